@@ -83,9 +83,19 @@ class PersistenceEngine:
 class SQLitePersistence(PersistenceEngine):
     """SQLite持久化引擎（使用aiosqlite进行异步操作）"""
 
-    def __init__(self, db_path: str = "loom.db", pool_size: int = 5):
+    def __init__(
+        self,
+        db_path: str = "loom.db",
+        pool_size: int = 5,
+        embedding_dtype: Optional[str] = None,
+    ):
         self.db_path = Path(db_path)
         self.pool_size = pool_size
+        # 记忆嵌入BLOB的存储精度：float32 / float16 / int8。
+        # 默认None时按原样保存和返回（与旧版本一致）；设置后写入带类型头的BLOB，
+        # 读取时解码为浮点列表，无类型头的旧数据按float32字节解析。
+        # 已有数据库启用前需确认调用方不依赖load_memories返回原始字节
+        self.embedding_dtype = embedding_dtype
         self._connection_pool: List[aiosqlite.Connection] = []
         self._pool_lock = asyncio.Lock()
         self._migration_version = 3
@@ -595,7 +605,7 @@ class SQLitePersistence(PersistenceEngine):
                         memory_dict["updated_at"],
                         memory_dict.get("version", 1),
                         json.dumps(memory_dict.get("metadata", {})),
-                        memory_dict.get("embedding"),
+                        self._encode_embedding(memory_dict.get("embedding")),
                     ),
                 )
 
@@ -607,6 +617,32 @@ class SQLitePersistence(PersistenceEngine):
             )
             return False
 
+    def _encode_embedding(self, embedding) -> Optional[bytes]:
+        """将嵌入向量编码为紧凑的BLOB（未配置精度或已是字节串时原样保存）"""
+        if (
+            self.embedding_dtype is None
+            or embedding is None
+            or isinstance(embedding, (bytes, bytearray, memoryview))
+        ):
+            return embedding
+
+        from ..memory.quantization import encode_embedding_blob
+
+        return encode_embedding_blob(embedding, self.embedding_dtype)
+
+    def _decode_embedding(self, blob) -> Optional[List[float]]:
+        """解码嵌入BLOB为浮点列表（未配置精度时原样返回）"""
+        if blob is None or self.embedding_dtype is None:
+            return blob
+
+        try:
+            from ..memory.quantization import decode_embedding_blob
+
+            return decode_embedding_blob(blob)
+        except Exception as e:
+            logger.warning(f"Failed to decode memory embedding: {e}")
+            return None
+
     async def load_memories(
         self, session_id: str, limit: int = 100, offset: int = 0
     ) -> List[Dict]:
@@ -637,7 +673,7 @@ class SQLitePersistence(PersistenceEngine):
                             "updated_at": row[5],
                             "version": row[6],
                             "metadata": json.loads(row[7]) if row[7] else {},
-                            "embedding": row[8],
+                            "embedding": self._decode_embedding(row[8]),
                         }
                     )
 
@@ -757,7 +793,7 @@ class SQLitePersistence(PersistenceEngine):
                             "updated_at": row[5],
                             "version": row[6],
                             "metadata": json.loads(row[7]) if row[7] else {},
-                            "embedding": row[8],
+                            "embedding": self._decode_embedding(row[8]),
                         }
                     )
 
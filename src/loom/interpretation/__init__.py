@@ -96,6 +96,7 @@ from .resource_analyzer import (
     get_resource_analyzer,
 )
 from .rule_interpreter import RuleInterpreter
+from .semantic_cache import SemanticCache
 
 __all__ = [
     # 基础组件
@@ -143,6 +144,7 @@ __all__ = [
     "LocalModelInfo",
     "LocalModelType",
     "ModelPerformanceMetrics",
+    "SemanticCache",
     # 性能监控组件
     "PerformanceMonitor",
     "Metric",
@@ -904,7 +904,7 @@ class EnhancedConsistencyChecker(ConsistencyChecker):
 
             # 调用LLM
             llm_response = await self.llm_provider.generate(
-                prompt, temperature=0.3, max_tokens=500
+                prompt, temperature=0.3, max_tokens=500, semantic_cache=True
             )
 
             # 解析LLM响应
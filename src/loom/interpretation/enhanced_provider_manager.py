@@ -5,7 +5,8 @@
 """
 
 import asyncio
-import statistics
+import math
+import random
 import time
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -13,7 +14,9 @@ from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
 
 from ..utils.logging_config import get_logger
-from .llm_provider import LLMProvider, LLMResponse, ProviderManager
+from .error_handler import CircuitOpenError
+from .llm_provider import LLMProvider, LLMRequest, LLMResponse, ProviderManager
+from .performance_optimizer import SingleFlight
 
 logger = get_logger(__name__)
 
@@ -41,17 +44,89 @@ class ProviderHealth:
     last_success: Optional[datetime] = None
 
 
+class LatencySketch:
+    """固定大小的延迟分位数草图
+
+    按对数间隔分桶计数（相邻桶边界相差 gamma 倍，相对误差约 (gamma-1)/2），
+    写入O(1)，查询分位数只遍历固定数量的桶。
+    样本数超过 max_count 时全部计数减半，使草图偏向近期样本。
+    """
+
+    def __init__(
+        self,
+        min_value: float = 0.001,
+        max_value: float = 600.0,
+        gamma: float = 1.08,
+        max_count: int = 1000,
+    ):
+        self.min_value = min_value
+        self.gamma = gamma
+        self._log_gamma = math.log(gamma)
+        self.max_count = max_count
+        size = int(math.ceil(math.log(max_value / min_value) / self._log_gamma)) + 2
+        self._counts = [0.0] * size
+        self.total = 0.0
+
+    def add(self, value: float):
+        """写入一个样本"""
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = int(math.ceil(math.log(value / self.min_value) / self._log_gamma))
+            index = min(index, len(self._counts) - 1)
+        self._counts[index] += 1
+        self.total += 1
+
+        if self.total > self.max_count:
+            self._counts = [count / 2 for count in self._counts]
+            self.total /= 2
+
+    def quantile(self, q: float) -> float:
+        """估计分位数（无样本时返回0）"""
+        if self.total <= 0:
+            return 0.0
+
+        target = q * self.total
+        cumulative = 0.0
+        for index, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= target and count > 0:
+                if index == 0:
+                    return self.min_value
+                # 取桶 (min * gamma^(i-1), min * gamma^i] 的中点
+                upper = self.min_value * self.gamma**index
+                return upper * 2 / (1 + self.gamma)
+        return self.min_value * self.gamma ** (len(self._counts) - 1)
+
+
 @dataclass
 class ProviderMetrics:
-    """Provider性能指标"""
+    """Provider性能指标
+
+    延迟以流式方式统计：EWMA反映近期延迟，分位数草图估计p95，
+    读取都不需要遍历历史样本。
+    """
 
     request_count: int = 0
     success_count: int = 0
     total_tokens: int = 0
     total_cost: float = 0.0
-    latency_history: List[float] = field(default_factory=list)
+    latency_count: int = 0
+    ewma_latency: float = 0.0
+    ewma_alpha: float = 0.3
+    outstanding: int = 0  # 在途请求数
+    latency_sketch: LatencySketch = field(default_factory=LatencySketch)
     error_history: List[Dict[str, Any]] = field(default_factory=list)
 
+    def record_latency(self, latency: float):
+        """记录一次成功请求的延迟"""
+        if self.latency_count == 0:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.ewma_alpha * (latency - self.ewma_latency)
+        self.latency_count += 1
+        self.latency_sketch.add(latency)
+
     @property
     def success_rate(self) -> float:
         """计算成功率"""
@@ -61,17 +136,15 @@ class ProviderMetrics:
 
     @property
     def avg_latency(self) -> float:
-        """计算平均延迟"""
-        if not self.latency_history:
-            return 0.0
-        return statistics.mean(self.latency_history)
+        """近期平均延迟（EWMA）"""
+        return self.ewma_latency
 
     @property
     def p95_latency(self) -> float:
         """计算95百分位延迟"""
-        if len(self.latency_history) < 2:
+        if self.latency_count < 2:
             return 0.0
-        return statistics.quantiles(self.latency_history, n=20)[18]  # 95th percentile
+        return self.latency_sketch.quantile(0.95)
 
 
 class ProviderHealthMonitor:
@@ -82,12 +155,18 @@ class ProviderHealthMonitor:
         self.health_checks: Dict[str, ProviderHealth] = {}
         self.metrics: Dict[str, ProviderMetrics] = {}
         self.check_interval = config.get("health_check_interval", 60)  # 秒
+        self.ewma_alpha = config.get("latency_ewma_alpha", 0.3)
         self._monitoring_tasks: Dict[str, asyncio.Task] = {}
 
+    def _get_metrics(self, name: str) -> ProviderMetrics:
+        if name not in self.metrics:
+            self.metrics[name] = ProviderMetrics(ewma_alpha=self.ewma_alpha)
+        return self.metrics[name]
+
     async def monitor_provider(self, name: str, provider: LLMProvider):
         """开始监控Provider"""
         self.health_checks[name] = ProviderHealth()
-        self.metrics[name] = ProviderMetrics()
+        self.metrics[name] = ProviderMetrics(ewma_alpha=self.ewma_alpha)
 
         # 启动健康检查任务
         task = asyncio.create_task(self._monitor_loop(name, provider))
@@ -135,17 +214,10 @@ class ProviderHealthMonitor:
 
     async def record_success(self, name: str, response: LLMResponse, latency: float):
         """记录成功请求"""
-        if name not in self.metrics:
-            self.metrics[name] = ProviderMetrics()
-
-        metrics = self.metrics[name]
+        metrics = self._get_metrics(name)
         metrics.request_count += 1
         metrics.success_count += 1
-        metrics.latency_history.append(latency)
-
-        # 限制历史记录大小
-        if len(metrics.latency_history) > 100:
-            metrics.latency_history = metrics.latency_history[-100:]
+        metrics.record_latency(latency)
 
         # 更新健康状态
         if name in self.health_checks:
@@ -157,10 +229,7 @@ class ProviderHealthMonitor:
 
     async def record_failure(self, name: str, error: str):
         """记录失败请求"""
-        if name not in self.metrics:
-            self.metrics[name] = ProviderMetrics()
-
-        metrics = self.metrics[name]
+        metrics = self._get_metrics(name)
         metrics.request_count += 1
         metrics.error_history.append(
             {"timestamp": datetime.now().isoformat(), "error": error}
@@ -181,6 +250,20 @@ class ProviderHealthMonitor:
             if health.consecutive_failures >= 3:
                 health.healthy = False
 
+    def request_started(self, name: str):
+        """记录请求开始（用于最少在途请求路由）"""
+        self._get_metrics(name).outstanding += 1
+
+    def request_finished(self, name: str):
+        """记录请求结束"""
+        metrics = self._get_metrics(name)
+        metrics.outstanding = max(0, metrics.outstanding - 1)
+
+    def is_healthy(self, name: str) -> bool:
+        """Provider是否健康（未监控的Provider视为不健康）"""
+        health = self.health_checks.get(name)
+        return health is not None and health.healthy
+
     async def get_provider_health(self, name: str) -> Dict[str, Any]:
         """获取Provider健康状态"""
         if name not in self.health_checks:
@@ -206,6 +289,7 @@ class ProviderHealthMonitor:
                 "success_rate": metrics.success_rate,
                 "avg_latency": metrics.avg_latency,
                 "p95_latency": metrics.p95_latency,
+                "outstanding": metrics.outstanding,
                 "total_tokens": metrics.total_tokens,
             },
         }
@@ -261,22 +345,25 @@ class ProviderLoadBalancer:
         model: Optional[str] = None,
         priority: ProviderPriority = ProviderPriority.BALANCED,
         health_monitor: Optional[ProviderHealthMonitor] = None,
+        exclude: Optional[List[str]] = None,
     ) -> str:
-        """选择最佳Provider"""
+        """选择最佳Provider（exclude中的Provider不参与选择）"""
         if not self.providers:
             raise ValueError("No providers available")
 
         # 过滤可用的Provider
         available_providers = []
         for name, provider in self.providers.items():
-            if not provider.enabled:
+            if not provider.enabled or (exclude and name in exclude):
+                continue
+
+            # 熔断中的Provider不参与选择
+            if provider.circuit_open(model):
                 continue
 
             # 检查健康状态
-            if health_monitor:
-                health = await health_monitor.get_provider_health(name)
-                if not health.get("healthy", True):
-                    continue
+            if health_monitor and not health_monitor.is_healthy(name):
+                continue
 
             available_providers.append(name)
 
@@ -287,11 +374,11 @@ class ProviderLoadBalancer:
         if priority == ProviderPriority.COST:
             return self._select_by_cost(available_providers)
         elif priority == ProviderPriority.SPEED:
-            return await self._select_by_speed(available_providers, health_monitor)
+            return self._select_by_speed(available_providers, health_monitor)
         elif priority == ProviderPriority.QUALITY:
-            return await self._select_by_quality(available_providers, health_monitor)
+            return self._select_by_quality(available_providers, health_monitor)
         else:  # BALANCED
-            return await self._select_balanced(available_providers, health_monitor)
+            return self._select_balanced(available_providers, health_monitor)
 
     def _select_by_cost(self, providers: List[str]) -> str:
         """成本优先选择"""
@@ -299,27 +386,27 @@ class ProviderLoadBalancer:
         # 实际实现应考虑每个Provider的成本模型
         return providers[0]
 
-    async def _select_by_speed(
+    @staticmethod
+    def _metrics(
+        name: str, health_monitor: Optional[ProviderHealthMonitor]
+    ) -> ProviderMetrics:
+        if health_monitor is None:
+            return ProviderMetrics()
+        return health_monitor.metrics.get(name) or ProviderMetrics()
+
+    def _select_by_speed(
         self, providers: List[str], health_monitor: Optional[ProviderHealthMonitor]
     ) -> str:
-        """速度优先选择"""
+        """速度优先选择：近期延迟（EWMA）最低的Provider"""
         if not health_monitor or len(providers) == 1:
             return providers[0]
 
-        # 选择延迟最低的Provider
-        fastest_provider = providers[0]
-        fastest_latency = float("inf")
-
-        for name in providers:
-            health = await health_monitor.get_provider_health(name)
-            latency = health.get("metrics", {}).get("avg_latency", float("inf"))
-            if latency < fastest_latency:
-                fastest_latency = latency
-                fastest_provider = name
-
-        return fastest_provider
+        return min(
+            providers,
+            key=lambda name: self._metrics(name, health_monitor).ewma_latency,
+        )
 
-    async def _select_by_quality(
+    def _select_by_quality(
         self, providers: List[str], health_monitor: Optional[ProviderHealthMonitor]
     ) -> str:
         """质量优先选择"""
@@ -331,23 +418,52 @@ class ProviderLoadBalancer:
         best_success_rate = 0.0
 
         for name in providers:
-            health = await health_monitor.get_provider_health(name)
-            success_rate = health.get("metrics", {}).get("success_rate", 0.0)
+            success_rate = self._metrics(name, health_monitor).success_rate
             if success_rate > best_success_rate:
                 best_success_rate = success_rate
                 best_provider = name
 
         return best_provider
 
-    async def _select_balanced(
+    def _load_score(
+        self, name: str, health_monitor: Optional[ProviderHealthMonitor]
+    ) -> float:
+        """预期等待代价：近期延迟 × (在途请求数 + 1) / 权重，越低越好"""
+        metrics = self._metrics(name, health_monitor)
+        return (
+            metrics.ewma_latency
+            * (metrics.outstanding + 1)
+            / self.weights.get(name, 1.0)
+        )
+
+    def _select_balanced(
         self, providers: List[str], health_monitor: Optional[ProviderHealthMonitor]
     ) -> str:
-        """平衡策略选择"""
-        # 加权随机选择，考虑权重、延迟和成功率
+        """平衡策略选择
+
+        - p2c：随机取两个Provider，选择预期等待代价较低的一个
+        - least_outstanding：在途请求最少的Provider，相同时比较近期延迟
+        - 其他：按权重、成功率和近期延迟加权随机
+        """
         if len(providers) == 1:
             return providers[0]
 
-        import random
+        if self.selection_strategy == "p2c":
+            first, second = random.sample(providers, 2)
+            if self._load_score(second, health_monitor) < self._load_score(
+                first, health_monitor
+            ):
+                return second
+            return first
+
+        if self.selection_strategy == "least_outstanding":
+            return min(
+                providers,
+                key=lambda name: (
+                    self._metrics(name, health_monitor).outstanding,
+                    self._metrics(name, health_monitor).ewma_latency,
+                ),
+            )
 
         # 计算每个Provider的得分
         scores = {}
@@ -355,14 +471,11 @@ class ProviderLoadBalancer:
             score = self.weights.get(name, 1.0)
 
             if health_monitor:
-                health = await health_monitor.get_provider_health(name)
-                success_rate = health.get("metrics", {}).get("success_rate", 0.5)
-                avg_latency = health.get("metrics", {}).get("avg_latency", 1.0)
-
+                metrics = self._metrics(name, health_monitor)
                 # 成功率越高得分越高
-                score *= success_rate
+                score *= metrics.success_rate
                 # 延迟越低得分越高
-                score *= 1.0 / max(avg_latency, 0.1)
+                score *= 1.0 / max(metrics.ewma_latency, 0.1)
 
             scores[name] = max(0.1, score)
 
@@ -445,6 +558,25 @@ class EnhancedProviderManager(ProviderManager):
         self.load_balancer = ProviderLoadBalancer(config)
         self.fallback_strategy = FallbackStrategy(config)
         self.cost_tracker = None  # 将在集成CostOptimizer时设置
+        self.enable_coalescing = config.get("enable_coalescing", True)
+        self._single_flight = SingleFlight()
+
+        # 对冲请求：主Provider超过其p95延迟仍未返回时，向次优Provider发出同一请求。
+        # 对冲会重复计费，默认关闭，且需配置cost_tracker做预算检查
+        self.enable_hedging = config.get("enable_hedging", False)
+        self.hedge_min_delay = config.get("hedge_min_delay", 0.05)  # 秒
+        self.hedge_min_samples = config.get("hedge_min_samples", 10)
+        self.hedge_estimated_output_tokens = config.get(
+            "hedge_estimated_output_tokens", 500
+        )
+        self._hedge_stats = {
+            "requests": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "primary_wins": 0,
+            "skipped_budget": 0,
+            "cancelled": 0,
+        }
 
     async def register_provider(self, name: str, provider: LLMProvider):
         """注册Provider"""
@@ -481,7 +613,34 @@ class EnhancedProviderManager(ProviderManager):
         priority: ProviderPriority = ProviderPriority.BALANCED,
         **kwargs,
     ) -> LLMResponse:
-        """智能故障转移生成"""
+        """智能故障转移生成
+
+        相同请求（提示、参数和优先级都相同）同时到达时合并为一次调用，
+        包括故障转移在内只执行一次，所有调用者共享结果。
+        """
+        if not self.enable_coalescing:
+            return await self._generate_with_intelligent_fallback(
+                prompt, priority, **kwargs
+            )
+
+        request = LLMRequest(
+            prompt=prompt,
+            model=kwargs.get("model"),
+            temperature=kwargs.get("temperature", 0.7),
+            max_tokens=kwargs.get("max_tokens"),
+            extra_params=kwargs,
+        )
+        return await self._single_flight.run(
+            f"{priority.value}:{request.get_hash()}",
+            lambda: self._generate_with_intelligent_fallback(
+                prompt, priority, **kwargs
+            ),
+        )
+
+    async def _generate_with_intelligent_fallback(
+        self, prompt: str, priority: ProviderPriority, **kwargs
+    ) -> LLMResponse:
+        """智能故障转移生成的具体实现"""
         start_time = time.time()
 
         try:
@@ -494,9 +653,14 @@ class EnhancedProviderManager(ProviderManager):
                 f"Selected provider: {selected_provider} with priority: {priority.value}"
             )
 
-            # 2. 尝试生成
-            provider = self.providers[selected_provider]
-            response = await provider.generate(prompt, **kwargs)
+            # 2. 尝试生成（主Provider过慢时对冲到次优Provider）
+            hedge_delay = self._hedge_delay(selected_provider)
+            if hedge_delay is not None:
+                return await self._generate_hedged(
+                    selected_provider, prompt, priority, hedge_delay, **kwargs
+                )
+
+            response = await self._call_provider(selected_provider, prompt, **kwargs)
 
             # 3. 记录成功
             latency = time.time() - start_time
@@ -537,19 +701,22 @@ class EnhancedProviderManager(ProviderManager):
                     f"Falling back from {selected_provider} to {fallback_provider}"
                 )
 
-                # 等待回退延迟
-                if self.fallback_strategy.fallback_delay > 0:
+                # 等待回退延迟（熔断拒绝的请求未发出，无需等待）
+                if self.fallback_strategy.fallback_delay > 0 and not isinstance(
+                    e, CircuitOpenError
+                ):
                     await asyncio.sleep(self.fallback_strategy.fallback_delay)
 
                 # 尝试回退Provider
                 try:
-                    provider = self.providers[fallback_provider]
-                    response = await provider.generate(prompt, **kwargs)
+                    fallback_start = time.time()
+                    response = await self._call_provider(
+                        fallback_provider, prompt, **kwargs
+                    )
 
-                    # 记录回退成功
-                    total_latency = time.time() - start_time
+                    # 记录回退成功（只计回退Provider自身的延迟）
                     await self.health_monitor.record_success(
-                        fallback_provider, response, total_latency
+                        fallback_provider, response, time.time() - fallback_start
                     )
 
                     if self.cost_tracker:
@@ -566,6 +733,159 @@ class EnhancedProviderManager(ProviderManager):
             logger.error(f"All providers failed for prompt: {prompt[:100]}...")
             return await self._generate_degraded_response(prompt, **kwargs)
 
+    async def _call_provider(self, name: str, prompt: str, **kwargs) -> LLMResponse:
+        """调用Provider，期间计入在途请求数"""
+        self.health_monitor.request_started(name)
+        try:
+            response = await self.providers[name].generate(prompt, **kwargs)
+        finally:
+            self.health_monitor.request_finished(name)
+
+        # 熔断中的Provider返回的降级响应按失败处理，以便立即故障转移
+        if response.metadata.get("circuit_open"):
+            raise CircuitOpenError(name)
+        return response
+
+    def _hedge_delay(self, name: str) -> Optional[float]:
+        """对冲等待时间：主Provider的p95延迟
+
+        未启用对冲、没有可对冲的Provider或延迟样本不足时返回None（不对冲）。
+        """
+        if not self.enable_hedging or len(self.providers) < 2:
+            return None
+        metrics = self.health_monitor.metrics.get(name)
+        if metrics is None or metrics.latency_count < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, metrics.p95_latency)
+
+    def _hedge_within_budget(self, name: str, prompt: str, **kwargs) -> bool:
+        """对冲会重复计费，发出前检查预算（没有成本跟踪器时不对冲）"""
+        if not self.cost_tracker or not hasattr(self.cost_tracker, "can_make_request"):
+            logger.info(f"Skipping hedge to {name}: no cost tracker configured")
+            return False
+
+        estimated_cost = 0.0
+        if hasattr(self.cost_tracker, "estimate_cost"):
+            provider = self.providers[name]
+            estimated_cost = self.cost_tracker.estimate_cost(
+                name,
+                kwargs.get("model", provider.model),
+                len(prompt) // 4,
+                kwargs.get("max_tokens") or self.hedge_estimated_output_tokens,
+            )
+        allowed, reason = self.cost_tracker.can_make_request(estimated_cost)
+        if not allowed:
+            logger.info(f"Skipping hedge to {name}: {reason}")
+        return allowed
+
+    async def _generate_hedged(
+        self,
+        primary: str,
+        prompt: str,
+        priority: ProviderPriority,
+        hedge_delay: float,
+        **kwargs,
+    ) -> LLMResponse:
+        """对冲生成
+
+        主Provider在p95延迟内未返回时，向次优Provider发出同一请求，
+        采用先成功返回的结果并取消另一个请求。
+        降级响应不算成功，会继续等待另一个请求。
+        全部失败时抛出主Provider的错误，由调用方记录并执行故障转移。
+        被取消的请求以已耗时作为延迟样本（下界），避免只记录胜者使p95偏低、
+        对冲率自我强化。
+        """
+        self._hedge_stats["requests"] += 1
+
+        async def _attempt(name: str) -> Tuple[float, LLMResponse]:
+            start_time = time.time()
+            response = await self._call_provider(name, prompt, **kwargs)
+            if response.metadata.get("fallback"):
+                raise RuntimeError(f"Provider {name} returned a fallback response")
+            return time.time() - start_time, response
+
+        pending = {asyncio.ensure_future(_attempt(primary)): primary}
+        started = {primary: time.time()}
+        done, _ = await asyncio.wait(set(pending), timeout=hedge_delay)
+
+        if not done:
+            try:
+                hedge = await self.load_balancer.select_provider(
+                    prompt,
+                    kwargs.get("model"),
+                    priority,
+                    self.health_monitor,
+                    exclude=[primary],
+                )
+            except ValueError:
+                hedge = None
+
+            if hedge is not None:
+                if self._hedge_within_budget(hedge, prompt, **kwargs):
+                    logger.info(f"Hedging slow provider {primary} with {hedge}")
+                    self._hedge_stats["hedged"] += 1
+                    pending[asyncio.ensure_future(_attempt(hedge))] = hedge
+                    started[hedge] = time.time()
+                else:
+                    self._hedge_stats["skipped_budget"] += 1
+
+        hedged = len(pending) > 1
+        primary_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    set(pending), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = pending.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        logger.warning(f"Provider {name} failed: {error}")
+                        if name == primary:
+                            # 主Provider的失败在全部失败时交由调用方记录
+                            primary_error = error
+                        else:
+                            await self.health_monitor.record_failure(name, str(error))
+                        continue
+
+                    latency, response = task.result()
+                    if primary_error is not None:
+                        await self.health_monitor.record_failure(
+                            primary, str(primary_error)
+                        )
+                    await self.health_monitor.record_success(name, response, latency)
+                    if self.cost_tracker:
+                        self.cost_tracker.record_usage(name, response)
+                    if hedged:
+                        key = "primary_wins" if name == primary else "hedge_wins"
+                        self._hedge_stats[key] += 1
+                    return response
+        finally:
+            # 取消落败的请求，记录其已耗时
+            now = time.time()
+            for task, name in pending.items():
+                task.cancel()
+                self._hedge_stats["cancelled"] += 1
+                self.health_monitor._get_metrics(name).record_latency(
+                    now - started[name]
+                )
+
+        raise primary_error
+
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """获取对冲统计（对冲率和对冲请求的胜率）"""
+        stats = self._hedge_stats
+        return {
+            **stats,
+            "enabled": self.enable_hedging,
+            "hedge_rate": (
+                stats["hedged"] / stats["requests"] if stats["requests"] else 0.0
+            ),
+            "hedge_win_rate": (
+                stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+            ),
+        }
+
     async def _generate_degraded_response(self, prompt: str, **kwargs) -> LLMResponse:
         """生成降级响应"""
         logger.warning("Generating degraded response due to all provider failures")
@@ -593,6 +913,7 @@ class EnhancedProviderManager(ProviderManager):
                 "success_rate": 0.0,
                 "avg_latency": 0.0,
                 "healthy_providers": 0,
+                "concurrency_limits": {},
             },
         }
 
@@ -616,8 +937,16 @@ class EnhancedProviderManager(ProviderManager):
             if self.cost_tracker and hasattr(self.cost_tracker, "get_provider_cost"):
                 cost_info = self.cost_tracker.get_provider_cost(name)
 
+            # 自适应并发上限（按模型）
+            concurrency = provider_stats.get("concurrency") or {}
+            concurrency_limits = {
+                model: limiter_stats.get("limit")
+                for model, limiter_stats in concurrency.items()
+            }
+
             stats["providers"][name] = {
                 **provider_stats,
+                "concurrency_limits": concurrency_limits,
                 "health": health,
                 "load_balancing_weight": weight,
                 "cost": cost_info,
@@ -631,6 +960,8 @@ class EnhancedProviderManager(ProviderManager):
             stats["overall"]["total_tokens"] += provider_stats.get("total_tokens", 0)
             stats["overall"]["total_cost"] += cost_info.get("total_cost", 0.0)
 
+            if concurrency_limits:
+                stats["overall"]["concurrency_limits"][name] = concurrency_limits
             if health.get("healthy", False):
                 stats["overall"]["healthy_providers"] += 1
 
@@ -655,6 +986,7 @@ class EnhancedProviderManager(ProviderManager):
         if latency_count > 0:
             stats["overall"]["avg_latency"] = total_latency / latency_count
 
+        stats["hedging"] = self.get_hedging_stats()
         return stats
 
     async def update_provider_weights(self, weights: Dict[str, float]):
@@ -8,6 +8,7 @@
 import asyncio
 import random
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
@@ -97,57 +98,174 @@ class RetryPolicy:
         return delay
 
 
+class CircuitOpenError(Exception):
+    """熔断器打开，请求在发出前被拒绝"""
+
+    def __init__(self, provider: str, retry_in: float = 0.0):
+        super().__init__(
+            f"Circuit breaker open for {provider}, retry in {retry_in:.1f}s"
+        )
+        self.provider = provider
+        self.retry_in = retry_in
+
+
 @dataclass
 class CircuitBreakerState:
-    """熔断器状态"""
-
-    is_open: bool = False
-    failure_count: int = 0
+    """熔断器状态（滑动窗口）
+
+    关闭：记录最近 window_size 次调用结果，至少 min_calls 次调用且
+    失败比例达到 failure_threshold 时打开。
+    打开：拒绝所有请求，reset_timeout 秒后进入半开。
+    半开：最多放行 half_open_max_calls 个探测请求，
+    探测成功则关闭并清空窗口，失败则重新打开。
+    """
+
+    window_size: int = 20
+    min_calls: int = 5
+    failure_threshold: float = 0.5
+    reset_timeout: float = 30.0
+    half_open_max_calls: int = 1
+
+    state: str = "closed"  # closed / open / half_open
     last_failure_time: Optional[datetime] = None
     last_success_time: Optional[datetime] = None
     opened_at: Optional[datetime] = None
+    times_opened: int = 0
+    rejected_count: int = 0
+    _outcomes: deque = field(default_factory=deque, repr=False)
+    _failures: int = field(default=0, repr=False)
+    _opened_monotonic: float = field(default=0.0, repr=False)
+    _probes: int = field(default=0, repr=False)
+    _probe_started: float = field(default=0.0, repr=False)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open"
+
+    @property
+    def failure_count(self) -> int:
+        """窗口内的失败次数"""
+        return self._failures
+
+    @property
+    def failure_ratio(self) -> float:
+        """窗口内的失败比例"""
+        return self._failures / len(self._outcomes) if self._outcomes else 0.0
+
+    def retry_in(self) -> float:
+        """距离进入半开还需等待的秒数"""
+        if self.state != "open":
+            return 0.0
+        elapsed = time.monotonic() - self._opened_monotonic
+        return max(0.0, self.reset_timeout - elapsed)
+
+    def rejects_request(self) -> bool:
+        """当前是否会拒绝请求（只查询，不占用半开探测名额）"""
+        if self.state == "open":
+            return self.retry_in() > 0
+        if self.state == "half_open":
+            return not self._probe_available()
+        return False
 
-    def should_allow_request(self, reset_timeout: float = 60.0) -> bool:
-        """是否允许请求"""
-        if not self.is_open:
-            return True
-
-        # 检查是否应该重置
-        if self.opened_at:
-            elapsed = (datetime.now() - self.opened_at).total_seconds()
-            if elapsed >= reset_timeout:
-                # 尝试半开状态
-                self.is_open = False
-                logger.info(
-                    f"Circuit breaker transitioning to half-open after {elapsed:.1f}s"
-                )
-                return True
+    def _probe_available(self) -> bool:
+        # 探测请求被取消时不会回报结果，超过reset_timeout后允许新的探测
+        if time.monotonic() - self._probe_started >= self.reset_timeout:
+            self._probes = 0
+        return self._probes < self.half_open_max_calls
 
-        return False
+    def should_allow_request(self, reset_timeout: Optional[float] = None) -> bool:
+        """是否允许请求（半开状态下放行的请求占用探测名额）"""
+        if reset_timeout is not None:
+            self.reset_timeout = reset_timeout
+
+        if self.state == "open":
+            if self.retry_in() > 0:
+                self.rejected_count += 1
+                return False
+            self.state = "half_open"
+            self._probes = 0
+            logger.info(
+                f"Circuit breaker transitioning to half-open after "
+                f"{time.monotonic() - self._opened_monotonic:.1f}s"
+            )
+
+        if self.state == "half_open":
+            if not self._probe_available():
+                self.rejected_count += 1
+                return False
+            if self._probes == 0:
+                self._probe_started = time.monotonic()
+            self._probes += 1
+
+        return True
+
+    def _record(self, failed: bool):
+        self._outcomes.append(failed)
+        self._failures += failed
+        while len(self._outcomes) > self.window_size:
+            self._failures -= self._outcomes.popleft()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = datetime.now()
+        self._opened_monotonic = time.monotonic()
+        self._probes = 0
+        self.times_opened += 1
 
     def record_failure(self):
         """记录失败"""
-        self.failure_count += 1
         self.last_failure_time = datetime.now()
 
-        # 如果失败次数过多，打开熔断器
-        if self.failure_count >= 5 and not self.is_open:
-            self.is_open = True
-            self.opened_at = datetime.now()
+        if self.state == "half_open":
+            self._open()
+            logger.warning("Circuit breaker re-opened after failed probe")
+            return
+
+        self._record(True)
+        if (
+            self.state == "closed"
+            and len(self._outcomes) >= self.min_calls
+            and self.failure_ratio >= self.failure_threshold
+        ):
+            self._open()
             logger.warning(
-                f"Circuit breaker opened after {self.failure_count} failures"
+                f"Circuit breaker opened after {self._failures} failures "
+                f"in {len(self._outcomes)} calls"
             )
 
     def record_success(self):
         """记录成功"""
-        self.failure_count = 0
         self.last_success_time = datetime.now()
 
-        # 如果熔断器是打开的，关闭它
-        if self.is_open:
-            self.is_open = False
+        # 半开探测成功或熔断期间收到迟到的成功结果：关闭熔断器
+        if self.state != "closed":
+            self.state = "closed"
             self.opened_at = None
+            self._outcomes.clear()
+            self._failures = 0
+            self._probes = 0
             logger.info("Circuit breaker closed after successful request")
+            return
+
+        self._record(False)
+
+    def record_ignored(self):
+        """请求结束但结果不反映Provider可用性（如限流、请求本身无效）"""
+        if self.state == "half_open":
+            self._probes = max(0, self._probes - 1)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        return {
+            "state": self.state,
+            "failure_count": self._failures,
+            "window_calls": len(self._outcomes),
+            "failure_ratio": self.failure_ratio,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected_count,
+            "retry_in": self.retry_in(),
+            "opened_at": self.opened_at.isoformat() if self.opened_at else None,
+        }
 
 
 class ErrorHandler:
@@ -167,9 +285,9 @@ class ErrorHandler:
         """记录错误"""
         self.error_history.append(error_info)
 
-        # 限制历史记录大小
-        if len(self.error_history) > self.max_history_size:
-            self.error_history = self.error_history[-self.max_history_size :]
+        # 限制历史记录大小（超出一倍时才整体裁剪，均摊O(1)）
+        if len(self.error_history) > 2 * self.max_history_size:
+            del self.error_history[: -self.max_history_size]
 
         # 更新Provider健康状态
         provider = error_info.provider
@@ -267,7 +385,9 @@ class ErrorHandler:
         if provider in self.circuit_breakers:
             circuit_breaker = self.circuit_breakers[provider]
             health["circuit_breaker_open"] = circuit_breaker.is_open
+            health["circuit_state"] = circuit_breaker.state
             health["failure_count"] = circuit_breaker.failure_count
+            health["failure_ratio"] = circuit_breaker.failure_ratio
             if circuit_breaker.opened_at:
                 health[
                     "circuit_breaker_opened_at"
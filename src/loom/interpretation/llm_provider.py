@@ -11,15 +11,27 @@ import hashlib
 import json
 import time
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any, AsyncGenerator, Dict, List, Optional, Union
 
 import aiohttp
 import backoff
 from aiohttp import ClientSession, ClientTimeout
 
+from ..utils.async_helpers import AdaptiveConcurrencyLimiter
 from ..utils.logging_config import get_logger
+from .error_handler import CircuitBreakerState, CircuitOpenError
+from .performance_optimizer import (
+    BatchProcessor,
+    BatchRequest,
+    ConnectionPool,
+    ResponseCache,
+    SingleFlight,
+)
+from .semantic_cache import SemanticCache
 
 logger = get_logger(__name__)
 
@@ -55,11 +67,67 @@ class LLMRequest:
     extra_params: Dict[str, Any] = field(default_factory=dict)
 
     def get_hash(self) -> str:
-        """获取请求哈希（用于缓存）"""
+        """获取请求哈希（用于缓存和在途请求合并）"""
         content = f"{self.prompt}:{self.model}:{self.temperature}:{self.max_tokens}"
+        extra = {
+            key: value
+            for key, value in self.extra_params.items()
+            if key not in ("model", "temperature", "max_tokens")
+        }
+        if extra:
+            # 其他生成参数（如stop、top_p）不同时结果不同，不能共用
+            content += ":" + json.dumps(extra, sort_keys=True, default=str)
         return hashlib.md5(content.encode()).hexdigest()
 
 
+class ProviderHTTPError(Exception):
+    """上游API返回非200状态码"""
+
+    def __init__(self, status: int, headers: Optional[Any] = None):
+        super().__init__(f"API error: {status}")
+        self.status = status
+        self.retry_after = self._parse_retry_after(headers)
+
+    @staticmethod
+    def _parse_retry_after(headers: Optional[Any]) -> Optional[float]:
+        """解析Retry-After头（秒数或HTTP日期）"""
+        value = headers.get("Retry-After") if isinstance(headers, Mapping) else None
+        if not isinstance(value, str) or not value.strip():
+            return None
+
+        value = value.strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    @property
+    def overloaded(self) -> bool:
+        """限流或服务端错误，说明上游已过载"""
+        return self.status == 429 or self.status >= 500
+
+    @property
+    def retryable(self) -> bool:
+        return self.overloaded or self.status == 408
+
+
+def _chat_completion_delta(event: Dict[str, Any], result: Dict[str, Any]) -> str:
+    """解析OpenAI兼容格式的流式数据块，返回增量文本"""
+    if event.get("model"):
+        result["model"] = event["model"]
+    if event.get("usage"):
+        result["usage"] = event["usage"]
+    choices = event.get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
+
+
 class LLMProvider(ABC):
     """LLM提供者抽象基类（增强版）"""
 
@@ -76,9 +144,15 @@ class LLMProvider(ABC):
 
         # 性能优化配置
         self.connection_pool_size = config.get("connection_pool_size", 5)
+        self.connector_limit = config.get("connector_limit", 100)
+        self.limit_per_host = config.get("limit_per_host", 0)
+        self.keepalive_timeout = config.get("keepalive_timeout", 30.0)
+        self.ttl_dns_cache = config.get("ttl_dns_cache", 300)
         self.enable_batching = config.get("enable_batching", False)
+        self.batch_concurrency = config.get("batch_concurrency", 10)
         self.enable_caching = config.get("enable_caching", True)
         self.cache_ttl = config.get("cache_ttl", 300)  # 5分钟
+        self.enable_coalescing = config.get("enable_coalescing", True)
 
         # 统计信息
         self.request_count = 0
@@ -87,12 +161,51 @@ class LLMProvider(ABC):
         self.error_count = 0
         self.last_used = None
 
-        # 连接池
-        self._session_pool = []
-        self._session_lock = asyncio.Lock()
+        # 流式统计（TTFT：从发起请求到收到首个文本块的时间）
+        self.stream_count = 0
+        self.cancelled_streams = 0
+        self._ttft_total = 0.0
+        self._ttft_count = 0
+        self._ttft_last: Optional[float] = None
+        self._ttft_max = 0.0
+
+        # 共享连接池：generate与generate_stream共用同一个keep-alive会话
+        self._connection_pool = ConnectionPool(
+            max_size=max(self.connector_limit, self.connection_pool_size),
+            timeout=self.timeout,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
 
-        # 缓存
-        self._response_cache = {}
+        # 响应缓存：内存LRU层 + 可选的SQLite层（同一主机的进程间共享）
+        self._response_cache = ResponseCache(
+            max_size=config.get("cache_max_entries", 1000),
+            default_ttl=self.cache_ttl,
+            max_bytes=config.get("cache_max_bytes", 32 * 1024 * 1024),
+            db_path=config.get("cache_path"),
+            max_disk_bytes=config.get("cache_max_disk_bytes", 256 * 1024 * 1024),
+        )
+        # 在途请求合并：相同请求同时到达时只调用一次API
+        self._single_flight = SingleFlight()
+        # 微批处理：开启enable_batching时，参数相同的并发请求合并为一批
+        self._batch_processor = BatchProcessor(
+            max_batch_size=config.get("max_batch_size", 8),
+            max_wait_time=config.get("batch_wait_time", 0.02),
+            max_concurrency=config.get("max_concurrent_batches", 4),
+            handler=self._handle_batch,
+        )
+        # 语义缓存（可选）：只用于调用时传入 semantic_cache=True 的请求
+        self.semantic_cache: Optional[SemanticCache] = None
+        # 自适应并发限制（AIMD，按模型）：健康时缓慢放宽，429/5xx或延迟恶化时减半
+        self.adaptive_concurrency = {
+            "enabled": True,
+            **config.get("adaptive_concurrency", {}),
+        }
+        self._limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        # 熔断器（按模型）：滑动窗口失败比例过高时打开，请求在发出前即被拒绝
+        self.circuit_breaker = {"enabled": True, **config.get("circuit_breaker", {})}
+        self._breakers: Dict[str, CircuitBreakerState] = {}
 
         logger.info(f"Initialized LLM provider: {self.name} ({self.provider_type})")
 
@@ -102,7 +215,13 @@ class LLMProvider(ABC):
         pass
 
     async def generate(self, prompt: str, **kwargs) -> LLMResponse:
-        """生成文本（带重试机制）"""
+        """生成文本（带重试机制）
+
+        传入 semantic_cache=True 且已配置语义缓存时，
+        语义相近的历史提示可直接复用其响应（适用于低温度的工具类提示）。
+        """
+        use_semantic_cache = kwargs.pop("semantic_cache", False)
+
         # 创建请求对象
         request = LLMRequest(
             prompt=prompt,
@@ -115,24 +234,89 @@ class LLMProvider(ABC):
 
         # 检查缓存
         if self.enable_caching:
-            cached_response = self._get_cached_response(request)
+            cached_response = await self._get_cached_response(request)
             if cached_response:
                 logger.debug(f"Using cached response for {self.name}")
                 return cached_response
 
-        # 带退避的重试机制
+        # 熔断器打开时直接失败，不做嵌入计算和网络请求
+        breaker = self._get_breaker(request.model)
+        if breaker is not None and breaker.rejects_request():
+            return await self._reject_open_circuit(prompt, breaker, **kwargs)
+
+        match = None
+        if use_semantic_cache and self.semantic_cache is not None:
+            match = await self.semantic_cache.lookup(
+                self._semantic_scope(request), prompt
+            )
+            if match.hit and not match.verify:
+                cached = match.entry.value
+                return LLMResponse(
+                    content=cached["content"],
+                    model=cached["model"],
+                    usage=cached.get("usage", {}),
+                    metadata={
+                        **cached.get("metadata", {}),
+                        "semantic_cache_hit": True,
+                        "semantic_similarity": match.similarity,
+                    },
+                )
+
+        if self.enable_coalescing:
+            response = await self._single_flight.run(
+                request.get_hash(), lambda: self._generate_uncached(request, **kwargs)
+            )
+        else:
+            response = await self._generate_uncached(request, **kwargs)
+
+        if match is not None and not response.metadata.get("fallback"):
+            if match.hit:
+                await self.semantic_cache.record_verification(match, response.content)
+            else:
+                await self.semantic_cache.store(
+                    match.scope, prompt, response.to_dict(), vector=match.vector
+                )
+        return response
+
+    def _semantic_scope(self, request: LLMRequest) -> str:
+        """语义缓存作用域：Provider + 除提示外的全部生成参数"""
+        params = LLMRequest(
+            prompt="",
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            extra_params=request.extra_params,
+        )
+        return f"{self.name}:{params.get_hash()}"
+
+    def set_semantic_cache(self, cache: Optional[SemanticCache]):
+        """配置语义缓存（None表示关闭）"""
+        self.semantic_cache = cache
+
+    async def _generate_uncached(self, request: LLMRequest, **kwargs) -> LLMResponse:
+        """调用API生成（带重试和降级），成功后写入缓存"""
+        prompt = request.prompt
+        breaker = self._get_breaker(request.model)
+
+        # 带退避的重试机制（Retry-After 由并发限制器在下次获取许可时等待）
         @backoff.on_exception(
             backoff.expo,
-            (aiohttp.ClientError, asyncio.TimeoutError),
+            (aiohttp.ClientError, asyncio.TimeoutError, ProviderHTTPError),
             max_tries=self.max_retries,
             max_time=self.timeout,
+            giveup=lambda e: isinstance(e, ProviderHTTPError) and not e.retryable,
         )
         async def _generate_with_retry():
+            # 每次尝试前检查熔断器，打开后不再消耗剩余的重试次数
+            if breaker is not None and not breaker.should_allow_request():
+                raise CircuitOpenError(self.name, breaker.retry_in())
+
             self.request_count += 1
             self.last_used = datetime.now()
 
             try:
-                response = await self._generate_impl(prompt, **kwargs)
+                response = await self._dispatch_generate(prompt, **kwargs)
+                self._record_breaker(breaker, None)
 
                 # 更新统计
                 if response.usage:
@@ -141,17 +325,20 @@ class LLMProvider(ABC):
 
                 # 缓存响应
                 if self.enable_caching:
-                    self._cache_response(request, response)
+                    await self._cache_response(request, response)
 
                 return response
 
             except Exception as e:
+                self._record_breaker(breaker, e)
                 self.error_count += 1
                 logger.error(f"Provider {self.name} error: {e}")
                 raise
 
         try:
             return await _generate_with_retry()
+        except CircuitOpenError:
+            return await self._reject_open_circuit(prompt, breaker, **kwargs)
         except Exception as e:
             logger.error(f"All retries failed for {self.name}: {e}")
 
@@ -161,59 +348,199 @@ class LLMProvider(ABC):
             else:
                 raise
 
+    def _get_breaker(
+        self, model: Optional[str] = None
+    ) -> Optional[CircuitBreakerState]:
+        """获取模型的熔断器（未启用时返回None）"""
+        if not self.circuit_breaker.get("enabled"):
+            return None
+
+        model = model or self.model
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            options = {
+                key: value
+                for key, value in self.circuit_breaker.items()
+                if key != "enabled"
+            }
+            breaker = CircuitBreakerState(**options)
+            self._breakers[model] = breaker
+        return breaker
+
+    @staticmethod
+    def _record_breaker(
+        breaker: Optional[CircuitBreakerState], error: Optional[BaseException]
+    ):
+        """向熔断器反馈调用结果
+
+        连接错误、超时、5xx和认证失败说明Provider不可用；
+        限流（由并发限制器处理）和其他4xx只与单个请求有关，不计入失败。
+        """
+        if breaker is None:
+            return
+        if error is None:
+            breaker.record_success()
+        elif isinstance(error, ProviderHTTPError) and not (
+            error.status >= 500 or error.status in (401, 403)
+        ):
+            breaker.record_ignored()
+        else:
+            breaker.record_failure()
+
+    def circuit_open(self, model: Optional[str] = None) -> bool:
+        """模型的熔断器当前是否拒绝请求"""
+        breaker = self._breakers.get(model or self.model)
+        return breaker is not None and breaker.rejects_request()
+
+    async def _reject_open_circuit(
+        self, prompt: str, breaker: CircuitBreakerState, **kwargs
+    ) -> LLMResponse:
+        """熔断期间的请求：允许降级时返回降级响应，否则抛出CircuitOpenError"""
+        error = CircuitOpenError(self.name, breaker.retry_in())
+        logger.debug(str(error))
+        if not self.fallback_enabled:
+            raise error
+
+        response = await self._generate_fallback(prompt, **kwargs)
+        response.metadata["circuit_open"] = True
+        response.metadata["error"] = str(error)
+        return response
+
     async def generate_batch(self, prompts: List[str], **kwargs) -> List[LLMResponse]:
-        """批量生成文本"""
+        """批量生成文本
+
+        并发调用generate（最多batch_concurrency个同时进行），结果顺序与prompts一致。
+        开启enable_batching时，这些并发请求会在微批处理器中合并为批量调用。
+        """
+        semaphore = asyncio.Semaphore(max(1, self.batch_concurrency))
+
+        async def _generate_one(prompt: str) -> LLMResponse:
+            async with semaphore:
+                return await self.generate(prompt, **kwargs)
+
+        results = await asyncio.gather(
+            *(_generate_one(prompt) for prompt in prompts), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results
+
+    def _get_limiter(
+        self, model: Optional[str] = None
+    ) -> Optional[AdaptiveConcurrencyLimiter]:
+        """获取模型的并发限制器（未启用时返回None）"""
+        if not self.adaptive_concurrency.get("enabled"):
+            return None
+
+        model = model or self.model
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            options = {
+                key: value
+                for key, value in self.adaptive_concurrency.items()
+                if key != "enabled"
+            }
+            limiter = AdaptiveConcurrencyLimiter(**options)
+            self._limiters[model] = limiter
+        return limiter
+
+    @staticmethod
+    def _release_limiter(
+        limiter: AdaptiveConcurrencyLimiter,
+        latency: Optional[float],
+        error: Optional[BaseException],
+    ):
+        """归还许可：成功反馈延迟，过载类错误触发降低并发"""
+        if error is None:
+            limiter.release(latency=latency)
+        elif isinstance(error, ProviderHTTPError) and error.overloaded:
+            limiter.release(overloaded=True, retry_after=error.retry_after)
+        elif isinstance(error, asyncio.TimeoutError):
+            limiter.release(overloaded=True)
+        else:
+            limiter.release()
+
+    async def _limited(self, model: Optional[str], factory):
+        """在并发限制器的许可内执行一次上游调用"""
+        limiter = self._get_limiter(model)
+        if limiter is None:
+            return await factory()
+
+        await limiter.acquire()
+        start = time.monotonic()
+        try:
+            result = await factory()
+        except BaseException as e:
+            self._release_limiter(limiter, None, e)
+            raise
+
+        # 批量结果中的过载错误同样需要反馈
+        error = None
+        if isinstance(result, list):
+            error = next(
+                (
+                    item
+                    for item in result
+                    if isinstance(item, ProviderHTTPError) and item.overloaded
+                ),
+                None,
+            )
+        self._release_limiter(limiter, time.monotonic() - start, error)
+        return result
+
+    async def _dispatch_generate(self, prompt: str, **kwargs) -> LLMResponse:
+        """执行单次生成：开启批处理时经由微批处理器，否则直接调用"""
         if not self.enable_batching:
-            # 如果不支持批处理，则顺序处理
-            results = []
-            for prompt in prompts:
-                results.append(await self.generate(prompt, **kwargs))
-            return results
+            return await self._limited(
+                kwargs.get("model"), lambda: self._generate_impl(prompt, **kwargs)
+            )
 
-        # 创建批量请求
+        # 生成参数相同的请求才能合并到同一批次
+        batch_key = LLMRequest(
+            prompt="",
+            model=kwargs.get("model", self.model),
+            temperature=kwargs.get("temperature", 0.7),
+            max_tokens=kwargs.get("max_tokens"),
+            extra_params=kwargs,
+        ).get_hash()
+        return await self._batch_processor.submit(
+            batch_key, prompt, metadata={"kwargs": kwargs}
+        )
+
+    async def _handle_batch(self, batch: List[BatchRequest]) -> List[Any]:
+        """微批处理器的处理函数"""
+        kwargs = batch[0].metadata.get("kwargs", {})
         requests = [
             LLMRequest(
-                prompt=prompt,
+                prompt=item.prompt,
                 model=kwargs.get("model", self.model),
                 temperature=kwargs.get("temperature", 0.7),
                 max_tokens=kwargs.get("max_tokens"),
-                stream=False,
                 extra_params=kwargs,
             )
-            for prompt in prompts
+            for item in batch
         ]
+        # 一个批次占用一个并发许可
+        return await self._limited(
+            kwargs.get("model"), lambda: self._generate_batch_impl(requests)
+        )
 
-        try:
-            return await self._generate_batch_impl(requests)
-        except Exception as e:
-            logger.error(f"Batch generation failed for {self.name}: {e}")
-            # 降级为顺序处理
-            results = []
-            for request in requests:
-                try:
-                    response = await self.generate(
-                        request.prompt, **request.extra_params
-                    )
-                    results.append(response)
-                except Exception as inner_e:
-                    logger.error(f"Individual request failed: {inner_e}")
-                    results.append(
-                        await self._generate_fallback(
-                            request.prompt, **request.extra_params
-                        )
-                    )
-            return results
-
-    async def _generate_batch_impl(
-        self, requests: List[LLMRequest]
-    ) -> List[LLMResponse]:
-        """批量生成的具体实现（默认顺序处理）"""
-        results = []
-        for request in requests:
-            results.append(
-                await self._generate_impl(request.prompt, **request.extra_params)
-            )
-        return results
+    async def _generate_batch_impl(self, requests: List[LLMRequest]) -> List[Any]:
+        """批量生成的具体实现（默认并发调用单条接口）
+
+        支持原生批量接口的Provider可以覆盖此方法。
+
+        Returns:
+            与requests顺序一致的结果，失败的项为Exception实例
+        """
+        return await asyncio.gather(
+            *(
+                self._generate_impl(request.prompt, **request.extra_params)
+                for request in requests
+            ),
+            return_exceptions=True,
+        )
 
     async def _generate_fallback(self, prompt: str, **kwargs) -> LLMResponse:
         """降级生成（默认实现）"""
@@ -230,75 +557,252 @@ class LLMProvider(ABC):
             },
         )
 
-    @abstractmethod
-    async def generate_stream(self, prompt: str, **kwargs) -> AsyncGenerator[str, None]:
-        """流式生成文本"""
-        pass
+    async def generate_stream(
+        self, prompt: str, fallback: Optional[bool] = None, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """流式生成文本
+
+        首个文本块到达之前的失败按generate的语义重试和降级；
+        首个文本块之后的失败直接抛出（已输出的内容无法撤回）。
+        熔断打开时在发出请求前抛出CircuitOpenError，便于调用方立即切换Provider。
+        流结束时按上游返回的用量统计令牌和成本，并记录TTFT。
+
+        Args:
+            prompt: 提示文本
+            fallback: 重试耗尽时是否输出降级文本，默认取fallback_enabled；
+                ProviderManager传入False，改为抛出错误并切换到下一个Provider
+        """
+        if fallback is None:
+            fallback = self.fallback_enabled
+        self.stream_count += 1
+        attempt = 0
+        started = time.monotonic()
+
+        while True:
+            attempt += 1
+            self.request_count += 1
+            self.last_used = datetime.now()
+
+            breaker = self._get_breaker(kwargs.get("model"))
+            if breaker is not None and not breaker.should_allow_request():
+                raise CircuitOpenError(self.name, breaker.retry_in())
+
+            result: Dict[str, Any] = {}
+            chunks: List[str] = []
+            # 流式请求以TTFT作为限制器的延迟信号（总时长取决于输出长度）
+            limiter = self._get_limiter(kwargs.get("model"))
+            if limiter is not None:
+                await limiter.acquire()
+            ttft: Optional[float] = None
+            error: Optional[BaseException] = None
+            cancelled = False
+            request_start = time.monotonic()
+            stream = self._stream_impl(prompt, result, **kwargs)
+            try:
+                async for chunk in stream:
+                    if not chunk:
+                        continue
+                    if not chunks:
+                        ttft = time.monotonic() - request_start
+                        self._record_ttft(ttft)
+                    chunks.append(chunk)
+                    yield chunk
+            except (GeneratorExit, asyncio.CancelledError):
+                # 客户端断开：关闭上游流，停止生成
+                self.cancelled_streams += 1
+                cancelled = True
+                raise
+            except Exception as e:
+                error = e
+                self.error_count += 1
+                logger.error(f"Provider {self.name} stream error: {e}")
+                if chunks:
+                    raise
+
+                retryable = isinstance(
+                    e, (aiohttp.ClientError, asyncio.TimeoutError)
+                ) or (isinstance(e, ProviderHTTPError) and e.retryable)
+                if (
+                    retryable
+                    and attempt < self.max_retries
+                    and time.monotonic() - started < self.timeout
+                ):
+                    await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+                    continue
+
+                logger.error(f"All stream retries failed for {self.name}: {e}")
+                if not fallback:
+                    raise
+                degraded = await self._generate_fallback(prompt, **kwargs)
+                yield degraded.content
+                return
+            finally:
+                await stream.aclose()
+                if limiter is not None:
+                    self._release_limiter(limiter, ttft, error)
+                if cancelled and ttft is None:
+                    # 首个文本块之前断开，无法判断Provider是否可用
+                    if breaker is not None:
+                        breaker.record_ignored()
+                else:
+                    self._record_breaker(breaker, error)
+
+            usage = result.get("usage")
+            if usage:
+                response = LLMResponse(
+                    content="".join(chunks),
+                    model=result.get("model", kwargs.get("model", self.model)),
+                    usage=usage,
+                )
+                self.total_tokens += sum(
+                    value for value in usage.values() if isinstance(value, int)
+                )
+                self.total_cost += self._calculate_cost(response)
+            return
 
-    def _get_cached_response(self, request: LLMRequest) -> Optional[LLMResponse]:
+    async def _stream_impl(
+        self, prompt: str, result: Dict[str, Any], **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """流式生成的具体实现（默认退化为非流式）
+
+        Args:
+            prompt: 提示
+            result: 流结束时写入 usage / model 供统计使用
+        """
+        response = await self._generate_impl(prompt, **kwargs)
+        result["usage"] = response.usage
+        result["model"] = response.model
+        yield response.content
+
+    async def _post_stream(
+        self, url: str, payload: Dict[str, Any], headers: Optional[Dict] = None
+    ) -> AsyncGenerator[bytes, None]:
+        """发送流式请求，逐行产出响应体
+
+        流式请求不设总超时，只限制连接和相邻数据块之间的等待时间。
+        """
+        session = await self.get_session()
+        try:
+            timeout = ClientTimeout(
+                total=None, sock_connect=self.timeout, sock_read=self.timeout
+            )
+            post_result = session.post(
+                url, json=payload, headers=headers, timeout=timeout
+            )
+            # 模拟对象可能返回协程
+            if asyncio.iscoroutine(post_result):
+                post_result = await post_result
+
+            async with post_result as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(
+                        f"{self.provider_type} API error: {response.status} - {error_text}"
+                    )
+                    raise ProviderHTTPError(response.status, response.headers)
+
+                try:
+                    async for line in response.content:
+                        yield line
+                except (GeneratorExit, asyncio.CancelledError):
+                    # 未读完的响应不能归还连接池，直接关闭连接
+                    response.close()
+                    raise
+        finally:
+            await self.release_session(session)
+
+    async def _stream_sse(
+        self, url: str, payload: Dict[str, Any], headers: Optional[Dict] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """发送SSE流式请求，逐个产出事件的JSON数据（遇到[DONE]结束）"""
+        data_lines: List[str] = []
+        async for raw in self._post_stream(url, payload, headers):
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+                continue
+            if line or not data_lines:
+                # 注释、event/id等字段不影响数据
+                continue
+
+            data = "\n".join(data_lines)
+            data_lines = []
+            if data == "[DONE]":
+                return
+            try:
+                yield json.loads(data)
+            except json.JSONDecodeError:
+                logger.debug(f"Skipping malformed SSE data from {self.name}")
+
+        if data_lines and data_lines != ["[DONE]"]:
+            try:
+                yield json.loads("\n".join(data_lines))
+            except json.JSONDecodeError:
+                pass
+
+    def _record_ttft(self, ttft: float):
+        """记录首个文本块延迟"""
+        self._ttft_total += ttft
+        self._ttft_count += 1
+        self._ttft_last = ttft
+        self._ttft_max = max(self._ttft_max, ttft)
+
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """获取流式统计"""
+        return {
+            "streams": self.stream_count,
+            "cancelled": self.cancelled_streams,
+            "ttft_count": self._ttft_count,
+            "avg_ttft": (
+                self._ttft_total / self._ttft_count if self._ttft_count else None
+            ),
+            "last_ttft": self._ttft_last,
+            "max_ttft": self._ttft_max,
+        }
+
+    def _cache_key(self, request: LLMRequest) -> str:
+        """缓存键（含Provider名称，磁盘层可被多个Provider共享）"""
+        return f"{self.name}:{request.get_hash()}"
+
+    async def _get_cached_response(self, request: LLMRequest) -> Optional[LLMResponse]:
         """获取缓存的响应"""
         if not self.enable_caching:
             return None
 
-        cache_key = request.get_hash()
-        if cache_key in self._response_cache:
-            cached_item = self._response_cache[cache_key]
-            # 检查TTL
-            if datetime.now() - cached_item["timestamp"] < timedelta(
-                seconds=self.cache_ttl
-            ):
-                logger.debug(f"Cache hit for {self.name}")
-                return cached_item["response"]
-            else:
-                # 缓存过期
-                del self._response_cache[cache_key]
-
-        return None
+        cached = await self._response_cache.lookup(self._cache_key(request))
+        if cached is None:
+            return None
+        logger.debug(f"Cache hit for {self.name}")
+        return LLMResponse(**cached)
 
-    def _cache_response(self, request: LLMRequest, response: LLMResponse):
+    async def _cache_response(self, request: LLMRequest, response: LLMResponse):
         """缓存响应"""
         if not self.enable_caching:
             return
 
-        cache_key = request.get_hash()
-        self._response_cache[cache_key] = {
-            "response": response,
-            "timestamp": datetime.now(),
-        }
-
-        # 限制缓存大小
-        if len(self._response_cache) > 100:
-            # 删除最旧的缓存项
-            oldest_key = min(
-                self._response_cache.keys(),
-                key=lambda k: self._response_cache[k]["timestamp"],
-            )
-            del self._response_cache[oldest_key]
+        await self._response_cache.store(
+            self._cache_key(request),
+            response.to_dict(),
+            provider=self.name,
+            ttl=self.cache_ttl,
+        )
 
     async def get_session(self) -> ClientSession:
-        """获取连接池中的会话"""
-        async with self._session_lock:
-            if self._session_pool:
-                return self._session_pool.pop()
-
-        # 创建新会话
-        timeout = ClientTimeout(total=self.timeout)
-        return ClientSession(timeout=timeout)
+        """获取共享会话"""
+        return await self._connection_pool.get_session()
 
     async def release_session(self, session: ClientSession):
-        """释放会话到连接池"""
-        async with self._session_lock:
-            if len(self._session_pool) < self.connection_pool_size:
-                self._session_pool.append(session)
-            else:
-                await session.close()
+        """结束对会话的使用（会话保持打开以复用连接）"""
+        await self._connection_pool.release_session(session)
 
     async def close(self):
         """关闭所有连接"""
-        async with self._session_lock:
-            for session in self._session_pool:
-                await session.close()
-            self._session_pool.clear()
+        await self._connection_pool.close_all()
+        self._response_cache.close()
+
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """获取连接器利用率统计"""
+        return self._connection_pool.get_stats()
 
     def _calculate_cost(self, response: LLMResponse) -> float:
         """计算成本（子类可以覆盖）"""
@@ -320,6 +824,8 @@ class LLMProvider(ABC):
         # 检查连接池大小
         if self.connection_pool_size < 1:
             errors.append("connection_pool_size must be >= 1")
+        if self.limit_per_host < 0:
+            errors.append("limit_per_host must be >= 0")
 
         return errors
 
@@ -368,9 +874,26 @@ class LLMProvider(ABC):
                 "enable_batching": self.enable_batching,
                 "enable_caching": self.enable_caching,
                 "cache_ttl": self.cache_ttl,
+                "enable_coalescing": self.enable_coalescing,
+            },
+            "coalescing": self._single_flight.get_stats(),
+            "batching": self._batch_processor.get_stats(),
+            "cache": self._response_cache.get_stats(),
+            "semantic_cache": (
+                self.semantic_cache.get_stats() if self.semantic_cache else None
+            ),
+            "connections": self.get_connection_stats(),
+            "streaming": self.get_stream_stats(),
+            "concurrency": self.get_concurrency_stats(),
+            "circuit_breakers": {
+                model: breaker.get_stats() for model, breaker in self._breakers.items()
             },
         }
 
+    def get_concurrency_stats(self) -> Dict[str, Any]:
+        """获取各模型当前的自适应并发上限"""
+        return {model: limiter.get_stats() for model, limiter in self._limiters.items()}
+
 
 class OpenAIProvider(LLMProvider):
     """OpenAI提供者"""
@@ -417,7 +940,7 @@ class OpenAIProvider(LLMProvider):
                 if response.status != 200:
                     error_text = await response.text()
                     logger.error(f"OpenAI API error: {response.status} - {error_text}")
-                    raise Exception(f"API error: {response.status}")
+                    raise ProviderHTTPError(response.status, response.headers)
 
                 data = await response.json()
 
@@ -434,11 +957,33 @@ class OpenAIProvider(LLMProvider):
         finally:
             await self.release_session(session)
 
-    async def generate_stream(self, prompt: str, **kwargs):
-        """流式生成文本"""
-        # 简化实现：先使用非流式
-        response = await self.generate(prompt, **kwargs)
-        yield response.content
+    async def _stream_impl(self, prompt: str, result: Dict[str, Any], **kwargs):
+        """SSE流式生成"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        if self.organization:
+            headers["OpenAI-Organization"] = self.organization
+
+        payload = {
+            "model": kwargs.get("model", self.model),
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            **{
+                k: v
+                for k, v in kwargs.items()
+                if k not in ["model", "temperature", "max_tokens"]
+            },
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+
+        async for event in self._stream_sse(
+            f"{self.base_url}/chat/completions", payload, headers
+        ):
+            yield _chat_completion_delta(event, result)
 
     def _calculate_cost(self, response: LLMResponse) -> float:
         """计算OpenAI成本"""
@@ -504,7 +1049,7 @@ class AnthropicProvider(LLMProvider):
                     logger.error(
                         f"Anthropic API error: {response.status} - {error_text}"
                     )
-                    raise Exception(f"API error: {response.status}")
+                    raise ProviderHTTPError(response.status, response.headers)
 
                 data = await response.json()
 
@@ -524,10 +1069,47 @@ class AnthropicProvider(LLMProvider):
         finally:
             await self.release_session(session)
 
-    async def generate_stream(self, prompt: str, **kwargs):
-        """流式生成文本"""
-        response = await self.generate(prompt, **kwargs)
-        yield response.content
+    async def _stream_impl(self, prompt: str, result: Dict[str, Any], **kwargs):
+        """SSE流式生成"""
+        headers = {
+            "x-api-key": self.api_key,
+            "anthropic-version": self.version,
+            "Content-Type": "application/json",
+        }
+
+        payload = {
+            "model": kwargs.get("model", self.model),
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 1000),
+            **{
+                k: v
+                for k, v in kwargs.items()
+                if k not in ["model", "temperature", "max_tokens"]
+            },
+            "stream": True,
+        }
+
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        async for event in self._stream_sse(
+            f"{self.base_url}/messages", payload, headers
+        ):
+            event_type = event.get("type")
+            if event_type == "message_start":
+                message = event.get("message", {})
+                result["model"] = message.get("model", payload["model"])
+                usage["input_tokens"] = message.get("usage", {}).get("input_tokens", 0)
+            elif event_type == "content_block_delta":
+                delta = event.get("delta", {})
+                if delta.get("type") == "text_delta":
+                    yield delta.get("text", "")
+            elif event_type == "message_delta":
+                usage["output_tokens"] = event.get("usage", {}).get(
+                    "output_tokens", usage["output_tokens"]
+                )
+            elif event_type == "error":
+                raise Exception(f"API error: {event.get('error')}")
+        result["usage"] = usage
 
 
 class GoogleProvider(LLMProvider):
@@ -569,7 +1151,7 @@ class GoogleProvider(LLMProvider):
                 if response.status != 200:
                     error_text = await response.text()
                     logger.error(f"Google API error: {response.status} - {error_text}")
-                    raise Exception(f"API error: {response.status}")
+                    raise ProviderHTTPError(response.status, response.headers)
 
                 data = await response.json()
 
@@ -594,10 +1176,42 @@ class GoogleProvider(LLMProvider):
         finally:
             await self.release_session(session)
 
-    async def generate_stream(self, prompt: str, **kwargs):
-        """流式生成文本"""
-        response = await self.generate(prompt, **kwargs)
-        yield response.content
+    async def _stream_impl(self, prompt: str, result: Dict[str, Any], **kwargs):
+        """SSE流式生成"""
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+            "generationConfig": {
+                "temperature": kwargs.get("temperature", 0.7),
+                "maxOutputTokens": kwargs.get("max_tokens", 1000),
+                **{
+                    k: v
+                    for k, v in kwargs.items()
+                    if k not in ["temperature", "max_tokens"]
+                },
+            },
+        }
+
+        model = kwargs.get("model", self.model)
+        url = f"{self.base_url}/models/{model}:streamGenerateContent?alt=sse"
+        if self.api_key:
+            url += f"&key={self.api_key}"
+
+        result["model"] = model
+        async for event in self._stream_sse(
+            url, payload, {"Content-Type": "application/json"}
+        ):
+            for candidate in event.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    if "text" in part:
+                        yield part["text"]
+
+            # 每个数据块都带累计用量，以最后一个为准
+            metadata = event.get("usageMetadata")
+            if metadata:
+                result["usage"] = {
+                    "input_tokens": metadata.get("promptTokenCount", 0),
+                    "output_tokens": metadata.get("candidatesTokenCount", 0),
+                }
 
 
 class AzureProvider(LLMProvider):
@@ -643,7 +1257,7 @@ class AzureProvider(LLMProvider):
                 if response.status != 200:
                     error_text = await response.text()
                     logger.error(f"Azure API error: {response.status} - {error_text}")
-                    raise Exception(f"API error: {response.status}")
+                    raise ProviderHTTPError(response.status, response.headers)
 
                 data = await response.json()
 
@@ -660,10 +1274,27 @@ class AzureProvider(LLMProvider):
         finally:
             await self.release_session(session)
 
-    async def generate_stream(self, prompt: str, **kwargs):
-        """流式生成文本"""
-        response = await self.generate(prompt, **kwargs)
-        yield response.content
+    async def _stream_impl(self, prompt: str, result: Dict[str, Any], **kwargs):
+        """SSE流式生成"""
+        payload = {
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 1000),
+            **{
+                k: v
+                for k, v in kwargs.items()
+                if k not in ["temperature", "max_tokens"]
+            },
+            "stream": True,
+        }
+
+        url = f"{self.base_url}/openai/deployments/{self.deployment}/chat/completions"
+        url += f"?api-version={self.api_version}"
+
+        async for event in self._stream_sse(
+            url, payload, {"api-key": self.api_key, "Content-Type": "application/json"}
+        ):
+            yield _chat_completion_delta(event, result)
 
 
 class LocalProvider(LLMProvider):
@@ -673,6 +1304,8 @@ class LocalProvider(LLMProvider):
         super().__init__(config)
         self.base_url = config.get("base_url", "http://localhost:11434/api")
         self.model = config.get("model", "llama2")
+        # OpenAI兼容的原生批量补全接口（vLLM、LM Studio等），如 http://localhost:8000/v1/completions
+        self.batch_url = config.get("batch_url")
 
     async def _generate_impl(self, prompt: str, **kwargs) -> LLMResponse:
         """生成文本的具体实现"""
@@ -697,7 +1330,7 @@ class LocalProvider(LLMProvider):
                 if response.status != 200:
                     error_text = await response.text()
                     logger.error(f"Local API error: {response.status} - {error_text}")
-                    raise Exception(f"API error: {response.status}")
+                    raise ProviderHTTPError(response.status, response.headers)
 
                 data = await response.json()
 
@@ -713,42 +1346,100 @@ class LocalProvider(LLMProvider):
         finally:
             await self.release_session(session)
 
-    async def generate_stream(self, prompt: str, **kwargs):
-        """流式生成文本"""
+    async def _generate_batch_impl(self, requests: List[LLMRequest]) -> List[Any]:
+        """批量生成：配置了batch_url时一次请求提交整批提示"""
+        if not self.batch_url or len(requests) < 2:
+            return await super()._generate_batch_impl(requests)
+
+        first = requests[0]
+        payload = {
+            "model": first.model or self.model,
+            "prompt": [request.prompt for request in requests],
+            "temperature": first.temperature,
+            "max_tokens": first.max_tokens or 1000,
+            **{
+                k: v
+                for k, v in first.extra_params.items()
+                if k not in ["model", "temperature", "max_tokens"]
+            },
+        }
+
         session = await self.get_session()
         try:
-            payload = {
-                "model": kwargs.get("model", self.model),
-                "prompt": prompt,
-                "temperature": kwargs.get("temperature", 0.7),
-                "max_tokens": kwargs.get("max_tokens", 1000),
-                "stream": True,
-                **{
-                    k: v
-                    for k, v in kwargs.items()
-                    if k not in ["model", "temperature", "max_tokens"]
-                },
-            }
-
             async with session.post(
-                f"{self.base_url}/generate", json=payload, timeout=self.timeout
+                self.batch_url, json=payload, timeout=self.timeout
             ) as response:
                 if response.status != 200:
                     error_text = await response.text()
-                    logger.error(f"Local API error: {response.status} - {error_text}")
-                    raise Exception(f"API error: {response.status}")
-
-                async for line in response.content:
-                    if line:
-                        try:
-                            data = json.loads(line.decode())
-                            if "response" in data:
-                                yield data["response"]
-                        except json.JSONDecodeError:
-                            continue
+                    logger.error(
+                        f"Local batch API error: {response.status} - {error_text}"
+                    )
+                    raise ProviderHTTPError(response.status, response.headers)
+                data = await response.json()
         finally:
             await self.release_session(session)
 
+        # 批量接口只返回总用量，平均分摊到各条结果
+        usage = data.get("usage", {})
+        count = len(requests)
+        shares = {}
+        for key in ("prompt_tokens", "completion_tokens"):
+            quotient, remainder = divmod(usage.get(key, 0), count)
+            shares[key] = [quotient + (1 if i < remainder else 0) for i in range(count)]
+
+        results: List[Any] = [
+            Exception("Missing choice in batch response") for _ in requests
+        ]
+        for choice in data.get("choices", []):
+            index = choice.get("index", -1)
+            if 0 <= index < count:
+                results[index] = LLMResponse(
+                    content=choice.get("text", ""),
+                    model=data.get("model", payload["model"]),
+                    usage={
+                        "input_tokens": shares["prompt_tokens"][index],
+                        "output_tokens": shares["completion_tokens"][index],
+                    },
+                    metadata={
+                        "provider": "local",
+                        "finish_reason": choice.get("finish_reason"),
+                        "batch_size": count,
+                    },
+                )
+        return results
+
+    async def _stream_impl(self, prompt: str, result: Dict[str, Any], **kwargs):
+        """流式生成（每行一个JSON对象）"""
+        payload = {
+            "model": kwargs.get("model", self.model),
+            "prompt": prompt,
+            "temperature": kwargs.get("temperature", 0.7),
+            "max_tokens": kwargs.get("max_tokens", 1000),
+            "stream": True,
+            **{
+                k: v
+                for k, v in kwargs.items()
+                if k not in ["model", "temperature", "max_tokens"]
+            },
+        }
+
+        async for line in self._post_stream(f"{self.base_url}/generate", payload):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line.decode())
+            except json.JSONDecodeError:
+                continue
+
+            if "response" in data:
+                yield data["response"]
+            if data.get("done"):
+                result["model"] = data.get("model", payload["model"])
+                result["usage"] = {
+                    "input_tokens": data.get("prompt_eval_count", 0),
+                    "output_tokens": data.get("eval_count", 0),
+                }
+
 
 class DeepSeekProvider(LLMProvider):
     """DeepSeek API提供者"""
@@ -811,7 +1502,7 @@ class DeepSeekProvider(LLMProvider):
                     logger.error(
                         f"DeepSeek API error: {response.status} - {error_text}"
                     )
-                    raise Exception(f"API error: {response.status}")
+                    raise ProviderHTTPError(response.status, response.headers)
 
                 data = await response.json()
 
@@ -829,11 +1520,30 @@ class DeepSeekProvider(LLMProvider):
         finally:
             await self.release_session(session)
 
-    async def generate_stream(self, prompt: str, **kwargs):
-        """流式生成文本"""
-        # 简化实现：先使用非流式
-        response = await self.generate(prompt, **kwargs)
-        yield response.content
+    async def _stream_impl(self, prompt: str, result: Dict[str, Any], **kwargs):
+        """SSE流式生成（推理内容不输出）"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+        payload = {
+            "model": kwargs.get("model", self.model),
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": kwargs.get("temperature", self.temperature),
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            "thinking": {"type": "enabled" if self.thinking_enabled else "disabled"},
+        }
+        for key in ["frequency_penalty", "presence_penalty", "top_p", "stop"]:
+            if key in kwargs:
+                payload[key] = kwargs[key]
+
+        async for event in self._stream_sse(
+            f"{self.base_url}/chat/completions", payload, headers
+        ):
+            yield _chat_completion_delta(event, result)
 
     def _calculate_cost(self, response: LLMResponse) -> float:
         """计算DeepSeek成本"""
@@ -914,6 +1624,7 @@ class ProviderManager:
                 providers_to_try.append(provider_name)
 
         last_error = None
+        circuit_response: Optional[LLMResponse] = None
         for provider_name in providers_to_try:
             if provider_name not in self.providers:
                 continue
@@ -925,13 +1636,73 @@ class ProviderManager:
 
             try:
                 logger.info(f"Trying provider: {provider_name}")
-                return await provider.generate(prompt, **kwargs)
+                response = await provider.generate(prompt, **kwargs)
             except Exception as e:
                 last_error = e
                 logger.warning(f"Provider {provider_name} failed: {e}")
                 continue
 
+            # 熔断中的Provider立即返回降级响应，直接切换到下一个
+            if response.metadata.get("circuit_open"):
+                logger.info(f"Provider {provider_name} circuit open, skipping")
+                circuit_response = circuit_response or response
+                continue
+            return response
+
         # 所有Provider都失败
+        if circuit_response is not None:
+            return circuit_response
+        if last_error:
+            raise last_error
+        else:
+            raise Exception("No available providers")
+
+    async def generate_stream_with_fallback(
+        self, prompt: str, **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """使用回退机制流式生成文本（只在首个文本块之前切换Provider）
+
+        各Provider以fallback=False调用，重试耗尽时抛出错误而不是输出降级文本；
+        全部失败时，若有Provider允许降级则输出其降级文本。
+        """
+        providers_to_try = []
+        if "provider" in kwargs:
+            providers_to_try.append(kwargs.pop("provider"))
+        elif self.default_provider:
+            providers_to_try.append(self.default_provider)
+        for provider_name in self.fallback_order:
+            if provider_name not in providers_to_try:
+                providers_to_try.append(provider_name)
+
+        last_error = None
+        fallback_provider: Optional[LLMProvider] = None
+        for provider_name in providers_to_try:
+            provider = self.providers.get(provider_name)
+            if provider is None or not provider.enabled:
+                continue
+            if fallback_provider is None and provider.fallback_enabled:
+                fallback_provider = provider
+
+            started = False
+            try:
+                logger.info(f"Trying provider stream: {provider_name}")
+                async for chunk in provider.generate_stream(
+                    prompt, fallback=False, **kwargs
+                ):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started:
+                    raise
+                last_error = e
+                # 熔断中的Provider在输出前被拒绝，直接切换到下一个
+                logger.warning(f"Provider {provider_name} stream failed: {e}")
+
+        if last_error and fallback_provider is not None:
+            degraded = await fallback_provider._generate_fallback(prompt, **kwargs)
+            yield degraded.content
+            return
         if last_error:
             raise last_error
         else:
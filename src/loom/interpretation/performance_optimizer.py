@@ -7,155 +7,321 @@
 import asyncio
 import hashlib
 import json
+import sqlite3
+import threading
 import time
 from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Set, Tuple
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 import aiohttp
 import backoff
 from aiohttp import ClientSession, ClientTimeout
 
 from ..utils.logging_config import get_logger
+from ..utils.ttl_cache import TTLCache
 
 logger = get_logger(__name__)
 
 
-@dataclass
-class CacheEntry:
-    """缓存条目"""
-
-    key: str
-    value: Any
-    created_at: datetime = field(default_factory=datetime.now)
-    last_accessed: datetime = field(default_factory=datetime.now)
-    access_count: int = 1
-    ttl: int = 300  # 默认5分钟
-
-    def is_expired(self) -> bool:
-        """检查是否过期"""
-        elapsed = (datetime.now() - self.created_at).total_seconds()
-        return elapsed > self.ttl
-
-    def update_access(self):
-        """更新访问时间"""
-        self.last_accessed = datetime.now()
-        self.access_count += 1
-
-
 @dataclass
 class BatchRequest:
     """批处理请求"""
 
     request_id: str
     prompt: str
-    callback: Any  # 回调函数
+    callback: Any  # 回调函数（可选）
     created_at: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    future: Optional[asyncio.Future] = None  # submit() 的调用者等待的结果
 
 
 class ConnectionPool:
-    """连接池"""
+    """共享连接池
 
-    def __init__(self, max_size: int = 10, timeout: int = 30):
+    每个Provider持有一个长期存在的ClientSession，底层TCPConnector负责
+    keep-alive连接复用和DNS缓存，避免每次请求重新进行TCP+TLS握手。
+    get_session/release_session只记录在途请求数，不再创建或关闭会话。
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10,
+        timeout: int = 30,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: Optional[int] = 300,
+    ):
+        """初始化连接池
+
+        Args:
+            max_size: 连接器的最大并发连接数
+            timeout: 请求总超时（秒）
+            limit_per_host: 每个主机的最大连接数，0表示不限制
+            keepalive_timeout: 空闲连接保持时间（秒）
+            ttl_dns_cache: DNS缓存时间（秒），None表示永久缓存
+        """
         self.max_size = max_size
         self.timeout = timeout
-        self._pool: List[ClientSession] = []
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+
+        self._session: Optional[ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._lock = asyncio.Lock()
         self._created_count = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests = 0
 
         logger.info(
             f"ConnectionPool initialized with max_size={max_size}, timeout={timeout}"
         )
 
+    def _create_session(self) -> ClientSession:
+        """创建共享会话"""
+        connector = aiohttp.TCPConnector(
+            limit=self.max_size,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.ttl_dns_cache,
+        )
+        self._created_count += 1
+        logger.debug(f"Created shared session (total created: {self._created_count})")
+        return ClientSession(
+            connector=connector, timeout=ClientTimeout(total=self.timeout)
+        )
+
     async def get_session(self) -> ClientSession:
-        """获取会话"""
+        """获取共享会话（首次使用或已关闭时创建）"""
+        loop = asyncio.get_running_loop()
         async with self._lock:
-            if self._pool:
-                session = self._pool.pop()
-                logger.debug(
-                    f"Reusing session from pool (pool size: {len(self._pool)})"
-                )
-                return session
-
-            # 创建新会话
-            self._created_count += 1
-            timeout = ClientTimeout(total=self.timeout)
-            session = ClientSession(timeout=timeout)
-            logger.debug(f"Created new session (total created: {self._created_count})")
-            return session
+            # 会话绑定事件循环，循环切换后旧会话不可再用
+            if self._session is None or self._session.closed or self._loop is not loop:
+                self._session = self._create_session()
+                self._loop = loop
+
+            self._requests += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            return self._session
 
     async def release_session(self, session: ClientSession):
-        """释放会话"""
-        async with self._lock:
-            if len(self._pool) < self.max_size:
-                self._pool.append(session)
-                logger.debug(f"Returned session to pool (pool size: {len(self._pool)})")
-            else:
-                await session.close()
-                logger.debug(f"Closed session (pool full, size: {len(self._pool)})")
+        """结束一次使用，会话保持打开以复用连接"""
+        self._in_flight = max(0, self._in_flight - 1)
 
     async def close_all(self):
-        """关闭所有连接"""
+        """关闭共享会话"""
         async with self._lock:
-            for session in self._pool:
-                await session.close()
-            self._pool.clear()
-            logger.info(f"Closed all sessions in pool")
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+            self._session = None
+            self._loop = None
+            logger.info("Closed shared session")
 
     def get_stats(self) -> Dict[str, Any]:
-        """获取统计信息"""
-        return {
-            "pool_size": len(self._pool),
+        """获取统计信息（含连接器利用率）"""
+        stats = {
             "max_size": self.max_size,
-            "created_count": self._created_count,
             "timeout": self.timeout,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "created_count": self._created_count,
+            "requests": self._requests,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "active_connections": 0,
+            "idle_connections": 0,
+            "utilization": 0.0,
         }
 
+        session = self._session
+        connector = session.connector if session is not None else None
+        if connector is not None and not connector.closed:
+            # aiohttp未公开连接计数，读取内部结构并容忍其缺失
+            acquired = getattr(connector, "_acquired", ())
+            idle = getattr(connector, "_conns", {})
+            stats["active_connections"] = len(acquired)
+            stats["idle_connections"] = sum(len(conns) for conns in idle.values())
+            if connector.limit:
+                stats["utilization"] = len(acquired) / connector.limit
+        return stats
+
+
+class SingleFlight:
+    """在途请求合并
+
+    相同键的请求同时到达时只执行一次：第一个调用者启动任务，
+    后续调用者等待同一任务的结果，异常同样传递给所有调用者。
+    任务独立于调用者运行，单个调用者被取消不会影响其他等待者；
+    所有调用者都被取消时任务随之取消，不再占用上游资源。
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self.stats = {"executions": 0, "coalesced": 0, "abandoned": 0}
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或加入键对应的在途请求
+
+        Args:
+            key: 请求键
+            factory: 创建请求协程的函数，只在没有在途请求时调用
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.stats["executions"] += 1
+        else:
+            self.stats["coalesced"] += 1
+            logger.debug(f"Coalesced in-flight request {key[:8]}")
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._calls.get(key) is task and self._waiters[key] == 1:
+                task.cancel()
+                self.stats["abandoned"] += 1
+            raise
+        finally:
+            if self._calls.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+            self._waiters.pop(key, None)
+        # 读取异常，避免所有调用者都取消时产生未读取异常的警告
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {**self.stats, "in_flight": self.in_flight}
+
 
 class ResponseCache:
-    """响应缓存"""
+    """两级响应缓存
+
+    1. 内存层：TTLCache，O(1) LRU，按条目数和估算字节数限制
+    2. 磁盘层：可选的SQLite，WAL模式下同一主机的多个进程共享，
+       按最近访问时间淘汰并限制总字节数。写入时只维护本进程的字节数估计，
+       过期清理和与数据库的字节数校准按周期批量执行，估计超出上限时立即执行
 
-    def __init__(self, max_size: int = 1000, default_ttl: int = 300):
+    每个Provider可以配置独立的TTL；写入磁盘层的值需可JSON序列化。
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        default_ttl: int = 300,
+        max_bytes: Optional[int] = None,
+        db_path: Optional[str] = None,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        provider_ttls: Optional[Dict[str, float]] = None,
+        disk_maintenance_interval: float = 60.0,
+    ):
+        """初始化响应缓存
+
+        Args:
+            max_size: 内存层最大条目数
+            default_ttl: 默认有效期（秒）
+            max_bytes: 内存层最大字节数，None表示不限制
+            db_path: SQLite文件路径，为None时仅使用内存层
+            max_disk_bytes: 磁盘层最大字节数
+            provider_ttls: Provider -> 有效期（秒），覆盖默认有效期
+            disk_maintenance_interval: 磁盘层过期清理和字节数校准的间隔（秒）
+        """
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self._cache: Dict[str, CacheEntry] = {}
-        self._lock = asyncio.Lock()
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_maintenance_interval = disk_maintenance_interval
+        self.provider_ttls = dict(provider_ttls or {})
+        self.db_path = Path(db_path) if db_path else None
+        self._cache = TTLCache(
+            max_entries=max_size, default_ttl=default_ttl, max_bytes=max_bytes
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        # SQLite连接在线程池中访问
+        self._db_lock = threading.Lock()
+        # 磁盘层字节数估计（其他进程的写入在周期维护时校准）
+        self._disk_bytes = 0
+        self._next_maintenance = 0.0
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "disk_evictions": 0,
+            "disk_expirations": 0,
+        }
+
+        if self.db_path:
+            self._initialize_db()
 
         logger.info(
             f"ResponseCache initialized with max_size={max_size}, default_ttl={default_ttl}s"
         )
 
+    def _initialize_db(self):
+        """初始化SQLite磁盘层"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # 其他进程写入时最多等待5秒
+        self._conn = sqlite3.connect(
+            str(self.db_path), timeout=5.0, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+        """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_responses_access "
+            "ON llm_responses (last_access)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_responses_expires "
+            "ON llm_responses (expires_at)"
+        )
+        self._conn.commit()
+        logger.info(f"Response cache persisted at {self.db_path}")
+
     def _generate_key(self, provider: str, prompt: str, params: Dict[str, Any]) -> str:
         """生成缓存键"""
         content = f"{provider}:{prompt}:{json.dumps(params, sort_keys=True)}"
         return hashlib.md5(content.encode()).hexdigest()
 
+    def ttl_for(self, provider: str) -> float:
+        """Provider的有效期"""
+        return self.provider_ttls.get(provider, self.default_ttl)
+
     async def get(
         self, provider: str, prompt: str, params: Dict[str, Any]
     ) -> Optional[Any]:
         """获取缓存响应"""
-        key = self._generate_key(provider, prompt, params)
-
-        async with self._lock:
-            if key in self._cache:
-                entry = self._cache[key]
-
-                if entry.is_expired():
-                    # 删除过期条目
-                    del self._cache[key]
-                    logger.debug(f"Cache entry expired for key: {key[:8]}...")
-                    return None
-
-                # 更新访问时间
-                entry.update_access()
-                logger.debug(
-                    f"Cache hit for key: {key[:8]}... (access count: {entry.access_count})"
-                )
-                return entry.value
-
-        return None
+        return await self.lookup(self._generate_key(provider, prompt, params))
 
     async def set(
         self,
@@ -163,169 +329,392 @@ class ResponseCache:
         prompt: str,
         params: Dict[str, Any],
         value: Any,
-        ttl: Optional[int] = None,
+        ttl: Optional[float] = None,
     ):
         """设置缓存响应"""
         key = self._generate_key(provider, prompt, params)
+        await self.store(key, value, provider=provider, ttl=ttl)
+
+    async def lookup(self, key: str) -> Optional[Any]:
+        """按键获取缓存值（内存层未命中时查询磁盘层并回填）"""
+        value = self._cache.get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            logger.debug(f"Cache hit for key: {key[:8]}...")
+            return value
+
+        if self._conn is not None:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(None, self._load_from_disk, key)
+            if found is not None:
+                value, remaining = found
+                self._cache.set(key, value, remaining)
+                self.stats["disk_hits"] += 1
+                logger.debug(f"Disk cache hit for key: {key[:8]}...")
+                return value
+
+        self.stats["misses"] += 1
+        return None
 
-        async with self._lock:
-            # 检查缓存大小
-            if len(self._cache) >= self.max_size:
-                self._evict_oldest()
+    async def store(
+        self,
+        key: str,
+        value: Any,
+        provider: str = "",
+        ttl: Optional[float] = None,
+    ):
+        """按键写入缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            provider: Provider名称，决定默认有效期
+            ttl: 有效期（秒），缺省使用Provider或全局有效期
+        """
+        ttl = self.ttl_for(provider) if ttl is None else ttl
+        self._cache.set(key, value, ttl)
+        self.stats["writes"] += 1
+        logger.debug(
+            f"Cached response for key: {key[:8]}... (cache size: {len(self._cache)})"
+        )
 
-            # 创建缓存条目
-            entry = CacheEntry(key=key, value=value, ttl=ttl or self.default_ttl)
+        if self._conn is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, self._save_to_disk, key, provider, value, ttl
+            )
 
-            self._cache[key] = entry
-            logger.debug(
-                f"Cached response for key: {key[:8]}... (cache size: {len(self._cache)})"
+    def _load_from_disk(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """从SQLite读取值，返回(值, 剩余有效期)"""
+        now = time.time()
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT value, size, expires_at FROM llm_responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, size, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._disk_bytes -= size
+                self.stats["disk_expirations"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key)
             )
+            self._conn.commit()
 
-    def _evict_oldest(self):
-        """驱逐最旧的缓存条目"""
-        if not self._cache:
-            return
+        remaining = expires_at - now if expires_at is not None else None
+        return json.loads(value), remaining
 
-        # 找到最久未访问的条目
-        oldest_key = min(self._cache.keys(), key=lambda k: self._cache[k].last_accessed)
+    def _save_to_disk(self, key: str, provider: str, value: Any, ttl: Optional[float]):
+        """写入SQLite，到达维护周期或估计超出字节上限时批量清理"""
+        try:
+            data = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            logger.debug(f"Skipping non-serializable cache value: {key[:8]}...")
+            return
 
-        del self._cache[oldest_key]
-        logger.debug(f"Evicted cache entry: {oldest_key[:8]}...")
+        now = time.time()
+        size = len(data.encode("utf-8"))
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._db_lock:
+            previous = self._conn.execute(
+                "SELECT size FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_responses
+                (key, provider, value, size, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (key, provider, data, size, expires_at, now),
+            )
+            self._disk_bytes += size - (previous[0] if previous else 0)
+
+            if now >= self._next_maintenance or self._disk_bytes > self.max_disk_bytes:
+                self._maintain_disk(now)
+            self._conn.commit()
+
+    def _maintain_disk(self, now: float):
+        """清理过期条目、校准字节数，超出上限时按LRU淘汰（调用方持有_db_lock）"""
+        # expires_at有索引，只扫描已过期的范围
+        self.stats["disk_expirations"] += self._conn.execute(
+            "DELETE FROM llm_responses WHERE expires_at <= ?", (now,)
+        ).rowcount
+
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM llm_responses"
+        ).fetchone()[0]
+        if total > self.max_disk_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM llm_responses ORDER BY last_access ASC"
+            )
+            victims = []
+            for victim, victim_size in rows:
+                if total <= self.max_disk_bytes:
+                    break
+                victims.append((victim,))
+                total -= victim_size
+            self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+            self.stats["disk_evictions"] += len(victims)
+
+        self._disk_bytes = total
+        self._next_maintenance = now + self.disk_maintenance_interval
 
     async def clear(self):
-        """清除缓存"""
-        async with self._lock:
-            self._cache.clear()
-            logger.info("Response cache cleared")
+        """清除缓存（包括磁盘层）"""
+        self._cache.clear()
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM llm_responses")
+                self._conn.commit()
+                self._disk_bytes = 0
+        logger.info("Response cache cleared")
+
+    def close(self):
+        """关闭磁盘连接"""
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
 
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
-        total_size = len(self._cache)
-        total_accesses = sum(entry.access_count for entry in self._cache.values())
-
-        # 计算命中率（如果有访问记录）
-        hit_rate = 0.0
-        if total_accesses > 0:
-            hit_rate = total_accesses / (total_accesses + total_size)  # 简化计算
-
+        stats = self._cache.get_stats()
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
         return {
-            "cache_size": total_size,
+            "cache_size": stats["entries"],
             "max_size": self.max_size,
-            "total_accesses": total_accesses,
-            "estimated_hit_rate": hit_rate,
+            "hits": hits,
+            "memory_hits": self.stats["memory_hits"],
+            "disk_hits": self.stats["disk_hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "writes": self.stats["writes"],
+            "evictions": stats["evictions"],
+            "expirations": stats["expirations"],
+            "memory_bytes": stats["memory_bytes"],
+            "disk_evictions": self.stats["disk_evictions"],
+            "disk_expirations": self.stats["disk_expirations"],
+            "disk_bytes": self._disk_bytes,
+            "persistent": self._conn is not None,
             "default_ttl": self.default_ttl,
         }
 
 
+# 批处理函数：输入一批请求，按顺序返回每个请求的结果（失败的项为Exception实例）
+BatchHandler = Callable[[List[BatchRequest]], Awaitable[List[Any]]]
+
+
 class BatchProcessor:
-    """批处理器"""
+    """微批处理器
+
+    同一批次键的请求在 max_wait_time 内（从批次中第一个请求算起）
+    或达到 max_batch_size 时合并为一批，交给该键注册的处理函数执行。
+    每个批次键最多同时执行 max_concurrency 个批次，
+    结果逐个回填到调用者的future或回调中。
+    """
 
-    def __init__(self, max_batch_size: int = 10, max_wait_time: float = 0.1):
-        self.max_batch_size = max_batch_size
+    def __init__(
+        self,
+        max_batch_size: int = 10,
+        max_wait_time: float = 0.1,
+        max_concurrency: int = 4,
+        handler: Optional[BatchHandler] = None,
+    ):
+        """初始化批处理器
+
+        Args:
+            max_batch_size: 单批最大请求数
+            max_wait_time: 批次最长等待时间（秒）
+            max_concurrency: 每个批次键同时执行的最大批次数
+            handler: 未单独注册处理函数的批次键使用的默认处理函数
+        """
+        self.max_batch_size = max(1, max_batch_size)
         self.max_wait_time = max_wait_time  # 最大等待时间（秒）
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_handler = handler
+        self._handlers: Dict[str, BatchHandler] = {}
         self._batches: Dict[str, List[BatchRequest]] = defaultdict(list)
-        self._batch_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
         self._batch_timers: Dict[str, asyncio.Task] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._dispatching: Set[asyncio.Task] = set()
+        self._request_counter = 0
+
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "batched_requests": 0,
+            "failed_requests": 0,
+            "max_batch_size_seen": 0,
+            "active_dispatches": 0,
+            "peak_dispatches": 0,
+        }
 
         logger.info(
             f"BatchProcessor initialized with max_batch_size={max_batch_size}, max_wait_time={max_wait_time}s"
         )
 
+    def register_handler(self, batch_key: str, handler: BatchHandler):
+        """注册批次键的处理函数"""
+        self._handlers[batch_key] = handler
+
+    async def submit(
+        self, batch_key: str, prompt: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """提交请求并等待其所在批次的结果"""
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(batch_key, prompt, None, metadata, future)
+        return await future
+
     async def add_request(
         self,
         batch_key: str,
         prompt: str,
-        callback: Any,
+        callback: Any = None,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> str:
-        """添加请求到批处理队列"""
-        request_id = hashlib.md5(
-            f"{batch_key}:{prompt}:{time.time()}".encode()
-        ).hexdigest()[:16]
+        """添加请求到批处理队列，结果通过回调返回"""
+        request = self._enqueue(batch_key, prompt, callback, metadata, None)
+        return request.request_id
 
+    def _enqueue(
+        self,
+        batch_key: str,
+        prompt: str,
+        callback: Any,
+        metadata: Optional[Dict[str, Any]],
+        future: Optional[asyncio.Future],
+    ) -> BatchRequest:
+        self._request_counter += 1
         request = BatchRequest(
-            request_id=request_id,
+            request_id=f"{batch_key[:8]}-{self._request_counter}",
             prompt=prompt,
             callback=callback,
             metadata=metadata or {},
+            future=future,
         )
+        self.stats["requests"] += 1
+
+        batch = self._batches[batch_key]
+        batch.append(request)
+        if len(batch) >= self.max_batch_size:
+            # 达到最大批处理大小，立即处理
+            self._flush(batch_key)
+        elif batch_key not in self._batch_timers:
+            self._batch_timers[batch_key] = asyncio.create_task(
+                self._batch_timer(batch_key)
+            )
 
-        async with self._batch_locks[batch_key]:
-            self._batches[batch_key].append(request)
-
-            # 如果达到最大批处理大小，立即处理
-            if len(self._batches[batch_key]) >= self.max_batch_size:
-                await self._process_batch(batch_key)
-            else:
-                # 启动或重置计时器
-                await self._start_batch_timer(batch_key)
-
-        logger.debug(
-            f"Added request {request_id} to batch {batch_key} (size: {len(self._batches[batch_key])})"
-        )
-        return request_id
-
-    async def _start_batch_timer(self, batch_key: str):
-        """启动批处理计时器"""
-        # 取消现有计时器
-        if batch_key in self._batch_timers:
-            self._batch_timers[batch_key].cancel()
-
-        # 创建新计时器
-        self._batch_timers[batch_key] = asyncio.create_task(
-            self._batch_timer(batch_key)
-        )
+        logger.debug(f"Added request {request.request_id} to batch {batch_key}")
+        return request
 
     async def _batch_timer(self, batch_key: str):
         """批处理计时器"""
         try:
             await asyncio.sleep(self.max_wait_time)
-            async with self._batch_locks[batch_key]:
-                if self._batches[batch_key]:
-                    await self._process_batch(batch_key)
         except asyncio.CancelledError:
-            pass
-        except Exception as e:
-            logger.error(f"Batch timer error for {batch_key}: {e}")
+            return
+        self._flush(batch_key)
+
+    def _flush(self, batch_key: str):
+        """取出当前批次并异步执行"""
+        timer = self._batch_timers.pop(batch_key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
 
-    async def _process_batch(self, batch_key: str):
-        """处理批处理请求"""
-        if batch_key not in self._batches or not self._batches[batch_key]:
+        requests = self._batches.pop(batch_key, [])
+        if not requests:
             return
 
-        # 获取当前批次的请求
-        requests = self._batches[batch_key].copy()
-        self._batches[batch_key].clear()
+        task = asyncio.create_task(self._process_batch(batch_key, requests))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def flush(self, batch_key: Optional[str] = None):
+        """立即处理等待中的批次并等待其完成"""
+        keys = [batch_key] if batch_key is not None else list(self._batches)
+        for key in keys:
+            self._flush(key)
+        if self._dispatching:
+            await asyncio.gather(*self._dispatching, return_exceptions=True)
+
+    async def _process_batch(self, batch_key: str, requests: List[BatchRequest]):
+        """执行一个批次并回填结果"""
+        handler = self._handlers.get(batch_key, self.default_handler)
+        semaphore = self._semaphores.setdefault(
+            batch_key, asyncio.Semaphore(self.max_concurrency)
+        )
 
-        # 取消计时器
-        if batch_key in self._batch_timers:
-            self._batch_timers[batch_key].cancel()
-            del self._batch_timers[batch_key]
+        async with semaphore:
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += len(requests)
+            self.stats["max_batch_size_seen"] = max(
+                self.stats["max_batch_size_seen"], len(requests)
+            )
+            self.stats["active_dispatches"] += 1
+            self.stats["peak_dispatches"] = max(
+                self.stats["peak_dispatches"], self.stats["active_dispatches"]
+            )
+            logger.debug(f"Processing batch {batch_key} with {len(requests)} requests")
 
-        logger.info(f"Processing batch {batch_key} with {len(requests)} requests")
+            try:
+                if handler is None:
+                    raise RuntimeError(f"No batch handler registered for {batch_key}")
+                results = list(await handler(requests))
+                if len(results) != len(requests):
+                    raise RuntimeError(
+                        f"Batch handler returned {len(results)} results "
+                        f"for {len(requests)} requests"
+                    )
+            except Exception as e:
+                logger.error(f"Batch {batch_key} failed: {e}")
+                results = [e] * len(requests)
+            finally:
+                self.stats["active_dispatches"] -= 1
+
+        for request, result in zip(requests, results):
+            await self._resolve(request, result)
+
+    async def _resolve(self, request: BatchRequest, result: Any):
+        """把结果交给调用者"""
+        failed = isinstance(result, BaseException)
+        if failed:
+            self.stats["failed_requests"] += 1
+
+        if request.future is not None and not request.future.done():
+            if failed:
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
 
-        # 这里应该实现实际的批处理逻辑
-        # 目前只是简单地为每个请求调用回调
-        for request in requests:
+        if request.callback is not None and not failed:
             try:
-                # 模拟批处理响应
-                response = (
-                    f"[批处理响应] 请求ID: {request.request_id}, 提示长度: {len(request.prompt)}"
-                )
-                await request.callback(response)
+                await request.callback(result)
             except Exception as e:
-                logger.error(f"Error processing request {request.request_id}: {e}")
+                logger.error(f"Error in callback for {request.request_id}: {e}")
 
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         total_pending = sum(len(batch) for batch in self._batches.values())
-        active_batches = len(self._batches)
-
+        batches = self.stats["batches"]
         return {
+            **self.stats,
             "max_batch_size": self.max_batch_size,
             "max_wait_time": self.max_wait_time,
+            "max_concurrency": self.max_concurrency,
+            "avg_batch_size": (
+                self.stats["batched_requests"] / batches if batches else 0.0
+            ),
             "total_pending_requests": total_pending,
-            "active_batches": active_batches,
+            "active_batches": len(self._batches),
             "batch_keys": list(self._batches.keys()),
         }
 
@@ -0,0 +1,339 @@
+"""
+语义响应缓存 (SemanticCache)
+
+面向低温度的工具类提示（规则语义验证、一致性检查等）：
+1. 对提示做嵌入，在本地向量索引中查找最相似的历史提示，
+   相似度不低于阈值时直接返回历史响应
+2. 索引按作用域（Provider/模型/温度/生成参数）隔离，不同配置的响应互不复用
+3. 命中质量遥测：命中相似度分布、低于阈值的最近邻相似度，
+   以及按 verify_rate 抽样回源后缓存响应与真实响应的一致度
+
+嵌入函数由调用方提供（如 VectorMemoryStore.get_embeddings），同步或异步均可。
+numpy为可选依赖，不可用时逐条计算余弦相似度，结果一致。
+"""
+
+import asyncio
+import math
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 嵌入函数：文本列表 -> 向量列表
+Embedder = Callable[[List[str]], Any]
+
+
+@dataclass
+class SemanticCacheEntry:
+    """缓存条目"""
+
+    entry_id: int
+    scope: str
+    prompt: str
+    vector: List[float]  # 已归一化
+    value: Any
+    created_at: float = field(default_factory=time.time)
+    expires_at: Optional[float] = None
+    hits: int = 0
+
+
+@dataclass
+class SemanticMatch:
+    """一次查找的结果"""
+
+    scope: str
+    vector: Optional[List[float]]  # 提示的归一化嵌入，写入时复用
+    entry: Optional[SemanticCacheEntry] = None
+    similarity: float = 0.0
+    verify: bool = False  # 命中但被抽样回源校验
+
+    @property
+    def hit(self) -> bool:
+        return self.entry is not None
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return [float(x) for x in vector]
+    return [x / norm for x in vector]
+
+
+class _ScopeIndex:
+    """单个作用域的向量索引（暴力内积）
+
+    删除时用末行覆盖被删行（O(1)），numpy矩阵在首次查询时构建，
+    之后随写入和删除原地更新，按倍增策略扩容。
+    """
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.vectors: List[List[float]] = []
+        self._rows: Dict[int, int] = {}
+        self._matrix = None
+
+    def add(self, entry_id: int, vector: List[float]):
+        row = len(self.ids)
+        self.ids.append(entry_id)
+        self.vectors.append(vector)
+        self._rows[entry_id] = row
+        if self._matrix is not None:
+            self._reserve(row + 1)
+            self._matrix[row] = vector
+
+    def remove(self, entry_id: int):
+        row = self._rows.pop(entry_id)
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.vectors[row] = self.vectors[last]
+            self._rows[moved_id] = row
+            if self._matrix is not None:
+                self._matrix[row] = self._matrix[last]
+        self.ids.pop()
+        self.vectors.pop()
+
+    def _reserve(self, count: int):
+        import numpy as np
+
+        capacity = self._matrix.shape[0]
+        if count <= capacity:
+            return
+        matrix = np.zeros(
+            (max(count, capacity * 2, 64), self._matrix.shape[1]), dtype=np.float32
+        )
+        matrix[:capacity] = self._matrix
+        self._matrix = matrix
+
+    def nearest(self, vector: List[float]) -> Optional[tuple]:
+        """返回 (条目ID, 余弦相似度)"""
+        if not self.ids:
+            return None
+
+        try:
+            import numpy as np
+        except ImportError:
+            scores = [sum(a * b for a, b in zip(v, vector)) for v in self.vectors]
+            best = max(range(len(scores)), key=scores.__getitem__)
+            return self.ids[best], scores[best]
+
+        if self._matrix is None:
+            self._matrix = np.asarray(self.vectors, dtype=np.float32)
+        scores = self._matrix[: len(self.ids)] @ np.asarray(vector, dtype=np.float32)
+        best = int(scores.argmax())
+        return self.ids[best], float(scores[best])
+
+
+class SemanticCache:
+    """基于嵌入相似度的响应缓存"""
+
+    def __init__(
+        self,
+        embed: Embedder,
+        threshold: float = 0.95,
+        max_entries: int = 5000,
+        ttl: Optional[float] = 3600,
+        verify_rate: float = 0.0,
+    ):
+        """初始化语义缓存
+
+        Args:
+            embed: 嵌入函数（同步或异步）
+            threshold: 命中所需的最低余弦相似度
+            max_entries: 最大条目数（全部作用域合计），按LRU淘汰
+            ttl: 条目有效期（秒），None表示不过期
+            verify_rate: 命中后仍回源校验的抽样比例，用于评估命中质量
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.verify_rate = verify_rate
+
+        self._entries: "OrderedDict[int, SemanticCacheEntry]" = OrderedDict()
+        self._scopes: Dict[str, _ScopeIndex] = {}
+        self._next_id = 0
+
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "embed_errors": 0,
+            "verifications": 0,
+            "verified_agreements": 0,
+        }
+        self._hit_similarity_sum = 0.0
+        self._hit_similarity_min: Optional[float] = None
+        self._near_miss_similarity_sum = 0.0
+        self._near_misses = 0
+        self._agreement_sum = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def _embed_one(self, text: str) -> Optional[List[float]]:
+        """嵌入单条文本，失败时返回None（缓存不影响正常请求）"""
+        try:
+            result = self.embed([text])
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                result = await result
+            return _normalize(list(result[0]))
+        except Exception as e:
+            self.stats["embed_errors"] += 1
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+    async def lookup(self, scope: str, prompt: str) -> SemanticMatch:
+        """查找语义相近的缓存响应
+
+        Args:
+            scope: 作用域键
+            prompt: 提示文本
+
+        Returns:
+            查找结果，未命中时entry为None
+        """
+        self.stats["lookups"] += 1
+        vector = await self._embed_one(prompt)
+        match = SemanticMatch(scope=scope, vector=vector)
+        index = self._scopes.get(scope)
+        if vector is None or index is None:
+            self.stats["misses"] += 1
+            return match
+
+        while True:
+            nearest = index.nearest(vector)
+            if nearest is None:
+                self.stats["misses"] += 1
+                return match
+
+            entry = self._entries[nearest[0]]
+            if entry.expires_at is not None and entry.expires_at <= time.time():
+                self._remove(entry.entry_id)
+                self.stats["expirations"] += 1
+                continue
+            break
+
+        entry_id, similarity = nearest
+        match.similarity = similarity
+        if similarity < self.threshold:
+            self.stats["misses"] += 1
+            self._near_misses += 1
+            self._near_miss_similarity_sum += similarity
+            return match
+
+        match.entry = entry
+        entry.hits += 1
+        self._entries.move_to_end(entry_id)
+        self.stats["hits"] += 1
+        self._hit_similarity_sum += similarity
+        if self._hit_similarity_min is None or similarity < self._hit_similarity_min:
+            self._hit_similarity_min = similarity
+
+        match.verify = self.verify_rate > 0 and random.random() < self.verify_rate
+        logger.debug(f"Semantic cache hit in {scope} (similarity={similarity:.3f})")
+        return match
+
+    async def store(
+        self,
+        scope: str,
+        prompt: str,
+        value: Any,
+        vector: Optional[List[float]] = None,
+    ):
+        """写入缓存
+
+        Args:
+            scope: 作用域键
+            prompt: 提示文本
+            value: 响应
+            vector: lookup得到的归一化嵌入，省略时重新计算
+        """
+        if vector is None:
+            vector = await self._embed_one(prompt)
+            if vector is None:
+                return
+
+        entry = SemanticCacheEntry(
+            entry_id=self._next_id,
+            scope=scope,
+            prompt=prompt,
+            vector=vector,
+            value=value,
+            expires_at=time.time() + self.ttl if self.ttl is not None else None,
+        )
+        self._next_id += 1
+        self._entries[entry.entry_id] = entry
+        self._scopes.setdefault(scope, _ScopeIndex()).add(entry.entry_id, vector)
+        self.stats["stores"] += 1
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+
+    async def record_verification(self, match: SemanticMatch, fresh_text: str):
+        """记录抽样校验结果：缓存响应与真实响应的嵌入相似度"""
+        if match.entry is None:
+            return
+
+        cached = match.entry.value
+        cached_text = cached.get("content", "") if isinstance(cached, dict) else cached
+        first = await self._embed_one(str(cached_text))
+        second = await self._embed_one(fresh_text)
+        if first is None or second is None:
+            return
+
+        agreement = sum(a * b for a, b in zip(first, second))
+        self.stats["verifications"] += 1
+        self._agreement_sum += agreement
+        if agreement >= self.threshold:
+            self.stats["verified_agreements"] += 1
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        index = self._scopes[entry.scope]
+        index.remove(entry_id)
+        if not index.ids:
+            del self._scopes[entry.scope]
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._scopes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存和命中质量统计"""
+        hits = self.stats["hits"]
+        lookups = self.stats["lookups"]
+        verifications = self.stats["verifications"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "scopes": len(self._scopes),
+            "threshold": self.threshold,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "avg_hit_similarity": self._hit_similarity_sum / hits if hits else None,
+            "min_hit_similarity": self._hit_similarity_min,
+            "avg_near_miss_similarity": (
+                self._near_miss_similarity_sum / self._near_misses
+                if self._near_misses
+                else None
+            ),
+            "avg_verified_agreement": (
+                self._agreement_sum / verifications if verifications else None
+            ),
+            "verified_agreement_rate": (
+                self.stats["verified_agreements"] / verifications
+                if verifications
+                else None
+            ),
+        }
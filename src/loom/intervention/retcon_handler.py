@@ -2,8 +2,13 @@
 Retcon处理
 
 处理追溯性修改（Retcon），管理历史版本和一致性。
+
+版本快照采用增量方式：每次Retcon只记录被修改实体修改前的状态（写时复制），
+快照大小与修改的实体数成正比；回滚时从最新版本向前逆序应用这些记录。
+增量版本数超过上限时，最旧的一批合并为一个检查点。
 """
 
+import copy
 import json
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -43,10 +48,27 @@ class RetconResult:
 class RetconHandler:
     """Retcon处理器"""
 
-    def __init__(self, world_memory: Optional[WorldMemory] = None):
+    def __init__(
+        self,
+        world_memory: Optional[WorldMemory] = None,
+        max_delta_versions: int = 50,
+        checkpoint_interval: int = 10,
+    ):
+        """初始化Retcon处理器
+
+        Args:
+            world_memory: 世界记忆
+            max_delta_versions: 保留的增量版本数上限
+            checkpoint_interval: 压缩时合并为一个检查点的增量版本数
+        """
         self.world_memory = world_memory
         self.retcon_history: List[RetconResult] = []
+        # 版本ID -> 快照（按创建顺序）。增量快照的 entities_before 记录
+        # 该版本之后首次被修改的实体在修改前的状态（None表示当时不存在）
         self.version_snapshots: Dict[str, Dict[str, Any]] = {}
+        self.max_delta_versions = max(1, max_delta_versions)
+        self.checkpoint_interval = max(2, checkpoint_interval)
+        self._active_version: Optional[str] = None
         logger.info("RetconHandler initialized")
 
     def parse_retcon_command(self, retcon_text: str) -> Optional[RetconOperation]:
@@ -158,6 +180,7 @@ class RetconHandler:
             handler = getattr(self, handler_name, None)
 
             if not handler:
+                self._active_version = None
                 return RetconResult(
                     success=False,
                     operation=operation,
@@ -166,7 +189,10 @@ class RetconHandler:
                     errors=[f"Unsupported operation type: {operation.type}"],
                 )
 
-            result = await handler(operation, session_context)
+            try:
+                result = await handler(operation, session_context)
+            finally:
+                self._active_version = None
             result.version_created = version_id
 
             # 检查一致性
@@ -225,6 +251,7 @@ class RetconHandler:
 
         # 简化修改：更新实体内容
         updates = {"statement": new_content, "retconned": True, "original": old_content}
+        self._record_entity_state(operation.target_id, entity)
 
         updated_entity = await self.world_memory.update_entity(
             operation.target_id, updates
@@ -282,6 +309,11 @@ class RetconHandler:
             updated_at=datetime.now(),
         )
 
+        existing = None
+        if operation.target_id:
+            existing = await self.world_memory.retrieve_entity(memory_id)
+        self._record_entity_state(memory_id, existing)
+
         success = await self.world_memory.store_entity(entity)
 
         if success:
@@ -332,6 +364,7 @@ class RetconHandler:
             "removal_reason": operation.changes.get("reason", operation.justification),
             "removed_at": datetime.now().isoformat(),
         }
+        self._record_entity_state(operation.target_id, entity)
 
         updated_entity = await self.world_memory.update_entity(
             operation.target_id, updates
@@ -371,22 +404,75 @@ class RetconHandler:
         )
 
     async def _create_snapshot(self, session_id: str) -> str:
-        """创建版本快照"""
-        version_id = f"retcon_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        """创建版本快照（增量）
 
+        快照创建时为空，执行Retcon的处理器在修改实体前调用
+        _record_entity_state 记录其原状态。
+        """
+        version_id = f"retcon_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if version_id in self.version_snapshots:
+            version_id = f"{version_id}_{len(self.version_snapshots)}"
+
+        self.version_snapshots[version_id] = {
+            "type": "delta",
+            "session_id": session_id,
+            "timestamp": datetime.now().isoformat(),
+            "entities_before": {},
+        }
         if self.world_memory:
-            snapshot = await self.world_memory.export_memory()
-            self.version_snapshots[version_id] = snapshot
-            logger.debug(f"Created snapshot: {version_id}")
+            self._active_version = version_id
         else:
-            self.version_snapshots[version_id] = {
-                "session_id": session_id,
-                "timestamp": datetime.now().isoformat(),
-                "note": "WorldMemory not available",
-            }
+            self.version_snapshots[version_id]["note"] = "WorldMemory not available"
 
+        self._compact_snapshots()
+        logger.debug(f"Created snapshot: {version_id}")
         return version_id
 
+    def _record_entity_state(self, entity_id: str, entity: Optional[MemoryEntity]):
+        """记录实体在当前版本中首次被修改前的状态"""
+        if not self._active_version:
+            return
+        snapshot = self.version_snapshots.get(self._active_version)
+        if snapshot is None:
+            return
+        before = snapshot.setdefault("entities_before", {})
+        if entity_id not in before:
+            before[entity_id] = copy.deepcopy(entity.to_dict()) if entity else None
+
+    def _compact_snapshots(self):
+        """增量版本过多时，把最旧的一批合并为一个检查点
+
+        合并后每个实体保留最早的原状态，回滚到检查点与逐个回滚结果相同，
+        只是不能再回滚到被合并的中间版本。
+        """
+        deltas = [
+            version_id
+            for version_id, snapshot in self.version_snapshots.items()
+            if snapshot.get("type") == "delta"
+        ]
+        if len(deltas) <= self.max_delta_versions:
+            return
+
+        merged_ids = deltas[: self.checkpoint_interval]
+        checkpoint_id = merged_ids[0]
+        checkpoint = self.version_snapshots[checkpoint_id]
+        merged_before = dict(checkpoint.get("entities_before", {}))
+        for version_id in merged_ids[1:]:
+            snapshot = self.version_snapshots.pop(version_id)
+            for entity_id, state in snapshot.get("entities_before", {}).items():
+                merged_before.setdefault(entity_id, state)
+
+        checkpoint.update(
+            {
+                "type": "checkpoint",
+                "entities_before": merged_before,
+                "merged_versions": merged_ids,
+            }
+        )
+        logger.debug(
+            f"Compacted {len(merged_ids)} snapshot versions into checkpoint {checkpoint_id}"
+        )
+
     async def _check_consistency(
         self, operation: RetconOperation, result: RetconResult
     ) -> List[str]:
@@ -415,51 +501,91 @@ class RetconHandler:
         return issues
 
     async def rollback_to_version(self, version_id: str) -> bool:
-        """回滚到指定版本"""
+        """回滚到指定版本
+
+        增量快照：从最新版本到目标版本逆序应用修改前状态；
+        完整快照（含entities）：清空后重新导入。
+        """
         if version_id not in self.version_snapshots:
             logger.error(f"Version not found: {version_id}")
             return False
 
         snapshot = self.version_snapshots[version_id]
 
-        if self.world_memory:
+        if not self.world_memory:
+            logger.warning(f"Cannot rollback without WorldMemory")
+            return False
+
+        if "entities" in snapshot:
             # 清空当前记忆
             self.world_memory.entities.clear()
             self.world_memory.relations.clear()
+            self.world_memory.relation_graph.load([])
 
             # 导入快照
             success = await self.world_memory.import_memory(snapshot)
+        else:
+            success = await self._apply_inverse_deltas(version_id)
 
-            if success:
-                logger.info(f"Rolled back to version: {version_id}")
+        if not success:
+            logger.error(f"Failed to restore snapshot: {version_id}")
+            return False
 
-                # 记录回滚操作
-                rollback_operation = RetconOperation(
-                    type="rollback",
-                    target_id=None,
-                    changes={"version": version_id},
-                    justification="系统回滚",
-                    timestamp=datetime.now(),
-                )
+        logger.info(f"Rolled back to version: {version_id}")
 
-                rollback_result = RetconResult(
-                    success=True,
-                    operation=rollback_operation,
-                    narrative_impact=f"回滚到版本: {version_id}",
-                    consistency_issues=[],
-                    version_created=f"rollback_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-                )
+        # 记录回滚操作
+        rollback_operation = RetconOperation(
+            type="rollback",
+            target_id=None,
+            changes={"version": version_id},
+            justification="系统回滚",
+            timestamp=datetime.now(),
+        )
 
-                self.retcon_history.append(rollback_result)
+        rollback_result = RetconResult(
+            success=True,
+            operation=rollback_operation,
+            narrative_impact=f"回滚到版本: {version_id}",
+            consistency_issues=[],
+            version_created=f"rollback_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        )
 
-                return True
-            else:
-                logger.error(f"Failed to import snapshot: {version_id}")
-                return False
-        else:
-            logger.warning(f"Cannot rollback without WorldMemory")
+        self.retcon_history.append(rollback_result)
+
+        return True
+
+    async def _apply_inverse_deltas(self, version_id: str) -> bool:
+        """逆序恢复目标版本及之后各版本修改过的实体
+
+        每个实体恢复为最早（最接近目标版本）的记录状态；
+        目标版本之后的版本随之失效并被删除。
+        """
+        version_ids = list(self.version_snapshots)
+        newer = version_ids[version_ids.index(version_id) :]
+
+        restore: Dict[str, Optional[Dict[str, Any]]] = {}
+        for vid in reversed(newer):
+            restore.update(self.version_snapshots[vid].get("entities_before", {}))
+
+        try:
+            for entity_id, state in restore.items():
+                if state is None:
+                    await self.world_memory.delete_entity(entity_id)
+                else:
+                    await self.world_memory.store_entity(
+                        MemoryEntity.from_dict(copy.deepcopy(state))
+                    )
+        except Exception as e:
+            logger.error(f"Failed to apply inverse deltas for {version_id}: {e}")
             return False
 
+        for vid in newer[1:]:
+            del self.version_snapshots[vid]
+        # 当前状态即目标版本，目标版本的增量已应用
+        self.version_snapshots[version_id]["entities_before"] = {}
+        logger.debug(f"Restored {len(restore)} entities for version {version_id}")
+        return True
+
     def get_retcon_history(self, limit: int = 20) -> List[RetconResult]:
         """获取Retcon历史"""
         return self.retcon_history[-limit:] if self.retcon_history else []
@@ -473,8 +599,10 @@ class RetconHandler:
                 {
                     "id": version_id,
                     "timestamp": snapshot.get("timestamp", "unknown"),
+                    "type": snapshot.get("type", "full"),
                     "entity_count": len(snapshot.get("entities", [])),
                     "relation_count": len(snapshot.get("relations", [])),
+                    "changed_entities": len(snapshot.get("entities_before", {})),
                 }
             )
 
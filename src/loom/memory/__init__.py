@@ -5,12 +5,16 @@
 包含第二阶段增强功能：向量存储集成、记忆摘要生成、增强记忆接口、一致性检查。
 """
 
+from .embedding_cache import EmbeddingCache
+from .embedding_worker import EmbeddingWorkerPool
 from .enhanced_world_memory import (
     EnhancedMemoryConfig,
     EnhancedWorldMemory,
     RelationshipNetwork,
     TimelineEvent,
 )
+from .hybrid_retrieval import HybridRetriever, HybridSearchConfig
+from .importance_scorer import ImportanceScorer
 from .memory_consistency_checker import (
     ConsistencyCheckResult,
     ConsistencyIssue,
@@ -21,8 +25,14 @@ from .memory_consistency_checker import (
 from .memory_summarizer import EnhancedMemorySummary
 from .memory_summarizer import MemorySummarizer as EnhancedMemorySummarizer
 from .memory_summarizer import SummaryConfig, SummaryFormat, SummaryStrategy
+from .minhash_lsh import MinHashLSHIndex
+from .quantization import QuantizedVectorIndex
+from .query_cache import QueryCache
+from .relation_graph import RelationGraph
 from .structured_store import StructuredStore
 from .summarizer import MemorySummarizer
+from .summary_hierarchy import SummaryHierarchy
+from .timeline_index import TimelineIndex
 
 # 第二阶段增强组件
 from .vector_memory_store import (
@@ -47,6 +57,16 @@ __all__ = [
     "VectorStoreBackend",
     "VectorSearchResult",
     "VectorSearchQuery",
+    "EmbeddingCache",
+    "EmbeddingWorkerPool",
+    "QuantizedVectorIndex",
+    "HybridRetriever",
+    "HybridSearchConfig",
+    "RelationGraph",
+    "TimelineIndex",
+    "QueryCache",
+    "SummaryHierarchy",
+    "ImportanceScorer",
     "EnhancedMemorySummarizer",
     "SummaryConfig",
     "SummaryStrategy",
@@ -61,4 +81,5 @@ __all__ = [
     "ConsistencyCheckResult",
     "ConsistencyIssueType",
     "ConsistencySeverity",
+    "MinHashLSHIndex",
 ]
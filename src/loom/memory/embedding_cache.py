@@ -0,0 +1,255 @@
+"""
+嵌入向量缓存 (EmbeddingCache)
+
+以内容哈希为键的两级嵌入缓存：
+1. 内存层：有界LRU（OrderedDict）
+2. 磁盘层：可选的SQLite持久化，按最近访问时间做LRU淘汰
+
+重启后重新索引世界时，未变化文本的嵌入可直接从磁盘命中，无需再次推理。
+get_many/put_many 可能在线程池中调用，内存层和磁盘层分别加锁。
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """嵌入向量缓存
+
+    键为 sha256(模型名 + 文本)，因此更换嵌入模型不会命中旧向量。
+    向量以float32字节串存储在SQLite的BLOB列中。
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_memory_entries: int = 10000,
+        db_path: Optional[str] = None,
+        max_disk_entries: int = 200000,
+    ):
+        """初始化嵌入缓存
+
+        Args:
+            model_name: 嵌入模型名称（参与键计算）
+            max_memory_entries: 内存层最大条目数
+            db_path: SQLite文件路径，为None时仅使用内存层
+            max_disk_entries: 磁盘层最大条目数
+        """
+        self.model_name = model_name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.db_path = Path(db_path) if db_path else None
+
+        # 内存层以array('f')保存，比Python浮点列表小约8倍
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # SQLite连接可能在线程池中被访问
+        self._db_lock = threading.Lock()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+        if self.db_path:
+            self._initialize_db()
+
+    def _initialize_db(self):
+        """初始化SQLite磁盘层"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        logger.info(f"Embedding cache persisted at {self.db_path}")
+
+    def make_key(self, text: str) -> str:
+        """计算文本的内容哈希键"""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """批量查询缓存
+
+        先查内存层，未命中的键再用一条 IN (...) 查询磁盘层，
+        磁盘命中的向量会回填到内存层。
+
+        Args:
+            keys: 缓存键
+
+        Returns:
+            命中的 {key: embedding}
+        """
+        found: Dict[str, List[float]] = {}
+        disk_keys = []
+
+        with self._memory_lock:
+            for key in keys:
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = embedding.tolist()
+                    self.stats["memory_hits"] += 1
+                else:
+                    disk_keys.append(key)
+
+        if disk_keys and self._conn is not None:
+            loaded = self._load_from_disk(disk_keys)
+            with self._memory_lock:
+                for key, embedding in loaded.items():
+                    found[key] = embedding
+                    self._remember(key, embedding)
+                    self.stats["disk_hits"] += 1
+
+        with self._memory_lock:
+            self.stats["misses"] += sum(1 for key in disk_keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """批量写入缓存
+
+        Args:
+            items: {key: embedding}
+        """
+        with self._memory_lock:
+            for key, embedding in items.items():
+                self._remember(key, embedding)
+
+        if items and self._conn is not None:
+            self._save_to_disk(items)
+
+    def _remember(self, key: str, embedding: List[float]):
+        """写入内存层并按LRU淘汰（调用方持有_memory_lock）"""
+        self._memory[key] = array("f", embedding)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def _load_from_disk(self, keys: List[str]) -> Dict[str, List[float]]:
+        """从SQLite批量读取向量并刷新访问时间"""
+        found = {}
+        now = time.time()
+
+        with self._db_lock:
+            # SQLite默认最多999个绑定参数
+            for start in range(0, len(keys), 900):
+                chunk = keys[start : start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+                hit_keys = [row[0] for row in rows]
+                if hit_keys:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? "
+                        f"WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [now, *hit_keys],
+                    )
+            self._conn.commit()
+
+        return found
+
+    def _save_to_disk(self, items: Dict[str, List[float]]):
+        """批量写入SQLite，超出上限时淘汰最久未访问的条目"""
+        now = time.time()
+        rows: List[Tuple[Any, ...]] = [
+            (
+                key,
+                self.model_name,
+                len(embedding),
+                array("f", embedding).tobytes(),
+                now,
+            )
+            for key, embedding in items.items()
+        ]
+
+        with self._db_lock:
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO embeddings
+                (key, model, dimension, vector, last_access)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            overflow = count - self.max_disk_entries
+            if overflow > 0:
+                self._conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+                    )
+                """,
+                    (overflow,),
+                )
+                self.stats["disk_evictions"] += overflow
+
+            self._conn.commit()
+
+    def clear(self):
+        """清空缓存（包括磁盘层）"""
+        with self._memory_lock:
+            self._memory.clear()
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def close(self):
+        """关闭磁盘连接"""
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / total if total > 0 else 0.0,
+            "memory_entries": len(self._memory),
+            "max_memory_entries": self.max_memory_entries,
+            "persistent": self._conn is not None,
+            "db_path": str(self.db_path) if self.db_path else None,
+        }
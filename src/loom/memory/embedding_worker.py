@@ -0,0 +1,262 @@
+"""
+嵌入推理工作池 (EmbeddingWorkerPool)
+
+将嵌入模型推理移出事件循环：
+1. 有界请求队列，队列满时调用方等待（背压）
+2. 微批处理：在几毫秒窗口内合并并发请求，一次调用模型编码，
+   单批不超过 max_batch_size 个文本
+3. 专用线程池执行推理，不占用默认执行器
+4. 记录排队延迟、批大小、推理耗时等指标
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _EmbeddingRequest:
+    """队列中的一次编码请求"""
+
+    texts: List[str]
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class EmbeddingWorkerPool:
+    """嵌入推理工作池
+
+    encode_fn 是同步批量编码函数（List[str] -> List[List[float]]），
+    在专用线程池中执行。sentence-transformers/torch推理会释放GIL，
+    因此线程池即可避免阻塞事件循环，且无需在进程间复制模型。
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue_size: int = 1024,
+        num_workers: int = 1,
+        metrics_window: int = 1000,
+    ):
+        """初始化工作池
+
+        Args:
+            encode_fn: 同步批量编码函数
+            max_batch_size: 单批最多文本数
+            max_wait_ms: 收集微批的最长等待时间（毫秒）
+            max_queue_size: 请求队列上限
+            num_workers: 推理线程数（同时执行的批数）
+            metrics_window: 延迟指标保留的最近样本数
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.num_workers = max(1, num_workers)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_workers, thread_name_prefix="loom-embedding"
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # 放不进上一批、留给下一批的请求
+        self._carry: Optional[_EmbeddingRequest] = None
+        self._inflight: set = set()
+        self._closed = False
+
+        self._queue_latencies: deque = deque(maxlen=metrics_window)
+        self._encode_latencies: deque = deque(maxlen=metrics_window)
+        self.stats = {
+            "requests": 0,
+            "texts": 0,
+            "batches": 0,
+            "errors": 0,
+        }
+
+    def _ensure_started(self):
+        """在当前事件循环上启动分发任务"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._loop is loop
+            and self._dispatcher is not None
+            and not self._dispatcher.done()
+        ):
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.num_workers)
+        self._dispatcher = loop.create_task(self._dispatch_loop())
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """提交文本并等待编码结果
+
+        Args:
+            texts: 待编码文本
+
+        Returns:
+            与输入顺序一致的嵌入向量
+        """
+        if self._closed:
+            raise RuntimeError("EmbeddingWorkerPool is closed")
+        if not texts:
+            return []
+
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put(
+            _EmbeddingRequest(list(texts), future, time.perf_counter())
+        )
+        self.stats["requests"] += 1
+        return await future
+
+    async def _dispatch_loop(self):
+        """收集微批并交给推理线程"""
+        while True:
+            batch: List[_EmbeddingRequest] = []
+            # 已获取但尚未交给批任务的推理槽位
+            holding_slot = False
+            try:
+                if self._carry is not None:
+                    first, self._carry = self._carry, None
+                else:
+                    first = await self._queue.get()
+                batch.append(first)
+                size = len(first.texts)
+                deadline = time.perf_counter() + self.max_wait
+
+                while size < self.max_batch_size:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        request = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if size + len(request.texts) > self.max_batch_size:
+                        self._carry = request
+                        break
+                    batch.append(request)
+                    size += len(request.texts)
+
+                await self._slots.acquire()
+                holding_slot = True
+                task = asyncio.create_task(self._run_batch(batch))
+                holding_slot = False  # 由批任务释放
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+            except asyncio.CancelledError:
+                # 已收集但未提交给推理线程的请求随关闭失败
+                self._fail(batch, RuntimeError("EmbeddingWorkerPool is closed"))
+                break
+            except Exception as e:
+                logger.error(f"Embedding dispatcher error: {e}")
+                self.stats["errors"] += 1
+                self._fail(batch, e)
+            finally:
+                if holding_slot:
+                    self._slots.release()
+
+    async def _run_batch(self, batch: List[_EmbeddingRequest]):
+        """在线程池中执行一批编码并分发结果"""
+        try:
+            started = time.perf_counter()
+            for request in batch:
+                self._queue_latencies.append(started - request.enqueued_at)
+
+            # 单个请求超过批大小时分块编码
+            texts = [text for request in batch for text in request.texts]
+            embeddings = []
+            for start in range(0, len(texts), self.max_batch_size):
+                embeddings.extend(
+                    await self._loop.run_in_executor(
+                        self._executor,
+                        self.encode_fn,
+                        texts[start : start + self.max_batch_size],
+                    )
+                )
+                self.stats["batches"] += 1
+            self._encode_latencies.append(time.perf_counter() - started)
+            self.stats["texts"] += len(texts)
+
+            offset = 0
+            for request in batch:
+                count = len(request.texts)
+                if not request.future.done():
+                    request.future.set_result(embeddings[offset : offset + count])
+                offset += count
+
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._fail(batch, e)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _fail(requests: List[_EmbeddingRequest], error: BaseException):
+        """以异常结束尚未完成的请求"""
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    @staticmethod
+    def _summarize(samples: deque) -> Dict[str, float]:
+        """计算延迟样本的均值/P95/最大值（毫秒）"""
+        if not samples:
+            return {"avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        values = [sample * 1000 for sample in samples]
+        p95 = statistics.quantiles(values, n=20)[18] if len(values) >= 2 else values[0]
+        return {
+            "avg_ms": statistics.mean(values),
+            "p95_ms": p95,
+            "max_ms": max(values),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取工作池指标"""
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "avg_batch_size": self.stats["texts"] / batches if batches else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_latency": self._summarize(self._queue_latencies),
+            "encode_latency": self._summarize(self._encode_latencies),
+        }
+
+    async def close(self):
+        """停止分发任务，使排队中的请求失败并关闭线程池
+
+        已提交到推理线程的批次照常完成。
+        """
+        self._closed = True
+        if self._dispatcher is not None and not self._dispatcher.done():
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+
+        error = RuntimeError("EmbeddingWorkerPool is closed")
+        if self._carry is not None:
+            self._fail([self._carry], error)
+            self._carry = None
+        if self._queue is not None:
+            # 取出请求会唤醒因背压等待的调用方，让出一轮后再次清空
+            while not self._queue.empty():
+                while not self._queue.empty():
+                    self._fail([self._queue.get_nowait()], error)
+                await asyncio.sleep(0)
+        self._executor.shutdown(wait=False)
@@ -20,6 +20,8 @@ from typing import Any, Dict, List, Optional, Set, Tuple
 
 from ..utils.async_helpers import async_retry
 from ..utils.logging_config import get_logger
+from ..utils.ttl_cache import TTLCache
+from .hybrid_retrieval import HybridRetriever, HybridSearchConfig
 from .interfaces import (
     ConsistencyError,
     MemoryQuery,
@@ -27,8 +29,10 @@ from .interfaces import (
     RetrievalError,
     StorageError,
 )
+from .memory_consistency_checker import ConsistencyIssue, MemoryConsistencyChecker
 from .memory_summarizer import EnhancedMemorySummary, MemorySummarizer, SummaryConfig
 from .structured_store import StructuredStore
+from .timeline_index import TimelineIndex
 from .vector_memory_store import VectorMemoryStore, VectorSearchResult
 from .world_memory import (
     MemoryEntity,
@@ -62,9 +66,16 @@ class EnhancedMemoryConfig:
     enable_timeline_analysis: bool = True
     enable_relationship_network: bool = True
     enable_consistency_checking: bool = True
+    consistency_config: Optional[Dict[str, Any]] = None
+
+    # 混合检索配置（HybridSearchConfig的字段）
+    hybrid_search_config: Optional[Dict[str, Any]] = None
 
     # 性能配置
     cache_ttl_seconds: int = 300
+    entity_cache_size: int = 1000
+    query_cache_size: int = 256
+    cache_max_bytes: Optional[int] = None  # 每个缓存的估算字节上限
     batch_size: int = 50
     max_relationships_depth: int = 3
 
@@ -116,6 +127,11 @@ class EnhancedWorldMemory(WorldMemory):
             EnhancedMemoryConfig(**config) if config else EnhancedMemoryConfig()
         )
 
+        if self.config.hybrid_search_config:
+            self.hybrid_retriever = HybridRetriever(
+                HybridSearchConfig(**self.config.hybrid_search_config)
+            )
+
         # 初始化存储组件
         self.structured_store = None
         self.vector_store = None
@@ -123,9 +139,34 @@ class EnhancedWorldMemory(WorldMemory):
 
         self._initialize_components()
 
+        # 时间线索引（有结构化存储时在首次查询时加载）
+        self.timeline_index = TimelineIndex()
+        if not self.structured_store:
+            self.timeline_index.load([])
+
+        # 一致性检查器（近似重复索引在首次检查时从结构化存储加载，之后增量维护）
+        self.consistency_checker = None
+        if self.config.enable_consistency_checking:
+            self.consistency_checker = MemoryConsistencyChecker(
+                self.config.consistency_config
+            )
+            if self.structured_store:
+                # 索引只保存ID和签名，候选实体按需从存储加载
+                self.consistency_checker.entity_source = self
+            else:
+                self.consistency_checker.load([])
+
         # 缓存
-        self.entity_cache: Dict[str, Tuple[MemoryEntity, datetime]] = {}
-        self.query_cache: Dict[str, Tuple[List[MemoryEntity], datetime]] = {}
+        self.entity_cache = TTLCache(
+            max_entries=self.config.entity_cache_size,
+            default_ttl=self.config.cache_ttl_seconds,
+            max_bytes=self.config.cache_max_bytes,
+        )
+        self.query_cache = TTLCache(
+            max_entries=self.config.query_cache_size,
+            default_ttl=self.config.cache_ttl_seconds,
+            max_bytes=self.config.cache_max_bytes,
+        )
 
         logger.info(f"EnhancedWorldMemory initialized for session: {session_id}")
 
@@ -160,6 +201,12 @@ class EnhancedWorldMemory(WorldMemory):
                 llm_provider = LLMProvider()  # 使用默认配置
                 summarizer_config = self.config.summarizer_config or {}
                 self.summarizer = MemorySummarizer(llm_provider, summarizer_config)
+                # 分层摘要节点持久化到结构化存储
+                self.summarizer.summary_store = self.structured_store
+                # 重要性评分使用关系图中的度数
+                self.summarizer.relation_graph = self.relation_graph
+                # 增量摘要需要按ID加载历史实体
+                self.summarizer.entity_source = self
                 logger.info("MemorySummarizer initialized")
             except Exception as e:
                 logger.error(f"Failed to initialize MemorySummarizer: {e}")
@@ -205,6 +252,8 @@ class EnhancedWorldMemory(WorldMemory):
 
             # 更新缓存
             self._cache_entity(entity)
+            self._index_timeline_entity(entity)
+            self._index_consistency_entity(entity)
 
             logger.debug(f"Stored entity {entity_id} of type {entity.type.value}")
             return entity_id
@@ -241,6 +290,37 @@ class EnhancedWorldMemory(WorldMemory):
             logger.error(f"Failed to retrieve entity {entity_id}: {e}")
             return None
 
+    async def retrieve_entities_batch(
+        self, entity_ids: List[str]
+    ) -> Dict[str, Optional[MemoryEntity]]:
+        """批量检索实体（先查缓存，未命中的一次批量查询）
+
+        Args:
+            entity_ids: 实体ID列表
+
+        Returns:
+            {entity_id: 实体或None}
+        """
+        results: Dict[str, Optional[MemoryEntity]] = {}
+        missing = []
+        for entity_id in entity_ids:
+            if entity_id in results:
+                continue
+            results[entity_id] = self._get_cached_entity(entity_id)
+            if results[entity_id] is None:
+                missing.append(entity_id)
+
+        if missing and self.config.structured_store_enabled and self.structured_store:
+            try:
+                fetched = await self.structured_store.retrieve_entities(missing)
+                for entity_id, entity in fetched.items():
+                    self._cache_entity(entity)
+                    results[entity_id] = entity
+            except Exception as e:
+                logger.error(f"Failed to retrieve entities: {e}")
+
+        return results
+
     async def query_entities(self, query: MemoryQuery) -> List[MemoryEntity]:
         """查询记忆实体
 
@@ -300,7 +380,7 @@ class EnhancedWorldMemory(WorldMemory):
 
             # 更新结构化存储
             if self.config.structured_store_enabled and self.structured_store:
-                success = await self.structured_store.update_entity(entity_id, updates)
+                success = await self.structured_store.store_entity(entity)
                 if not success:
                     return False
 
@@ -317,6 +397,8 @@ class EnhancedWorldMemory(WorldMemory):
 
             # 更新缓存
             self._cache_entity(entity)
+            self._index_timeline_entity(entity)
+            self._index_consistency_entity(entity)
 
             logger.debug(f"Updated entity {entity_id}")
             return True
@@ -350,6 +432,12 @@ class EnhancedWorldMemory(WorldMemory):
 
             # 清除缓存
             self._remove_cached_entity(entity_id)
+            self.relation_graph.remove_entity(entity_id)
+            self.timeline_index.remove(entity_id)
+            if self.consistency_checker:
+                self.consistency_checker.remove_entity(entity_id)
+            if self.summarizer:
+                await self.summarizer.remove_entity(entity_id, self.session_id)
 
             logger.debug(f"Deleted entity {entity_id}")
             return True
@@ -368,9 +456,14 @@ class EnhancedWorldMemory(WorldMemory):
             是否成功添加
         """
         try:
+            await self._ensure_relation_graph()
+
             if self.config.structured_store_enabled and self.structured_store:
-                return await self.structured_store.add_relation(relation)
-            return False
+                if not await self.structured_store.store_relation(relation):
+                    return False
+
+            self.relation_graph.add(relation)
+            return True
 
         except Exception as e:
             logger.error(f"Failed to add relation: {e}")
@@ -390,11 +483,16 @@ class EnhancedWorldMemory(WorldMemory):
             是否成功移除
         """
         try:
+            await self._ensure_relation_graph()
+            removed = self.relation_graph.remove(source_id, target_id, relation_type)
+
             if self.config.structured_store_enabled and self.structured_store:
-                return await self.structured_store.remove_relation(
+                deleted = await self.structured_store.delete_relation(
                     source_id, target_id, relation_type
                 )
-            return False
+                removed = removed or deleted
+
+            return removed
 
         except Exception as e:
             logger.error(f"Failed to remove relation: {e}")
@@ -413,16 +511,80 @@ class EnhancedWorldMemory(WorldMemory):
             相关实体列表
         """
         try:
-            if self.config.structured_store_enabled and self.structured_store:
-                return await self.structured_store.get_related_entities(
-                    entity_id, relation_type
-                )
-            return []
+            await self._ensure_relation_graph()
+            related_ids = self.relation_graph.neighbors(entity_id, relation_type)
+            retrieved = await self.retrieve_entities_batch(related_ids)
+            return [entity for entity in retrieved.values() if entity]
 
         except Exception as e:
             logger.error(f"Failed to get related entities: {e}")
             return []
 
+    async def get_k_hop_entities(
+        self,
+        entity_id: str,
+        k: int = 2,
+        relation_type: Optional[MemoryRelationType] = None,
+    ) -> Dict[str, Tuple[MemoryEntity, int]]:
+        """获取k跳内可达的实体
+
+        Args:
+            entity_id: 起点实体ID
+            k: 最大跳数
+            relation_type: 只沿指定类型的关系遍历
+
+        Returns:
+            {entity_id: (实体, 跳数)}，不包含起点
+        """
+        try:
+            await self._ensure_relation_graph()
+            distances = self.relation_graph.k_hop(entity_id, k, relation_type)
+            retrieved = await self.retrieve_entities_batch(list(distances))
+            return {
+                related_id: (entity, distances[related_id])
+                for related_id, entity in retrieved.items()
+                if entity
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to get k-hop entities: {e}")
+            return {}
+
+    async def find_relationship_path(
+        self,
+        source_id: str,
+        target_id: str,
+        max_depth: Optional[int] = None,
+        relation_type: Optional[MemoryRelationType] = None,
+    ) -> Optional[List[MemoryEntity]]:
+        """查找两个实体之间的最短关系路径
+
+        Args:
+            source_id: 起点实体ID
+            target_id: 终点实体ID
+            max_depth: 最大路径长度（默认不限制）
+            relation_type: 只沿指定类型的关系遍历
+
+        Returns:
+            路径上的实体列表（含起点和终点），不可达时返回None
+        """
+        try:
+            await self._ensure_relation_graph()
+            path = self.relation_graph.shortest_path(
+                source_id, target_id, max_depth, relation_type
+            )
+            if path is None:
+                return None
+
+            retrieved = await self.retrieve_entities_batch(path)
+            if not all(retrieved.get(entity_id) for entity_id in path):
+                return None
+            return [retrieved[entity_id] for entity_id in path]
+
+        except Exception as e:
+            logger.error(f"Failed to find relationship path: {e}")
+            return None
+
     async def summarize(
         self, session_id: str, time_range: Optional[Tuple[datetime, datetime]] = None
     ) -> MemorySummary:
@@ -555,16 +717,14 @@ class EnhancedWorldMemory(WorldMemory):
                 query, filters, limit
             )
 
-            # 检索完整实体
+            # 批量检索完整实体
             entities = []
-            for entity_id, score in search_results:
-                entity = await self.retrieve_entity(entity_id)
-                if entity:
-                    # 添加相似度分数到元数据
-                    if not entity.metadata:
-                        entity.metadata = {}
-                    entity.metadata["similarity_score"] = score
-                    entities.append(entity)
+            for entity, score in await self._hydrate_search_results(search_results):
+                # 添加相似度分数到元数据
+                if not entity.metadata:
+                    entity.metadata = {}
+                entity.metadata["similarity_score"] = score
+                entities.append(entity)
 
             # 按相似度排序
             entities.sort(
@@ -596,31 +756,11 @@ class EnhancedWorldMemory(WorldMemory):
             return []
 
         try:
-            # 查询时间范围内的实体
-            query = MemoryQuery(
-                session_id=self.session_id,
-                time_range=(start_time, end_time) if start_time or end_time else None,
+            # 时间索引上二分查找范围，事件按实体版本缓存
+            await self._ensure_timeline_index()
+            timeline_events = self.timeline_index.events(
+                self._build_timeline_event, start_time, end_time
             )
-            entities = await self.query_entities(query)
-
-            # 转换为时间线事件
-            timeline_events = []
-            for entity in entities:
-                # 计算重要性（简化）
-                importance = self._calculate_entity_importance(entity)
-
-                event = TimelineEvent(
-                    timestamp=entity.created_at,
-                    entity_id=entity.id,
-                    entity_type=entity.type,
-                    content_summary=self._summarize_content(entity.content),
-                    importance=importance,
-                    metadata={"type": entity.type.value, "version": entity.version},
-                )
-                timeline_events.append(event)
-
-            # 按时间排序
-            timeline_events.sort(key=lambda e: e.timestamp)
 
             logger.debug(f"Generated timeline with {len(timeline_events)} events")
             return timeline_events
@@ -629,6 +769,32 @@ class EnhancedWorldMemory(WorldMemory):
             logger.error(f"Failed to generate timeline: {e}")
             return []
 
+    async def _ensure_timeline_index(self):
+        """首次使用时按创建时间顺序加载本会话的全部实体"""
+        if self.timeline_index.loaded:
+            return
+
+        entities = await self.structured_store.retrieve_entities_in_time_range(
+            self.session_id
+        )
+        self.timeline_index.load(entities)
+
+    def _index_timeline_entity(self, entity: MemoryEntity):
+        """实体写入后同步时间线索引（索引尚未加载时由加载过程覆盖）"""
+        if self.timeline_index.loaded and entity.session_id == self.session_id:
+            self.timeline_index.add(entity)
+
+    def _build_timeline_event(self, entity: MemoryEntity) -> TimelineEvent:
+        """由实体构建时间线事件"""
+        return TimelineEvent(
+            timestamp=entity.created_at,
+            entity_id=entity.id,
+            entity_type=entity.type,
+            content_summary=self._summarize_content(entity.content),
+            importance=self._calculate_entity_importance(entity),
+            metadata={"type": entity.type.value, "version": entity.version},
+        )
+
     async def get_relationship_network(
         self, entity_id: str, depth: int = 2
     ) -> RelationshipNetwork:
@@ -672,53 +838,62 @@ class EnhancedWorldMemory(WorldMemory):
     async def _bfs_relationship_search(
         self, start_entity_id: str, max_depth: int, network: RelationshipNetwork
     ):
-        """广度优先搜索关系"""
-        from collections import deque
-
-        visited = set()
-        queue = deque([(start_entity_id, 0)])  # (entity_id, depth)
-
-        while queue:
-            entity_id, current_depth = queue.popleft()
-
-            if entity_id in visited or current_depth > max_depth:
-                continue
+        """层同步广度优先搜索关系
 
-            visited.add(entity_id)
-
-            # 获取实体
-            entity = await self.retrieve_entity(entity_id)
-            if not entity:
-                continue
-
-            # 添加节点
-            network.nodes[entity_id] = {
-                "id": entity_id,
-                "type": entity.type.value,
-                "content_summary": self._summarize_content(entity.content),
-                "depth": current_depth,
-            }
+        遍历在关系图索引上进行，每层前沿节点通过一次批量检索加载。
+        """
+        await self._ensure_relation_graph()
+        seen_edges = set()
 
-            # 如果达到最大深度，停止探索
-            if current_depth >= max_depth:
-                continue
+        for depth, frontier in enumerate(
+            self.relation_graph.bfs_levels(start_entity_id, max_depth)
+        ):
+            entities = await self.retrieve_entities_batch(frontier)
+
+            for entity_id in frontier:
+                entity = entities.get(entity_id)
+                if not entity:
+                    continue
+
+                # 添加节点
+                network.nodes[entity_id] = {
+                    "id": entity_id,
+                    "type": entity.type.value,
+                    "content_summary": self._summarize_content(entity.content),
+                    "depth": depth,
+                }
 
-            # 获取相关实体
-            related_entities = await self.get_related_entities(entity_id)
+                # 如果达到最大深度，不再添加通往下一层的边
+                if depth >= max_depth:
+                    continue
 
-            for related_entity in related_entities:
-                # 添加边
-                edge = {
-                    "source": entity_id,
-                    "target": related_entity.id,
-                    "depth": current_depth,
-                    "metadata": {},
-                }
-                network.edges.append(edge)
+                for relation in self.relation_graph.relations_of(entity_id):
+                    key = (
+                        relation.source_id,
+                        relation.target_id,
+                        relation.relation_type,
+                    )
+                    if key in seen_edges:
+                        continue
+                    seen_edges.add(key)
+                    network.edges.append(
+                        {
+                            "source": relation.source_id,
+                            "target": relation.target_id,
+                            "depth": depth,
+                            "metadata": {
+                                "relation_type": relation.relation_type.value,
+                                "strength": relation.strength,
+                            },
+                        }
+                    )
 
-                # 添加到队列
-                if related_entity.id not in visited:
-                    queue.append((related_entity.id, current_depth + 1))
+        # 丢弃指向无法加载实体的边
+        network.edges = [
+            edge
+            for edge in network.edges
+            if edge["source"] in network.nodes and edge["target"] in network.nodes
+        ]
 
     async def generate_enhanced_summary(
         self,
@@ -754,58 +929,143 @@ class EnhancedWorldMemory(WorldMemory):
             logger.error(f"Failed to generate enhanced summary: {e}")
             return None
 
+    async def check_entity_consistency(
+        self, entity: MemoryEntity
+    ) -> List[ConsistencyIssue]:
+        """检查实体与已写入实体之间的近似重复和矛盾（适合每轮调用）
+
+        Args:
+            entity: 新写入或更新的实体
+
+        Returns:
+            发现的一致性问题
+        """
+        if not self.consistency_checker:
+            return []
+        await self._ensure_consistency_index()
+        return await self.consistency_checker.check_entity(entity)
+
+    async def _ensure_consistency_index(self):
+        """首次检查时加载本会话的全部实体到近似重复索引"""
+        if self.consistency_checker.loaded:
+            return
+
+        entities = await self.structured_store.retrieve_entities_in_time_range(
+            self.session_id
+        )
+        self.consistency_checker.load(entities)
+
+    def _index_consistency_entity(self, entity: MemoryEntity):
+        """实体写入后同步近似重复索引（索引尚未加载时由加载过程覆盖）"""
+        if (
+            self.consistency_checker
+            and self.consistency_checker.loaded
+            and entity.session_id == self.session_id
+        ):
+            self.consistency_checker.index_entity(entity)
+
     async def search_hybrid(
         self,
         query: str,
         keyword_filters: Optional[Dict[str, Any]] = None,
         semantic_limit: int = 5,
         keyword_limit: int = 5,
+        limit: Optional[int] = None,
+        timeout_ms: Optional[float] = None,
     ) -> List[MemoryEntity]:
         """混合搜索（语义+关键词）
 
+        两路检索并发执行，按倒数排名融合（或加权分数融合），
+        叠加新近度和重要性加成，在延迟预算内返回。
+
         Args:
             query: 查询文本
-            keyword_filters: 关键词过滤条件
-            semantic_limit: 语义搜索结果数量
-            keyword_limit: 关键词搜索结果数量
+            keyword_filters: 过滤条件（entity_types、time_range或元数据键值）
+            semantic_limit: 语义搜索候选数量
+            keyword_limit: 关键词搜索候选数量
+            limit: 返回数量，默认为两路候选数量之和
+            timeout_ms: 延迟预算（毫秒），默认使用检索器配置
 
         Returns:
-            搜索结果实体列表
+            按融合分数排序的实体列表，分数写入 metadata["hybrid_score"]
         """
         try:
-            results = []
+            sources = {}
 
-            # 语义搜索
-            if self.config.enable_semantic_search and self.config.vector_store_enabled:
-                semantic_results = await self.semantic_search(
-                    query, limit=semantic_limit
-                )
-                results.extend(semantic_results)
-
-            # 关键词搜索
-            if keyword_filters:
-                keyword_query = MemoryQuery(
-                    session_id=self.session_id,
-                    keywords=[query] if query else None,
-                    **keyword_filters,
-                )
-                keyword_results = await self.query_entities(keyword_query)
-                results.extend(keyword_results[:keyword_limit])
+            if (
+                self.config.enable_semantic_search
+                and self.config.vector_store_enabled
+                and self.vector_store
+            ):
+
+                async def semantic(text: str, _: int):
+                    entities = await self.semantic_search(text, limit=semantic_limit)
+                    return [
+                        (entity, entity.metadata.get("similarity_score", 0.0))
+                        for entity in entities
+                        if self._match_keyword_filters(entity, keyword_filters)
+                    ]
 
-            # 去重
-            unique_results = []
-            seen_ids = set()
-            for entity in results:
-                if entity.id not in seen_ids:
-                    seen_ids.add(entity.id)
-                    unique_results.append(entity)
+                sources["semantic"] = semantic
 
-            return unique_results
+            if self.structured_store and hasattr(
+                self.structured_store, "search_entities_ranked"
+            ):
+
+                async def keyword(text: str, _: int):
+                    hits = await self.structured_store.search_entities_ranked(
+                        text, self.session_id, keyword_limit
+                    )
+                    return [
+                        (entity, score)
+                        for entity, score in hits
+                        if self._match_keyword_filters(entity, keyword_filters)
+                    ]
+
+                sources["keyword"] = keyword
+
+            results = await self.hybrid_retriever.search(
+                query,
+                sources,
+                limit=limit or (semantic_limit + keyword_limit),
+                importance_fn=self._calculate_entity_importance,
+                timeout_ms=timeout_ms,
+            )
+
+            entities = []
+            for entity, score in results:
+                if not entity.metadata:
+                    entity.metadata = {}
+                entity.metadata["hybrid_score"] = score
+                entities.append(entity)
+            return entities
 
         except Exception as e:
             logger.error(f"Hybrid search failed: {e}")
             return []
 
+    @staticmethod
+    def _match_keyword_filters(
+        entity: MemoryEntity, filters: Optional[Dict[str, Any]]
+    ) -> bool:
+        """检查实体是否满足混合搜索的过滤条件"""
+        if not filters:
+            return True
+
+        for key, value in filters.items():
+            if key == "entity_types":
+                if value and entity.type not in value:
+                    return False
+            elif key == "time_range":
+                start, end = value or (None, None)
+                if start and entity.created_at < start:
+                    return False
+                if end and entity.created_at > end:
+                    return False
+            elif (entity.metadata or {}).get(key) != value:
+                return False
+        return True
+
     async def sync_vector_store(self):
         """同步向量存储"""
         if not self.config.vector_store_enabled or not self.vector_store:
@@ -838,94 +1098,41 @@ class EnhancedWorldMemory(WorldMemory):
 
     def _cache_entity(self, entity: MemoryEntity):
         """缓存实体"""
-        cache_key = f"entity:{entity.id}"
-        self.entity_cache[cache_key] = (entity, datetime.now())
-
-        # 清理过期缓存
-        self._cleanup_cache()
+        self.entity_cache.set(entity.id, entity)
 
     def _get_cached_entity(self, entity_id: str) -> Optional[MemoryEntity]:
         """获取缓存的实体"""
-        cache_key = f"entity:{entity_id}"
-        if cache_key in self.entity_cache:
-            entity, timestamp = self.entity_cache[cache_key]
-            if datetime.now() - timestamp < timedelta(
-                seconds=self.config.cache_ttl_seconds
-            ):
-                return entity
-            else:
-                del self.entity_cache[cache_key]
-        return None
+        return self.entity_cache.get(entity_id)
 
     def _remove_cached_entity(self, entity_id: str):
         """移除缓存的实体"""
-        cache_key = f"entity:{entity_id}"
-        if cache_key in self.entity_cache:
-            del self.entity_cache[cache_key]
+        self.entity_cache.pop(entity_id)
 
-    def _generate_query_cache_key(self, query: MemoryQuery) -> str:
+    def _generate_query_cache_key(self, query: MemoryQuery) -> Tuple:
         """生成查询缓存键"""
-        import hashlib
-
-        query_dict = {
-            "session_id": query.session_id,
-            "entity_types": (
-                [t.value for t in query.entity_types] if query.entity_types else []
-            ),
-            "keywords": query.keywords or [],
-            "time_range": query.time_range,
-            "limit": query.limit,
-            "offset": query.offset,
-        }
-        query_str = json.dumps(query_dict, sort_keys=True, default=str)
-        return hashlib.md5(query_str.encode()).hexdigest()
+        return (
+            query.session_id,
+            tuple(t.value for t in query.entity_types or ()),
+            tuple(query.keywords or ()),
+            tuple(query.time_range) if query.time_range else None,
+            query.limit,
+            query.offset,
+        )
 
-    def _cache_query(self, cache_key: str, entities: List[MemoryEntity]):
+    def _cache_query(self, cache_key: Tuple, entities: List[MemoryEntity]):
         """缓存查询结果"""
-        self.query_cache[cache_key] = (entities, datetime.now())
+        self.query_cache.set(cache_key, entities)
 
-        # 清理过期缓存
-        self._cleanup_cache()
-
-    def _get_cached_query(self, cache_key: str) -> Optional[List[MemoryEntity]]:
+    def _get_cached_query(self, cache_key: Tuple) -> Optional[List[MemoryEntity]]:
         """获取缓存的查询结果"""
-        if cache_key in self.query_cache:
-            entities, timestamp = self.query_cache[cache_key]
-            if datetime.now() - timestamp < timedelta(
-                seconds=self.config.cache_ttl_seconds
-            ):
-                return entities
-            else:
-                del self.query_cache[cache_key]
-        return None
-
-    def _cleanup_cache(self):
-        """清理过期缓存"""
-        now = datetime.now()
-        ttl = timedelta(seconds=self.config.cache_ttl_seconds)
-
-        # 清理实体缓存
-        expired_entities = [
-            key
-            for key, (_, timestamp) in self.entity_cache.items()
-            if now - timestamp > ttl
-        ]
-        for key in expired_entities:
-            del self.entity_cache[key]
-
-        # 清理查询缓存
-        expired_queries = [
-            key
-            for key, (_, timestamp) in self.query_cache.items()
-            if now - timestamp > ttl
-        ]
-        for key in expired_queries:
-            del self.query_cache[key]
+        return self.query_cache.get(cache_key)
 
-        if expired_entities or expired_queries:
-            logger.debug(
-                f"Cleaned up {len(expired_entities)} entity caches and {len(expired_queries)} query caches"
-            )
+    def get_memory_cache_stats(self) -> Dict[str, Any]:
+        """获取实体缓存和查询缓存统计"""
+        return {
+            "entity_cache": self.entity_cache.get_stats(),
+            "query_cache": self.query_cache.get_stats(),
+        }
 
     def _calculate_entity_importance(self, entity: MemoryEntity) -> float:
         """计算实体重要性（简化）"""
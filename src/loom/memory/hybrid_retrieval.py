@@ -0,0 +1,250 @@
+"""
+混合检索 (Hybrid Retrieval)
+
+并发执行多路检索（向量语义检索、BM25关键词检索等），按排名融合结果：
+1. 倒数排名融合（RRF）：score = Σ weight / (k + rank)
+2. 加权分数融合：各路分数min-max归一化后加权求和
+3. 融合后叠加时间新近度和重要性加成
+4. 整体受延迟预算约束，超时的检索路径被取消，仅使用已完成的结果
+"""
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from ..utils.logging_config import get_logger
+from .world_memory import MemoryEntity
+
+logger = get_logger(__name__)
+
+# 一路检索：输入(query, limit)，返回按相关度降序的 [(实体, 分数), ...]
+SearchSource = Callable[[str, int], Awaitable[List[Tuple[MemoryEntity, float]]]]
+
+
+@dataclass
+class HybridSearchConfig:
+    """混合检索配置"""
+
+    fusion: str = "rrf"  # rrf, weighted
+    rrf_k: int = 60
+    source_weights: Dict[str, float] = field(
+        default_factory=lambda: {"semantic": 1.0, "keyword": 1.0}
+    )
+
+    # 加成配置
+    recency_weight: float = 0.1
+    recency_half_life_hours: float = 24.0
+    importance_weight: float = 0.1
+    context_boost: float = 1.5  # 上下文实体的分数倍数
+
+    # 性能配置
+    candidate_multiplier: int = 2  # 每路检索取 limit * multiplier 个候选
+    timeout_ms: Optional[float] = 500.0  # 延迟预算，None表示不限制
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, Sequence[str]],
+    weights: Optional[Dict[str, float]] = None,
+    k: int = 60,
+) -> Dict[str, float]:
+    """倒数排名融合
+
+    Args:
+        rankings: {来源: 按相关度降序的ID列表}
+        weights: {来源: 权重}，缺省为1.0
+        k: 平滑常数，越大越削弱头部排名的优势
+
+    Returns:
+        {ID: 融合分数}
+    """
+    weights = weights or {}
+    fused: Dict[str, float] = {}
+    for source, ids in rankings.items():
+        weight = weights.get(source, 1.0)
+        for rank, entity_id in enumerate(ids, start=1):
+            fused[entity_id] = fused.get(entity_id, 0.0) + weight / (k + rank)
+    return fused
+
+
+def weighted_score_fusion(
+    scores: Dict[str, Dict[str, float]],
+    weights: Optional[Dict[str, float]] = None,
+) -> Dict[str, float]:
+    """加权分数融合（各路分数先min-max归一化）
+
+    Args:
+        scores: {来源: {ID: 原始分数}}
+        weights: {来源: 权重}，缺省为1.0
+
+    Returns:
+        {ID: 融合分数}
+    """
+    weights = weights or {}
+    fused: Dict[str, float] = {}
+    for source, source_scores in scores.items():
+        if not source_scores:
+            continue
+        weight = weights.get(source, 1.0)
+        low, high = min(source_scores.values()), max(source_scores.values())
+        span = high - low
+        for entity_id, score in source_scores.items():
+            normalized = (score - low) / span if span > 0 else 1.0
+            fused[entity_id] = fused.get(entity_id, 0.0) + weight * normalized
+    return fused
+
+
+class HybridRetriever:
+    """混合检索器
+
+    各路检索并发执行，在延迟预算内完成的结果参与融合。
+    """
+
+    def __init__(self, config: Optional[HybridSearchConfig] = None):
+        self.config = config or HybridSearchConfig()
+        self.stats = {"searches": 0, "timeouts": 0, "source_errors": 0}
+
+    async def search(
+        self,
+        query: str,
+        sources: Dict[str, SearchSource],
+        limit: int = 10,
+        context_entity_ids: Optional[Iterable[str]] = None,
+        importance_fn: Optional[Callable[[MemoryEntity], float]] = None,
+        timeout_ms: Optional[float] = None,
+    ) -> List[Tuple[MemoryEntity, float]]:
+        """执行混合检索
+
+        Args:
+            query: 查询文本
+            sources: {来源名: 检索函数}
+            limit: 返回数量
+            context_entity_ids: 需要提升分数的上下文实体
+            importance_fn: 实体重要性函数（0-1）
+            timeout_ms: 覆盖配置中的延迟预算
+
+        Returns:
+            [(实体, 最终分数), ...]，按分数降序
+        """
+        self.stats["searches"] += 1
+        if not sources or limit <= 0:
+            return []
+
+        budget = timeout_ms if timeout_ms is not None else self.config.timeout_ms
+        candidate_limit = limit * max(1, self.config.candidate_multiplier)
+        started = time.perf_counter()
+
+        tasks = {
+            asyncio.ensure_future(source(query, candidate_limit)): name
+            for name, source in sources.items()
+        }
+        done, pending = await asyncio.wait(
+            tasks.keys(), timeout=budget / 1000.0 if budget else None
+        )
+
+        for task in pending:
+            task.cancel()
+            self.stats["timeouts"] += 1
+            logger.warning(
+                f"Hybrid search source '{tasks[task]}' exceeded {budget}ms budget"
+            )
+
+        results: Dict[str, List[Tuple[MemoryEntity, float]]] = {}
+        for task in done:
+            name = tasks[task]
+            try:
+                results[name] = task.result() or []
+            except Exception as e:
+                self.stats["source_errors"] += 1
+                logger.warning(f"Hybrid search source '{name}' failed: {e}")
+
+        ranked = self._fuse(results, context_entity_ids, importance_fn)
+
+        logger.debug(
+            f"Hybrid search fused {sum(len(r) for r in results.values())} hits from "
+            f"{len(results)}/{len(sources)} sources in "
+            f"{(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return ranked[:limit]
+
+    def _fuse(
+        self,
+        results: Dict[str, List[Tuple[MemoryEntity, float]]],
+        context_entity_ids: Optional[Iterable[str]],
+        importance_fn: Optional[Callable[[MemoryEntity], float]],
+    ) -> List[Tuple[MemoryEntity, float]]:
+        """融合各路结果并叠加加成"""
+        entities: Dict[str, MemoryEntity] = {}
+        for hits in results.values():
+            for entity, _ in hits:
+                entities.setdefault(entity.id, entity)
+
+        if not entities:
+            return []
+
+        weights = self.config.source_weights
+        if self.config.fusion == "weighted":
+            fused = weighted_score_fusion(
+                {
+                    name: {entity.id: score for entity, score in hits}
+                    for name, hits in results.items()
+                },
+                weights,
+            )
+            max_score = sum(weights.get(name, 1.0) for name in results)
+        else:
+            fused = reciprocal_rank_fusion(
+                {
+                    name: [entity.id for entity, _ in hits]
+                    for name, hits in results.items()
+                },
+                weights,
+                self.config.rrf_k,
+            )
+            max_score = sum(
+                weights.get(name, 1.0) / (self.config.rrf_k + 1) for name in results
+            )
+
+        context_ids = set(context_entity_ids or ())
+        now = datetime.now()
+        importance_weight = self.config.importance_weight if importance_fn else 0.0
+        relevance_share = max(0.0, 1.0 - self.config.recency_weight - importance_weight)
+
+        ranked = []
+        for entity_id, score in fused.items():
+            entity = entities[entity_id]
+            relevance = score / max_score if max_score > 0 else 0.0
+            final = relevance_share * relevance
+            final += self.config.recency_weight * self._recency(entity, now)
+            if importance_fn is not None:
+                final += importance_weight * importance_fn(entity)
+            if entity_id in context_ids:
+                final *= self.config.context_boost
+            ranked.append((entity, final))
+
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def _recency(self, entity: MemoryEntity, now: datetime) -> float:
+        """按半衰期计算新近度（0-1）"""
+        timestamp = entity.updated_at or entity.created_at
+        if timestamp is None or self.config.recency_half_life_hours <= 0:
+            return 0.0
+        age_hours = max(0.0, (now - timestamp).total_seconds() / 3600.0)
+        return math.pow(0.5, age_hours / self.config.recency_half_life_hours)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取检索统计"""
+        return dict(self.stats)
@@ -0,0 +1,300 @@
+"""
+批量重要性评分 (ImportanceScorer)
+
+摘要选择时对一批实体统一评分，替代逐个实体的Python循环：
+1. 静态特征（类型权重、内容复杂度、创建时间、版本、元数据重要性）
+   每个实体版本只提取一次并缓存，内容不变时不再重复解析
+2. 动态特征（年龄、关系度数、访问次数）在评分时按列组装
+3. 所有因素以特征矩阵向量化计算，一次得到整批的分数，
+   各选择策略（时间、重要性、混合）共享同一次评分结果
+4. 批量结果提供向量化的排序和阈值筛选
+
+numpy为可选依赖，在使用时导入；不可用时退化为逐行计算，结果一致。
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from ..utils.logging_config import get_logger
+from .world_memory import MemoryEntity, MemoryEntityType
+
+logger = get_logger(__name__)
+
+TYPE_IMPORTANCE = {
+    MemoryEntityType.CHARACTER: 0.8,
+    MemoryEntityType.EVENT: 0.7,
+    MemoryEntityType.FACT: 0.6,
+    MemoryEntityType.LOCATION: 0.5,
+    MemoryEntityType.PLOTLINE: 0.9,
+    MemoryEntityType.OBJECT: 0.4,
+    MemoryEntityType.CONCEPT: 0.5,
+    MemoryEntityType.STYLE: 0.3,
+}
+
+# 评分因素（列顺序），缺失的因素不参与平均
+FACTOR_NAMES = ("type", "content_complexity", "recency", "metadata", "activity")
+
+RECENCY_WINDOW_DAYS = 30.0  # 30天内线性衰减
+VERSION_SATURATION = 4.0  # 修订4次为满分
+DEGREE_SATURATION = 5.0  # 5条关系为满分
+ACCESS_SATURATION = 10.0  # 访问10次为满分
+
+_SECONDS_PER_DAY = 86400.0
+
+# (type, content_complexity, created_at时间戳, version, metadata重要性或nan, 元数据访问次数)
+_StaticFeatures = Tuple[float, float, float, int, float, int]
+
+
+def content_complexity(content: Any) -> float:
+    """计算内容复杂度"""
+    if isinstance(content, str):
+        # 基于长度和多样性
+        length_score = min(len(content) / 500.0, 1.0)  # 500字符为满分
+        # 简单估算多样性（唯一词比例）
+        words = content.split()
+        unique_ratio = len(set(words)) / len(words) if words else 0.5
+        return (length_score + unique_ratio) / 2
+
+    if isinstance(content, dict):
+        # 基于键值对数量，10个键值对为满分
+        return min(len(content) / 10.0, 1.0)
+
+    if isinstance(content, list):
+        # 基于列表长度，5个元素为满分
+        return min(len(content) / 5.0, 1.0)
+
+    return 0.5
+
+
+@dataclass
+class ImportanceBatch:
+    """一批实体的评分结果"""
+
+    entity_ids: List[str]
+    scores: Any  # 形状 (n,) 的分数
+    factors: Any  # 形状 (n, len(FACTOR_NAMES)) 的因素矩阵，缺失为nan
+    age_days: Any  # 形状 (n,) 的年龄（天，向下取整）
+
+    def __len__(self) -> int:
+        return len(self.entity_ids)
+
+    def score_of(self, index: int) -> float:
+        return float(self.scores[index])
+
+    def factors_of(self, index: int) -> Dict[str, float]:
+        """第index个实体的因素字典（不含缺失因素）"""
+        return {
+            name: float(value)
+            for name, value in zip(FACTOR_NAMES, self.factors[index])
+            if not math.isnan(value)
+        }
+
+    def ranked(
+        self, threshold: Optional[float] = None, limit: Optional[int] = None
+    ) -> List[int]:
+        """按分数从高到低返回下标（同分保持原顺序）
+
+        Args:
+            threshold: 只保留分数不低于阈值的实体
+            limit: 最多返回数量
+        """
+        scores = self.scores
+        if hasattr(scores, "argsort"):
+            import numpy as np
+
+            order = np.argsort(-scores, kind="stable")
+            if threshold is not None:
+                order = order[scores[order] >= threshold]
+            indices = order.tolist()
+        else:
+            indices = sorted(range(len(scores)), key=lambda i: -scores[i])
+            if threshold is not None:
+                indices = [i for i in indices if scores[i] >= threshold]
+        return indices if limit is None else indices[:limit]
+
+    def as_dict(self) -> Dict[str, float]:
+        """实体ID -> 分数"""
+        return {
+            entity_id: float(score)
+            for entity_id, score in zip(self.entity_ids, self.scores)
+        }
+
+
+class ImportanceScorer:
+    """批量重要性评分器"""
+
+    def __init__(self, max_cache_entries: int = 10000):
+        """初始化评分器
+
+        Args:
+            max_cache_entries: 特征缓存的最大实体数，超过时整体清空
+        """
+        self.max_cache_entries = max(1, max_cache_entries)
+        # entity_id -> (version, 静态特征)
+        self._features: Dict[str, Tuple[int, _StaticFeatures]] = {}
+        self.stats = {"feature_hits": 0, "feature_builds": 0, "batches": 0}
+
+    def _static_features(self, entity: MemoryEntity) -> _StaticFeatures:
+        """提取（或从缓存获取）实体的静态特征"""
+        cached = self._features.get(entity.id)
+        if cached is not None and cached[0] == entity.version:
+            self.stats["feature_hits"] += 1
+            return cached[1]
+
+        metadata = entity.metadata or {}
+        metadata_importance = math.nan
+        if "importance" in metadata:
+            try:
+                metadata_importance = float(metadata["importance"])
+            except (TypeError, ValueError):
+                metadata_importance = 0.5
+        try:
+            access_count = int(metadata.get("access_count", 0) or 0)
+        except (TypeError, ValueError):
+            access_count = 0
+
+        features = (
+            TYPE_IMPORTANCE.get(entity.type, 0.5),
+            content_complexity(entity.content),
+            entity.created_at.timestamp(),
+            entity.version,
+            metadata_importance,
+            access_count,
+        )
+
+        if len(self._features) >= self.max_cache_entries:
+            self._features.clear()
+        self._features[entity.id] = (entity.version, features)
+        self.stats["feature_builds"] += 1
+        return features
+
+    def score_batch(
+        self,
+        entities: Sequence[MemoryEntity],
+        relation_degrees: Optional[Mapping[str, int]] = None,
+        access_counts: Optional[Mapping[str, int]] = None,
+        now: Optional[datetime] = None,
+    ) -> ImportanceBatch:
+        """对一批实体评分
+
+        Args:
+            entities: 实体列表
+            relation_degrees: 实体ID -> 关系度数
+            access_counts: 实体ID -> 访问次数（与元数据中的access_count相加）
+            now: 计算年龄的参考时间，默认当前时间
+
+        Returns:
+            评分结果，顺序与entities一致
+        """
+        now = now or datetime.now()
+        relation_degrees = relation_degrees or {}
+        access_counts = access_counts or {}
+
+        self.stats["batches"] += 1
+        static = [self._static_features(entity) for entity in entities]
+        degrees = [relation_degrees.get(entity.id, 0) for entity in entities]
+        accesses = [
+            features[5] + access_counts.get(entity.id, 0)
+            for entity, features in zip(entities, static)
+        ]
+
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            return self._score_python(entities, static, degrees, accesses, now)
+        return self._score_numpy(entities, static, degrees, accesses, now)
+
+    def _score_numpy(
+        self,
+        entities: Sequence[MemoryEntity],
+        static: List[_StaticFeatures],
+        degrees: List[int],
+        accesses: List[int],
+        now: datetime,
+    ) -> ImportanceBatch:
+        """向量化评分"""
+        import numpy as np
+
+        entity_ids = [entity.id for entity in entities]
+        if not entities:
+            empty = np.zeros(0, dtype=np.float64)
+            return ImportanceBatch(
+                entity_ids, empty, np.zeros((0, len(FACTOR_NAMES))), empty
+            )
+
+        columns = np.array(static, dtype=np.float64)
+        type_weight, complexity, created, version, metadata = columns[:, :5].T
+        degree = np.asarray(degrees, dtype=np.float64)
+        access = np.asarray(accesses, dtype=np.float64)
+
+        age_days = np.floor((now.timestamp() - created) / _SECONDS_PER_DAY)
+        recency = np.maximum(0.0, 1.0 - age_days / RECENCY_WINDOW_DAYS)
+
+        # 活跃度：修订次数、关系度数、访问次数，无任何信号时视为缺失
+        revisions = np.maximum(version - 1.0, 0.0)
+        activity = (
+            np.minimum(revisions / VERSION_SATURATION, 1.0)
+            + np.minimum(degree / DEGREE_SATURATION, 1.0)
+            + np.minimum(access / ACCESS_SATURATION, 1.0)
+        ) / 3.0
+        activity[(revisions == 0) & (degree <= 0) & (access <= 0)] = np.nan
+
+        factors = np.column_stack(
+            [type_weight, complexity, recency, metadata, activity]
+        )
+        present = ~np.isnan(factors)
+        scores = np.where(present, factors, 0.0).sum(axis=1) / present.sum(axis=1)
+
+        return ImportanceBatch(entity_ids, scores, factors, age_days)
+
+    def _score_python(
+        self,
+        entities: Sequence[MemoryEntity],
+        static: List[_StaticFeatures],
+        degrees: List[int],
+        accesses: List[int],
+        now: datetime,
+    ) -> ImportanceBatch:
+        """逐行评分（numpy不可用时）"""
+        now_ts = now.timestamp()
+        entity_ids, rows, scores, ages = [], [], [], []
+        for entity, features, degree, access in zip(
+            entities, static, degrees, accesses
+        ):
+            type_weight, complexity, created, version, metadata, _ = features
+            age_days = math.floor((now_ts - created) / _SECONDS_PER_DAY)
+            recency = max(0.0, 1.0 - age_days / RECENCY_WINDOW_DAYS)
+
+            revisions = max(version - 1, 0)
+            activity = math.nan
+            if revisions or degree > 0 or access > 0:
+                activity = (
+                    min(revisions / VERSION_SATURATION, 1.0)
+                    + min(degree / DEGREE_SATURATION, 1.0)
+                    + min(access / ACCESS_SATURATION, 1.0)
+                ) / 3.0
+
+            row = (type_weight, complexity, recency, metadata, activity)
+            present = [value for value in row if not math.isnan(value)]
+            entity_ids.append(entity.id)
+            rows.append(row)
+            scores.append(sum(present) / len(present))
+            ages.append(age_days)
+
+        return ImportanceBatch(entity_ids, scores, rows, ages)
+
+    def invalidate(self, entity_id: Optional[str] = None):
+        """清除缓存（默认全部）"""
+        if entity_id is None:
+            self._features.clear()
+        else:
+            self._features.pop(entity_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {
+            **self.stats,
+            "cached_features": len(self._features),
+        }
@@ -2,6 +2,12 @@
 记忆一致性检查器 (MemoryConsistencyChecker)
 
 检查记忆冲突、时间线一致性、实体关系一致性，确保世界记忆的逻辑连贯性。
+
+近似重复和矛盾候选通过 MinHash + LSH 索引查找，索引随实体写入增量维护，
+单个实体的检查（check_entity）只比较同桶候选，可在每轮交互中运行。
+配置实体来源后索引只保存ID和签名，候选实体按需加载；
+批量检查（check_consistency）使用临时索引，不改动增量索引。
+同一参与者的事件时间重叠通过区间扫描（批量）和区间索引（增量）检测。
 """
 
 import hashlib
@@ -9,10 +15,17 @@ import json
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from ..utils.logging_config import get_logger
 from .interfaces import ConsistencyError
+from .minhash_lsh import MinHashLSHIndex
+from .temporal_intervals import (
+    TemporalInterval,
+    TemporalIntervalIndex,
+    find_overlapping_pairs,
+    interval_from_entity,
+)
 from .world_memory import (
     MemoryEntity,
     MemoryEntityType,
@@ -22,6 +35,9 @@ from .world_memory import (
 
 logger = get_logger(__name__)
 
+# 标识同一对象的字段：取值相同的实体才可能互相矛盾
+IDENTITY_FIELDS = frozenset({"name", "title", "character_id", "entity_name"})
+
 
 class ConsistencyIssueType(Enum):
     """一致性问题类型"""
@@ -76,6 +92,102 @@ class MemoryConsistencyChecker:
         self.config = config or {}
         self.issues_history: Dict[str, ConsistencyIssue] = {}
 
+        # 近似重复 / 矛盾候选索引
+        self.near_duplicate_threshold = self.config.get("near_duplicate_threshold", 0.8)
+        self.contradiction_threshold = self.config.get("contradiction_threshold", 0.5)
+        self.lsh_index = self._new_lsh_index()
+        # 未配置实体来源时保存已索引实体本身，供候选比较使用
+        self._indexed_entities: Dict[str, MemoryEntity] = {}
+        # 实体来源（需实现 retrieve_entities_batch(entity_ids)，如EnhancedWorldMemory）
+        self.entity_source = None
+        self.loaded = False
+
+        # 事件时间区间索引（按参与者）
+        self.default_event_duration = timedelta(
+            hours=self.config.get("default_event_duration_hours", 1)
+        )
+        self.temporal_index = TemporalIntervalIndex()
+
+    def _new_lsh_index(self) -> MinHashLSHIndex:
+        return MinHashLSHIndex(
+            num_perm=self.config.get("lsh_num_perm", 64),
+            bands=self.config.get("lsh_bands", 16),
+        )
+
+    def load(self, entities: Iterable[MemoryEntity]):
+        """用完整的实体集合重建增量索引"""
+        self.lsh_index.clear()
+        self._indexed_entities.clear()
+        self.temporal_index = TemporalIntervalIndex()
+        count = 0
+        for entity in entities:
+            self.index_entity(entity)
+            count += 1
+        self.loaded = True
+        logger.debug(f"Consistency index loaded {count} entities")
+
+    def index_entity(self, entity: MemoryEntity):
+        """实体写入或更新后加入近似重复索引"""
+        self.lsh_index.add(entity)
+        if self.entity_source is None:
+            self._indexed_entities[entity.id] = entity
+
+        interval = interval_from_entity(entity, self.default_event_duration)
+        if interval is not None:
+            self.temporal_index.add(interval)
+        else:
+            self.temporal_index.remove(entity.id)
+
+    def remove_entity(self, entity_id: str):
+        """实体删除后移出近似重复索引"""
+        self.lsh_index.remove(entity_id)
+        self._indexed_entities.pop(entity_id, None)
+        self.temporal_index.remove(entity_id)
+
+    async def check_entity(self, entity: MemoryEntity) -> List[ConsistencyIssue]:
+        """检查单个实体与已索引实体之间的近似重复、矛盾和时间重叠
+
+        只比较LSH同桶的候选和同一参与者的相邻区间，开销与世界规模基本无关。
+        """
+        self.index_entity(entity)
+        issues = []
+        threshold = min(self.near_duplicate_threshold, self.contradiction_threshold)
+        matches = self.lsh_index.query(entity.id, threshold)
+        others = await self._load_indexed([other_id for other_id, _ in matches])
+        for other_id, similarity in matches:
+            other = others.get(other_id)
+            if other is None:
+                continue
+            issue = self._classify_similar_pair(entity, other, similarity)
+            if issue is not None:
+                issues.append(issue)
+
+        interval = interval_from_entity(entity, self.default_event_duration)
+        if interval is not None:
+            for other, subject in self.temporal_index.overlapping(interval):
+                issues.append(self._overlap_issue(other, interval, subject))
+
+        for issue in issues:
+            self.issues_history[issue.issue_id] = issue
+        return issues
+
+    async def _load_indexed(
+        self, entity_ids: List[str]
+    ) -> Dict[str, Optional[MemoryEntity]]:
+        """获取已索引的候选实体（配置了实体来源时批量加载）"""
+        if not entity_ids:
+            return {}
+        if self.entity_source is None:
+            return {
+                entity_id: self._indexed_entities.get(entity_id)
+                for entity_id in entity_ids
+            }
+        try:
+            return await self.entity_source.retrieve_entities_batch(entity_ids)
+        except Exception as e:
+            logger.warning(f"Failed to load consistency candidates: {e}")
+            return {}
+
     async def check_consistency(
         self, entities: List[MemoryEntity], relations: List[MemoryRelation] = None
     ) -> ConsistencyCheckResult:
@@ -93,6 +205,9 @@ class MemoryConsistencyChecker:
             # 检查重复实体
             issues.extend(await self._check_duplicates(entities))
 
+            # 检查近似重复和矛盾候选
+            issues.extend(await self._check_near_duplicates(entities))
+
             # 检查时间冲突
             issues.extend(await self._check_temporal_conflicts(entities))
 
@@ -172,6 +287,116 @@ class MemoryConsistencyChecker:
 
         return issues
 
+    async def _check_near_duplicates(
+        self, entities: List[MemoryEntity]
+    ) -> List[ConsistencyIssue]:
+        """通过LSH候选对检查近似重复和矛盾（内容完全相同的由_check_duplicates处理）
+
+        使用临时索引，检查结束后不保留实体。
+        """
+        lsh_index = self._new_lsh_index()
+        for entity in entities:
+            lsh_index.add(entity)
+
+        by_id = {entity.id: entity for entity in entities}
+        threshold = min(self.near_duplicate_threshold, self.contradiction_threshold)
+        issues = []
+        for first_id, second_id, similarity in lsh_index.candidate_pairs(
+            by_id, threshold
+        ):
+            issue = self._classify_similar_pair(
+                by_id[first_id], by_id[second_id], similarity
+            )
+            if issue is not None:
+                issues.append(issue)
+        return issues
+
+    def _classify_similar_pair(
+        self, first: MemoryEntity, second: MemoryEntity, similarity: float
+    ) -> Optional[ConsistencyIssue]:
+        """判断相似实体对是矛盾、近似重复，还是无问题"""
+        if first.type != second.type:
+            return None
+        if self._hash_entity_content(first) == self._hash_entity_content(second):
+            return None
+
+        first, second = sorted((first, second), key=lambda e: e.id)
+        agreeing, conflicting = self._compare_fields(first.content, second.content)
+
+        # 标识字段一致但状态字段不同：矛盾候选
+        if (
+            agreeing & IDENTITY_FIELDS
+            and conflicting
+            and similarity >= self.contradiction_threshold
+        ):
+            return ConsistencyIssue(
+                issue_id=f"contradiction_{first.id}_{second.id}",
+                issue_type=ConsistencyIssueType.FACT_CONTRADICTION,
+                severity=ConsistencySeverity.MEDIUM,
+                description=(
+                    f"实体 {first.id} 和 {second.id} 描述同一对象但字段冲突: "
+                    f"{', '.join(sorted(conflicting))}"
+                ),
+                affected_entities=[first.id, second.id],
+                conflicting_data={
+                    "similarity": similarity,
+                    "agreeing_fields": sorted(agreeing),
+                    "conflicting_fields": {
+                        key: [first.content[key], second.content[key]]
+                        for key in sorted(conflicting)
+                    },
+                },
+                detected_at=datetime.now(),
+                suggested_fixes=[
+                    {
+                        "action": "keep_latest",
+                        "description": "保留较新的字段值",
+                        "parameters": {"fields": sorted(conflicting)},
+                    }
+                ],
+            )
+
+        if similarity >= self.near_duplicate_threshold:
+            return ConsistencyIssue(
+                issue_id=f"near_duplicate_{first.id}_{second.id}",
+                issue_type=ConsistencyIssueType.ENTITY_DUPLICATE,
+                severity=ConsistencySeverity.LOW,
+                description=f"实体 {first.id} 和 {second.id} 内容高度相似",
+                affected_entities=[first.id, second.id],
+                conflicting_data={"similarity": similarity},
+                detected_at=datetime.now(),
+                suggested_fixes=[
+                    {
+                        "action": "merge",
+                        "description": "合并相似实体",
+                        "parameters": {"keep_older": True},
+                    }
+                ],
+            )
+        return None
+
+    @staticmethod
+    def _compare_fields(first: Any, second: Any) -> Tuple[set, set]:
+        """比较两个内容字典的简短标量字段
+
+        Returns:
+            (取值相同的字段, 取值不同的字段)
+        """
+        if not isinstance(first, dict) or not isinstance(second, dict):
+            return set(), set()
+
+        agreeing, conflicting = set(), set()
+        for key in first.keys() & second.keys():
+            values = (first[key], second[key])
+            # 长文本描述的差异不视为字段冲突
+            if not all(
+                isinstance(v, (str, int, float, bool)) and len(str(v)) <= 40
+                for v in values
+            ):
+                continue
+            (agreeing if values[0] == values[1] else conflicting).add(key)
+        return agreeing, conflicting
+
     def _hash_entity_content(self, entity: MemoryEntity) -> str:
         """哈希实体内容"""
         content_str = (
@@ -228,8 +453,61 @@ class MemoryConsistencyChecker:
                     )
                     issues.append(issue)
 
+        # 同一参与者的事件时间重叠（扫描线）
+        intervals = [
+            interval
+            for interval in (
+                interval_from_entity(entity, self.default_event_duration)
+                for entity in entities
+            )
+            if interval is not None
+        ]
+        for first, second, subject in find_overlapping_pairs(intervals):
+            issues.append(self._overlap_issue(first, second, subject))
+
         return issues
 
+    def _overlap_issue(
+        self, first: TemporalInterval, second: TemporalInterval, subject: str
+    ) -> ConsistencyIssue:
+        """同一参与者的两个事件时间重叠；地点不同时为高严重度"""
+        first, second = sorted((first, second), key=lambda i: i.entity_id)
+        elsewhere = bool(
+            first.location and second.location and first.location != second.location
+        )
+        description = f"{subject} 同时参与了事件 {first.entity_id} 和 {second.entity_id}"
+        if elsewhere:
+            description += f"（地点分别为 {first.location} 和 {second.location}）"
+
+        return ConsistencyIssue(
+            issue_id=f"overlap_{first.entity_id}_{second.entity_id}",
+            issue_type=ConsistencyIssueType.TEMPORAL_CONFLICT,
+            severity=(
+                ConsistencySeverity.HIGH if elsewhere else ConsistencySeverity.MEDIUM
+            ),
+            description=description,
+            affected_entities=[first.entity_id, second.entity_id],
+            conflicting_data={
+                "subject": subject,
+                "intervals": {
+                    interval.entity_id: [
+                        interval.start.isoformat(),
+                        interval.end.isoformat(),
+                    ]
+                    for interval in (first, second)
+                },
+                "locations": [first.location, second.location],
+            },
+            detected_at=datetime.now(),
+            suggested_fixes=[
+                {
+                    "action": "adjust_timing",
+                    "description": "调整事件时间使其不再重叠",
+                    "parameters": {"entity_id": second.entity_id},
+                }
+            ],
+        )
+
     async def _check_fact_contradictions(
         self, entities: List[MemoryEntity]
     ) -> List[ConsistencyIssue]:
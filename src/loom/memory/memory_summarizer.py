@@ -21,7 +21,10 @@ from typing import Any, Dict, List, Optional, Tuple
 from ..interpretation.llm_provider import LLMProvider, LLMResponse
 from ..utils.async_helpers import async_retry
 from ..utils.logging_config import get_logger
+from ..utils.ttl_cache import TTLCache
+from .importance_scorer import ImportanceBatch, ImportanceScorer
 from .interfaces import MemorySummarizer as BaseMemorySummarizer
+from .summary_hierarchy import SummaryHierarchy
 from .world_memory import MemoryEntity, MemoryEntityType
 
 logger = get_logger(__name__)
@@ -64,6 +67,12 @@ class SummaryConfig:
     llm_model: str = "gpt-3.5-turbo"
     temperature: float = 0.3
 
+    # 分层滚动摘要配置
+    enable_hierarchical: bool = False
+    leaf_window_size: int = 20  # 每个叶子窗口的实体数
+    hierarchy_fanout: int = 5  # 每个章节/篇章汇总的下层摘要数
+    hierarchy_levels: int = 3  # 叶子 -> 章节 -> 篇章
+
     def __post_init__(self):
         """后初始化处理，将字符串转换为枚举值"""
         # 如果summary_strategy是字符串，转换为SummaryStrategy枚举
@@ -113,6 +122,7 @@ class ImportanceScore:
     score: float
     factors: Dict[str, float]  # 评分因素
     explanation: Optional[str] = None
+    version: int = 1  # 评分对应的实体版本
 
 
 class MemorySummarizer(BaseMemorySummarizer):
@@ -140,13 +150,25 @@ class MemorySummarizer(BaseMemorySummarizer):
         self.llm_provider = llm_provider
         self.config = SummaryConfig(**config) if config else SummaryConfig()
 
-        # 摘要缓存
-        self.summary_cache: Dict[
-            str, Dict[str, Any]
-        ] = {}  # cache_key -> {summary, timestamp}
+        # 摘要缓存（TTL + LRU）
+        self.summary_cache = TTLCache(
+            max_entries=self.config.max_cache_size,
+            default_ttl=self.config.cache_ttl_hours * 3600,
+        )
 
-        # 重要性评分缓存
+        # 重要性评分缓存（按实体版本失效），特征提取和评分由批量评分器完成
         self.importance_cache: Dict[str, ImportanceScore] = {}
+        self.importance_scorer = ImportanceScorer()
+        # 关系度数来源（需实现 degree(entity_id)，如RelationGraph）
+        self.relation_graph = None
+
+        # 分层摘要树（按会话），summary_store提供节点持久化
+        # （需实现 save_summary_nodes / load_summary_nodes，如StructuredStore）
+        self.hierarchies: Dict[str, SummaryHierarchy] = {}
+        self.summary_store = None
+        # 实体来源（需实现 retrieve_entity(entity_id)，如EnhancedWorldMemory），
+        # 用于按ID加载历史实体
+        self.entity_source = None
 
         logger.info(
             f"MemorySummarizer initialized with strategy: {self.config.summary_strategy.value}"
@@ -282,6 +304,15 @@ class MemorySummarizer(BaseMemorySummarizer):
         Returns:
             更新后的摘要
         """
+        if self.config.enable_hierarchical:
+            summary = await self._update_hierarchy_from_previous(
+                new_entities, previous_summary
+            )
+            if summary:
+                summary.version = previous_summary.version + 1
+                summary.metadata["previous_summary_id"] = previous_summary.id
+                return summary
+
         if not self.config.enable_incremental:
             # 如果不支持增量，重新生成完整摘要
             all_entities = await self._get_entities_by_ids(
@@ -343,6 +374,153 @@ class MemorySummarizer(BaseMemorySummarizer):
             all_entities.extend(new_entities)
             return await self.generate_summary(all_entities)
 
+    async def _update_hierarchy_from_previous(
+        self, new_entities: List[MemoryEntity], previous_summary: EnhancedMemorySummary
+    ) -> Optional[EnhancedMemorySummary]:
+        """增量摘要的分层路径
+
+        摘要树为空时先用之前摘要覆盖的实体建树；
+        这些实体无法加载时返回None，由调用方走普通的增量路径，避免丢失历史内容。
+        """
+        hierarchy = await self.get_summary_hierarchy(previous_summary.session_id)
+        missing = [
+            entity_id
+            for entity_id in previous_summary.original_entities
+            if entity_id not in hierarchy
+        ]
+        if missing:
+            new_ids = {entity.id for entity in new_entities}
+            loaded = await self._get_entities_by_ids(
+                [entity_id for entity_id in missing if entity_id not in new_ids]
+            )
+            if len(hierarchy) == 0 and not loaded:
+                logger.debug(
+                    "Summary hierarchy is empty and previous entities are unavailable, "
+                    "using flat incremental summary"
+                )
+                return None
+            new_entities = loaded + list(new_entities)
+
+        return await self.update_hierarchical_summary(
+            new_entities, previous_summary.session_id
+        )
+
+    async def remove_entity(self, entity_id: str, session_id: Optional[str] = None):
+        """从摘要树中移除已删除的实体，下次更新时重算受影响的节点
+
+        Args:
+            entity_id: 实体ID
+            session_id: 实体所属会话；省略时只检查已加载的摘要树
+        """
+        if session_id and self.config.enable_hierarchical:
+            await self.get_summary_hierarchy(session_id)
+        for hierarchy in self.hierarchies.values():
+            hierarchy.remove_entity(entity_id)
+
+    async def get_summary_hierarchy(self, session_id: str) -> SummaryHierarchy:
+        """获取会话的分层摘要树，首次使用时从summary_store恢复"""
+        hierarchy = self.hierarchies.get(session_id)
+        if hierarchy is not None:
+            return hierarchy
+
+        hierarchy = SummaryHierarchy(
+            session_id,
+            leaf_size=self.config.leaf_window_size,
+            fanout=self.config.hierarchy_fanout,
+            levels=self.config.hierarchy_levels,
+        )
+        if self.summary_store is not None:
+            try:
+                hierarchy.load(await self.summary_store.load_summary_nodes(session_id))
+            except Exception as e:
+                logger.warning(f"Failed to load summary hierarchy: {e}")
+
+        self.hierarchies[session_id] = hierarchy
+        return hierarchy
+
+    async def update_hierarchical_summary(
+        self, new_entities: List[MemoryEntity], session_id: Optional[str] = None
+    ) -> Optional[EnhancedMemorySummary]:
+        """将新实体并入分层摘要树并返回会话整体摘要
+
+        只重算新实体所在的叶子窗口及其祖先节点，
+        每轮的摘要调用次数和输入长度都有上界。
+
+        Args:
+            new_entities: 新增或修改的实体
+            session_id: 会话ID（默认取第一个实体的会话）
+
+        Returns:
+            会话整体摘要
+        """
+        if not session_id:
+            if not new_entities:
+                return None
+            session_id = new_entities[0].session_id
+
+        try:
+            hierarchy = await self.get_summary_hierarchy(session_id)
+            for entity in sorted(new_entities, key=lambda e: e.created_at):
+                hierarchy.add_entity(
+                    entity.id,
+                    self._entity_to_text(entity),
+                    entity.created_at.isoformat(),
+                )
+
+            refreshed = await hierarchy.refresh(self._summarize_hierarchy_level)
+            if refreshed and self.summary_store is not None:
+                await self.summary_store.save_summary_nodes(
+                    hierarchy.to_records(refreshed)
+                )
+
+            return EnhancedMemorySummary(
+                id=f"summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                session_id=session_id,
+                summary_text=hierarchy.render(),
+                original_entities=hierarchy.entity_ids,
+                created_at=datetime.now(),
+                coverage_period=hierarchy.coverage_period(),
+                metadata={
+                    "hierarchical": True,
+                    "new_entities_count": len(new_entities),
+                    "refreshed_nodes": len(refreshed),
+                    "total_nodes": len(hierarchy),
+                    "generation_method": "llm" if self.llm_provider else "template",
+                },
+                summary_format=SummaryFormat.TEXT,
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to update hierarchical summary: {e}")
+            return None
+
+    async def _summarize_hierarchy_level(self, level: int, inputs: List[str]) -> str:
+        """生成摘要树中一个节点的摘要
+
+        叶子节点汇总实体文本，上层节点汇总下层摘要；
+        无LLM或LLM失败时按目标长度截断拼接（只在叶子层加列表符号）。
+        """
+        if level == 0:
+            joined = "\n".join(f"- {text}" for text in inputs)
+        else:
+            joined = "\n".join(inputs)
+        if self.llm_provider and inputs:
+            unit = "记忆片段" if level == 0 else "阶段摘要"
+            prompt = f"""请将以下按时间排列的{unit}汇总成一段连贯的叙事摘要，
+保留关键事件、角色和地点，长度不超过{self.config.target_summary_length}字。
+
+{joined}
+
+请生成摘要："""
+            try:
+                response = await self.llm_provider.generate(prompt)
+                return response.content.strip()
+            except Exception as e:
+                logger.warning(f"LLM hierarchy summary failed, using template: {e}")
+
+        limit = self.config.target_summary_length
+        return joined if len(joined) <= limit else joined[:limit] + "..."
+
     async def optimize_summary(
         self, summary: EnhancedMemorySummary, target_length: Optional[int] = None
     ) -> EnhancedMemorySummary:
@@ -410,111 +588,46 @@ class MemorySummarizer(BaseMemorySummarizer):
         Returns:
             重要性评分
         """
-        # 检查缓存
-        if entity.id in self.importance_cache:
-            return self.importance_cache[entity.id]
-
-        # 计算重要性分数
-        factors = self._calculate_importance_factors(entity)
-        total_score = sum(factors.values()) / len(factors) if factors else 0.5
+        scores = await self._calculate_importance_scores([entity])
+        return scores[0]
 
-        # 如果有LLM，可以获取解释
-        explanation = None
-        if self.llm_provider:
-            try:
-                prompt = f"""请分析以下记忆实体的重要性：
-
-                实体类型：{entity.type.value}
-                内容：{json.dumps(entity.content, ensure_ascii=False)[:200]}
-
-                请简要解释这个实体的重要性："""
-
-                response = await self.llm_provider.generate(prompt)
-                explanation = response.content.strip()
-            except:
-                pass
-
-        score = ImportanceScore(
-            entity_id=entity.id,
-            score=total_score,
-            factors=factors,
-            explanation=explanation,
+    def score_entities(self, entities: List[MemoryEntity]) -> ImportanceBatch:
+        """批量计算实体重要性（向量化，不含LLM解释）"""
+        return self.importance_scorer.score_batch(
+            entities, relation_degrees=self._relation_degrees(entities)
         )
 
-        # 缓存结果
-        self.importance_cache[entity.id] = score
-
-        return score
-
-    def _calculate_importance_factors(self, entity: MemoryEntity) -> Dict[str, float]:
-        """计算重要性因素"""
-        factors = {}
-
-        # 1. 类型重要性
-        type_importance = {
-            MemoryEntityType.CHARACTER: 0.8,
-            MemoryEntityType.EVENT: 0.7,
-            MemoryEntityType.FACT: 0.6,
-            MemoryEntityType.LOCATION: 0.5,
-            MemoryEntityType.PLOTLINE: 0.9,
-            MemoryEntityType.OBJECT: 0.4,
-            MemoryEntityType.CONCEPT: 0.5,
-            MemoryEntityType.STYLE: 0.3,
-        }
-        factors["type"] = type_importance.get(entity.type, 0.5)
-
-        # 2. 内容丰富度
-        content_complexity = self._calculate_content_complexity(entity.content)
-        factors["content_complexity"] = content_complexity
-
-        # 3. 时间新鲜度（越新越重要）
-        if hasattr(entity, "created_at"):
-            age_days = (datetime.now() - entity.created_at).days
-            recency = max(0, 1.0 - (age_days / 30.0))  # 30天内线性衰减
-            factors["recency"] = recency
+    def _relation_degrees(self, entities: List[MemoryEntity]) -> Dict[str, int]:
+        """从关系图获取实体的关系度数"""
+        graph = self.relation_graph
+        if graph is None or not getattr(graph, "loaded", True):
+            return {}
+        return {entity.id: graph.degree(entity.id) for entity in entities}
 
-        # 4. 元数据重要性
-        if entity.metadata and "importance" in entity.metadata:
-            try:
-                metadata_importance = float(entity.metadata["importance"])
-                factors["metadata"] = metadata_importance
-            except:
-                factors["metadata"] = 0.5
-
-        return factors
-
-    def _calculate_content_complexity(self, content: Any) -> float:
-        """计算内容复杂度"""
-        if isinstance(content, str):
-            # 基于长度和多样性
-            length_score = min(len(content) / 500.0, 1.0)  # 500字符为满分
-            # 简单估算多样性（唯一词比例）
-            words = content.split()
-            if words:
-                unique_ratio = len(set(words)) / len(words)
-            else:
-                unique_ratio = 0.5
-            return (length_score + unique_ratio) / 2
+    async def _explain_importance(self, entity: MemoryEntity) -> Optional[str]:
+        """使用LLM解释实体的重要性"""
+        if not self.llm_provider:
+            return None
+        try:
+            prompt = f"""请分析以下记忆实体的重要性：
 
-        elif isinstance(content, dict):
-            # 基于键值对数量
-            size = len(content)
-            complexity = min(size / 10.0, 1.0)  # 10个键值对为满分
-            return complexity
+            实体类型：{entity.type.value}
+            内容：{json.dumps(entity.content, ensure_ascii=False)[:200]}
 
-        elif isinstance(content, list):
-            # 基于列表长度
-            length = len(content)
-            complexity = min(length / 5.0, 1.0)  # 5个元素为满分
-            return complexity
+            请简要解释这个实体的重要性："""
 
-        else:
-            return 0.5
+            response = await self.llm_provider.generate(prompt)
+            return response.content.strip()
+        except:
+            return None
 
     def _select_entities_for_summary(
         self, entities: List[MemoryEntity]
     ) -> List[MemoryEntity]:
-        """选择要摘要的实体"""
+        """选择要摘要的实体
+
+        重要性相关的策略对整批实体只评分一次。
+        """
         if self.config.summary_strategy == SummaryStrategy.TIME_BASED:
             return self._select_entities_time_based(entities)
         elif self.config.summary_strategy == SummaryStrategy.IMPORTANCE_BASED:
@@ -541,30 +654,13 @@ class MemorySummarizer(BaseMemorySummarizer):
     def _select_entities_importance_based(
         self, entities: List[MemoryEntity]
     ) -> List[MemoryEntity]:
-        """基于重要性选择实体"""
-        # 计算所有实体的重要性
-        scored_entities = []
-        for entity in entities:
-            # 这里简化处理，实际应该调用calculate_entity_importance
-            importance = self._calculate_importance_factors(entity)
-            avg_score = (
-                sum(importance.values()) / len(importance) if importance else 0.5
-            )
-            scored_entities.append((entity, avg_score))
-
-        # 按重要性排序
-        scored_entities.sort(key=lambda x: x[1], reverse=True)
-
-        # 选择重要性高于阈值的实体
-        selected = []
-        for entity, score in scored_entities:
-            if (
-                score >= self.config.importance_threshold
-                and len(selected) < self.config.max_entities_per_summary
-            ):
-                selected.append(entity)
-
-        return selected
+        """基于重要性选择实体（重要性高于阈值，按分数从高到低）"""
+        batch = self.score_entities(entities)
+        indices = batch.ranked(
+            threshold=self.config.importance_threshold,
+            limit=self.config.max_entities_per_summary,
+        )
+        return [entities[i] for i in indices]
 
     def _select_entities_relevance_based(
         self, entities: List[MemoryEntity]
@@ -629,48 +725,43 @@ class MemorySummarizer(BaseMemorySummarizer):
         if not self.config.enable_cache:
             return None
 
-        if cache_key in self.summary_cache:
-            cache_entry = self.summary_cache[cache_key]
-            cache_age = datetime.now() - cache_entry["timestamp"]
-
-            # 检查缓存是否过期
-            if cache_age < timedelta(hours=self.config.cache_ttl_hours):
-                logger.debug(f"Using cached summary for key: {cache_key[:8]}...")
-                return cache_entry["summary"]
-            else:
-                # 缓存过期，删除
-                del self.summary_cache[cache_key]
-
-        return None
+        summary = self.summary_cache.get(cache_key)
+        if summary is not None:
+            logger.debug(f"Using cached summary for key: {cache_key[:8]}...")
+        return summary
 
     def _cache_summary(self, cache_key: str, summary: EnhancedMemorySummary):
         """缓存摘要"""
         if not self.config.enable_cache:
             return
 
-        self.summary_cache[cache_key] = {
-            "summary": summary,
-            "timestamp": datetime.now(),
-        }
-
-        # 限制缓存大小
-        if len(self.summary_cache) > self.config.max_cache_size:
-            # 删除最旧的缓存
-            oldest_key = min(
-                self.summary_cache.keys(),
-                key=lambda k: self.summary_cache[k]["timestamp"],
-            )
-            del self.summary_cache[oldest_key]
-
+        self.summary_cache.set(cache_key, summary)
         logger.debug(f"Cached summary for key: {cache_key[:8]}...")
 
     async def _calculate_importance_scores(
         self, entities: List[MemoryEntity]
     ) -> List[ImportanceScore]:
-        """计算重要性评分列表"""
+        """计算重要性评分列表
+
+        分数整批向量化计算；LLM解释按实体版本缓存，版本不变时复用。
+        """
+        batch = self.score_entities(entities)
         scores = []
-        for entity in entities:
-            score = await self.calculate_entity_importance(entity)
+        for i, entity in enumerate(entities):
+            cached = self.importance_cache.get(entity.id)
+            if cached is not None and cached.version == entity.version:
+                explanation = cached.explanation
+            else:
+                explanation = await self._explain_importance(entity)
+
+            score = ImportanceScore(
+                entity_id=entity.id,
+                score=batch.score_of(i),
+                factors=batch.factors_of(i),
+                explanation=explanation,
+                version=entity.version,
+            )
+            self.importance_cache[entity.id] = score
             scores.append(score)
         return scores
 
@@ -684,6 +775,7 @@ class MemorySummarizer(BaseMemorySummarizer):
         # 按时间排序
         sorted_entities = sorted(entities, key=lambda e: e.created_at)
 
+        scores_by_id = {score.entity_id: score for score in importance_scores}
         input_parts = []
 
         # 添加上下文
@@ -697,9 +789,7 @@ class MemorySummarizer(BaseMemorySummarizer):
 
         for i, entity in enumerate(sorted_entities):
             # 查找重要性评分
-            importance = next(
-                (s for s in importance_scores if s.entity_id == entity.id), None
-            )
+            importance = scores_by_id.get(entity.id)
             importance_str = f" (重要性: {importance.score:.2f})" if importance else ""
 
             entity_text = self._format_entity_for_summary(entity, i + 1, importance_str)
@@ -893,22 +983,35 @@ class MemorySummarizer(BaseMemorySummarizer):
         return type_counts
 
     async def _get_entities_by_ids(self, entity_ids: List[str]) -> List[MemoryEntity]:
-        """根据ID获取实体（需要具体实现）"""
-        # 这个方法需要从存储中获取实体
-        # 这里返回空列表，实际实现需要集成存储
-        return []
+        """根据ID获取实体（通过entity_source，未配置时返回空列表）"""
+        if self.entity_source is None or not entity_ids:
+            return []
+
+        entities = []
+        for entity_id in entity_ids:
+            try:
+                entity = await self.entity_source.retrieve_entity(entity_id)
+            except Exception as e:
+                logger.warning(f"Failed to load entity {entity_id} for summary: {e}")
+                continue
+            if entity is not None:
+                entities.append(entity)
+        return entities
 
     async def clear_cache(self):
         """清空缓存"""
         self.summary_cache.clear()
         self.importance_cache.clear()
+        self.importance_scorer.invalidate()
         logger.info("Summary and importance caches cleared")
 
     async def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计"""
         return {
             "summary_cache_entries": len(self.summary_cache),
+            "summary_cache": self.summary_cache.get_stats(),
             "importance_cache_entries": len(self.importance_cache),
+            "importance_scorer": self.importance_scorer.get_stats(),
             "cache_enabled": self.config.enable_cache,
             "cache_ttl_hours": self.config.cache_ttl_hours,
             "max_cache_size": self.config.max_cache_size,
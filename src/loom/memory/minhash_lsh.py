@@ -0,0 +1,250 @@
+"""
+MinHash + LSH 近似重复索引 (MinHashLSHIndex)
+
+为一致性检查提供亚线性的候选对查找，避免两两比较：
+1. 实体文本切分为字符n-gram（兼容中文等无空格文本），
+   用MinHash签名估计Jaccard相似度
+2. 签名分为 bands 段，每段 rows 个值，任一段完全相同即进入同一桶；
+   相似度为s的两个实体成为候选的概率为 1 - (1 - s^rows)^bands
+3. 实体写入、更新、删除时增量维护，查询只检查同桶实体
+
+numpy为可选依赖，用于向量化计算签名；不可用时逐个计算，结果一致。
+"""
+
+import hashlib
+import json
+import random
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..utils.logging_config import get_logger
+from .world_memory import MemoryEntity
+
+logger = get_logger(__name__)
+
+# 取 2^31 - 1，使 a * h + b（h < 2^32）不超出uint64，可直接向量化
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def entity_text(entity: MemoryEntity) -> str:
+    """用于相似度比较的实体文本（类型 + 规范化内容）"""
+    content = entity.content
+    if isinstance(content, (dict, list)):
+        content = json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return f"{entity.type.value} {content}".lower()
+
+
+def shingles(text: str, size: int = 3) -> Set[str]:
+    """字符n-gram集合，过短的文本整体作为一个片段"""
+    text = " ".join(text.split())
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def _hash_shingle(shingle: str) -> int:
+    """稳定的32位片段哈希（不受PYTHONHASHSEED影响）"""
+    digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little")
+
+
+class MinHashLSHIndex:
+    """MinHash签名 + LSH分桶索引"""
+
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ):
+        """初始化索引
+
+        Args:
+            num_perm: 签名长度（哈希函数个数），需能被bands整除
+            bands: LSH分段数，rows = num_perm / bands；
+                候选阈值约为 (1 / bands) ^ (1 / rows)
+            shingle_size: 字符n-gram长度
+            seed: 哈希函数参数的随机种子
+        """
+        if num_perm % bands != 0:
+            raise ValueError(
+                f"num_perm ({num_perm}) must be divisible by bands ({bands})"
+            )
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # 哈希族 h(x) = (a * x + b) mod p，参数由种子确定以保证签名可复现
+        rng = random.Random(seed)
+        self._a = [rng.randrange(1, _MERSENNE_PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, _MERSENNE_PRIME) for _ in range(num_perm)]
+
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._versions: Dict[str, int] = {}
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [
+            {} for _ in range(bands)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._signatures
+
+    @property
+    def threshold(self) -> float:
+        """候选概率为50%左右的近似相似度阈值"""
+        return (1.0 / self.bands) ** (1.0 / self.rows)
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """计算文本的MinHash签名"""
+        hashes = [_hash_shingle(s) for s in shingles(text, self.shingle_size)]
+        if not hashes:
+            return (_MERSENNE_PRIME,) * self.num_perm
+
+        try:
+            import numpy as np
+        except ImportError:
+            return tuple(
+                min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+                for a, b in zip(self._a, self._b)
+            )
+
+        # (num_perm, 片段数) 的哈希矩阵，按行取最小值
+        values = np.asarray(hashes, dtype=np.uint64)
+        a = np.asarray(self._a, dtype=np.uint64)[:, None]
+        b = np.asarray(self._b, dtype=np.uint64)[:, None]
+        mins = ((a * values[None, :] + b) % np.uint64(_MERSENNE_PRIME)).min(axis=1)
+        return tuple(mins.tolist())
+
+    def _bands_of(self, signature: Tuple[int, ...]) -> Iterable[Tuple[int, ...]]:
+        for band in range(self.bands):
+            yield signature[band * self.rows : (band + 1) * self.rows]
+
+    def add(self, entity: MemoryEntity) -> bool:
+        """添加或更新实体
+
+        Returns:
+            签名是否重新计算（同版本的实体跳过）
+        """
+        if self._versions.get(entity.id) == entity.version:
+            return False
+
+        self.remove(entity.id)
+        signature = self.signature(entity_text(entity))
+        self._signatures[entity.id] = signature
+        self._versions[entity.id] = entity.version
+        for buckets, key in zip(self._buckets, self._bands_of(signature)):
+            buckets.setdefault(key, set()).add(entity.id)
+        return True
+
+    def remove(self, entity_id: str) -> bool:
+        """删除实体"""
+        signature = self._signatures.pop(entity_id, None)
+        if signature is None:
+            return False
+
+        self._versions.pop(entity_id, None)
+        for buckets, key in zip(self._buckets, self._bands_of(signature)):
+            members = buckets.get(key)
+            if members is not None:
+                members.discard(entity_id)
+                if not members:
+                    del buckets[key]
+        return True
+
+    def clear(self):
+        """清空索引"""
+        self._signatures.clear()
+        self._versions.clear()
+        for buckets in self._buckets:
+            buckets.clear()
+
+    def similarity(self, first_id: str, second_id: str) -> float:
+        """由签名估计两个实体的Jaccard相似度"""
+        first = self._signatures.get(first_id)
+        second = self._signatures.get(second_id)
+        if first is None or second is None:
+            return 0.0
+        return sum(1 for x, y in zip(first, second) if x == y) / self.num_perm
+
+    def candidates(self, entity_id: str) -> Set[str]:
+        """与实体至少共享一个桶的其他实体"""
+        signature = self._signatures.get(entity_id)
+        if signature is None:
+            return set()
+
+        found = set()
+        for buckets, key in zip(self._buckets, self._bands_of(signature)):
+            found.update(buckets.get(key, ()))
+        found.discard(entity_id)
+        return found
+
+    def query(
+        self, entity_id: str, threshold: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """查找与实体相似的实体
+
+        Args:
+            entity_id: 已索引的实体ID
+            threshold: 估计相似度下限，默认使用索引阈值
+
+        Returns:
+            (实体ID, 估计相似度) 列表，按相似度降序
+        """
+        threshold = self.threshold if threshold is None else threshold
+        matches = [
+            (other, self.similarity(entity_id, other))
+            for other in self.candidates(entity_id)
+        ]
+        matches = [(other, sim) for other, sim in matches if sim >= threshold]
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return matches
+
+    def candidate_pairs(
+        self,
+        entity_ids: Optional[Iterable[str]] = None,
+        threshold: Optional[float] = None,
+    ) -> List[Tuple[str, str, float]]:
+        """枚举相似的实体对
+
+        Args:
+            entity_ids: 只返回两端都在该集合内的实体对，默认全部
+            threshold: 估计相似度下限，默认使用索引阈值
+
+        Returns:
+            (实体ID, 实体ID, 估计相似度) 列表，实体对按ID有序且不重复
+        """
+        threshold = self.threshold if threshold is None else threshold
+        scope = set(entity_ids) if entity_ids is not None else None
+
+        seen: Set[Tuple[str, str]] = set()
+        pairs = []
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                ids = sorted(members if scope is None else members & scope)
+                for i, first in enumerate(ids):
+                    for second in ids[i + 1 :]:
+                        if (first, second) in seen:
+                            continue
+                        seen.add((first, second))
+                        similarity = self.similarity(first, second)
+                        if similarity >= threshold:
+                            pairs.append((first, second, similarity))
+        return pairs
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计"""
+        bucket_sizes = [len(m) for buckets in self._buckets for m in buckets.values()]
+        return {
+            "entities": len(self._signatures),
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "rows": self.rows,
+            "threshold": self.threshold,
+            "buckets": len(bucket_sizes),
+            "max_bucket_size": max(bucket_sizes, default=0),
+        }
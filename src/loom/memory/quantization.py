@@ -0,0 +1,304 @@
+"""
+嵌入向量量化 (Embedding Quantization)
+
+以紧凑格式保存嵌入向量，降低常驻内存和磁盘占用：
+1. float16：每维2字节，精度损失可忽略
+2. int8：每维1字节 + 每向量一个float32缩放系数（对称量化）
+
+提供：
+- QuantizedVectorIndex：内存中的量化向量矩阵，直接在量化值上计算相似度
+- encode_embedding_blob / decode_embedding_blob：SQLite BLOB列的序列化格式
+
+numpy为可选依赖，在使用时导入。
+"""
+
+import struct
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+# BLOB头：魔数(2) + 版本(1) + 类型码(1)
+_BLOB_MAGIC = b"LQ"
+_BLOB_VERSION = 1
+_DTYPE_CODES = {"float32": 0, "float16": 1, "int8": 2}
+_CODE_DTYPES = {code: dtype for dtype, code in _DTYPE_CODES.items()}
+
+
+def _validate_dtype(dtype: str) -> str:
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(
+            f"Unsupported embedding dtype: {dtype}, expected one of {SUPPORTED_DTYPES}"
+        )
+    return dtype
+
+
+def quantize_embeddings(embeddings, dtype: str = "int8"):
+    """量化一批嵌入向量
+
+    Args:
+        embeddings: 形状为 (n, d) 的向量
+        dtype: float32 / float16 / int8
+
+    Returns:
+        (codes, scales)，非int8时scales为None
+    """
+    import numpy as np
+
+    _validate_dtype(dtype)
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+
+    if dtype == "float32":
+        return vectors.copy(), None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+
+    # int8对称量化：x ≈ code * scale，scale = max|x| / 127
+    max_abs = np.abs(vectors).max(axis=1)
+    scales = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize_embeddings(codes, scales=None):
+    """将量化向量还原为float32"""
+    import numpy as np
+
+    vectors = np.asarray(codes).astype(np.float32)
+    if scales is not None:
+        vectors *= np.asarray(scales, dtype=np.float32).reshape(-1, 1)
+    return vectors
+
+
+def encode_embedding_blob(embedding: Sequence[float], dtype: str = "float16") -> bytes:
+    """将单个嵌入向量编码为带类型头的BLOB
+
+    Args:
+        embedding: 嵌入向量
+        dtype: 存储精度
+
+    Returns:
+        BLOB字节串
+    """
+    codes, scales = quantize_embeddings([embedding], dtype)
+    header = _BLOB_MAGIC + bytes([_BLOB_VERSION, _DTYPE_CODES[dtype]])
+    if scales is not None:
+        header += struct.pack("<f", float(scales[0]))
+    return header + codes[0].astype(codes.dtype.newbyteorder("<")).tobytes()
+
+
+def decode_embedding_blob(blob: Optional[bytes]) -> Optional[List[float]]:
+    """解码由 encode_embedding_blob 生成的BLOB
+
+    不带类型头的旧数据按原始float32字节解析。
+    """
+    import numpy as np
+
+    if not blob:
+        return None
+
+    blob = bytes(blob)
+    if blob[:2] != _BLOB_MAGIC or len(blob) < 4 or blob[3] not in _CODE_DTYPES:
+        return np.frombuffer(blob, dtype="<f4").astype(np.float32).tolist()
+
+    dtype = _CODE_DTYPES[blob[3]]
+    payload = blob[4:]
+    if dtype == "float32":
+        return np.frombuffer(payload, dtype="<f4").astype(np.float32).tolist()
+    if dtype == "float16":
+        return np.frombuffer(payload, dtype="<f2").astype(np.float32).tolist()
+
+    (scale,) = struct.unpack("<f", payload[:4])
+    codes = np.frombuffer(payload[4:], dtype=np.int8)
+    return (codes.astype(np.float32) * scale).tolist()
+
+
+class QuantizedVectorIndex:
+    """量化向量索引
+
+    向量在写入时L2归一化后量化，按行保存在连续数组中，
+    搜索时分块在量化值上计算内积（即余弦相似度），
+    不会把整个矩阵还原成float32。
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        dtype: str = "int8",
+        normalize: bool = True,
+        chunk_size: int = 4096,
+    ):
+        """初始化量化索引
+
+        Args:
+            dimension: 向量维度
+            dtype: float32 / float16 / int8
+            normalize: 写入和查询前是否L2归一化（余弦相似度）
+            chunk_size: 搜索时每次还原的行数
+        """
+        import numpy as np
+
+        self.dimension = dimension
+        self.dtype = _validate_dtype(dtype)
+        self.normalize = normalize
+        self.chunk_size = max(1, chunk_size)
+
+        self._codes = np.zeros((0, dimension), dtype=np.dtype(dtype))
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """向量数据占用的字节数"""
+        count = len(self._ids)
+        row_bytes = self._codes.itemsize * self.dimension
+        scale_bytes = 4 if self.dtype == "int8" else 0
+        return count * (row_bytes + scale_bytes)
+
+    def _prepare(self, embeddings):
+        import numpy as np
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Embedding dimension mismatch: expected {self.dimension}, "
+                f"got {vectors.shape[1]}"
+            )
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms > 0, norms, 1.0)
+        return vectors
+
+    def _reserve(self, count: int):
+        """按倍增策略扩容底层数组"""
+        import numpy as np
+
+        capacity = self._codes.shape[0]
+        if count <= capacity:
+            return
+        new_capacity = max(count, capacity * 2, 64)
+        codes = np.zeros((new_capacity, self.dimension), dtype=self._codes.dtype)
+        codes[:capacity] = self._codes
+        scales = np.ones(new_capacity, dtype=np.float32)
+        scales[:capacity] = self._scales
+        self._codes, self._scales = codes, scales
+
+    def add(self, ids: List[str], embeddings):
+        """写入或更新向量
+
+        Args:
+            ids: 实体ID
+            embeddings: 形状为 (n, d) 的向量
+        """
+        vectors = self._prepare(embeddings)
+        codes, scales = quantize_embeddings(vectors, self.dtype)
+
+        for offset, entity_id in enumerate(ids):
+            row = self._rows.get(entity_id)
+            if row is None:
+                row = len(self._ids)
+                self._reserve(row + 1)
+                self._ids.append(entity_id)
+                self._rows[entity_id] = row
+            self._codes[row] = codes[offset]
+            self._scales[row] = scales[offset] if scales is not None else 1.0
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """删除向量（用末行覆盖被删行）
+
+        Returns:
+            实际删除的数量
+        """
+        removed = 0
+        for entity_id in ids:
+            row = self._rows.pop(entity_id, None)
+            if row is None:
+                continue
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._codes[row] = self._codes[last]
+                self._scales[row] = self._scales[last]
+                self._ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._ids.pop()
+            removed += 1
+        return removed
+
+    def get(self, entity_id: str) -> Optional[List[float]]:
+        """获取还原后的（归一化）向量"""
+        row = self._rows.get(entity_id)
+        if row is None:
+            return None
+        scales = self._scales[row : row + 1] if self.dtype == "int8" else None
+        return dequantize_embeddings(self._codes[row : row + 1], scales)[0].tolist()
+
+    def scores(self, query_embedding):
+        """计算查询向量与所有向量的相似度（分块在量化值上计算）"""
+        import numpy as np
+
+        query = self._prepare(query_embedding)[0]
+        count = len(self._ids)
+        scores = np.empty(count, dtype=np.float32)
+
+        for start in range(0, count, self.chunk_size):
+            end = min(start + self.chunk_size, count)
+            chunk = self._codes[start:end].astype(np.float32)
+            scores[start:end] = chunk @ query
+
+        if self.dtype == "int8":
+            scores *= self._scales[:count]
+        return scores
+
+    def search(
+        self,
+        query_embedding,
+        limit: int = 10,
+        predicate: Optional[Callable[[str], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """相似度搜索
+
+        Args:
+            query_embedding: 查询向量
+            limit: 返回数量
+            predicate: 可选的ID过滤函数
+
+        Returns:
+            [(entity_id, score), ...]，按分数降序
+        """
+        import numpy as np
+
+        if not self._ids or limit <= 0:
+            return []
+
+        scores = self.scores(query_embedding)
+
+        if predicate is None and limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            order = top[np.argsort(-scores[top])]
+        else:
+            order = np.argsort(-scores)
+
+        results = []
+        for row in order:
+            entity_id = self._ids[row]
+            if predicate is not None and not predicate(entity_id):
+                continue
+            results.append((entity_id, float(scores[row])))
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,112 @@
+"""
+查询缓存 (QueryCache)
+
+StructuredStore 的查询结果缓存，在 TTLCache 之上增加基于标签的失效：
+1. 以元组为键（如 ("retrieve_entity", entity_id)），无需序列化和哈希
+2. 有界LRU和TTL过期由 TTLCache 负责
+3. 每条结果登记其依赖的标签（实体ID、会话ID、类型），
+   写入时只失效相关结果，而不是等待TTL；条目被淘汰或过期时同步清理标签索引
+4. 统计命中率和近似内存占用
+"""
+
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from ..utils.logging_config import get_logger
+from ..utils.ttl_cache import TTLCache, estimate_size
+
+logger = get_logger(__name__)
+
+
+class QueryCache:
+    """带标签失效的有界LRU查询缓存"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 300):
+        """初始化查询缓存
+
+        Args:
+            max_entries: 最大条目数
+            ttl_seconds: 条目有效期（秒），None表示只依赖标签失效
+        """
+        # 缓存值为 (结果, 标签)，字节数只按结果估算
+        self._cache = TTLCache(
+            max_entries=max_entries,
+            default_ttl=ttl_seconds,
+            size_fn=lambda entry: estimate_size(entry[0]),
+            on_remove=self._unindex,
+        )
+        self._tag_index: Dict[Hashable, Set[Hashable]] = {}
+        self.invalidations = 0
+
+    @property
+    def max_entries(self) -> int:
+        return self._cache.max_entries
+
+    @property
+    def ttl_seconds(self) -> Optional[float]:
+        return self._cache.default_ttl
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._cache
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存结果，未命中或已过期返回None"""
+        entry = self._cache.get(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()):
+        """写入缓存结果
+
+        Args:
+            key: 缓存键
+            value: 结果
+            tags: 结果依赖的标签，任一标签失效时结果被移除
+        """
+        tags = tuple(dict.fromkeys(tags))
+        # 覆盖旧值时先由on_remove清理旧标签，再登记新标签
+        self._cache.set(key, (value, tags))
+        if key in self._cache:
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+
+    def invalidate(self, *tags: Hashable) -> int:
+        """使带有任一标签的结果失效
+
+        Returns:
+            失效的条目数
+        """
+        removed = 0
+        for tag in tags:
+            for key in list(self._tag_index.get(tag, ())):
+                if self._cache.pop(key) is not None:
+                    removed += 1
+            self._tag_index.pop(tag, None)
+
+        self.invalidations += removed
+        if removed:
+            logger.debug(f"Invalidated {removed} cached queries for tags {tags}")
+        return removed
+
+    def _unindex(self, key: Hashable, entry: Tuple[Any, Tuple]):
+        """条目离开缓存时清理标签索引"""
+        for tag in entry[1]:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def clear(self):
+        """清空缓存"""
+        self._cache.clear()
+        self._tag_index.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        return {
+            **self._cache.get_stats(),
+            "invalidations": self.invalidations,
+            "tags": len(self._tag_index),
+        }
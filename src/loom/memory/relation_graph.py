@@ -0,0 +1,261 @@
+"""
+关系图索引 (RelationGraph)
+
+按会话维护的内存邻接表，避免关系遍历时逐节点查询数据库：
+1. 会话首次使用时一次性加载全部关系，之后随增删关系增量更新
+2. 层同步BFS：按层返回前沿节点，便于调用方批量加载实体
+3. k跳邻居和最短路径查询
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..utils.logging_config import get_logger
+from .world_memory import MemoryRelation, MemoryRelationType
+
+logger = get_logger(__name__)
+
+# 边的唯一键：(source_id, target_id, relation_type)
+EdgeKey = Tuple[str, str, MemoryRelationType]
+
+
+class RelationGraph:
+    """关系图邻接表索引
+
+    关系是有向的，但遍历默认同时沿出边和入边进行，
+    与 get_related_entities 的语义一致。
+    """
+
+    def __init__(self):
+        self._outgoing: Dict[str, Dict[EdgeKey, MemoryRelation]] = {}
+        self._incoming: Dict[str, Dict[EdgeKey, MemoryRelation]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        """节点数量"""
+        return len(set(self._outgoing) | set(self._incoming))
+
+    @property
+    def edge_count(self) -> int:
+        """边数量"""
+        return sum(len(edges) for edges in self._outgoing.values())
+
+    @staticmethod
+    def _key(relation: MemoryRelation) -> EdgeKey:
+        return (relation.source_id, relation.target_id, relation.relation_type)
+
+    def load(self, relations: Iterable[MemoryRelation]):
+        """用完整的关系集合重建索引"""
+        self._outgoing.clear()
+        self._incoming.clear()
+        for relation in relations:
+            self.add(relation)
+        self.loaded = True
+        logger.debug(
+            f"RelationGraph loaded {self.edge_count} edges over {len(self)} nodes"
+        )
+
+    def add(self, relation: MemoryRelation):
+        """添加或更新一条边"""
+        key = self._key(relation)
+        self._outgoing.setdefault(relation.source_id, {})[key] = relation
+        self._incoming.setdefault(relation.target_id, {})[key] = relation
+
+    def remove(
+        self, source_id: str, target_id: str, relation_type: MemoryRelationType
+    ) -> bool:
+        """删除一条边
+
+        Returns:
+            边是否存在
+        """
+        key = (source_id, target_id, relation_type)
+        outgoing = self._outgoing.get(source_id, {})
+        if key not in outgoing:
+            return False
+
+        del outgoing[key]
+        del self._incoming[target_id][key]
+        self._prune(source_id)
+        self._prune(target_id)
+        return True
+
+    def remove_entity(self, entity_id: str) -> int:
+        """删除与实体相连的所有边
+
+        Returns:
+            删除的边数量
+        """
+        keys = list(self._outgoing.get(entity_id, {})) + list(
+            self._incoming.get(entity_id, {})
+        )
+        return sum(1 for key in set(keys) if self.remove(*key))
+
+    def _prune(self, entity_id: str):
+        """移除没有边的空邻接表"""
+        if not self._outgoing.get(entity_id):
+            self._outgoing.pop(entity_id, None)
+        if not self._incoming.get(entity_id):
+            self._incoming.pop(entity_id, None)
+
+    def relations_of(
+        self,
+        entity_id: str,
+        relation_type: Optional[MemoryRelationType] = None,
+        direction: str = "both",
+    ) -> List[MemoryRelation]:
+        """获取实体的关系
+
+        Args:
+            entity_id: 实体ID
+            relation_type: 只返回指定类型
+            direction: out / in / both
+        """
+        relations = []
+        if direction in ("out", "both"):
+            relations.extend(self._outgoing.get(entity_id, {}).values())
+        if direction in ("in", "both"):
+            relations.extend(self._incoming.get(entity_id, {}).values())
+        if relation_type is not None:
+            relations = [r for r in relations if r.relation_type == relation_type]
+        return relations
+
+    def degree(self, entity_id: str) -> int:
+        """实体的边数（出边 + 入边）"""
+        return len(self._outgoing.get(entity_id, ())) + len(
+            self._incoming.get(entity_id, ())
+        )
+
+    def neighbors(
+        self,
+        entity_id: str,
+        relation_type: Optional[MemoryRelationType] = None,
+        direction: str = "both",
+    ) -> List[str]:
+        """获取相邻实体ID（去重，保持插入顺序）"""
+        neighbors = {}
+        for relation in self.relations_of(entity_id, relation_type, direction):
+            other = (
+                relation.target_id
+                if relation.source_id == entity_id
+                else relation.source_id
+            )
+            neighbors[other] = None
+        return list(neighbors)
+
+    def bfs_levels(
+        self,
+        start_id: str,
+        max_depth: int,
+        relation_type: Optional[MemoryRelationType] = None,
+    ) -> Iterator[List[str]]:
+        """层同步BFS，逐层产出前沿节点
+
+        第0层为起点本身，每个节点只出现在其最短距离所在的层。
+        """
+        visited: Set[str] = {start_id}
+        frontier = [start_id]
+        depth = 0
+
+        while frontier:
+            yield frontier
+            if depth >= max_depth:
+                return
+
+            next_frontier = []
+            for entity_id in frontier:
+                for neighbor in self.neighbors(entity_id, relation_type):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+            depth += 1
+
+    def k_hop(
+        self,
+        start_id: str,
+        k: int,
+        relation_type: Optional[MemoryRelationType] = None,
+    ) -> Dict[str, int]:
+        """k跳内可达的实体
+
+        Returns:
+            {entity_id: 跳数}，不包含起点
+        """
+        distances = {}
+        for depth, frontier in enumerate(self.bfs_levels(start_id, k, relation_type)):
+            if depth == 0:
+                continue
+            for entity_id in frontier:
+                distances[entity_id] = depth
+        return distances
+
+    def shortest_path(
+        self,
+        source_id: str,
+        target_id: str,
+        max_depth: Optional[int] = None,
+        relation_type: Optional[MemoryRelationType] = None,
+    ) -> Optional[List[str]]:
+        """无权最短路径（双向BFS）
+
+        Returns:
+            从source到target的实体ID序列，不可达时返回None
+        """
+        if source_id == target_id:
+            return [source_id]
+
+        parents_forward: Dict[str, Optional[str]] = {source_id: None}
+        parents_backward: Dict[str, Optional[str]] = {target_id: None}
+        frontier_forward = deque([source_id])
+        frontier_backward = deque([target_id])
+        depth = 0
+
+        while frontier_forward and frontier_backward:
+            if max_depth is not None and depth >= max_depth:
+                return None
+
+            # 每次扩展较小的一侧
+            if len(frontier_forward) <= len(frontier_backward):
+                meeting = self._expand_level(
+                    frontier_forward, parents_forward, parents_backward, relation_type
+                )
+            else:
+                meeting = self._expand_level(
+                    frontier_backward, parents_backward, parents_forward, relation_type
+                )
+            depth += 1
+
+            if meeting is not None:
+                path = []
+                node = meeting
+                while node is not None:
+                    path.append(node)
+                    node = parents_forward[node]
+                path.reverse()
+                node = parents_backward[meeting]
+                while node is not None:
+                    path.append(node)
+                    node = parents_backward[node]
+                return path
+
+        return None
+
+    def _expand_level(
+        self,
+        frontier: deque,
+        parents: Dict[str, Optional[str]],
+        other_parents: Dict[str, Optional[str]],
+        relation_type: Optional[MemoryRelationType],
+    ) -> Optional[str]:
+        """扩展一整层，遇到另一侧已访问的节点时返回相遇点"""
+        for _ in range(len(frontier)):
+            entity_id = frontier.popleft()
+            for neighbor in self.neighbors(entity_id, relation_type):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = entity_id
+                if neighbor in other_parents:
+                    return neighbor
+                frontier.append(neighbor)
+        return None
@@ -15,6 +15,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from ..utils.logging_config import get_logger
 from .interfaces import StorageError
+from .query_cache import QueryCache
 from .world_memory import (
     MemoryEntity,
     MemoryEntityType,
@@ -33,13 +34,15 @@ class StructuredStore:
         db_path: str = "loom_memory.db",
         enable_cache: bool = True,
         cache_ttl: int = 300,
+        cache_max_entries: int = 1024,
     ):
         self.db_path = Path(db_path)
         self.executor = ThreadPoolExecutor(max_workers=4)
         self.enable_cache = enable_cache
         self.cache_ttl = cache_ttl  # 缓存TTL（秒）
-        self.query_cache = {}  # 查询缓存
-        self.cache_timestamps = {}  # 缓存时间戳
+        # 查询缓存（有界LRU，写入时按实体/会话/类型标签失效）
+        self.query_cache = QueryCache(cache_max_entries, cache_ttl)
+        self.fts_tokenizer: Optional[str] = None  # 全文索引分词器，None表示不可用
         self._ensure_tables()
         logger.info(
             f"StructuredStore initialized with db={db_path}, cache={'enabled' if enable_cache else 'disabled'}"
@@ -176,6 +179,20 @@ class StructuredStore:
             """
             )
 
+            # 分层摘要节点表 - 叶子窗口/章节/篇章摘要
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS summary_nodes (
+                    id TEXT PRIMARY KEY,
+                    session_id TEXT NOT NULL,
+                    level INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """
+            )
+
             # 创建索引
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_entities_session ON memory_entities (session_id)"
@@ -186,6 +203,9 @@ class StructuredStore:
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_entities_active ON memory_entities (is_active)"
             )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entities_session_created ON memory_entities (session_id, created_at)"
+            )
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_relations_source ON memory_relations (source_id)"
             )
@@ -216,6 +236,12 @@ class StructuredStore:
             cursor.execute(
                 "CREATE INDEX IF NOT EXISTS idx_associations_fact ON entity_fact_associations (fact_id)"
             )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_summary_nodes_session ON summary_nodes (session_id)"
+            )
+
+            # 全文索引 - 关键词检索（BM25排序）
+            self._create_fulltext_index(cursor)
 
             conn.commit()
             conn.close()
@@ -223,6 +249,164 @@ class StructuredStore:
         loop = asyncio.get_event_loop()
         loop.run_in_executor(self.executor, create_tables)
 
+    def _create_fulltext_index(self, cursor: sqlite3.Cursor):
+        """创建FTS5全文索引并通过触发器与memory_entities保持同步
+
+        优先使用trigram分词器（支持中文子串匹配），不可用时退回unicode61。
+        FTS行的rowid与memory_entities的rowid一致；INSERT OR REPLACE删除旧行时
+        不会触发DELETE触发器，因此在BEFORE INSERT中先移除旧的索引行。
+        """
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'memory_entities_fts'"
+        )
+        row = cursor.fetchone()
+        if row:
+            self.fts_tokenizer = "trigram" if "trigram" in row[0] else "unicode61"
+            return
+
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                cursor.execute(
+                    f"""
+                    CREATE VIRTUAL TABLE memory_entities_fts USING fts5(
+                        entity_id UNINDEXED, content, tokenize='{tokenizer}'
+                    )
+                """
+                )
+                self.fts_tokenizer = tokenizer
+                break
+            except sqlite3.OperationalError:
+                continue
+        else:
+            logger.warning("SQLite FTS5 unavailable, keyword search uses LIKE")
+            return
+
+        cursor.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS memory_entities_fts_before_insert
+            BEFORE INSERT ON memory_entities BEGIN
+                DELETE FROM memory_entities_fts WHERE rowid =
+                    (SELECT rowid FROM memory_entities WHERE id = new.id);
+            END;
+            CREATE TRIGGER IF NOT EXISTS memory_entities_fts_after_insert
+            AFTER INSERT ON memory_entities BEGIN
+                INSERT INTO memory_entities_fts (rowid, entity_id, content)
+                VALUES (new.rowid, new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS memory_entities_fts_after_update
+            AFTER UPDATE OF content ON memory_entities BEGIN
+                DELETE FROM memory_entities_fts WHERE rowid = old.rowid;
+                INSERT INTO memory_entities_fts (rowid, entity_id, content)
+                VALUES (new.rowid, new.id, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS memory_entities_fts_after_delete
+            AFTER DELETE ON memory_entities BEGIN
+                DELETE FROM memory_entities_fts WHERE rowid = old.rowid;
+            END;
+
+            INSERT INTO memory_entities_fts (rowid, entity_id, content)
+            SELECT rowid, id, content FROM memory_entities;
+        """
+        )
+
+    def _build_fts_query(self, query: str) -> Optional[str]:
+        """将查询文本转换为FTS5 MATCH表达式（各词项OR连接）"""
+        terms = [term for term in query.split() if term]
+        if self.fts_tokenizer == "trigram":
+            # trigram分词器无法匹配少于3个字符的词项
+            terms = [term for term in terms if len(term) >= 3]
+        if not terms:
+            return None
+        return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    async def search_entities_ranked(
+        self, query: str, session_id: Optional[str] = None, limit: int = 10
+    ) -> List[Tuple[MemoryEntity, float]]:
+        """关键词检索，按BM25相关度排序
+
+        FTS5不可用或查询词过短时退回LIKE匹配，分数按排名递减。
+
+        Args:
+            query: 查询文本
+            session_id: 限定会话
+            limit: 返回数量
+
+        Returns:
+            [(实体, 分数), ...]，分数越高越相关
+        """
+        match_expression = self._build_fts_query(query) if self.fts_tokenizer else None
+
+        def search():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            session_clause = "AND m.session_id = ?" if session_id else ""
+            session_params = [session_id] if session_id else []
+
+            if match_expression:
+                cursor.execute(
+                    f"""
+                    SELECT m.*, -bm25(memory_entities_fts) AS score
+                    FROM memory_entities_fts
+                    JOIN memory_entities m ON m.rowid = memory_entities_fts.rowid
+                    WHERE memory_entities_fts MATCH ? AND m.is_active = 1
+                    {session_clause}
+                    ORDER BY bm25(memory_entities_fts)
+                    LIMIT ?
+                """,
+                    [match_expression, *session_params, limit],
+                )
+                rows = cursor.fetchall()
+                conn.close()
+                return [(self._row_to_entity(row), float(row[-1])) for row in rows]
+
+            cursor.execute(
+                f"""
+                SELECT m.* FROM memory_entities m
+                WHERE m.content LIKE ? AND m.is_active = 1 {session_clause}
+                ORDER BY m.updated_at DESC
+                LIMIT ?
+            """,
+                [f"%{query}%", *session_params, limit],
+            )
+            rows = cursor.fetchall()
+            conn.close()
+            return [
+                (self._row_to_entity(row), 1.0 / (rank + 1))
+                for rank, row in enumerate(rows)
+            ]
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, search)
+        except Exception as e:
+            logger.error(f"Failed to search entities: {e}")
+            return []
+
+    @staticmethod
+    def _row_to_entity(row) -> MemoryEntity:
+        """将memory_entities行转换为实体"""
+        return MemoryEntity(
+            id=row[0],
+            session_id=row[1],
+            type=MemoryEntityType(row[2]),
+            content=json.loads(row[3]),
+            created_at=datetime.fromisoformat(row[4]),
+            updated_at=datetime.fromisoformat(row[5]),
+            version=row[6],
+            metadata=json.loads(row[7]),
+        )
+
+    @staticmethod
+    def _row_to_relation(row) -> MemoryRelation:
+        """将memory_relations行转换为关系"""
+        return MemoryRelation(
+            source_id=row[0],
+            target_id=row[1],
+            relation_type=MemoryRelationType(row[2]),
+            strength=row[3],
+            metadata=json.loads(row[4]),
+        )
+
     async def store_entity(self, entity: MemoryEntity) -> str:
         """存储实体
 
@@ -396,6 +580,56 @@ class StructuredStore:
             logger.error(f"Failed to search entities: {e}")
             return []
 
+    async def retrieve_entities_in_time_range(
+        self,
+        session_id: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[MemoryEntity]:
+        """按创建时间顺序检索会话内的实体
+
+        走 (session_id, created_at) 复合索引，无需全表扫描和排序。
+
+        Args:
+            session_id: 会话ID
+            start_time: 开始时间（含）
+            end_time: 结束时间（含）
+            limit: 最多返回数量
+
+        Returns:
+            按created_at升序的实体列表
+        """
+
+        def retrieve():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            sql = "SELECT * FROM memory_entities WHERE session_id = ?"
+            params: List[Any] = [session_id]
+            if start_time is not None:
+                sql += " AND created_at >= ?"
+                params.append(start_time.isoformat())
+            if end_time is not None:
+                sql += " AND created_at <= ?"
+                params.append(end_time.isoformat())
+            sql += " ORDER BY created_at"
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            conn.close()
+            return [self._row_to_entity(row) for row in rows]
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, retrieve)
+        except Exception as e:
+            logger.error(f"Failed to retrieve entities in time range: {e}")
+            return []
+
     async def store_relation(self, relation: MemoryRelation) -> bool:
         """存储关系"""
 
@@ -406,8 +640,8 @@ class StructuredStore:
             cursor.execute(
                 """
                 INSERT OR REPLACE INTO memory_relations
-                (source_id, target_id, relation_type, strength, metadata)
-                VALUES (?, ?, ?, ?, ?)
+                (source_id, target_id, relation_type, strength, metadata, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
             """,
                 (
                     relation.source_id,
@@ -415,6 +649,7 @@ class StructuredStore:
                     relation.relation_type.value,
                     relation.strength,
                     json.dumps(relation.metadata, ensure_ascii=False),
+                    datetime.now().isoformat(),
                 ),
             )
 
@@ -459,19 +694,7 @@ class StructuredStore:
             rows = cursor.fetchall()
             conn.close()
 
-            relations = []
-            for row in rows:
-                relations.append(
-                    MemoryRelation(
-                        source_id=row[0],
-                        target_id=row[1],
-                        relation_type=MemoryRelationType(row[2]),
-                        strength=row[3],
-                        metadata=json.loads(row[4]),
-                    )
-                )
-
-            return relations
+            return [self._row_to_relation(row) for row in rows]
 
         try:
             loop = asyncio.get_event_loop()
@@ -481,6 +704,64 @@ class StructuredStore:
             logger.error(f"Failed to retrieve relations: {e}")
             return []
 
+    async def retrieve_session_relations(self, session_id: str) -> List[MemoryRelation]:
+        """一次性检索会话内的全部关系（用于构建关系图索引）
+
+        关系表不记录会话，按源实体所属会话筛选。
+        """
+
+        def retrieve():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                SELECT r.* FROM memory_relations r
+                JOIN memory_entities e ON e.id = r.source_id
+                WHERE e.session_id = ?
+            """,
+                (session_id,),
+            )
+
+            rows = cursor.fetchall()
+            conn.close()
+            return [self._row_to_relation(row) for row in rows]
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, retrieve)
+        except Exception as e:
+            logger.error(f"Failed to retrieve session relations: {e}")
+            return []
+
+    async def delete_relation(
+        self, source_id: str, target_id: str, relation_type: MemoryRelationType
+    ) -> bool:
+        """删除关系"""
+
+        def delete():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                DELETE FROM memory_relations
+                WHERE source_id = ? AND target_id = ? AND relation_type = ?
+            """,
+                (source_id, target_id, relation_type.value),
+            )
+
+            conn.commit()
+            conn.close()
+            return cursor.rowcount > 0
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, delete)
+        except Exception as e:
+            logger.error(f"Failed to delete relation: {e}")
+            return False
+
     async def delete_entity(self, entity_id: str) -> bool:
         """删除实体"""
 
@@ -489,6 +770,7 @@ class StructuredStore:
             cursor = conn.cursor()
 
             cursor.execute("DELETE FROM memory_entities WHERE id = ?", (entity_id,))
+            deleted = cursor.rowcount > 0
             cursor.execute(
                 "DELETE FROM memory_relations WHERE source_id = ? OR target_id = ?",
                 (entity_id, entity_id),
@@ -496,11 +778,13 @@ class StructuredStore:
 
             conn.commit()
             conn.close()
-            return cursor.rowcount > 0
+            return deleted
 
         try:
             loop = asyncio.get_event_loop()
             success = await loop.run_in_executor(self.executor, delete)
+            if self.enable_cache:
+                self.query_cache.invalidate(("entity", entity_id))
             return success
         except Exception as e:
             logger.error(f"Failed to delete entity {entity_id}: {e}")
@@ -992,6 +1276,73 @@ class StructuredStore:
             logger.error(f"Failed to get entity versions: {e}")
             return []
 
+    async def save_summary_nodes(self, nodes: List[Dict[str, Any]]) -> bool:
+        """保存分层摘要节点（按ID覆盖）"""
+        if not nodes:
+            return True
+
+        def save():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            now = datetime.now().isoformat()
+
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO summary_nodes
+                (id, session_id, level, position, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                [
+                    (
+                        node["id"],
+                        node["session_id"],
+                        node["level"],
+                        node["position"],
+                        json.dumps(node, ensure_ascii=False),
+                        now,
+                    )
+                    for node in nodes
+                ],
+            )
+
+            conn.commit()
+            conn.close()
+            return True
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, save)
+        except Exception as e:
+            logger.error(f"Failed to save summary nodes: {e}")
+            return False
+
+    async def load_summary_nodes(self, session_id: str) -> List[Dict[str, Any]]:
+        """加载会话的全部分层摘要节点"""
+
+        def load():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute(
+                """
+                SELECT data FROM summary_nodes
+                WHERE session_id = ?
+                ORDER BY level, position
+            """,
+                (session_id,),
+            )
+
+            rows = cursor.fetchall()
+            conn.close()
+            return [json.loads(row[0]) for row in rows]
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, load)
+        except Exception as e:
+            logger.error(f"Failed to load summary nodes: {e}")
+            return []
+
     async def get_related_facts(
         self, entity_id: str, association_type: Optional[str] = None
     ) -> List[Dict[str, Any]]:
@@ -1052,54 +1403,43 @@ class StructuredStore:
             logger.error(f"Failed to get related facts: {e}")
             return []
 
-    def _get_cache_key(self, method: str, *args, **kwargs) -> str:
-        """生成缓存键"""
-        import hashlib
-        import pickle
-
-        data = {"method": method, "args": args, "kwargs": kwargs}
+    @staticmethod
+    def _get_cache_key(method: str, *args) -> Tuple:
+        """生成缓存键（元组，无需序列化）"""
+        return (method,) + args
 
-        try:
-            data_bytes = pickle.dumps(data)
-        except:
-            data_bytes = str(data).encode()
-
-        return hashlib.md5(data_bytes).hexdigest()
+    @staticmethod
+    def _entity_cache_tags(entity: MemoryEntity) -> List[Tuple]:
+        """单个实体结果依赖的缓存标签"""
+        return [("entity", entity.id), ("session", entity.session_id)]
 
-    def _get_cached_result(self, cache_key: str):
+    def _get_cached_result(self, cache_key: Tuple):
         """获取缓存结果"""
         if not self.enable_cache:
             return None
+        return self.query_cache.get(cache_key)
 
-        if cache_key in self.query_cache:
-            timestamp = self.cache_timestamps.get(cache_key, 0)
-            current_time = datetime.now().timestamp()
-
-            if current_time - timestamp < self.cache_ttl:
-                logger.debug(f"Cache hit for key: {cache_key[:8]}...")
-                return self.query_cache[cache_key]
-            else:
-                # 缓存过期
-                del self.query_cache[cache_key]
-                del self.cache_timestamps[cache_key]
+    def _set_cached_result(self, cache_key: Tuple, result, tags=()):
+        """设置缓存结果
 
-        return None
-
-    def _set_cached_result(self, cache_key: str, result):
-        """设置缓存结果"""
+        Args:
+            cache_key: 缓存键
+            result: 查询结果
+            tags: 结果依赖的标签，相关写入发生时结果失效
+        """
         if not self.enable_cache:
             return
-
-        self.query_cache[cache_key] = result
-        self.cache_timestamps[cache_key] = datetime.now().timestamp()
-        logger.debug(f"Cached result for key: {cache_key[:8]}...")
+        self.query_cache.set(cache_key, result, tags)
 
     def clear_cache(self):
         """清空缓存"""
         self.query_cache.clear()
-        self.cache_timestamps.clear()
         logger.info("Query cache cleared")
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取查询缓存统计（命中率、条目数、近似内存占用）"""
+        return {"enabled": self.enable_cache, **self.query_cache.get_stats()}
+
     async def retrieve_entity(self, entity_id: str) -> Optional[MemoryEntity]:
         """检索实体"""
         # 检查缓存
@@ -1138,13 +1478,76 @@ class StructuredStore:
             # 缓存结果
             if self.enable_cache and entity is not None:
                 cache_key = self._get_cache_key("retrieve_entity", entity_id)
-                self._set_cached_result(cache_key, entity)
+                self._set_cached_result(
+                    cache_key, entity, self._entity_cache_tags(entity)
+                )
 
             return entity
         except Exception as e:
             logger.error(f"Failed to retrieve entity {entity_id}: {e}")
             return None
 
+    async def retrieve_entities(self, entity_ids: List[str]) -> Dict[str, MemoryEntity]:
+        """批量检索实体
+
+        先查查询缓存，未命中的ID用 IN (...) 查询一次性取回。
+
+        Args:
+            entity_ids: 实体ID列表
+
+        Returns:
+            {entity_id: 实体}，不存在的ID不包含在结果中
+        """
+        found: Dict[str, MemoryEntity] = {}
+        missing = []
+        for entity_id in dict.fromkeys(entity_ids):
+            cached = None
+            if self.enable_cache:
+                cached = self._get_cached_result(
+                    self._get_cache_key("retrieve_entity", entity_id)
+                )
+            if cached is not None:
+                found[entity_id] = cached
+            else:
+                missing.append(entity_id)
+
+        if not missing:
+            return found
+
+        def retrieve():
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            rows = []
+            # SQLite默认最多999个绑定参数
+            for start in range(0, len(missing), 900):
+                chunk = missing[start : start + 900]
+                placeholders = ",".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT * FROM memory_entities WHERE id IN ({placeholders})",
+                    chunk,
+                )
+                rows.extend(cursor.fetchall())
+            conn.close()
+            return [self._row_to_entity(row) for row in rows]
+
+        try:
+            loop = asyncio.get_event_loop()
+            entities = await loop.run_in_executor(self.executor, retrieve)
+        except Exception as e:
+            logger.error(f"Failed to retrieve entities: {e}")
+            return found
+
+        for entity in entities:
+            found[entity.id] = entity
+            if self.enable_cache:
+                self._set_cached_result(
+                    self._get_cache_key("retrieve_entity", entity.id),
+                    entity,
+                    self._entity_cache_tags(entity),
+                )
+
+        return found
+
     async def retrieve_entities_by_type(
         self, session_id: str, entity_type: MemoryEntityType, limit: int = 100
     ) -> List[MemoryEntity]:
@@ -1201,7 +1604,12 @@ class StructuredStore:
                 cache_key = self._get_cache_key(
                     "retrieve_entities_by_type", session_id, entity_type.value, limit
                 )
-                self._set_cached_result(cache_key, entities)
+                tags = [
+                    ("type", session_id, entity_type.value),
+                    ("session", session_id),
+                ]
+                tags.extend(("entity", entity.id) for entity in entities)
+                self._set_cached_result(cache_key, entities, tags)
 
             return entities
         except Exception as e:
@@ -1253,26 +1661,14 @@ class StructuredStore:
     def _invalidate_entity_cache(
         self, entity_id: str, session_id: str, entity_type: MemoryEntityType
     ):
-        """使实体相关缓存失效"""
-        # 清除实体检索缓存
-        entity_cache_key = self._get_cache_key("retrieve_entity", entity_id)
-        if entity_cache_key in self.query_cache:
-            del self.query_cache[entity_cache_key]
-            del self.cache_timestamps[entity_cache_key]
-
-        # 清除按类型检索缓存
-        type_cache_key = self._get_cache_key(
-            "retrieve_entities_by_type", session_id, entity_type.value, 100
-        )
-        if type_cache_key in self.query_cache:
-            del self.query_cache[type_cache_key]
-            del self.cache_timestamps[type_cache_key]
+        """使实体相关缓存失效
 
-        # 清除会话统计缓存
-        stats_cache_key = self._get_cache_key("get_session_stats", session_id)
-        if stats_cache_key in self.query_cache:
-            del self.query_cache[stats_cache_key]
-            del self.cache_timestamps[stats_cache_key]
+        包含该实体的结果都带有实体标签；按类型检索的结果还带有类型标签，
+        新写入的实体可能出现在其中。
+        """
+        self.query_cache.invalidate(
+            ("entity", entity_id), ("type", session_id, entity_type.value)
+        )
 
     async def cleanup_old_sessions(self, days_old: int = 30):
         """清理旧会话"""
@@ -1283,31 +1679,38 @@ class StructuredStore:
 
             cutoff_date = (datetime.now() - timedelta(days=days_old)).isoformat()
 
-            # 标记旧会话实体为不活跃
             cursor.execute(
                 """
-                UPDATE memory_entities
-                SET is_active = 0
-                WHERE session_id IN (
-                    SELECT DISTINCT session_id
-                    FROM memory_entities
-                    WHERE created_at < ?
-                    GROUP BY session_id
-                    HAVING MAX(created_at) < ?
-                )
+                SELECT session_id
+                FROM memory_entities
+                GROUP BY session_id
+                HAVING MAX(created_at) < ?
             """,
-                (cutoff_date, cutoff_date),
+                (cutoff_date,),
+            )
+            session_ids = [row[0] for row in cursor.fetchall()]
+
+            # 标记旧会话实体为不活跃
+            cursor.executemany(
+                "UPDATE memory_entities SET is_active = 0 WHERE session_id = ?",
+                [(session_id,) for session_id in session_ids],
             )
 
             logger.info(f"Marked old sessions (older than {days_old} days) as inactive")
 
             conn.commit()
             conn.close()
-            return True
+            return session_ids
 
         try:
             loop = asyncio.get_event_loop()
-            await loop.run_in_executor(self.executor, cleanup)
+            session_ids = await loop.run_in_executor(self.executor, cleanup)
+
+            # 会话级写入：使带会话标签的缓存结果失效
+            if session_ids and self.enable_cache:
+                self.query_cache.invalidate(
+                    *(("session", session_id) for session_id in session_ids)
+                )
             return True
         except Exception as e:
             logger.error(f"Failed to cleanup old sessions: {e}")
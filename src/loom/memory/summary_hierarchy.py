@@ -0,0 +1,245 @@
+"""
+分层滚动摘要 (SummaryHierarchy)
+
+将会话记忆组织成固定形状的摘要树，避免摘要成本随战役长度增长：
+1. 叶子节点：固定窗口（leaf_size个实体）的摘要
+2. 上层节点：每fanout个下层摘要汇总为一个章节/篇章摘要
+3. 新增或修改实体只会把所在叶子及其祖先标记为脏，
+   刷新时自底向上只重算脏节点，每轮的摘要调用次数不超过层数
+
+节点位置由(层级, 序号)确定，父节点为(层级+1, 序号 // fanout)，
+因此无需保存子节点列表，节点可以直接持久化和恢复。
+"""
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 摘要函数：输入(层级, 下层文本列表)，返回该节点的摘要文本
+LevelSummarizer = Callable[[int, List[str]], Awaitable[str]]
+
+
+@dataclass
+class SummaryNode:
+    """摘要树节点"""
+
+    session_id: str
+    level: int  # 0为叶子
+    position: int
+    summary_text: str = ""
+    items: Dict[str, str] = field(default_factory=dict)  # 叶子: 实体ID -> 实体文本
+    coverage_start: str = ""
+    coverage_end: str = ""
+    version: int = 0
+    dirty: bool = True
+
+    @property
+    def id(self) -> str:
+        return f"{self.session_id}:L{self.level}:{self.position}"
+
+    def extend_coverage(self, start: str, end: str):
+        """扩展覆盖时间段（ISO格式字符串可直接比较）"""
+        if start and (not self.coverage_start or start < self.coverage_start):
+            self.coverage_start = start
+        if end and (not self.coverage_end or end > self.coverage_end):
+            self.coverage_end = end
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"id": self.id, **asdict(self)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SummaryNode":
+        """从字典创建"""
+        fields = {key: value for key, value in data.items() if key != "id"}
+        return cls(**fields)
+
+
+class SummaryHierarchy:
+    """会话的分层摘要树"""
+
+    def __init__(
+        self, session_id: str, leaf_size: int = 20, fanout: int = 5, levels: int = 3
+    ):
+        """初始化摘要树
+
+        Args:
+            session_id: 会话ID
+            leaf_size: 每个叶子窗口包含的实体数
+            fanout: 每个上层节点汇总的下层节点数
+            levels: 层数（含叶子层）
+        """
+        self.session_id = session_id
+        self.leaf_size = max(1, leaf_size)
+        self.fanout = max(2, fanout)
+        self.levels = max(1, levels)
+
+        self.nodes: Dict[Tuple[int, int], SummaryNode] = {}
+        self._entity_leaf: Dict[str, int] = {}
+        self._leaf_count = 0
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def _node(self, level: int, position: int) -> SummaryNode:
+        node = self.nodes.get((level, position))
+        if node is None:
+            node = SummaryNode(self.session_id, level, position)
+            self.nodes[(level, position)] = node
+        return node
+
+    def _mark_dirty(self, level: int, position: int, start: str, end: str):
+        """标记节点及其所有祖先为脏"""
+        while level < self.levels:
+            node = self._node(level, position)
+            node.dirty = True
+            node.extend_coverage(start, end)
+            level += 1
+            position //= self.fanout
+
+    def add_entity(self, entity_id: str, text: str, timestamp: str = "") -> int:
+        """添加或更新实体
+
+        已存在的实体更新其所在叶子，新实体追加到最后一个叶子窗口。
+
+        Returns:
+            实体所在叶子的序号
+        """
+        position = self._entity_leaf.get(entity_id)
+        if position is None:
+            position = max(0, self._leaf_count - 1)
+            if (
+                self._leaf_count == 0
+                or len(self._node(0, position).items) >= self.leaf_size
+            ):
+                position = self._leaf_count
+                self._leaf_count += 1
+            self._entity_leaf[entity_id] = position
+
+        self._node(0, position).items[entity_id] = text
+        self._mark_dirty(0, position, timestamp, timestamp)
+        return position
+
+    def remove_entity(self, entity_id: str) -> bool:
+        """移除实体（如实体已删除），所在叶子及其祖先需要重算"""
+        position = self._entity_leaf.pop(entity_id, None)
+        if position is None:
+            return False
+
+        leaf = self.nodes.get((0, position))
+        if leaf is not None:
+            leaf.items.pop(entity_id, None)
+        self._mark_dirty(0, position, "", "")
+        return True
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._entity_leaf
+
+    @property
+    def entity_ids(self) -> List[str]:
+        """树中包含的全部实体ID"""
+        return list(self._entity_leaf)
+
+    def dirty_nodes(self) -> List[SummaryNode]:
+        """按层级自底向上返回脏节点"""
+        return sorted(
+            (node for node in self.nodes.values() if node.dirty),
+            key=lambda node: (node.level, node.position),
+        )
+
+    def children(self, node: SummaryNode) -> List[SummaryNode]:
+        """获取上层节点的子节点（按顺序）"""
+        if node.level == 0:
+            return []
+        first = node.position * self.fanout
+        return [
+            self.nodes[(node.level - 1, position)]
+            for position in range(first, first + self.fanout)
+            if (node.level - 1, position) in self.nodes
+        ]
+
+    async def refresh(self, summarize: LevelSummarizer) -> List[SummaryNode]:
+        """自底向上重算脏节点
+
+        Args:
+            summarize: 摘要函数
+
+        Returns:
+            本次重算的节点
+        """
+        refreshed = []
+        for node in self.dirty_nodes():
+            if node.level == 0:
+                inputs = list(node.items.values())
+            else:
+                inputs = [
+                    child.summary_text
+                    for child in self.children(node)
+                    if child.summary_text
+                ]
+
+            # 子节点全部清空（实体都已删除）时节点摘要也清空
+            node.summary_text = await summarize(node.level, inputs) if inputs else ""
+            node.version += 1
+            node.dirty = False
+            refreshed.append(node)
+
+        if refreshed:
+            logger.debug(
+                f"Refreshed {len(refreshed)} summary nodes for session {self.session_id}"
+            )
+        return refreshed
+
+    def top_nodes(self) -> List[SummaryNode]:
+        """最上层节点（按时间顺序），它们共同覆盖整个会话"""
+        top = self.levels - 1
+        return sorted(
+            (node for (level, _), node in self.nodes.items() if level == top),
+            key=lambda node: node.position,
+        )
+
+    def render(self, max_nodes: Optional[int] = None) -> str:
+        """拼接最上层摘要作为会话整体摘要
+
+        Args:
+            max_nodes: 最多拼接的最上层节点数（取最近的），默认为fanout，
+                使实体数超过树容量后输出长度仍有上界
+        """
+        max_nodes = self.fanout if max_nodes is None else max_nodes
+        texts = [node.summary_text for node in self.top_nodes() if node.summary_text]
+        return "\n\n".join(texts[-max_nodes:] if max_nodes > 0 else [])
+
+    def coverage_period(self, max_nodes: Optional[int] = None) -> Dict[str, str]:
+        """render输出覆盖的时间段"""
+        max_nodes = self.fanout if max_nodes is None else max_nodes
+        top = [node for node in self.top_nodes() if node.summary_text]
+        top = top[-max_nodes:] if max_nodes > 0 else []
+        if not top:
+            return {"start": "", "end": ""}
+        starts = [node.coverage_start for node in top if node.coverage_start]
+        ends = [node.coverage_end for node in top if node.coverage_end]
+        return {"start": min(starts, default=""), "end": max(ends, default="")}
+
+    def load(self, records: List[Dict[str, Any]]):
+        """从持久化记录恢复"""
+        self.nodes.clear()
+        self._entity_leaf.clear()
+        for record in records:
+            node = SummaryNode.from_dict(record)
+            if node.level >= self.levels:
+                continue
+            self.nodes[(node.level, node.position)] = node
+            if node.level == 0:
+                for entity_id in node.items:
+                    self._entity_leaf[entity_id] = node.position
+
+        leaves = [position for level, position in self.nodes if level == 0]
+        self._leaf_count = max(leaves) + 1 if leaves else 0
+
+    def to_records(self, nodes: Optional[List[SummaryNode]] = None) -> List[Dict]:
+        """导出节点记录（默认全部节点）"""
+        nodes = self.nodes.values() if nodes is None else nodes
+        return [node.to_dict() for node in nodes]
@@ -0,0 +1,210 @@
+"""
+时间区间冲突检测 (Temporal Intervals)
+
+把事件视为时间区间 [start, end)，查找同一参与者在时间上重叠的事件：
+1. 批量检测：按开始时间排序后扫描，每个参与者维护按结束时间排序的活动堆，
+   复杂度 O(n log n + k)，k为冲突对数
+2. 增量检测：TemporalIntervalIndex 按参与者维护按开始时间排序的区间，
+   利用该参与者的最大区间长度把候选限制在 [start - max_len, end) 内，
+   新增单个事件时只需 O(log n + 候选数)
+
+区间来源：实体内容中的 start_time/time/timestamp 与 end_time/duration_hours，
+缺省以 created_at 为开始时间、default_duration 为长度。
+只有事件实体或内容中带显式时间的实体才构建区间，
+角色、事实等实体的创建时间不代表参与者在该时段的活动。
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from ..utils.logging_config import get_logger
+from .world_memory import MemoryEntity, MemoryEntityType
+
+logger = get_logger(__name__)
+
+# 内容中表示参与者的字段
+SUBJECT_FIELDS = ("participants", "characters", "character_id")
+
+
+@dataclass(frozen=True)
+class TemporalInterval:
+    """事件时间区间"""
+
+    entity_id: str
+    start: datetime
+    end: datetime
+    subjects: FrozenSet[str]
+    location: Optional[str] = None
+
+    def overlaps(self, other: "TemporalInterval") -> bool:
+        return self.start < other.end and other.start < self.end
+
+
+def _parse_time(value) -> Optional[datetime]:
+    """解析时间，带时区的时间转换为本地无时区时间（与created_at一致）"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def interval_from_entity(
+    entity: MemoryEntity, default_duration: timedelta = timedelta(hours=1)
+) -> Optional[TemporalInterval]:
+    """由实体构建时间区间
+
+    没有参与者、或既不是事件也没有显式开始时间的实体返回None
+    """
+    content = entity.content
+    if not isinstance(content, dict):
+        return None
+
+    explicit_start = None
+    for key in ("start_time", "time", "timestamp"):
+        explicit_start = _parse_time(content.get(key))
+        if explicit_start is not None:
+            break
+    if explicit_start is None and entity.type != MemoryEntityType.EVENT:
+        return None
+
+    subjects = set()
+    for key in SUBJECT_FIELDS:
+        value = content.get(key)
+        if isinstance(value, str) and value:
+            subjects.add(value)
+        elif isinstance(value, (list, tuple, set)):
+            subjects.update(str(item) for item in value if item)
+    if not subjects:
+        return None
+
+    start = explicit_start if explicit_start is not None else entity.created_at
+
+    end = _parse_time(content.get("end_time"))
+    if end is None:
+        try:
+            end = start + timedelta(hours=float(content["duration_hours"]))
+        except (KeyError, TypeError, ValueError):
+            end = start + default_duration
+    if end <= start:
+        end = start + default_duration
+
+    location = content.get("location")
+    return TemporalInterval(
+        entity_id=entity.id,
+        start=start,
+        end=end,
+        subjects=frozenset(subjects),
+        location=str(location) if location else None,
+    )
+
+
+def find_overlapping_pairs(
+    intervals: Iterable[TemporalInterval],
+) -> List[Tuple[TemporalInterval, TemporalInterval, str]]:
+    """扫描线查找共享参与者且时间重叠的区间对
+
+    Returns:
+        (较早区间, 较晚区间, 共享参与者) 列表，同一对区间只报告一次
+    """
+    ordered = sorted(intervals, key=lambda i: (i.start, i.entity_id))
+    # 参与者 -> [(end, 序号, 区间)]
+    active: Dict[str, List[Tuple[datetime, int, TemporalInterval]]] = {}
+    reported = set()
+    pairs = []
+
+    for order, interval in enumerate(ordered):
+        for subject in sorted(interval.subjects):
+            heap = active.setdefault(subject, [])
+            # 移除已结束的区间
+            while heap and heap[0][0] <= interval.start:
+                heapq.heappop(heap)
+
+            for _, _, other in heap:
+                key = (other.entity_id, interval.entity_id)
+                if key not in reported:
+                    reported.add(key)
+                    pairs.append((other, interval, subject))
+            heapq.heappush(heap, (interval.end, order, interval))
+
+    return pairs
+
+
+class TemporalIntervalIndex:
+    """按参与者组织的区间索引，支持增量冲突查询"""
+
+    def __init__(self):
+        # 参与者 -> 按 (start, entity_id) 排序的键
+        self._starts: Dict[str, List[Tuple[datetime, str]]] = {}
+        # 参与者 -> 区间最大长度（只增不减，删除后仍是有效上界）
+        self._max_length: Dict[str, timedelta] = {}
+        self._intervals: Dict[str, TemporalInterval] = {}
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._intervals
+
+    def add(self, interval: TemporalInterval):
+        """添加或替换区间"""
+        self.remove(interval.entity_id)
+        self._intervals[interval.entity_id] = interval
+        length = interval.end - interval.start
+        for subject in interval.subjects:
+            insort(
+                self._starts.setdefault(subject, []),
+                (interval.start, interval.entity_id),
+            )
+            if length > self._max_length.get(subject, timedelta(0)):
+                self._max_length[subject] = length
+
+    def remove(self, entity_id: str) -> bool:
+        """删除区间"""
+        interval = self._intervals.pop(entity_id, None)
+        if interval is None:
+            return False
+
+        key = (interval.start, entity_id)
+        for subject in interval.subjects:
+            starts = self._starts.get(subject, [])
+            index = bisect_left(starts, key)
+            if index < len(starts) and starts[index] == key:
+                del starts[index]
+            if not starts:
+                self._starts.pop(subject, None)
+                self._max_length.pop(subject, None)
+        return True
+
+    def overlapping(
+        self, interval: TemporalInterval
+    ) -> List[Tuple[TemporalInterval, str]]:
+        """查找与区间共享参与者且时间重叠的已索引区间
+
+        Returns:
+            (已索引区间, 共享参与者) 列表，按开始时间排序
+        """
+        found: Dict[str, Tuple[TemporalInterval, str]] = {}
+        for subject in sorted(interval.subjects):
+            starts = self._starts.get(subject)
+            if not starts:
+                continue
+            # 开始时间早于 start - max_len 的区间不可能延续到start之后
+            low = bisect_left(starts, (interval.start - self._max_length[subject], ""))
+            high = bisect_right(starts, (interval.end, ""))
+            for _, entity_id in starts[low:high]:
+                if entity_id == interval.entity_id or entity_id in found:
+                    continue
+                other = self._intervals[entity_id]
+                if other.overlaps(interval):
+                    found[entity_id] = (other, subject)
+
+        return sorted(found.values(), key=lambda item: item[0].start)
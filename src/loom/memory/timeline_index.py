@@ -0,0 +1,120 @@
+"""
+时间线索引 (TimelineIndex)
+
+按创建时间排序维护会话内实体，支持二分查找的时间范围查询：
+1. 有序数组 (created_at, entity_id)，范围查询 O(log n + k)
+2. 实体增删改时增量维护，无需每次全量查询后排序
+3. 时间线事件按实体版本缓存，摘要和重要性只在版本变化时重新计算
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.logging_config import get_logger
+from .world_memory import MemoryEntity
+
+logger = get_logger(__name__)
+
+
+class TimelineIndex:
+    """时间线索引"""
+
+    def __init__(self):
+        self._keys: List[Tuple[datetime, str]] = []
+        self._entities: Dict[str, MemoryEntity] = {}
+        # entity_id -> (version, 事件)
+        self._events: Dict[str, Tuple[int, Any]] = {}
+        self.loaded = False
+        self.stats = {"event_hits": 0, "event_builds": 0}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._entities
+
+    def load(self, entities: Iterable[MemoryEntity]):
+        """用完整的实体集合重建索引"""
+        self._entities = {entity.id: entity for entity in entities}
+        self._keys = sorted(
+            (entity.created_at, entity.id) for entity in self._entities.values()
+        )
+        self._events.clear()
+        self.loaded = True
+        logger.debug(f"TimelineIndex loaded {len(self._keys)} entities")
+
+    def add(self, entity: MemoryEntity):
+        """添加或更新实体"""
+        previous = self._entities.get(entity.id)
+        if previous is not None and previous.created_at != entity.created_at:
+            self._remove_key(previous.created_at, entity.id)
+        if previous is None or previous.created_at != entity.created_at:
+            insort(self._keys, (entity.created_at, entity.id))
+        if previous is not entity:
+            # 同版本号的新对象（如重新写入）也需要重建事件
+            self._events.pop(entity.id, None)
+        self._entities[entity.id] = entity
+
+    def remove(self, entity_id: str) -> bool:
+        """删除实体"""
+        entity = self._entities.pop(entity_id, None)
+        if entity is None:
+            return False
+        self._remove_key(entity.created_at, entity_id)
+        self._events.pop(entity_id, None)
+        return True
+
+    def _remove_key(self, timestamp: datetime, entity_id: str):
+        index = bisect_left(self._keys, (timestamp, entity_id))
+        if index < len(self._keys) and self._keys[index] == (timestamp, entity_id):
+            del self._keys[index]
+
+    def range(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[MemoryEntity]:
+        """按时间顺序返回 [start_time, end_time] 内的实体"""
+        low = 0 if start_time is None else bisect_left(self._keys, (start_time, ""))
+        if end_time is None:
+            high = len(self._keys)
+        else:
+            # 所有ID都大于空串，用 (end_time, 最大字符) 作为上界
+            high = bisect_right(self._keys, (end_time, "\U0010ffff"))
+        if limit is not None:
+            high = min(high, low + max(0, limit))
+        return [self._entities[entity_id] for _, entity_id in self._keys[low:high]]
+
+    def events(
+        self,
+        build_event: Callable[[MemoryEntity], Any],
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        """返回时间范围内的时间线事件
+
+        Args:
+            build_event: 由实体构建事件的函数，结果按实体版本缓存
+            start_time: 开始时间
+            end_time: 结束时间
+            limit: 最多返回数量
+
+        Returns:
+            按时间排序的事件列表
+        """
+        events = []
+        for entity in self.range(start_time, end_time, limit):
+            cached = self._events.get(entity.id)
+            if cached is not None and cached[0] == entity.version:
+                self.stats["event_hits"] += 1
+                events.append(cached[1])
+                continue
+
+            event = build_event(entity)
+            self._events[entity.id] = (entity.version, event)
+            self.stats["event_builds"] += 1
+            events.append(event)
+        return events
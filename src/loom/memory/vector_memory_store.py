@@ -13,15 +13,19 @@
 """
 
 import asyncio
-import hashlib
 import json
+import threading
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from ..utils.logging_config import get_logger
+from .embedding_cache import EmbeddingCache
+from .embedding_worker import EmbeddingWorkerPool
 from .interfaces import RetrievalError, StorageError
+from .quantization import QuantizedVectorIndex
 from .world_memory import MemoryEntity, MemoryEntityType, MemoryRelation
 
 logger = get_logger(__name__)
@@ -58,11 +62,37 @@ class VectorStoreConfig:
     qdrant_url: Optional[str] = None
     qdrant_api_key: Optional[str] = None
 
+    # FAISS配置
+    faiss_index_type: str = "flat"  # flat, ivf, hnsw
+    faiss_metric: str = "cosine"  # cosine（归一化+内积）, l2
+    faiss_nlist: int = 1024  # IVF聚类中心数量
+    faiss_nprobe: int = 16  # IVF搜索时探查的聚类数量
+    faiss_min_train_size: Optional[int] = None  # 训练所需最少向量数，IVF默认 39 * nlist
+    faiss_hnsw_m: int = 32  # HNSW每个节点的邻居数
+    faiss_hnsw_ef_construction: int = 200
+    faiss_hnsw_ef_search: int = 64
+    faiss_index_path: Optional[str] = None  # 默认 persist_directory/collection_name.faiss
+    faiss_persist_on_write: bool = False  # 每次写入后立即持久化
+
     # 性能配置
     batch_size: int = 100
     cache_embeddings: bool = True
+    embedding_cache_size: int = 10000  # 内存层LRU上限
+    persist_embedding_cache: bool = False  # 是否启用SQLite磁盘层
+    embedding_cache_path: Optional[
+        str
+    ] = None  # 默认 persist_directory/embedding_cache.db
+    embedding_cache_max_disk_entries: int = 200000
+    embedding_max_batch_wait_ms: float = 5.0  # 合并并发嵌入请求的等待窗口
+    embedding_queue_size: int = 1024  # 嵌入请求队列上限
+    embedding_workers: int = 1  # 嵌入推理线程数
     similarity_threshold: float = 0.7
 
+    # 量化配置（内存后端的常驻量化索引，FAISS后端的标量量化索引）
+    vector_quantization: str = "none"  # none, float16, int8
+    # >0 时用float32嵌入重排前k个候选（从嵌入缓存取回，持久化时为SQLite磁盘层）
+    quantization_rerank_k: int = 0
+
     # 高级功能
     enable_metadata_indexing: bool = True
     enable_hybrid_search: bool = False  # 混合搜索（向量+关键词）
@@ -128,7 +158,15 @@ class VectorMemoryStore:
 
         # 嵌入模型
         self.embedding_model = None
-        self.embedding_cache: Dict[str, List[float]] = {}
+        self._embedding_model_lock = threading.Lock()
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        self.embedding_worker = EmbeddingWorkerPool(
+            self._encode_batch,
+            max_batch_size=self.config.batch_size,
+            max_wait_ms=self.config.embedding_max_batch_wait_ms,
+            max_queue_size=self.config.embedding_queue_size,
+            num_workers=self.config.embedding_workers,
+        )
 
         # 向量数据库客户端
         self.client = None
@@ -137,9 +175,33 @@ class VectorMemoryStore:
         # 初始化
         if self.enabled:
             self._initialize()
+            if self.config.cache_embeddings:
+                self._initialize_embedding_cache()
         else:
             logger.info("VectorMemoryStore disabled")
 
+    def _initialize_embedding_cache(self):
+        """初始化嵌入缓存（内存LRU + 可选SQLite磁盘层）"""
+        db_path = None
+        if self.config.persist_embedding_cache:
+            db_path = self.config.embedding_cache_path or str(
+                Path(self.config.persist_directory) / "embedding_cache.db"
+            )
+
+        try:
+            self.embedding_cache = EmbeddingCache(
+                model_name=f"{self.config.embedding_provider}:{self.config.embedding_model}",
+                max_memory_entries=self.config.embedding_cache_size,
+                db_path=db_path,
+                max_disk_entries=self.config.embedding_cache_max_disk_entries,
+            )
+        except Exception as e:
+            logger.warning(f"Persistent embedding cache unavailable: {e}")
+            self.embedding_cache = EmbeddingCache(
+                model_name=f"{self.config.embedding_provider}:{self.config.embedding_model}",
+                max_memory_entries=self.config.embedding_cache_size,
+            )
+
     def _initialize(self):
         """初始化向量存储后端"""
         try:
@@ -237,43 +299,484 @@ class VectorMemoryStore:
             )
 
     def _initialize_faiss(self):
-        """初始化FAISS"""
+        """初始化FAISS
+
+        Flat/HNSW索引外层包裹 IndexIDMap2，IVF索引使用原生ID及哈希直接映射；
+        实体ID映射为自增的 int64 ID，从而支持 remove_ids 删除和按ID重建向量。
+        设置 vector_quantization 时使用对应的标量量化（SQ）索引。
+        """
         try:
             import faiss
-
-            # FAISS初始化逻辑
-            self.index = faiss.IndexFlatL2(self.config.embedding_dimension)
-            self.id_to_index = {}
-            self.index_to_id = {}
-            logger.info("Initialized FAISS index")
         except ImportError:
             raise ImportError(
                 "faiss not installed. Install with: pip install faiss-cpu"
             )
 
+        self.id_to_index: Dict[str, int] = {}
+        self.index_to_id: Dict[int, str] = {}
+        self.faiss_metadata: Dict[str, Dict[str, Any]] = {}
+        # 启用重排时保存实体文本，用于从嵌入缓存取回float32嵌入
+        self.faiss_texts: Dict[str, str] = {}
+        self._faiss_rerank = (
+            self._faiss_scalar_quantizer_type() is not None
+            and self.config.quantization_rerank_k > 0
+        )
+        self._faiss_next_id = 0
+        # 索引训练前暂存的向量 {faiss_id: vector}
+        self._faiss_pending: Dict[int, Any] = {}
+        # 无法物理删除（如HNSW）而仅做逻辑删除的向量数量
+        self._faiss_stale_count = 0
+
+        index_path = self._get_faiss_index_path()
+        if index_path.exists():
+            self._load_faiss_index(index_path)
+        else:
+            self.index = self._build_faiss_index()
+            logger.info(
+                f"Initialized FAISS index (type={self.config.faiss_index_type}, "
+                f"metric={self.config.faiss_metric})"
+            )
+
+    def _get_faiss_index_path(self) -> Path:
+        """获取FAISS索引文件路径"""
+        if self.config.faiss_index_path:
+            return Path(self.config.faiss_index_path)
+        return (
+            Path(self.config.persist_directory) / f"{self.config.collection_name}.faiss"
+        )
+
+    def _faiss_scalar_quantizer_type(self):
+        """vector_quantization对应的FAISS标量量化类型，未启用时返回None"""
+        import faiss
+
+        quantization = self.config.vector_quantization
+        if quantization in ("none", "float32"):
+            return None
+        if quantization == "float16":
+            return faiss.ScalarQuantizer.QT_fp16
+        if quantization == "int8":
+            return faiss.ScalarQuantizer.QT_8bit
+        raise ValueError(f"Unsupported vector quantization: {quantization}")
+
+    def _build_faiss_index(self):
+        """根据配置构建FAISS索引"""
+        import faiss
+
+        dimension = self.config.embedding_dimension
+        metric = (
+            faiss.METRIC_INNER_PRODUCT
+            if self.config.faiss_metric == "cosine"
+            else faiss.METRIC_L2
+        )
+        index_type = self.config.faiss_index_type.lower()
+        qtype = self._faiss_scalar_quantizer_type()
+
+        if index_type == "ivf":
+            if metric == faiss.METRIC_INNER_PRODUCT:
+                quantizer = faiss.IndexFlatIP(dimension)
+            else:
+                quantizer = faiss.IndexFlatL2(dimension)
+            if qtype is None:
+                base_index = faiss.IndexIVFFlat(
+                    quantizer, dimension, self.config.faiss_nlist, metric
+                )
+            else:
+                base_index = faiss.IndexIVFScalarQuantizer(
+                    quantizer, dimension, self.config.faiss_nlist, qtype, metric
+                )
+            base_index.nprobe = self.config.faiss_nprobe
+            # IVF原生支持自定义ID；IndexIDMap2会破坏IVF的删除语义，
+            # 这里改用哈希直接映射以支持按ID删除和重建
+            base_index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return base_index
+        elif index_type == "hnsw":
+            if qtype is None:
+                base_index = faiss.IndexHNSWFlat(
+                    dimension, self.config.faiss_hnsw_m, metric
+                )
+            else:
+                base_index = faiss.IndexHNSWSQ(
+                    dimension, qtype, self.config.faiss_hnsw_m, metric
+                )
+            base_index.hnsw.efConstruction = self.config.faiss_hnsw_ef_construction
+            base_index.hnsw.efSearch = self.config.faiss_hnsw_ef_search
+        elif index_type == "flat":
+            if qtype is not None:
+                base_index = faiss.IndexScalarQuantizer(dimension, qtype, metric)
+            elif metric == faiss.METRIC_INNER_PRODUCT:
+                base_index = faiss.IndexFlatIP(dimension)
+            else:
+                base_index = faiss.IndexFlatL2(dimension)
+        else:
+            raise ValueError(f"Unsupported FAISS index type: {index_type}")
+
+        return faiss.IndexIDMap2(base_index)
+
+    def _prepare_faiss_vectors(self, embeddings: List[List[float]]):
+        """转换为float32矩阵，余弦度量时做L2归一化"""
+        import numpy as np
+
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(
+            -1, self.config.embedding_dimension
+        )
+        if self.config.faiss_metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def _faiss_min_train_size(self) -> int:
+        """索引训练所需的最少向量数
+
+        IVF索引需要训练聚类中心；其他索引仅int8标量量化需要训练取值范围。
+        """
+        if self.config.faiss_index_type.lower() != "ivf":
+            if self.config.faiss_min_train_size is not None:
+                return max(self.config.faiss_min_train_size, 1)
+            return 256
+        if self.config.faiss_min_train_size is not None:
+            return max(self.config.faiss_min_train_size, self.config.faiss_nlist)
+        return self.config.faiss_nlist * 39
+
+    def _faiss_add(
+        self,
+        entity_ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        texts: Optional[List[str]] = None,
+    ):
+        """批量写入FAISS索引（已存在的实体会被替换）"""
+        import numpy as np
+
+        self._faiss_remove(
+            [entity_id for entity_id in entity_ids if entity_id in self.id_to_index]
+        )
+
+        vectors = self._prepare_faiss_vectors(embeddings)
+        faiss_ids = np.arange(
+            self._faiss_next_id, self._faiss_next_id + len(entity_ids), dtype=np.int64
+        )
+        self._faiss_next_id += len(entity_ids)
+
+        for entity_id, faiss_id, metadata in zip(entity_ids, faiss_ids, metadatas):
+            self.id_to_index[entity_id] = int(faiss_id)
+            self.index_to_id[int(faiss_id)] = entity_id
+            self.faiss_metadata[entity_id] = metadata
+        if self._faiss_rerank and texts is not None:
+            self.faiss_texts.update(zip(entity_ids, texts))
+
+        if self.index.is_trained:
+            self.index.add_with_ids(vectors, faiss_ids)
+            return
+
+        # 索引未训练（IVF或int8标量量化）：先暂存，攒够样本后训练并一次性写入
+        for faiss_id, vector in zip(faiss_ids, vectors):
+            self._faiss_pending[int(faiss_id)] = vector
+
+        if len(self._faiss_pending) >= self._faiss_min_train_size():
+            pending_ids = np.fromiter(self._faiss_pending.keys(), dtype=np.int64)
+            pending_vectors = np.stack(list(self._faiss_pending.values()))
+            self.index.train(pending_vectors)
+            self.index.add_with_ids(pending_vectors, pending_ids)
+            self._faiss_pending.clear()
+            logger.info(f"Trained FAISS index on {len(pending_ids)} vectors")
+
+    def _faiss_remove(self, entity_ids: List[str]):
+        """从FAISS索引中删除实体"""
+        import numpy as np
+
+        faiss_ids = []
+        for entity_id in entity_ids:
+            faiss_id = self.id_to_index.pop(entity_id, None)
+            self.faiss_metadata.pop(entity_id, None)
+            self.faiss_texts.pop(entity_id, None)
+            if faiss_id is None:
+                continue
+            self.index_to_id.pop(faiss_id, None)
+            if self._faiss_pending.pop(faiss_id, None) is None:
+                faiss_ids.append(faiss_id)
+
+        if not faiss_ids:
+            return
+
+        try:
+            self.index.remove_ids(np.asarray(faiss_ids, dtype=np.int64))
+        except RuntimeError:
+            # HNSW等索引不支持物理删除，映射已移除，搜索时会被过滤
+            self._faiss_stale_count += len(faiss_ids)
+
+    def _faiss_search(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]],
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """FAISS相似性搜索"""
+        import numpy as np
+
+        query = self._prepare_faiss_vectors([query_embedding])
+
+        # 有过滤条件或存在逻辑删除时多取一些候选
+        k = limit
+        if filters or self._faiss_stale_count:
+            k = limit * 4 + self._faiss_stale_count
+
+        candidates: List[Tuple[int, float]] = []
+        if self.index.ntotal > 0:
+            distances, faiss_ids = self.index.search(query, min(k, self.index.ntotal))
+            candidates.extend(
+                (int(faiss_id), float(distance))
+                for faiss_id, distance in zip(faiss_ids[0], distances[0])
+                if faiss_id != -1
+            )
+
+        if self._faiss_pending:
+            pending_ids = list(self._faiss_pending.keys())
+            pending_vectors = np.stack(list(self._faiss_pending.values()))
+            if self.config.faiss_metric == "cosine":
+                scores = pending_vectors @ query[0]
+            else:
+                scores = np.sum((pending_vectors - query[0]) ** 2, axis=1)
+            candidates.extend(zip(pending_ids, scores.tolist()))
+
+        results = []
+        for faiss_id, distance in candidates:
+            entity_id = self.index_to_id.get(faiss_id)
+            if entity_id is None:
+                continue
+            if filters and not self._match_filters(
+                self.faiss_metadata.get(entity_id, {}), filters
+            ):
+                continue
+            if self.config.faiss_metric == "cosine":
+                similarity = distance
+            else:
+                similarity = 1.0 / (1.0 + distance)
+            results.append((entity_id, similarity))
+
+        results.sort(key=lambda x: x[1], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _match_filters(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        """简单的等值元数据过滤"""
+        return all(metadata.get(key) == value for key, value in filters.items())
+
+    def _save_faiss_index(self) -> bool:
+        """将FAISS索引及ID映射写入磁盘"""
+        import faiss
+        import numpy as np
+
+        index_path = self._get_faiss_index_path()
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+
+        faiss.write_index(self.index, str(index_path))
+
+        pending_path = index_path.with_suffix(".pending.npy")
+        if self._faiss_pending:
+            np.save(pending_path, np.stack(list(self._faiss_pending.values())))
+        elif pending_path.exists():
+            pending_path.unlink()
+
+        sidecar = {
+            "id_to_index": self.id_to_index,
+            "metadata": self.faiss_metadata,
+            "texts": self.faiss_texts,
+            "next_id": self._faiss_next_id,
+            "pending_ids": list(self._faiss_pending.keys()),
+            "stale_count": self._faiss_stale_count,
+            "embedding_dimension": self.config.embedding_dimension,
+            "metric": self.config.faiss_metric,
+        }
+        with open(index_path.with_suffix(".ids.json"), "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, ensure_ascii=False)
+
+        logger.debug(f"Saved FAISS index with {self.index.ntotal} vectors")
+        return True
+
+    def _load_faiss_index(self, index_path: Path):
+        """从磁盘加载FAISS索引及ID映射"""
+        import faiss
+        import numpy as np
+
+        self.index = faiss.read_index(str(index_path))
+
+        sidecar_path = index_path.with_suffix(".ids.json")
+        if sidecar_path.exists():
+            with open(sidecar_path, "r", encoding="utf-8") as f:
+                sidecar = json.load(f)
+            self.id_to_index = sidecar.get("id_to_index", {})
+            self.index_to_id = {v: k for k, v in self.id_to_index.items()}
+            self.faiss_metadata = sidecar.get("metadata", {})
+            self.faiss_texts = sidecar.get("texts", {})
+            self._faiss_next_id = sidecar.get("next_id", 0)
+            self._faiss_stale_count = sidecar.get("stale_count", 0)
+
+            pending_ids = sidecar.get("pending_ids", [])
+            pending_path = index_path.with_suffix(".pending.npy")
+            if pending_ids and pending_path.exists():
+                pending_vectors = np.load(pending_path)
+                self._faiss_pending = dict(zip(pending_ids, pending_vectors))
+
+        logger.info(
+            f"Loaded FAISS index from {index_path} ({self.index.ntotal} vectors)"
+        )
+
+    async def persist(self) -> bool:
+        """持久化向量索引（目前仅FAISS后端需要显式持久化）
+
+        Returns:
+            是否成功持久化
+        """
+        if not self.enabled or self.config.backend != VectorStoreBackend.FAISS:
+            return False
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self._save_faiss_index)
+        except Exception as e:
+            logger.error(f"Failed to persist FAISS index: {e}")
+            raise StorageError(f"Failed to persist FAISS index: {e}")
+
     def _initialize_memory(self):
         """初始化内存存储（用于测试）"""
         self.memory_store = {}
         self.embeddings = {}
         # 对于内存后端，使用虚拟嵌入模型
         self.embedding_model = "dummy"
+
+        # 启用量化时，向量只保存在紧凑的量化索引中
+        self.quantized_index: Optional[QuantizedVectorIndex] = None
+        if self.config.vector_quantization != "none":
+            self.quantized_index = QuantizedVectorIndex(
+                self.config.embedding_dimension, dtype=self.config.vector_quantization
+            )
         logger.info("Initialized in-memory vector store")
 
+    def _memory_add(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        texts: List[str],
+    ):
+        """写入内存后端（启用量化时向量进入量化索引，不再保留浮点列表）"""
+        if self.quantized_index is not None:
+            self.quantized_index.add(ids, embeddings)
+
+        for entity_id, embedding, metadata, text in zip(
+            ids, embeddings, metadatas, texts
+        ):
+            entry = {"metadata": metadata, "text": text}
+            if self.quantized_index is None:
+                entry["embedding"] = embedding
+            self.memory_store[entity_id] = entry
+
+    async def _quantized_search(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]],
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """在量化向量上搜索，可选用float32嵌入重排候选"""
+        predicate = None
+        if filters:
+
+            def matches(entity_id: str) -> bool:
+                return self._match_filters(
+                    self.memory_store[entity_id]["metadata"], filters
+                )
+
+            predicate = matches
+
+        rerank_k = self.config.quantization_rerank_k
+        candidates = self.quantized_index.search(
+            query_embedding, max(limit, rerank_k), predicate
+        )
+        if rerank_k <= 0 or not candidates:
+            return candidates[:limit]
+
+        entity_ids = [entity_id for entity_id, _ in candidates]
+        texts = [self.memory_store[entity_id]["text"] for entity_id in entity_ids]
+        return await self._rerank_exact(query_embedding, entity_ids, texts, limit)
+
+    async def _faiss_quantized_search(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]],
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """在FAISS标量量化索引上取候选，再用float32嵌入重排"""
+        candidates = self._faiss_search(
+            query_embedding, filters, max(limit, self.config.quantization_rerank_k)
+        )
+        entity_ids = [entity_id for entity_id, _ in candidates]
+        if not entity_ids or any(
+            entity_id not in self.faiss_texts for entity_id in entity_ids
+        ):
+            # 启用重排前写入的实体没有文本，保持量化分数
+            return candidates[:limit]
+
+        texts = [self.faiss_texts[entity_id] for entity_id in entity_ids]
+        return await self._rerank_exact(query_embedding, entity_ids, texts, limit)
+
+    async def _rerank_exact(
+        self,
+        query_embedding: List[float],
+        entity_ids: List[str],
+        texts: List[str],
+        limit: int,
+    ) -> List[Tuple[str, float]]:
+        """用float32嵌入重排候选
+
+        嵌入按文本从嵌入缓存取回（启用persist_embedding_cache时为SQLite磁盘层），
+        未命中时重新编码，不为每个实体常驻一份float32向量。
+        """
+        import numpy as np
+
+        exact = np.asarray(await self.get_embeddings(texts), dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        if (
+            self.config.backend == VectorStoreBackend.FAISS
+            and self.config.faiss_metric != "cosine"
+        ):
+            scores = 1.0 / (1.0 + np.sum((exact - query) ** 2, axis=1))
+        else:
+            exact_norms = np.linalg.norm(exact, axis=1)
+            query_norm = np.linalg.norm(query)
+            denominator = np.where(
+                exact_norms * query_norm > 0, exact_norms * query_norm, 1.0
+            )
+            scores = (exact @ query) / denominator
+
+        reranked = sorted(
+            zip(entity_ids, scores.tolist()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return reranked[:limit]
+
     def _get_embedding_model(self):
         """获取嵌入模型（延迟加载）"""
-        # 对于内存后端，使用虚拟嵌入
+        # 对于内存后端，未显式指定模型时使用虚拟嵌入
         if self.config.backend == VectorStoreBackend.MEMORY:
-            return None
+            return None if self.embedding_model == "dummy" else self.embedding_model
 
         if self.embedding_model is not None:
             return self.embedding_model
 
-        if self.config.embedding_provider == "openai":
-            self.embedding_model = self._create_openai_embedder()
-        elif self.config.embedding_provider == "huggingface":
-            self.embedding_model = self._create_huggingface_embedder()
-        else:  # local
-            self.embedding_model = self._create_local_embedder()
+        # 模型在线程池中加载，避免并发请求重复加载
+        with self._embedding_model_lock:
+            if self.embedding_model is not None:
+                return self.embedding_model
+
+            if self.config.embedding_provider == "openai":
+                self.embedding_model = self._create_openai_embedder()
+            elif self.config.embedding_provider == "huggingface":
+                self.embedding_model = self._create_huggingface_embedder()
+            else:  # local
+                self.embedding_model = self._create_local_embedder()
 
         return self.embedding_model
 
@@ -302,11 +805,12 @@ class VectorMemoryStore:
 
             openai.api_key = self.config.openai_api_key
 
-            def embedder(text):
+            def embedder(texts):
                 response = openai.Embedding.create(
-                    model=self.config.openai_model, input=text
+                    model=self.config.openai_model, input=texts
                 )
-                return response["data"][0]["embedding"]
+                data = sorted(response["data"], key=lambda item: item["index"])
+                return [item["embedding"] for item in data]
 
             logger.info(
                 f"Configured OpenAI embedding model: {self.config.openai_model}"
@@ -329,9 +833,9 @@ class VectorMemoryStore:
             tokenizer = AutoTokenizer.from_pretrained(self.config.embedding_model)
             model = AutoModel.from_pretrained(self.config.embedding_model)
 
-            def embedder(text):
+            def embedder(texts):
                 inputs = tokenizer(
-                    text,
+                    texts,
                     return_tensors="pt",
                     padding=True,
                     truncation=True,
@@ -339,8 +843,11 @@ class VectorMemoryStore:
                 )
                 with torch.no_grad():
                     outputs = model(**inputs)
-                embeddings = outputs.last_hidden_state.mean(dim=1).squeeze()
-                embeddings = F.normalize(embeddings, p=2, dim=0)
+                # 按attention mask做平均池化，忽略padding位置
+                mask = inputs["attention_mask"].unsqueeze(-1).float()
+                summed = (outputs.last_hidden_state * mask).sum(dim=1)
+                embeddings = summed / mask.sum(dim=1).clamp(min=1e-9)
+                embeddings = F.normalize(embeddings, p=2, dim=1)
                 return embeddings.tolist()
 
             logger.info(
@@ -363,42 +870,93 @@ class VectorMemoryStore:
         Returns:
             嵌入向量列表
 
+        Raises:
+            RetrievalError: 嵌入生成失败
+        """
+        embeddings = await self.get_embeddings([text])
+        return embeddings[0]
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """批量获取文本嵌入向量
+
+        先按内容哈希查缓存，未命中的文本去重后提交给嵌入工作池。
+        工作池会把几毫秒内的并发请求合并为一次模型调用，并在专用线程中推理。
+
+        Args:
+            texts: 输入文本列表
+
+        Returns:
+            与输入顺序一致的嵌入向量列表
+
         Raises:
             RetrievalError: 嵌入生成失败
         """
         if not self.enabled:
             raise RetrievalError("VectorMemoryStore is disabled")
 
-        # 检查缓存
-        if self.config.cache_embeddings:
-            cache_key = hashlib.md5(text.encode()).hexdigest()
-            if cache_key in self.embedding_cache:
-                return self.embedding_cache[cache_key]
+        if not texts:
+            return []
 
         try:
-            model = self._get_embedding_model()
-
-            if model is None:
-                # 返回虚拟嵌入
-                embedding = [0.0] * self.config.embedding_dimension
-            elif callable(model):
-                # 函数型嵌入器（如OpenAI）
-                embedding = model(text)
-            else:
-                # 模型对象（如sentence-transformers）
-                embedding = model.encode(text).tolist()
-
-            # 缓存结果
-            if self.config.cache_embeddings:
-                cache_key = hashlib.md5(text.encode()).hexdigest()
-                self.embedding_cache[cache_key] = embedding
-
-            return embedding
+            loop = asyncio.get_event_loop()
+            cache = self.embedding_cache
 
+            keys = (
+                [cache.make_key(text) for text in texts]
+                if cache is not None
+                else list(texts)
+            )
+            found: Dict[str, List[float]] = {}
+            if cache is not None:
+                if cache.db_path:
+                    found = await loop.run_in_executor(None, cache.get_many, keys)
+                else:
+                    found = cache.get_many(keys)
+
+            # 去重后的未命中文本
+            missing: Dict[str, str] = {}
+            for key, text in zip(keys, texts):
+                if key not in found and key not in missing:
+                    missing[key] = text
+
+            if missing:
+                encoded = await self.embedding_worker.encode(list(missing.values()))
+                computed = dict(zip(missing.keys(), encoded))
+                found.update(computed)
+
+                if cache is not None:
+                    if cache.db_path:
+                        await loop.run_in_executor(None, cache.put_many, computed)
+                    else:
+                        cache.put_many(computed)
+
+            return [found[key] for key in keys]
+
+        except RetrievalError:
+            raise
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
             raise RetrievalError(f"Embedding generation failed: {e}")
 
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        """在一次模型调用中编码多条文本（同步，在嵌入工作池线程中执行）"""
+        model = self._get_embedding_model()
+
+        if model is None:
+            # 返回虚拟嵌入
+            return [[0.0] * self.config.embedding_dimension for _ in texts]
+
+        if hasattr(model, "encode"):
+            # 模型对象（如sentence-transformers）
+            embeddings = model.encode(texts, batch_size=self.config.batch_size)
+        else:
+            # 函数型嵌入器（如OpenAI、HuggingFace）
+            embeddings = model(texts)
+
+        if hasattr(embeddings, "tolist"):
+            return embeddings.tolist()
+        return [list(embedding) for embedding in embeddings]
+
     def _summarize_content(self, content: Any) -> str:
         """摘要内容"""
         import json
@@ -506,20 +1064,16 @@ class VectorMemoryStore:
                 )
 
             elif self.config.backend == VectorStoreBackend.FAISS:
-                import numpy as np
-
-                embedding_array = np.array([embedding], dtype=np.float32)
-                self.index.add(embedding_array)
-                idx = self.index.ntotal - 1
-                self.id_to_index[entity.id] = idx
-                self.index_to_id[idx] = entity.id
+                self._faiss_add(
+                    [entity.id], [embedding], [metadata], [text_representation]
+                )
+                if self.config.faiss_persist_on_write:
+                    await self.persist()
 
             elif self.config.backend == VectorStoreBackend.MEMORY:
-                self.memory_store[entity.id] = {
-                    "embedding": embedding,
-                    "metadata": metadata,
-                    "text": text_representation,
-                }
+                self._memory_add(
+                    [entity.id], [embedding], [metadata], [text_representation]
+                )
 
             logger.debug(f"Stored entity {entity.id} in vector store")
             return True
@@ -549,27 +1103,19 @@ class VectorMemoryStore:
             batch = entities[i : i + self.config.batch_size]
 
             try:
-                # 准备批量数据
-                embeddings = []
-                texts = []
-                metadatas = []
-                ids = []
-
-                for entity in batch:
-                    text = self._entity_to_text(entity)
-                    embedding = await self.get_embedding(text)
-
-                    metadata = {
+                # 准备批量数据，整批文本一次性编码
+                texts = [self._entity_to_text(entity) for entity in batch]
+                embeddings = await self.get_embeddings(texts)
+                ids = [entity.id for entity in batch]
+                metadatas = [
+                    {
                         "session_id": entity.session_id,
                         "type": entity.type.value,
                         "created_at": entity.created_at.isoformat(),
                         "updated_at": entity.updated_at.isoformat(),
                     }
-
-                    embeddings.append(embedding)
-                    texts.append(text)
-                    metadatas.append(metadata)
-                    ids.append(entity.id)
+                    for entity in batch
+                ]
 
                 # 批量存储
                 if self.config.backend == VectorStoreBackend.CHROMADB:
@@ -579,6 +1125,10 @@ class VectorMemoryStore:
                         metadatas=metadatas,
                         ids=ids,
                     )
+                elif self.config.backend == VectorStoreBackend.FAISS:
+                    self._faiss_add(ids, embeddings, metadatas, texts)
+                elif self.config.backend == VectorStoreBackend.MEMORY:
+                    self._memory_add(ids, embeddings, metadatas, texts)
 
                 # 标记成功
                 for entity in batch:
@@ -589,6 +1139,12 @@ class VectorMemoryStore:
                 for entity in batch:
                     results[entity.id] = False
 
+        if (
+            self.config.backend == VectorStoreBackend.FAISS
+            and self.config.faiss_persist_on_write
+        ):
+            await self.persist()
+
         logger.info(f"Batch stored {sum(results.values())}/{len(entities)} entities")
         return results
 
@@ -636,6 +1192,19 @@ class VectorMemoryStore:
                     return list(zip(entity_ids, similarities))
                 return []
 
+            elif self.config.backend == VectorStoreBackend.FAISS:
+                if self._faiss_rerank:
+                    return await self._faiss_quantized_search(
+                        query_embedding, filters, limit
+                    )
+                return self._faiss_search(query_embedding, filters, limit)
+
+            elif (
+                self.config.backend == VectorStoreBackend.MEMORY
+                and self.quantized_index is not None
+            ):
+                return await self._quantized_search(query_embedding, filters, limit)
+
             elif self.config.backend == VectorStoreBackend.MEMORY:
                 # 内存后端：简单文本匹配
                 results = []
@@ -690,17 +1259,17 @@ class VectorMemoryStore:
                     )
 
             elif self.config.backend == VectorStoreBackend.FAISS:
-                if entity_id in self.id_to_index:
-                    idx = self.id_to_index[entity_id]
-                    # FAISS不支持删除，标记为无效
-                    del self.id_to_index[entity_id]
-                    del self.index_to_id[idx]
+                self._faiss_remove([entity_id])
+                if self.config.faiss_persist_on_write:
+                    await self.persist()
 
             elif self.config.backend == VectorStoreBackend.MEMORY:
                 if entity_id in self.memory_store:
                     del self.memory_store[entity_id]
                 if entity_id in self.embeddings:
                     del self.embeddings[entity_id]
+                if self.quantized_index is not None:
+                    self.quantized_index.remove([entity_id])
 
             logger.debug(f"Deleted entity {entity_id} from vector store")
             return True
@@ -708,3 +1277,16 @@ class VectorMemoryStore:
         except Exception as e:
             logger.error(f"Failed to delete entity {entity_id}: {e}")
             raise StorageError(f"Failed to delete entity: {e}")
+
+    def get_embedding_stats(self) -> Dict[str, Any]:
+        """获取嵌入缓存和推理工作池的统计信息"""
+        return {
+            "cache": self.embedding_cache.get_stats() if self.embedding_cache else None,
+            "worker": self.embedding_worker.get_stats(),
+        }
+
+    async def close(self):
+        """关闭嵌入工作池和缓存连接"""
+        await self.embedding_worker.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
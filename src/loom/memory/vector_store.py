@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 from ..utils.logging_config import get_logger
+from .embedding_worker import EmbeddingWorkerPool
 from .world_memory import MemoryEntity, MemoryEntityType
 
 logger = get_logger(__name__)
@@ -35,6 +36,14 @@ class VectorStore:
         self.client = None
         self.collection = None
 
+        # 嵌入推理在专用线程中执行，并合并并发请求
+        self._embedding_worker = EmbeddingWorkerPool(
+            self._get_embeddings_batch,
+            max_batch_size=self.config.get("embedding_batch_size", 64),
+            max_wait_ms=self.config.get("embedding_batch_wait_ms", 5.0),
+            max_queue_size=self.config.get("embedding_queue_size", 1024),
+        )
+
         if self.enabled:
             self._initialize()
         else:
@@ -95,23 +104,46 @@ class VectorStore:
             logger.error(f"Failed to generate embedding: {e}")
             return []
 
+    async def _embed(self, text: str) -> List[float]:
+        """通过嵌入工作池获取文本嵌入（不阻塞事件循环）"""
+        if not self.enabled:
+            return []
+
+        embeddings = await self._embedding_worker.encode([text])
+        return embeddings[0]
+
+    def _get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """批量获取文本嵌入（同步，在嵌入工作池线程中执行）"""
+        if self.embedding_provider in ("openai", "huggingface"):
+            return [self._get_embedding(text) for text in texts]
+
+        try:
+            return self._get_local_embeddings(texts)
+        except Exception as e:
+            logger.error(f"Failed to generate embedding: {e}")
+            return [[] for _ in texts]
+
     def _get_local_embedding(self, text: str) -> List[float]:
         """获取本地模型嵌入"""
+        return self._get_local_embeddings([text])[0]
+
+    def _get_local_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """一次模型调用获取多条文本的本地模型嵌入"""
         try:
             from sentence_transformers import SentenceTransformer
 
             if not hasattr(self, "_embedding_model"):
                 self._embedding_model = SentenceTransformer(self.embedding_model)
 
-            embedding = self._embedding_model.encode(text)
-            return embedding.tolist()
+            embeddings = self._embedding_model.encode(texts)
+            return embeddings.tolist()
 
         except ImportError:
             logger.warning(
                 "sentence-transformers not installed, using dummy embeddings"
             )
             # 返回虚拟嵌入
-            return [0.0] * 384
+            return [[0.0] * 384 for _ in texts]
 
     def _get_openai_embedding(self, text: str) -> List[float]:
         """获取OpenAI嵌入"""
@@ -223,7 +255,7 @@ class VectorStore:
                 return False
 
             # 生成嵌入
-            embedding = self._get_embedding(text)
+            embedding = await self._embed(text)
             if not embedding:
                 return False
 
@@ -256,7 +288,7 @@ class VectorStore:
 
         try:
             # 生成查询嵌入
-            query_embedding = self._get_embedding(query)
+            query_embedding = await self._embed(query)
             if not query_embedding:
                 return []
 
@@ -417,7 +449,7 @@ class VectorStore:
             return
 
         try:
-            # 可以添加清理逻辑，如删除旧嵌入
+            await self._embedding_worker.close()
             logger.info("VectorStore cleanup completed")
         except Exception as e:
             logger.error(f"VectorStore cleanup failed: {e}")
@@ -8,7 +8,7 @@ import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from ..utils.logging_config import get_logger
 
@@ -136,6 +136,16 @@ class WorldMemory:
         # 缓存统计
         self.cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
 
+        # 混合检索（语义 + 关键词，RRF融合）
+        from .hybrid_retrieval import HybridRetriever
+
+        self.hybrid_retriever = HybridRetriever()
+
+        # 关系图邻接索引（首次使用时从结构化存储加载）
+        from .relation_graph import RelationGraph
+
+        self.relation_graph = RelationGraph()
+
         logger.info(
             f"WorldMemory initialized for session {session_id}, cache={'enabled' if enable_cache else 'disabled'}"
         )
@@ -310,10 +320,7 @@ class WorldMemory:
         # 使用向量存储进行语义搜索
         if self.vector_store:
             vector_results = await self.vector_store.search(query, limit)
-            for entity_id, score in vector_results:
-                entity = await self.retrieve_entity(entity_id)
-                if entity:
-                    results.append((entity, score))
+            results = await self._hydrate_search_results(vector_results)
 
         # 如果没有向量存储或结果不足，使用关键词搜索
         if not results and self.structured_store:
@@ -342,7 +349,9 @@ class WorldMemory:
             return False
 
         # 添加关系
+        await self._ensure_relation_graph()
         self.relations.append(relation)
+        self.relation_graph.add(relation)
 
         # 存储到结构化存储
         if self.structured_store:
@@ -359,24 +368,50 @@ class WorldMemory:
         self, entity_id: str, relation_type: Optional[MemoryRelationType] = None
     ) -> List[MemoryEntity]:
         """获取相关实体"""
-        related_ids = []
-
-        for relation in self.relations:
-            if relation.source_id == entity_id:
-                if relation_type is None or relation.relation_type == relation_type:
-                    related_ids.append(relation.target_id)
-            elif relation.target_id == entity_id:
-                if relation_type is None or relation.relation_type == relation_type:
-                    related_ids.append(relation.source_id)
+        await self._ensure_relation_graph()
+        related_ids = self.relation_graph.neighbors(entity_id, relation_type)
 
         # 检索实体
-        entities = []
-        for related_id in related_ids:
-            entity = await self.retrieve_entity(related_id)
-            if entity:
-                entities.append(entity)
+        retrieved = await self.retrieve_entities_batch(related_ids)
+        return [entity for entity in retrieved.values() if entity]
+
+    async def remove_relation(
+        self, source_id: str, target_id: str, relation_type: MemoryRelationType
+    ) -> bool:
+        """移除关系"""
+        await self._ensure_relation_graph()
+        removed = self.relation_graph.remove(source_id, target_id, relation_type)
+        self.relations = [
+            r
+            for r in self.relations
+            if (r.source_id, r.target_id, r.relation_type)
+            != (source_id, target_id, relation_type)
+        ]
 
-        return entities
+        if self.structured_store:
+            deleted = await self.structured_store.delete_relation(
+                source_id, target_id, relation_type
+            )
+            removed = removed or deleted
+
+        return removed
+
+    async def _ensure_relation_graph(self):
+        """首次使用时从结构化存储加载本会话的全部关系"""
+        if self.relation_graph.loaded:
+            return
+
+        relations = list(self.relations)
+        if self.structured_store:
+            try:
+                stored = await self.structured_store.retrieve_session_relations(
+                    self.session_id
+                )
+                relations = list(stored) + relations
+            except Exception as e:
+                logger.warning(f"Failed to load relation graph from store: {e}")
+
+        self.relation_graph.load(relations)
 
     async def update_entity(
         self, entity_id: str, updates: Dict[str, Any]
@@ -415,6 +450,7 @@ class WorldMemory:
             for r in self.relations
             if r.source_id != entity_id and r.target_id != entity_id
         ]
+        self.relation_graph.remove_entity(entity_id)
 
         # 从存储中删除
         if self.structured_store:
@@ -525,11 +561,35 @@ class WorldMemory:
     async def retrieve_entities_batch(
         self, entity_ids: List[str]
     ) -> Dict[str, Optional[MemoryEntity]]:
-        """批量检索实体"""
-        results = {}
+        """批量检索实体
+
+        先查内存缓存，未命中的实体通过结构化存储一次批量查询取回。
+        """
+        results: Dict[str, Optional[MemoryEntity]] = {}
+        missing = []
         for entity_id in entity_ids:
-            entity = await self.retrieve_entity(entity_id)
-            results[entity_id] = entity
+            if entity_id in self.entities:
+                self._record_cache_hit(entity_id)
+                results[entity_id] = self.entities[entity_id]
+            elif entity_id not in results:
+                self._record_cache_miss(entity_id)
+                results[entity_id] = None
+                missing.append(entity_id)
+
+        if missing and self.structured_store:
+            if hasattr(self.structured_store, "retrieve_entities"):
+                fetched = await self.structured_store.retrieve_entities(missing)
+            else:
+                fetched = {}
+                for entity_id in missing:
+                    entity = await self.structured_store.retrieve_entity(entity_id)
+                    if entity:
+                        fetched[entity_id] = entity
+
+            for entity_id, entity in fetched.items():
+                self.entities[entity_id] = entity
+                self._update_cache_order(entity_id)
+                results[entity_id] = entity
 
         logger.debug(
             f"Batch retrieved {len(entity_ids)} entities, {sum(1 for e in results.values() if e is not None)} found"
@@ -634,35 +694,73 @@ class WorldMemory:
     async def get_contextual_memories(
         self, query: str, context_entities: List[str] = None, limit: int = 10
     ) -> List[MemoryEntity]:
-        """获取上下文相关记忆"""
-        results = []
+        """获取上下文相关记忆
+
+        语义检索和关键词检索并发执行，按倒数排名融合，
+        再叠加新近度、重要性和上下文实体加成。
+        """
+        results = await self.hybrid_retriever.search(
+            query,
+            self._get_search_sources(),
+            limit=limit,
+            context_entity_ids=context_entities,
+            importance_fn=self._entity_importance,
+        )
+        return [entity for entity, score in results]
+
+    def _get_search_sources(self) -> Dict[str, Any]:
+        """构建混合检索的各路检索函数"""
+        sources = {}
 
-        # 使用向量存储进行语义搜索
         if self.vector_store:
-            vector_results = await self.vector_store.search(query, limit * 2)
-            for entity_id, score in vector_results:
-                entity = await self.retrieve_entity(entity_id)
-                if entity:
-                    results.append((entity, score))
 
-        # 如果没有向量存储或结果不足，使用关键词搜索
-        if len(results) < limit and self.structured_store:
-            keyword_results = await self.structured_store.search_entities(
-                query, None, limit * 2
-            )
-            for entity in keyword_results:
-                results.append((entity, 0.3))  # 较低的基础分数
+            async def semantic(query: str, limit: int):
+                hits = await self.vector_store.search(query, limit)
+                return await self._hydrate_search_results(hits)
 
-        # 如果有上下文实体，提升相关实体的分数
-        if context_entities:
-            for i, (entity, score) in enumerate(results):
-                if entity.id in context_entities:
-                    # 提升上下文相关实体的分数
-                    results[i] = (entity, score * 1.5)
+            sources["semantic"] = semantic
 
-        # 按分数排序并返回
-        results.sort(key=lambda x: x[1], reverse=True)
-        return [entity for entity, score in results[:limit]]
+        if self.structured_store:
+
+            async def keyword(query: str, limit: int):
+                if hasattr(self.structured_store, "search_entities_ranked"):
+                    return await self.structured_store.search_entities_ranked(
+                        query, self.session_id, limit
+                    )
+                entities = await self.structured_store.search_entities(
+                    query, None, limit
+                )
+                return [
+                    (entity, 1.0 / (rank + 1)) for rank, entity in enumerate(entities)
+                ]
+
+            sources["keyword"] = keyword
+
+        return sources
+
+    async def _hydrate_search_results(
+        self, hits: List[Tuple[str, float]]
+    ) -> List[Tuple[MemoryEntity, float]]:
+        """将 (entity_id, score) 检索结果批量还原为实体，保持原有顺序"""
+        retrieved = await self.retrieve_entities_batch(
+            [entity_id for entity_id, _ in hits]
+        )
+        return [
+            (retrieved[entity_id], score)
+            for entity_id, score in hits
+            if retrieved.get(entity_id)
+        ]
+
+    @staticmethod
+    def _entity_importance(entity: MemoryEntity) -> float:
+        """读取实体的重要性（元数据或内容中的importance字段，默认0.5）"""
+        for source in (entity.metadata, entity.content):
+            if isinstance(source, dict) and "importance" in source:
+                try:
+                    return min(1.0, max(0.0, float(source["importance"])))
+                except (TypeError, ValueError):
+                    pass
+        return 0.5
 
     async def create_fact(self, fact_data: Dict[str, Any]) -> str:
         """创建事实"""
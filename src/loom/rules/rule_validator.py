@@ -293,8 +293,10 @@ class RuleValidator:
                 prompt = self._build_semantic_validation_prompt(section_name, section)
 
                 try:
-                    # 使用LLM进行验证
-                    response = await self.llm_provider.generate(prompt)
+                    # 使用LLM进行验证（已配置语义缓存时复用相近章节的结果）
+                    response = await self.llm_provider.generate(
+                        prompt, semantic_cache=True
+                    )
 
                     # 解析响应
                     semantic_issues = self._parse_semantic_response(response.content)
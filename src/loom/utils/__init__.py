@@ -4,6 +4,7 @@ LOOM 工具函数包
 """
 
 from .async_helpers import (
+    AdaptiveConcurrencyLimiter,
     AsyncCache,
     AsyncRateLimiter,
     async_retry,
@@ -25,12 +26,14 @@ from .logging_config import (
     log_warning,
     setup_logging,
 )
+from .ttl_cache import TTLCache, estimate_size
 
 __all__ = [
     # 异步辅助函数
     "async_retry",
     "timeout",
     "AsyncRateLimiter",
+    "AdaptiveConcurrencyLimiter",
     "gather_with_concurrency",
     "run_in_thread",
     "sync_to_async",
@@ -47,4 +50,7 @@ __all__ = [
     "log_warning",
     "log_error",
     "log_debug",
+    # 缓存
+    "TTLCache",
+    "estimate_size",
 ]
@@ -6,9 +6,11 @@
 import asyncio
 import functools
 import inspect
+import time
+from collections import deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Any, Callable, Coroutine, TypeVar
+from typing import Any, Callable, Coroutine, Optional, TypeVar
 
 T = TypeVar("T")
 
@@ -160,6 +162,188 @@ class AsyncRateLimiter:
             pass
 
 
+class AdaptiveConcurrencyLimiter:
+    """
+    自适应并发限制器（AIMD）
+
+    请求成功且延迟正常时，并发上限按加法缓慢增长（每用满一轮上限约+1）；
+    遇到过载信号（429/5xx）或p95延迟明显高于基线时按乘法下降。
+    过载响应带 Retry-After 时，在指定时间内暂停发放新的许可。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease_factor: float = 0.5,
+        latency_window: int = 50,
+        latency_tolerance: float = 2.0,
+        decrease_cooldown: float = 1.0,
+    ):
+        """
+        Args:
+            initial_limit: 初始并发上限
+            min_limit: 最小并发上限
+            max_limit: 最大并发上限
+            increase: 每用满一轮上限增加的并发数
+            decrease_factor: 过载时上限乘以的系数
+            latency_window: 计算p95的最近样本数
+            latency_tolerance: p95超过基线的倍数视为延迟恶化
+            decrease_cooldown: 两次下降的最小间隔（秒），避免同一波失败重复下降
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._latencies: deque = deque(maxlen=max(1, latency_window))
+        self._min_samples = min(10, self._latencies.maxlen)
+        self.baseline_p95: Optional[float] = None
+
+        self.stats = {"increases": 0, "decreases": 0, "throttled": 0, "waits": 0}
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self):
+        """获取一个并发许可"""
+        loop = asyncio.get_running_loop()
+        while True:
+            paused_for = self._paused_until - loop.time()
+            if paused_for > 0:
+                self.stats["waits"] += 1
+                await asyncio.sleep(paused_for)
+                continue
+
+            if self.in_flight < self.current_limit:
+                self.in_flight += 1
+                return
+
+            self.stats["waits"] += 1
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # 已被唤醒却被取消，把唤醒让给下一个等待者
+                    self._wake()
+                raise
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        overloaded: bool = False,
+        retry_after: Optional[float] = None,
+    ):
+        """
+        归还许可并反馈结果
+
+        Args:
+            latency: 成功请求的延迟（秒），None表示不参与调整（如非过载类错误）
+            overloaded: 是否收到过载信号（429/5xx）
+            retry_after: 服务端要求的等待时间（秒）
+        """
+        saturated = self.in_flight >= self.current_limit
+        self.in_flight = max(0, self.in_flight - 1)
+
+        if retry_after is not None and retry_after > 0:
+            self.stats["throttled"] += 1
+            resume_at = asyncio.get_running_loop().time() + retry_after
+            self._paused_until = max(self._paused_until, resume_at)
+
+        if overloaded:
+            self._decrease()
+        elif latency is not None:
+            self._latencies.append(latency)
+            if self._latency_degraded():
+                self._decrease()
+            elif saturated and self.limit < self.max_limit:
+                # 只有上限被用满时才增长，空闲时上限保持不变
+                self.limit = min(
+                    self.max_limit, self.limit + self.increase / self.limit
+                )
+                self.stats["increases"] += 1
+
+        self._wake()
+
+    def _latency_degraded(self) -> bool:
+        """p95是否明显高于基线（基线取历史较低的p95，并缓慢跟随当前值）"""
+        if len(self._latencies) < self._min_samples:
+            return False
+
+        ordered = sorted(self._latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        if self.baseline_p95 is None or p95 < self.baseline_p95:
+            self.baseline_p95 = p95
+            return False
+
+        degraded = p95 > self.baseline_p95 * self.latency_tolerance
+        self.baseline_p95 += 0.05 * (p95 - self.baseline_p95)
+        return degraded
+
+    def _decrease(self):
+        now = asyncio.get_running_loop().time()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self._latencies.clear()
+        self.stats["decreases"] += 1
+
+    def _wake(self):
+        available = self.current_limit - self.in_flight
+        while available > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """上下文管理器形式的许可（成功按延迟反馈，异常不参与调整）"""
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self.release()
+            raise
+        self.release(latency=time.monotonic() - start)
+
+    def get_stats(self) -> dict:
+        """获取限制器状态"""
+        loop_time = None
+        try:
+            loop_time = asyncio.get_running_loop().time()
+        except RuntimeError:
+            pass
+        paused_for = (
+            max(0.0, self._paused_until - loop_time) if loop_time is not None else 0.0
+        )
+        return {
+            **self.stats,
+            "limit": self.current_limit,
+            "raw_limit": self.limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "paused_for": paused_for,
+            "baseline_p95": self.baseline_p95,
+        }
+
+
 async def gather_with_concurrency(
     tasks: list[Coroutine], max_concurrent: int = 10
 ) -> list[Any]:
@@ -0,0 +1,219 @@
+"""
+TTL + LRU 缓存
+
+各模块共用的同步缓存原语：
+1. 每个条目有过期时间，过期条目通过最小堆按到期顺序批量清理，
+   每次写入的清理成本为均摊 O(log n)，无需扫描整个缓存
+2. 按最近使用顺序淘汰，同时限制条目数和（估算的）字节数
+3. 统计命中率、淘汰、过期和内存占用
+
+不加锁，适用于单个事件循环内使用；跨线程使用时由调用方加锁。
+"""
+
+import heapq
+import itertools
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """粗略估算对象占用的字节数
+
+    递归统计容器和普通对象的属性，深度受限，仅用于容量控制和统计。
+    """
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+
+    if isinstance(value, dict):
+        size += sum(
+            estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        size += estimate_size(vars(value), _depth + 1)
+    return size
+
+
+class TTLCache:
+    """带过期时间和容量上限的LRU缓存"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: Optional[float] = 300,
+        max_bytes: Optional[int] = None,
+        size_fn: Optional[Callable[[Any], int]] = None,
+        on_remove: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        """初始化缓存
+
+        Args:
+            max_entries: 最大条目数
+            default_ttl: 默认有效期（秒），None表示不过期
+            max_bytes: 最大字节数（按size_fn估算），None表示不限制
+            size_fn: 条目大小估算函数，默认使用 estimate_size
+            on_remove: 条目因淘汰、过期、覆盖或pop离开缓存时的回调(key, value)，
+                clear()不触发
+        """
+        self.max_entries = max(1, max_entries)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn or estimate_size
+        self.on_remove = on_remove
+
+        # key -> (value, 到期时间或None, 字节数)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = (
+            OrderedDict()
+        )
+        # (到期时间, 序号, key)，条目覆盖或删除后旧记录在弹出时跳过
+        self._expiry_heap: List[Tuple[float, int, Hashable]] = []
+        self._counter = itertools.count()
+        self._bytes = 0
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._is_expired(entry, time.monotonic())
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._entries))
+
+    @staticmethod
+    def _is_expired(entry: Tuple[Any, Optional[float], int], now: float) -> bool:
+        return entry[1] is not None and entry[1] <= now
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，未命中或已过期时返回default"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+
+        if self._is_expired(entry, time.monotonic()):
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值但不更新LRU顺序和统计"""
+        entry = self._entries.get(key)
+        if entry is None or self._is_expired(entry, time.monotonic()):
+            return default
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = _MISSING):
+        """写入缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 有效期（秒），缺省使用default_ttl，None表示不过期
+        """
+        now = time.monotonic()
+        self.purge_expired(now)
+
+        if key in self._entries:
+            self._remove(key)
+
+        ttl = self.default_ttl if ttl is _MISSING else ttl
+        expires_at = now + ttl if ttl is not None else None
+        size = self.size_fn(value)
+
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, next(self._counter), key))
+
+        self._enforce_limits()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """删除并返回缓存值"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry[0]
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self._expiry_heap.clear()
+        self._bytes = 0
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """清理已到期的条目
+
+        Returns:
+            清理的条目数
+        """
+        now = time.monotonic() if now is None else now
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                removed += 1
+
+        # 覆盖写入留下的陈旧堆记录过多时重建堆
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [
+                (entry[1], next(self._counter), key)
+                for key, entry in self._entries.items()
+                if entry[1] is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+
+        self.stats["expirations"] += removed
+        return removed
+
+    def _remove(self, key: Hashable):
+        value, _, size = self._entries.pop(key)
+        self._bytes -= size
+        if self.on_remove is not None:
+            self.on_remove(key, value)
+
+    def _enforce_limits(self):
+        """按LRU顺序淘汰，直到满足条目数和字节数上限"""
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None
+            and self._bytes > self.max_bytes
+            and len(self._entries) > 1
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    @property
+    def nbytes(self) -> int:
+        """估算的缓存字节数"""
+        return self._bytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+            "memory_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
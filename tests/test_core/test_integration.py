@@ -206,6 +206,43 @@ class TestCoreRuntimeIntegration:
         # 清理
         await persistence.close()
 
+    @pytest.mark.asyncio
+    async def test_memory_embedding_stored_compactly(self, temp_db_path):
+        """测试记忆嵌入以量化BLOB保存并可还原"""
+        persistence = SQLitePersistence(db_path=temp_db_path, embedding_dtype="int8")
+        await persistence.initialize()
+
+        session_manager = SessionManager(persistence_engine=persistence)
+        session = await session_manager.create_session(
+            SessionConfig(name="嵌入存储测试", canon_path="./test_canon")
+        )
+        await session_manager.save_session(session, force=True)
+
+        embedding = [0.1 * i - 0.3 for i in range(8)]
+        now = datetime.now().isoformat()
+        assert await persistence.save_memory(
+            {
+                "id": "memory-1",
+                "session_id": session.id,
+                "type": "fact",
+                "content": {"text": "测试"},
+                "created_at": now,
+                "updated_at": now,
+                "embedding": embedding,
+            }
+        )
+
+        memories = await persistence.load_memories(session.id)
+        assert memories[0]["embedding"] == pytest.approx(embedding, abs=0.01)
+
+        await persistence.close()
+
+        # 默认不量化，嵌入按原样保存和返回
+        legacy = SQLitePersistence(db_path=temp_db_path)
+        raw = b"\x00\x00\x80\x3f"
+        assert legacy._encode_embedding(raw) is raw
+        assert legacy._decode_embedding(raw) is raw
+
     @pytest.mark.asyncio
     async def test_turn_dependencies(self):
         """测试回合依赖关系"""
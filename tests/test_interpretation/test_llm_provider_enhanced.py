@@ -5,12 +5,15 @@
 """
 
 import asyncio
+import json
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from src.loom.interpretation.error_handler import (
+    CircuitBreakerState,
+    CircuitOpenError,
     ErrorCategory,
     ErrorHandler,
     ErrorInfo,
@@ -72,6 +75,21 @@ class TestLLMProviderEnhancements:
         assert result["usage"]["output_tokens"] == 20
         assert result["metadata"]["id"] == "test-id"
 
+    def test_provider_http_error_retry_after(self):
+        """测试Retry-After解析与可重试判断"""
+        from src.loom.interpretation.llm_provider import ProviderHTTPError
+
+        error = ProviderHTTPError(429, {"Retry-After": "3"})
+        assert str(error) == "API error: 429"
+        assert error.retry_after == 3.0 and error.overloaded and error.retryable
+
+        error = ProviderHTTPError(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        assert error.retry_after == 0.0 and error.retryable
+
+        error = ProviderHTTPError(401, MagicMock())
+        assert error.retry_after is None
+        assert not error.overloaded and not error.retryable
+
 
 class TestProviderManager:
     """Provider管理器测试"""
@@ -221,6 +239,34 @@ class TestErrorHandler:
 
         assert circuit_breaker.is_open is True
 
+    def test_circuit_breaker_sliding_window_and_half_open(self):
+        """测试滑动窗口失败比例和半开探测"""
+        breaker = CircuitBreakerState(
+            window_size=4, min_calls=4, failure_threshold=0.5, reset_timeout=60
+        )
+
+        # 窗口内失败比例不足时保持关闭，旧结果滑出窗口
+        for failed in (True, False, False, False, True):
+            breaker.record_failure() if failed else breaker.record_success()
+        assert breaker.state == "closed" and breaker.failure_ratio == 0.25
+
+        breaker.record_failure()
+        assert breaker.is_open
+        assert not breaker.should_allow_request()
+        assert breaker.rejects_request() and breaker.rejected_count == 1
+
+        # 超时后只放行一个探测请求，探测失败重新打开
+        breaker._opened_monotonic -= 60
+        assert breaker.should_allow_request() and breaker.state == "half_open"
+        assert not breaker.should_allow_request()
+        breaker.record_failure()
+        assert breaker.is_open and breaker.times_opened == 2
+
+        breaker._opened_monotonic -= 60
+        assert breaker.should_allow_request()
+        breaker.record_success()
+        assert breaker.state == "closed" and breaker.failure_count == 0
+
 
 class TestPerformanceOptimizer:
     """性能优化器测试"""
@@ -251,6 +297,158 @@ class TestPerformanceOptimizer:
         pool3 = optimizer.get_connection_pool("anthropic")
         assert pool3 is not pool1
 
+    @pytest.mark.asyncio
+    async def test_response_cache_lru_and_ttl(self):
+        """测试响应缓存按LRU淘汰并按TTL过期"""
+        from src.loom.interpretation.performance_optimizer import ResponseCache
+
+        cache = ResponseCache(max_size=2, default_ttl=60)
+        await cache.set("openai", "a", {}, "A")
+        await cache.set("openai", "b", {}, "B")
+        assert await cache.get("openai", "a", {}) == "A"
+
+        await cache.set("openai", "c", {}, "C")  # 淘汰最久未用的 b
+        assert await cache.get("openai", "b", {}) is None
+        assert await cache.get("openai", "c", {}) == "C"
+
+        await cache.set("openai", "short", {}, "S", ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert await cache.get("openai", "short", {}) is None
+
+        stats = cache.get_stats()
+        assert stats["cache_size"] == 1
+        assert stats["evictions"] == 2
+        assert stats["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_response_cache_disk_tier_shared(self, tmp_path):
+        """测试磁盘层在实例间共享，并按Provider TTL和字节上限淘汰"""
+        from src.loom.interpretation.performance_optimizer import ResponseCache
+
+        db_path = tmp_path / "responses.db"
+        writer = ResponseCache(
+            db_path=str(db_path), provider_ttls={"fast": 0.01}, max_disk_bytes=200
+        )
+        reader = ResponseCache(db_path=str(db_path))
+
+        await writer.store("k1", {"content": "甲" * 20}, provider="slow")
+        await writer.store("k2", {"content": "乙"}, provider="fast")
+        assert await reader.lookup("k1") == {"content": "甲" * 20}
+        assert await reader.lookup("k1") == {"content": "甲" * 20}  # 已回填内存层
+
+        await asyncio.sleep(0.02)
+        assert await reader.lookup("k2") is None  # fast的TTL已过期
+
+        stats = reader.get_stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+        # 超出磁盘字节上限时淘汰最久未访问的条目
+        for i in range(5):
+            await writer.store(f"big{i}", {"content": "x" * 60})
+        assert writer.get_stats()["disk_evictions"] > 0
+        writer._cache.clear()
+        assert await writer.lookup("big4") is not None
+        assert await writer.lookup("k1") is None
+
+        writer.close()
+        reader.close()
+
+    @pytest.mark.asyncio
+    async def test_response_cache_disk_maintenance_batched(self, tmp_path):
+        """测试磁盘层按周期批量清理过期条目，并维护字节数估计"""
+        from src.loom.interpretation.performance_optimizer import ResponseCache
+
+        cache = ResponseCache(
+            db_path=str(tmp_path / "responses.db"),
+            provider_ttls={"fast": 0.01},
+            disk_maintenance_interval=3600,
+        )
+        await cache.store("first", {"content": "a"})  # 首次写入执行维护
+        await cache.store("stale", {"content": "b"}, provider="fast")
+        await asyncio.sleep(0.02)
+
+        # 维护周期未到：写入不做全表清理
+        await cache.store("second", {"content": "c"})
+        await cache.store("second", {"content": "c"})  # 覆盖不重复计数
+        assert cache.get_stats()["disk_expirations"] == 0
+        entry_size = len('{"content": "a"}'.encode("utf-8"))
+        assert cache.get_stats()["disk_bytes"] == 3 * entry_size
+
+        cache._next_maintenance = 0.0
+        await cache.store("third", {"content": "d"})
+        stats = cache.get_stats()
+        assert stats["disk_expirations"] == 1
+        assert stats["disk_bytes"] == 3 * entry_size
+
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_provider_response_cache_persists(self, tmp_path):
+        """测试Provider响应缓存在重启后仍可命中"""
+        config = {
+            "name": "local",
+            "type": "local",
+            "cache_path": str(tmp_path / "cache.db"),
+        }
+        calls = []
+
+        async def impl(prompt, **kwargs):
+            calls.append(prompt)
+            return LLMResponse(content="答案", model="m", usage={"input_tokens": 1})
+
+        first = LocalProvider(config)
+        first._generate_impl = impl
+        await first.generate("问题")
+        await first.generate("问题")
+        assert first.get_stats()["cache"]["memory_hits"] == 1
+        await first.close()
+
+        second = LocalProvider(config)
+        second._generate_impl = impl
+        response = await second.generate("问题")
+        assert response.content == "答案"
+        assert calls == ["问题"]
+        assert second.get_stats()["cache"]["disk_hits"] == 1
+        await second.close()
+
+    @pytest.mark.asyncio
+    async def test_provider_shares_keepalive_session(self):
+        """测试Provider复用同一个keep-alive会话并统计连接器利用率"""
+        provider = LocalProvider(
+            {
+                "name": "local",
+                "type": "local",
+                "connector_limit": 8,
+                "keepalive_timeout": 15,
+            }
+        )
+
+        first = await provider.get_session()
+        second = await provider.get_session()
+        assert first is second
+        assert first.connector.limit == 8
+        assert provider.get_connection_stats()["in_flight"] == 2
+
+        await provider.release_session(first)
+        await provider.release_session(second)
+        assert not first.closed  # 释放后会话保持打开
+
+        stats = provider.get_stats()["connections"]
+        assert stats["created_count"] == 1
+        assert stats["requests"] == 2
+        assert stats["in_flight"] == 0
+        assert stats["peak_in_flight"] == 2
+
+        await provider.close()
+        assert first.closed
+        # 关闭后再次使用会重建会话
+        third = await provider.get_session()
+        assert third is not first
+        await provider.close()
+
 
 @pytest.mark.asyncio
 class TestAsyncFunctionality:
@@ -314,18 +512,281 @@ class TestAsyncFunctionality:
         assert result == "Success"
         assert call_count == 3
 
+    async def test_openai_sse_stream_usage_and_cancel(self):
+        """测试SSE流式输出、流结束时的用量统计和客户端断开"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        disconnected = asyncio.Event()
+
+        async def handler(request):
+            body = await request.json()
+            assert body["stream"] is True
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            events = [
+                {"model": "gpt-4", "choices": [{"delta": {"content": "你"}}]},
+                {"model": "gpt-4", "choices": [{"delta": {"content": "好"}}]},
+                {
+                    "model": "gpt-4",
+                    "choices": [],
+                    "usage": {"prompt_tokens": 3, "completion_tokens": 2},
+                },
+            ]
+            try:
+                for event in events:
+                    payload = json.dumps(event, ensure_ascii=False)
+                    await response.write(f"data: {payload}\n\n".encode())
+                    if body["messages"][0]["content"] == "slow":
+                        await asyncio.sleep(0.2)
+                await response.write(b"data: [DONE]\n\n")
+            except (ConnectionResetError, asyncio.CancelledError):
+                disconnected.set()
+                raise
+            return response
+
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", handler)
+        server = TestServer(app)
+        await server.start_server()
+        provider = OpenAIProvider(
+            {
+                "name": "openai",
+                "type": "openai",
+                "api_key": "test",
+                "base_url": str(server.make_url("/v1")),
+            }
+        )
+        try:
+            chunks = [chunk async for chunk in provider.generate_stream("hi")]
+            assert chunks == ["你", "好"]
+            assert provider.total_tokens == 5
+            assert provider.total_cost > 0
+
+            stream = provider.generate_stream("slow")
+            assert await stream.__anext__() == "你"
+            await stream.aclose()
+            await asyncio.wait_for(disconnected.wait(), 2)
+
+            stats = provider.get_stats()["streaming"]
+            assert stats["streams"] == 2
+            assert stats["cancelled"] == 1
+            assert stats["ttft_count"] == 2
+            assert stats["avg_ttft"] is not None
+            assert provider.get_connection_stats()["in_flight"] == 0
+        finally:
+            await provider.close()
+            await server.close()
+
+    async def test_stream_retry_and_fallback_before_first_chunk(self):
+        """测试首个文本块之前的重试与降级"""
+        import aiohttp
+
+        provider = LocalProvider({"name": "local", "type": "local"})
+        provider.retry_delay = 0
+        attempts = []
+
+        async def flaky_stream(prompt, result, **kwargs):
+            attempts.append(prompt)
+            if len(attempts) < 2:
+                raise aiohttp.ClientConnectionError("reset")
+            result["usage"] = {"input_tokens": 1, "output_tokens": 1}
+            yield "ok"
+
+        provider._stream_impl = flaky_stream
+        assert [c async for c in provider.generate_stream("p")] == ["ok"]
+        assert len(attempts) == 2
+        assert provider.total_tokens == 2
+
+        async def broken_stream(prompt, result, **kwargs):
+            raise Exception("API error: 500")
+            yield  # pragma: no cover
+
+        provider._stream_impl = broken_stream
+        chunks = [c async for c in provider.generate_stream("p")]
+        assert len(chunks) == 1 and "降级响应" in chunks[0]
+
+        with pytest.raises(Exception, match="API error"):
+            async for _ in provider.generate_stream("p", fallback=False):
+                pass
+
+        provider.fallback_enabled = False
+        with pytest.raises(Exception, match="API error"):
+            async for _ in provider.generate_stream("p"):
+                pass
+
+    async def test_stream_failover_with_default_fallback(self):
+        """测试默认fallback_enabled下流式请求在首个文本块之前切换Provider"""
+        broken = LocalProvider({"name": "broken", "type": "local"})
+        good = LocalProvider({"name": "good", "type": "local"})
+        assert broken.fallback_enabled and good.fallback_enabled
+
+        async def broken_stream(prompt, result, **kwargs):
+            raise Exception("API error: 500")
+            yield  # pragma: no cover
+
+        async def good_stream(prompt, result, **kwargs):
+            yield "he"
+            yield "llo"
+
+        broken._stream_impl = broken_stream
+        good._stream_impl = good_stream
+
+        manager = ProviderManager()
+        manager.register_provider("broken", broken)
+        manager.register_provider("good", good)
+        manager.set_fallback_order(["broken", "good"])
+        try:
+            chunks = [c async for c in manager.generate_stream_with_fallback("p")]
+            assert chunks == ["he", "llo"]
+
+            # 全部失败时才输出降级文本
+            good._stream_impl = broken_stream
+            chunks = [c async for c in manager.generate_stream_with_fallback("p")]
+            assert len(chunks) == 1 and "降级响应" in chunks[0]
+        finally:
+            await broken.close()
+            await good.close()
+
+    async def test_identical_inflight_requests_coalesced(self):
+        """测试相同的在途请求只调用一次API"""
+        provider = LocalProvider(
+            {"name": "local", "type": "local", "fallback_enabled": False}
+        )
+        calls = []
+
+        async def slow_impl(prompt, **kwargs):
+            calls.append(prompt)
+            await asyncio.sleep(0.05)
+            if prompt == "bad":
+                raise ValueError("upstream failed")
+            return LLMResponse(content=f"re: {prompt}", model="m", usage={})
+
+        provider._generate_impl = slow_impl
+
+        results = await asyncio.gather(
+            provider.generate("same"),
+            provider.generate("same"),
+            provider.generate("same"),
+            provider.generate("same", stop=["\n"]),
+        )
+        assert [r.content for r in results] == ["re: same"] * 4
+        assert results[0] is results[1] is results[2]
+        assert calls == ["same", "same"]  # 参数不同的请求单独调用
+        assert provider.get_stats()["coalescing"]["coalesced"] == 2
+
+        # 缓存只写入一次，随后的请求直接命中缓存
+        await provider.generate("same")
+        assert len(calls) == 2
+
+        # 异常传递给所有等待者
+        outcomes = await asyncio.gather(
+            provider.generate("bad"), provider.generate("bad"), return_exceptions=True
+        )
+        assert all(isinstance(o, ValueError) for o in outcomes)
+        assert calls.count("bad") == 1
+        assert provider._single_flight.in_flight == 0
+
+    async def test_semantic_cache_scoped_hits(self):
+        """测试语义缓存按作用域命中并统计命中质量"""
+        from src.loom.interpretation.semantic_cache import SemanticCache
+
+        def embed(texts):
+            # 字母频次向量：措辞相近的提示余弦相似度接近1
+            return [
+                [text.lower().count(chr(ord("a") + i)) for i in range(26)]
+                for text in texts
+            ]
+
+        provider = LocalProvider(
+            {"name": "local", "type": "local", "enable_caching": False}
+        )
+        provider.set_semantic_cache(SemanticCache(embed, threshold=0.98))
+        calls = []
+
+        async def impl(prompt, **kwargs):
+            calls.append(prompt)
+            return LLMResponse(content=f"checked: {prompt}", model="m", usage={})
+
+        provider._generate_impl = impl
+
+        prompt = "Validate rule section: magic always costs mana"
+        first = await provider.generate(prompt, temperature=0.2, semantic_cache=True)
+        second = await provider.generate(
+            prompt + "!", temperature=0.2, semantic_cache=True
+        )
+        assert second.content == first.content
+        assert second.metadata["semantic_cache_hit"] is True
+        assert len(calls) == 1
+
+        # 温度不同属于不同作用域；未开启语义缓存的调用不参与
+        await provider.generate(prompt + "!", temperature=0.5, semantic_cache=True)
+        await provider.generate(prompt + "!", temperature=0.2)
+        await provider.generate(
+            "Summarize the dragon siege of the northern keep",
+            temperature=0.2,
+            semantic_cache=True,
+        )
+        assert len(calls) == 4
+
+        provider.semantic_cache.verify_rate = 1.0
+        await provider.generate(prompt + "?", temperature=0.2, semantic_cache=True)
+        assert len(calls) == 5
+
+        stats = provider.get_stats()["semantic_cache"]
+        assert stats["hits"] == 2
+        assert stats["scopes"] == 2
+        assert stats["min_hit_similarity"] >= 0.98
+        assert stats["avg_near_miss_similarity"] < 0.98
+        assert stats["verifications"] == 1
+
+    async def test_semantic_cache_eviction_updates_matrix_in_place(self):
+        """测试满载后每次写入淘汰一条，查询矩阵原地更新而不是重建"""
+        from src.loom.interpretation.semantic_cache import SemanticCache
+
+        def embed(texts):
+            return [[1.0, float(len(text)), float(text.count("a"))] for text in texts]
+
+        cache = SemanticCache(embed, threshold=0.9999, max_entries=4, ttl=None)
+        for i in range(4):
+            await cache.store("scope", "a" * (i + 1) + "b" * i, f"v{i}")
+        assert (await cache.lookup("scope", "aab")).entry.value == "v1"
+
+        matrices = set()
+        for i in range(4, 10):
+            prompt = "a" * (i + 1) + "b" * i
+            await cache.store("scope", prompt, f"v{i}")
+            assert (await cache.lookup("scope", prompt)).entry.value == f"v{i}"
+            matrices.add(id(cache._scopes["scope"]._matrix))
+        assert len(matrices) == 1  # 只在首次超出容量时扩容一次
+
+        index = cache._scopes["scope"]
+        assert len(cache) == 4 and len(index.ids) == 4
+        assert sorted(index.ids) == sorted(cache._entries)
+        assert not (await cache.lookup("scope", "aab")).hit  # 已被淘汰
+
     async def test_batch_processor(self):
         """测试批处理器"""
         from src.loom.interpretation.performance_optimizer import BatchProcessor
 
+        batches = []
+
+        async def handler(requests):
+            batches.append([r.prompt for r in requests])
+            return [
+                ValueError("bad") if r.prompt == "bad" else r.prompt.upper()
+                for r in requests
+            ]
+
         processor = BatchProcessor(max_batch_size=2, max_wait_time=0.01)
+        processor.register_handler("test_batch", handler)
 
         results = []
 
         async def callback(result):
             results.append(result)
 
-        # 添加请求
+        # 添加请求（达到批大小立即处理）
         await processor.add_request("test_batch", "Prompt 1", callback)
         await processor.add_request("test_batch", "Prompt 2", callback)
 
@@ -333,7 +794,231 @@ class TestAsyncFunctionality:
         await asyncio.sleep(0.02)
 
         # 应该有两个结果
-        assert len(results) == 2
+        assert results == ["PROMPT 1", "PROMPT 2"]
+
+        # submit等待各自的结果，单项失败只影响该调用者；未满的批次按等待时间处理
+        outcomes = await asyncio.gather(
+            processor.submit("test_batch", "ok"),
+            processor.submit("test_batch", "bad"),
+            processor.submit("test_batch", "late"),
+            return_exceptions=True,
+        )
+        assert outcomes[0] == "OK"
+        assert isinstance(outcomes[1], ValueError)
+        assert outcomes[2] == "LATE"
+        assert batches == [["Prompt 1", "Prompt 2"], ["ok", "bad"], ["late"]]
+
+        # 未注册处理函数的批次键返回错误
+        with pytest.raises(RuntimeError):
+            await processor.submit("unknown", "x")
+
+        stats = processor.get_stats()
+        assert stats["batches"] == 4
+        assert stats["failed_requests"] == 2
+
+    async def test_provider_micro_batching_native_endpoint(self):
+        """测试Provider把并发请求合并为一次原生批量调用"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        received = []
+
+        async def completions(request):
+            body = await request.json()
+            received.append(body["prompt"])
+            return web.json_response(
+                {
+                    "model": body["model"],
+                    "choices": [
+                        {"index": i, "text": f"<{p}>", "finish_reason": "stop"}
+                        for i, p in reversed(list(enumerate(body["prompt"])))
+                    ],
+                    "usage": {"prompt_tokens": 7, "completion_tokens": 4},
+                }
+            )
+
+        app = web.Application()
+        app.router.add_post("/v1/completions", completions)
+        server = TestServer(app)
+        await server.start_server()
+        provider = LocalProvider(
+            {
+                "name": "vllm",
+                "type": "local",
+                "enable_batching": True,
+                "enable_caching": False,
+                "batch_wait_time": 0.05,
+                "batch_url": str(server.make_url("/v1/completions")),
+            }
+        )
+        try:
+            responses = await provider.generate_batch(["a", "b", "c"])
+            assert [r.content for r in responses] == ["<a>", "<b>", "<c>"]
+            assert received == [["a", "b", "c"]]
+            assert provider.total_tokens == 11
+            assert provider.get_stats()["batching"]["avg_batch_size"] == 3
+        finally:
+            await provider.close()
+            await server.close()
+
+    @pytest.mark.asyncio
+    async def test_adaptive_concurrency_limiter_aimd(self):
+        """测试AIMD：用满上限时缓慢增长，过载时减半并遵守Retry-After"""
+        from src.loom.utils.async_helpers import AdaptiveConcurrencyLimiter
+
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=2, max_limit=4, decrease_cooldown=0
+        )
+        for _ in range(20):
+            await limiter.acquire()
+            await limiter.acquire()
+            limiter.release(latency=0.01)
+            limiter.release(latency=0.01)
+        assert limiter.current_limit > 2
+
+        # 未用满上限时不增长
+        before = limiter.limit
+        await limiter.acquire()
+        limiter.release(latency=0.01)
+        assert limiter.limit == before
+
+        await limiter.acquire()
+        limiter.release(overloaded=True, retry_after=0.1)
+        assert limiter.limit == before / 2
+        assert limiter.get_stats()["paused_for"] > 0
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire()
+        assert loop.time() - start >= 0.09
+        limiter.release(latency=0.01)
+
+        # 超过上限的请求排队，释放后按序唤醒
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done() and limiter.get_stats()["waiting"] == 1
+        limiter.release(latency=0.01)
+        await waiter
+        assert limiter.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_provider_backs_off_on_429(self):
+        """测试Provider收到429后重试、降低并发上限并在管理器统计中暴露"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        from src.loom.interpretation.enhanced_provider_manager import (
+            EnhancedProviderManager,
+        )
+
+        calls = []
+
+        async def generate(request):
+            body = await request.json()
+            calls.append(body["prompt"])
+            if len(calls) == 1:
+                return web.Response(
+                    status=429, text="slow down", headers={"Retry-After": "0.1"}
+                )
+            return web.json_response({"model": body["model"], "response": "ok"})
+
+        app = web.Application()
+        app.router.add_post("/api/generate", generate)
+        server = TestServer(app)
+        await server.start_server()
+        provider = LocalProvider(
+            {
+                "name": "local",
+                "type": "local",
+                "model": "llama",
+                "enable_caching": False,
+                "base_url": str(server.make_url("/api")),
+                "adaptive_concurrency": {"initial_limit": 8},
+            }
+        )
+        try:
+            response = await provider.generate("hello")
+            assert response.content == "ok"
+            assert len(calls) == 2
+
+            concurrency = provider.get_stats()["concurrency"]["llama"]
+            assert concurrency["limit"] == 4
+            assert concurrency["decreases"] == 1
+            assert concurrency["throttled"] == 1
+
+            manager = EnhancedProviderManager({})
+            manager.providers["local"] = provider
+            stats = await manager.get_provider_stats()
+            assert stats["providers"]["local"]["concurrency_limits"] == {"llama": 4}
+            assert stats["overall"]["concurrency_limits"] == {"local": {"llama": 4}}
+        finally:
+            await provider.close()
+            await server.close()
+
+    async def test_circuit_breaker_skips_dead_provider(self):
+        """测试熔断后不再请求失效的Provider，管理器立即切换"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+
+        calls = []
+
+        async def generate(request):
+            calls.append(1)
+            return web.Response(status=503, text="down")
+
+        app = web.Application()
+        app.router.add_post("/api/generate", generate)
+        server = TestServer(app)
+        await server.start_server()
+        dead = LocalProvider(
+            {
+                "name": "dead",
+                "type": "local",
+                "model": "llama",
+                "max_retries": 1,
+                "enable_caching": False,
+                "base_url": str(server.make_url("/api")),
+                "circuit_breaker": {"min_calls": 2, "reset_timeout": 60},
+            }
+        )
+        healthy = AsyncMock(spec=LLMProvider)
+        healthy.provider_type = "test"
+        healthy.enabled = True
+        healthy.generate.return_value = LLMResponse(content="ok", model="m")
+
+        manager = ProviderManager()
+        manager.register_provider("dead", dead)
+        manager.register_provider("healthy", healthy)
+        manager.set_fallback_order(["dead", "healthy"])
+        try:
+            for prompt in ("a", "b"):
+                response = await dead.generate(prompt)
+                assert response.metadata["fallback"] is True
+            assert len(calls) == 2 and dead.circuit_open()
+
+            response = await manager.generate_with_fallback("c")
+            assert response.content == "ok"
+            assert len(calls) == 2
+
+            stats = dead.get_stats()["circuit_breakers"]["llama"]
+            assert stats["state"] == "open" and stats["rejected"] == 0
+
+            # 流式：熔断的Provider在输出前抛出CircuitOpenError，切换到下一个
+            async def healthy_stream(prompt, **kwargs):
+                yield "good"
+
+            healthy.generate_stream = healthy_stream
+            with pytest.raises(CircuitOpenError):
+                async for _ in dead.generate_stream("d"):
+                    pass
+            chunks = [c async for c in manager.generate_stream_with_fallback("d")]
+            assert chunks == ["good"]
+            assert len(calls) == 2
+        finally:
+            await dead.close()
+            await server.close()
 
 
 class TestIntegration:
@@ -180,6 +180,162 @@ class TestEnhancedProviderManager:
         # 由于第一个Provider失败，应该回退到第二个Provider
         assert response.content == "Mock response from provider1"
 
+    @pytest.mark.asyncio
+    async def test_intelligent_fallback_coalesces_identical_requests(
+        self, manager, mock_providers
+    ):
+        """测试智能故障转移合并相同的在途请求"""
+        provider = mock_providers["provider1"]
+        provider.enable_coalescing = False  # 只验证管理器层的合并
+        await manager.register_provider("only", provider)
+
+        responses = await asyncio.gather(
+            *[manager.generate_with_intelligent_fallback("Same") for _ in range(3)]
+        )
+
+        assert all(r is responses[0] for r in responses)
+        assert provider.request_count == 1
+        assert manager._single_flight.get_stats()["coalesced"] == 2
+
+    @staticmethod
+    def _enable_hedging(manager, primary: str, latency: float):
+        """启用对冲并为主Provider预置足够的延迟样本"""
+        manager.enable_hedging = True
+        manager.hedge_min_samples = 3
+        for _ in range(3):
+            manager.health_monitor._get_metrics(primary).record_latency(latency)
+        manager.cost_tracker = Mock()
+        manager.cost_tracker.estimate_cost.return_value = 0.5
+        manager.cost_tracker.can_make_request.return_value = (True, "")
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_cancels_slow_primary(self, manager):
+        """测试主Provider过慢时对冲到次优Provider并取消落败请求"""
+        slow = MockLLMProvider("slow", latency=1.0)
+        fast = MockLLMProvider("fast", latency=0.01)
+        await manager.register_provider("slow", slow)
+        await manager.register_provider("fast", fast)
+        self._enable_hedging(manager, "slow", 0.05)
+
+        response = await manager.generate_with_intelligent_fallback(
+            "Hedge me", priority=ProviderPriority.COST
+        )
+        await asyncio.sleep(0)
+
+        assert response.content == "Mock response from fast"
+        assert slow._single_flight.get_stats()["abandoned"] == 1
+
+        stats = manager.get_hedging_stats()
+        assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+        assert stats["cancelled"] == 1
+        assert stats["hedge_rate"] == 1.0 and stats["hedge_win_rate"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_does_not_shrink_after_hedge_wins(self, manager):
+        """测试被取消的主Provider记录已耗时，对冲等待时间不会因胜者偏差而下降"""
+        slow = MockLLMProvider("slow", latency=1.0)
+        fast = MockLLMProvider("fast", latency=0.01)
+        await manager.register_provider("slow", slow)
+        await manager.register_provider("fast", fast)
+        self._enable_hedging(manager, "slow", 0.05)
+        slow.enable_coalescing = False
+
+        metrics = manager.health_monitor.metrics["slow"]
+        delays = [manager._hedge_delay("slow")]
+        for i in range(3):
+            response = await manager.generate_with_intelligent_fallback(
+                f"Hedge {i}", priority=ProviderPriority.COST
+            )
+            assert response.content == "Mock response from fast"
+            delays.append(manager._hedge_delay("slow"))
+
+        assert metrics.latency_count == 6
+        assert all(later >= earlier for earlier, later in zip(delays, delays[1:]))
+        assert manager.get_hedging_stats()["hedge_wins"] == 3
+
+    @pytest.mark.asyncio
+    async def test_hedge_skipped_when_over_budget(self, manager):
+        """测试预算不足时不发出对冲请求"""
+        slow = MockLLMProvider("slow", latency=0.1)
+        fast = MockLLMProvider("fast", latency=0.01)
+        await manager.register_provider("slow", slow)
+        await manager.register_provider("fast", fast)
+        self._enable_hedging(manager, "slow", 0.01)
+        manager.cost_tracker.can_make_request.return_value = (False, "over budget")
+
+        response = await manager.generate_with_intelligent_fallback(
+            "Budget", priority=ProviderPriority.COST
+        )
+
+        assert response.content == "Mock response from slow"
+        assert fast.request_count == 0
+        manager.cost_tracker.can_make_request.assert_called_once_with(0.5)
+        assert manager.get_hedging_stats()["skipped_budget"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hedging_requires_opt_in_samples_and_cost_tracker(self, manager):
+        """测试对冲默认关闭，样本不足或没有成本跟踪器时不对冲"""
+        slow = MockLLMProvider("slow", latency=0.1)
+        fast = MockLLMProvider("fast", latency=0.01)
+        await manager.register_provider("slow", slow)
+        await manager.register_provider("fast", fast)
+        assert manager.enable_hedging is False
+        assert manager._hedge_delay("slow") is None
+
+        # 已启用但延迟样本不足
+        manager.enable_hedging = True
+        assert manager._hedge_delay("slow") is None
+
+        # 样本足够但没有成本跟踪器
+        for _ in range(manager.hedge_min_samples):
+            manager.health_monitor._get_metrics("slow").record_latency(0.01)
+        assert manager._hedge_delay("slow") is not None
+        response = await manager.generate_with_intelligent_fallback(
+            "No tracker", priority=ProviderPriority.COST
+        )
+
+        assert response.content == "Mock response from slow"
+        assert fast.request_count == 0
+        assert manager.get_hedging_stats()["hedged"] == 0
+
+    def test_streaming_latency_metrics(self):
+        """测试EWMA延迟和分位数草图"""
+        metrics = ProviderMetrics()
+        for i in range(1, 1001):
+            metrics.record_latency(i / 1000)
+
+        # 草图的相对误差约4%
+        assert metrics.p95_latency == pytest.approx(0.95, rel=0.05)
+        assert metrics.latency_count == 1000
+
+        # EWMA几个样本内就跟上延迟恶化
+        for _ in range(10):
+            metrics.record_latency(5.0)
+        assert metrics.avg_latency > 4.5
+
+    @pytest.mark.asyncio
+    async def test_latency_aware_selection_modes(self, mock_providers):
+        """测试p2c与最少在途请求路由"""
+        monitor = ProviderHealthMonitor({})
+        names = ["provider1", "provider2"]
+        for strategy in ("p2c", "least_outstanding"):
+            balancer = ProviderLoadBalancer({"selection_strategy": strategy})
+            for name in names:
+                balancer.add_provider(name, mock_providers[name])
+                monitor.health_checks[name] = ProviderHealth()
+                monitor.metrics[name] = ProviderMetrics()
+
+            monitor.metrics["provider1"].record_latency(2.0)
+            monitor.metrics["provider2"].record_latency(0.5)
+            selected = await balancer.select_provider("p", health_monitor=monitor)
+            assert selected == "provider2"
+
+            # 快的Provider积压较多在途请求时改选另一个
+            for _ in range(5):
+                monitor.request_started("provider2")
+            selected = await balancer.select_provider("p", health_monitor=monitor)
+            assert selected == "provider1"
+
     @pytest.mark.asyncio
     async def test_provider_health_monitoring(self, manager, mock_providers):
         """测试Provider健康监控"""
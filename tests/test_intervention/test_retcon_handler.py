@@ -13,6 +13,7 @@ from src.loom.intervention.retcon_handler import (
     RetconOperation,
     RetconResult,
 )
+from src.loom.memory.world_memory import MemoryEntity, MemoryEntityType, WorldMemory
 
 
 class TestRetconHandler:
@@ -248,6 +249,56 @@ class TestRetconHandler:
         # 由于没有WorldMemory，应该失败
         assert success == False
 
+    @pytest.mark.asyncio
+    async def test_delta_snapshots_rollback_and_compaction(self):
+        """测试增量快照、逆序回滚和检查点压缩"""
+        memory = WorldMemory("test_session")
+        handler = RetconHandler(memory, max_delta_versions=2, checkpoint_interval=2)
+        for i in range(5):
+            await memory.store_entity(
+                MemoryEntity(
+                    id=f"fact_{i}",
+                    session_id="test_session",
+                    type=MemoryEntityType.FACT,
+                    content={"statement": f"事实{i}"},
+                    created_at=datetime.now(),
+                    updated_at=datetime.now(),
+                )
+            )
+        context = {"session_id": "test_session"}
+
+        def operation(op_type, target_id, changes):
+            return RetconOperation(
+                type=op_type,
+                target_id=target_id,
+                changes=changes,
+                justification="测试增量快照",
+                timestamp=datetime.now(),
+            )
+
+        first = await handler.execute_retcon(
+            operation("modify_fact", "fact_0", {"new": "改写"}), context
+        )
+        await handler.execute_retcon(
+            operation("add_memory", "added", {"content": "新增"}), context
+        )
+        last = await handler.execute_retcon(
+            operation("remove_memory", "fact_1", {"reason": "移除"}), context
+        )
+
+        # 快照只记录被修改的实体；超过上限后最旧的两个版本合并为检查点
+        versions = {v["id"]: v for v in handler.get_available_versions()}
+        assert set(versions) == {first.version_created, last.version_created}
+        assert versions[first.version_created]["type"] == "checkpoint"
+        assert versions[first.version_created]["changed_entities"] == 2
+        assert versions[last.version_created]["changed_entities"] == 1
+
+        assert await handler.rollback_to_version(first.version_created)
+        assert (await memory.retrieve_entity("fact_0")).content == {"statement": "事实0"}
+        assert "removed" not in (await memory.retrieve_entity("fact_1")).content
+        assert await memory.retrieve_entity("added") is None
+        assert list(handler.version_snapshots) == [first.version_created]
+
     @pytest.mark.asyncio
     async def test_resolve_retcon_conflicts(self):
         """测试解决Retcon冲突"""
@@ -6,15 +6,20 @@
 
 import asyncio
 import json
+import threading
+import time
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
+from src.loom.memory.embedding_cache import EmbeddingCache
+from src.loom.memory.embedding_worker import EmbeddingWorkerPool
 from src.loom.memory.enhanced_world_memory import (
     EnhancedMemoryConfig,
     EnhancedWorldMemory,
 )
+from src.loom.memory.importance_scorer import ImportanceScorer
 from src.loom.memory.memory_consistency_checker import (
     ConsistencyIssueType,
     ConsistencySeverity,
@@ -26,6 +31,21 @@ from src.loom.memory.memory_summarizer import (
     SummaryFormat,
     SummaryStrategy,
 )
+from src.loom.memory.quantization import (
+    QuantizedVectorIndex,
+    decode_embedding_blob,
+    encode_embedding_blob,
+)
+from src.loom.memory.query_cache import QueryCache
+from src.loom.memory.relation_graph import RelationGraph
+from src.loom.memory.structured_store import StructuredStore
+from src.loom.memory.temporal_intervals import (
+    TemporalInterval,
+    TemporalIntervalIndex,
+    find_overlapping_pairs,
+    interval_from_entity,
+)
+from src.loom.memory.timeline_index import TimelineIndex
 from src.loom.memory.vector_memory_store import VectorMemoryStore, VectorStoreBackend
 from src.loom.memory.world_memory import (
     MemoryEntity,
@@ -33,6 +53,7 @@ from src.loom.memory.world_memory import (
     MemoryRelation,
     MemoryRelationType,
 )
+from src.loom.utils.ttl_cache import TTLCache
 
 
 class TestVectorMemoryStore:
@@ -107,6 +128,687 @@ class TestVectorMemoryStore:
         assert not any(entity_id == test_entity.id for entity_id, _ in results)
 
 
+class _FakeEncoder:
+    """基于文本哈希生成确定性嵌入的测试编码器"""
+
+    def __init__(self, dimension: int = 16):
+        self.dimension = dimension
+        self.calls = []
+
+    def encode(self, texts, batch_size=None):
+        import hashlib
+
+        self.calls.append(list(texts))
+        return [
+            [b / 255.0 - 0.5 for b in hashlib.sha256(t.encode()).digest()][
+                : self.dimension
+            ]
+            for t in texts
+        ]
+
+
+class TestFaissVectorMemoryStore:
+    """测试VectorMemoryStore的FAISS后端"""
+
+    @pytest.fixture(params=["flat", "ivf", "hnsw"])
+    def faiss_store(self, request, tmp_path):
+        """创建使用FAISS后端的VectorMemoryStore"""
+        pytest.importorskip("faiss")
+        config = {
+            "backend": VectorStoreBackend.FAISS.value,
+            "embedding_dimension": 16,
+            "persist_directory": str(tmp_path),
+            "faiss_index_type": request.param,
+            "faiss_nlist": 2,
+            "faiss_min_train_size": 4,
+        }
+        store = VectorMemoryStore(config)
+        assert store.enabled
+        store.embedding_model = _FakeEncoder()
+        return store
+
+    def _entities(self, count: int):
+        return [
+            MemoryEntity(
+                id=f"faiss_entity_{i}",
+                session_id="test_session",
+                type=MemoryEntityType.FACT,
+                content={"text": f"FAISS测试实体 {i}"},
+                created_at=datetime.now(),
+                updated_at=datetime.now(),
+            )
+            for i in range(count)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_batch_store_and_search(self, faiss_store):
+        """测试批量写入后可检索到最相似实体"""
+        entities = self._entities(6)
+        results = await faiss_store.store_entities_batch(entities)
+        assert all(results.values())
+
+        query_text = faiss_store._entity_to_text(entities[3])
+        hits = await faiss_store.semantic_search(query_text, limit=3)
+        assert hits[0][0] == entities[3].id
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-4)
+
+        filtered = await faiss_store.semantic_search(
+            query_text, filters={"session_id": "other_session"}, limit=3
+        )
+        assert filtered == []
+
+    @pytest.mark.asyncio
+    async def test_delete_and_upsert(self, faiss_store):
+        """测试删除和重复写入不会返回过期向量"""
+        entities = self._entities(6)
+        await faiss_store.store_entities_batch(entities)
+
+        assert await faiss_store.delete_entity(entities[0].id)
+        query_text = faiss_store._entity_to_text(entities[0])
+        hits = await faiss_store.semantic_search(query_text, limit=10)
+        assert entities[0].id not in [entity_id for entity_id, _ in hits]
+
+        await faiss_store.store_entity_with_embedding(entities[1])
+        hits = await faiss_store.semantic_search(query_text, limit=10)
+        ids = [entity_id for entity_id, _ in hits]
+        assert ids.count(entities[1].id) == 1
+        assert len(ids) == 5
+
+    @pytest.mark.asyncio
+    async def test_persist_and_reload(self, faiss_store):
+        """测试索引持久化后重新加载"""
+        entities = self._entities(6)
+        await faiss_store.store_entities_batch(entities)
+        await faiss_store.delete_entity(entities[5].id)
+        assert await faiss_store.persist() is True
+
+        reloaded = VectorMemoryStore(faiss_store.config.__dict__.copy())
+        reloaded.embedding_model = _FakeEncoder()
+
+        query_text = faiss_store._entity_to_text(entities[2])
+        hits = await reloaded.semantic_search(query_text, limit=10)
+        ids = [entity_id for entity_id, _ in hits]
+        assert ids[0] == entities[2].id
+        assert entities[5].id not in ids
+        assert len(ids) == 5
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("quantization", ["float16", "int8"])
+    async def test_scalar_quantized_index_with_rerank(
+        self, faiss_store, quantization, tmp_path
+    ):
+        """测试启用量化时使用标量量化索引，并从嵌入缓存取回float32重排"""
+        import faiss
+
+        config = {
+            **faiss_store.config.__dict__,
+            "persist_directory": str(tmp_path / quantization),
+            "vector_quantization": quantization,
+            "quantization_rerank_k": 5,
+            "persist_embedding_cache": True,
+        }
+        store = VectorMemoryStore(config)
+        store.embedding_model = _FakeEncoder()
+
+        base_index = store.index
+        if isinstance(base_index, faiss.IndexIDMap2):
+            base_index = faiss.downcast_index(base_index.index)
+        assert isinstance(
+            base_index,
+            (
+                faiss.IndexScalarQuantizer,
+                faiss.IndexIVFScalarQuantizer,
+                faiss.IndexHNSWSQ,
+            ),
+        )
+
+        entities = self._entities(6)
+        await store.store_entities_batch(entities)
+
+        query_text = store._entity_to_text(entities[3])
+        calls = len(store.embedding_model.calls)
+        hits = await store.semantic_search(query_text, limit=3)
+        assert all(call == [query_text] for call in store.embedding_model.calls[calls:])
+        assert hits[0][0] == entities[3].id
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+        # 重新加载后重排所需文本仍在，float32嵌入来自磁盘缓存
+        assert await store.persist() is True
+        store.embedding_cache.close()
+        reloaded = VectorMemoryStore(config)
+        reloaded.embedding_model = _FakeEncoder()
+        hits = await reloaded.semantic_search(query_text, limit=3)
+        assert reloaded.embedding_model.calls == []
+        assert hits[0][0] == entities[3].id
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+class TestEmbeddingBatching:
+    """测试批量嵌入计算和持久化嵌入缓存"""
+
+    def _store(self, tmp_path, **overrides):
+        config = {
+            "backend": VectorStoreBackend.FAISS.value,
+            "embedding_dimension": 16,
+            "persist_directory": str(tmp_path),
+            "persist_embedding_cache": True,
+            **overrides,
+        }
+        store = VectorMemoryStore(config)
+        store.embedding_model = _FakeEncoder()
+        return store
+
+    @pytest.mark.asyncio
+    async def test_uncached_texts_encoded_in_one_call(self, tmp_path):
+        """测试未缓存文本去重后一次性编码"""
+        pytest.importorskip("faiss")
+        store = self._store(tmp_path)
+
+        embeddings = await store.get_embeddings(["甲", "乙", "甲"])
+        assert len(embeddings) == 3
+        assert embeddings[0] == embeddings[2]
+        assert store.embedding_model.calls == [["甲", "乙"]]
+
+        await store.get_embeddings(["乙", "丙"])
+        assert store.embedding_model.calls[-1] == ["丙"]
+
+    @pytest.mark.asyncio
+    async def test_persistent_cache_survives_restart(self, tmp_path):
+        """测试重启后未变化文本直接命中磁盘缓存"""
+        pytest.importorskip("faiss")
+        first = self._store(tmp_path)
+        expected = await first.get_embeddings(["不变的文本"])
+        first.embedding_cache.close()
+
+        second = self._store(tmp_path)
+        embeddings = await second.get_embeddings(["不变的文本"])
+        assert second.embedding_model.calls == []
+        assert embeddings[0] == pytest.approx(expected[0], abs=1e-6)
+        assert second.embedding_cache.get_stats()["disk_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_memory_tier_is_bounded(self, tmp_path):
+        """测试内存层按LRU淘汰"""
+        pytest.importorskip("faiss")
+        store = self._store(
+            tmp_path, persist_embedding_cache=False, embedding_cache_size=2
+        )
+
+        await store.get_embeddings(["a", "b", "c"])
+        assert len(store.embedding_cache) == 2
+        assert store.embedding_cache.get_stats()["memory_evictions"] == 1
+
+    def test_memory_tier_thread_safe(self, tmp_path):
+        """测试内存层可在线程池中并发读写"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        cache = EmbeddingCache(
+            "fake", max_memory_entries=8, db_path=str(tmp_path / "cache.db")
+        )
+
+        def worker(seed: int):
+            for i in range(200):
+                key = cache.make_key(f"{seed}-{i % 16}")
+                cache.put_many({key: [float(i)]})
+                cache.get_many([key, cache.make_key(f"{seed}-{(i + 1) % 16}")])
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(8)))
+
+        assert len(cache) <= 8
+        stats = cache.get_stats()
+        assert stats["memory_hits"] + stats["disk_hits"] + stats["misses"] == 3200
+        cache.close()
+
+
+class TestEmbeddingWorkerPool:
+    """测试嵌入推理工作池"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_coalesced(self):
+        """测试并发请求被合并为一次编码"""
+        encoder = _FakeEncoder()
+        pool = EmbeddingWorkerPool(encoder.encode, max_wait_ms=20)
+
+        results = await asyncio.gather(*(pool.encode([f"文本{i}"]) for i in range(5)))
+        assert [len(r) for r in results] == [1] * 5
+        assert results[3][0] == encoder.encode(["文本3"])[0]
+        assert encoder.calls[0] == [f"文本{i}" for i in range(5)]
+
+        stats = pool.get_stats()
+        assert stats["batches"] == 1
+        assert stats["requests"] == 5
+        assert stats["queue_latency"]["max_ms"] >= 0
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit_and_errors(self):
+        """测试批大小上限和异常传播"""
+        encoder = _FakeEncoder()
+        pool = EmbeddingWorkerPool(encoder.encode, max_batch_size=2, max_wait_ms=20)
+        await asyncio.gather(*(pool.encode([f"文本{i}"]) for i in range(4)))
+        assert all(len(call) <= 2 for call in encoder.calls)
+
+        # 放不下的请求留到下一批，超大请求分块编码
+        encoder.calls.clear()
+        results = await asyncio.gather(
+            pool.encode(["a"]), pool.encode(["b", "c"]), pool.encode(["d", "e", "f"])
+        )
+        assert [len(r) for r in results] == [1, 2, 3]
+        assert results[2][2] == encoder.encode(["f"])[0]
+        assert all(len(call) <= 2 for call in encoder.calls)
+        await pool.close()
+
+        def failing(texts):
+            raise ValueError("model crashed")
+
+        pool = EmbeddingWorkerPool(failing)
+        with pytest.raises(ValueError):
+            await pool.encode(["文本"])
+        assert pool.get_stats()["errors"] == 1
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_dispatcher_error_fails_batch_and_releases_slot(self):
+        """测试分发异常时请求失败且推理槽位被释放"""
+        encoder = _FakeEncoder()
+        pool = EmbeddingWorkerPool(encoder.encode, max_wait_ms=1)
+        run_batch = pool._run_batch
+        pool._run_batch = Mock(side_effect=ValueError("dispatch failed"))
+
+        with pytest.raises(ValueError, match="dispatch failed"):
+            await asyncio.wait_for(pool.encode(["文本"]), 1)
+        assert pool._slots._value == pool.num_workers
+        assert pool.get_stats()["errors"] == 1
+
+        # 分发循环继续工作
+        pool._run_batch = run_batch
+        assert await pool.encode(["文本"]) == encoder.encode(["文本"])
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_close_fails_pending_requests(self):
+        """测试关闭时排队中的请求失败，已在推理的批次照常完成"""
+        encoder = _FakeEncoder()
+        release = threading.Event()
+
+        def blocking(texts):
+            release.wait(5)
+            return encoder.encode(texts)
+
+        pool = EmbeddingWorkerPool(blocking, max_batch_size=1, max_wait_ms=1)
+        tasks = [asyncio.ensure_future(pool.encode([f"文本{i}"])) for i in range(3)]
+        await asyncio.sleep(0.05)
+
+        await pool.close()
+        release.set()
+        results = await asyncio.wait_for(
+            asyncio.gather(*tasks, return_exceptions=True), 5
+        )
+        assert results[0] == encoder.encode(["文本0"])
+        assert all(isinstance(r, RuntimeError) for r in results[1:])
+        with pytest.raises(RuntimeError):
+            await pool.encode(["文本"])
+
+
+class TestQuantizedVectors:
+    """测试量化向量索引和内存后端的量化搜索"""
+
+    def _vectors(self, count: int):
+        encoder = _FakeEncoder()
+        texts = [f"量化测试实体 {i}" for i in range(count)]
+        return texts, encoder.encode(texts)
+
+    @pytest.mark.parametrize("dtype", ["float16", "int8"])
+    def test_index_search_and_remove(self, dtype):
+        """测试量化索引检索、更新和删除"""
+        texts, vectors = self._vectors(20)
+        index = QuantizedVectorIndex(16, dtype=dtype)
+        index.add(texts, vectors)
+
+        hits = index.search(vectors[7], limit=3)
+        assert hits[0][0] == texts[7]
+        assert hits[0][1] == pytest.approx(1.0, abs=0.02)
+
+        index.remove([texts[7], texts[0]])
+        assert len(index) == 18
+        assert texts[7] not in [entity_id for entity_id, _ in index.search(vectors[7])]
+        assert index.search(vectors[19], limit=1)[0][0] == texts[19]
+
+        hits = index.search(vectors[3], limit=2, predicate=lambda i: i != texts[3])
+        assert texts[3] not in [entity_id for entity_id, _ in hits]
+        assert index.nbytes < 18 * 16 * 4
+
+    @pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+    def test_blob_roundtrip(self, dtype):
+        """测试BLOB编码还原"""
+        embedding = [0.5, -0.25, 0.125, 0.0]
+        blob = encode_embedding_blob(embedding, dtype)
+        assert decode_embedding_blob(blob) == pytest.approx(embedding, abs=0.01)
+
+    @pytest.mark.asyncio
+    async def test_memory_backend_quantized_search_with_rerank(self):
+        """测试内存后端在量化向量上搜索并用float32重排"""
+        store = VectorMemoryStore(
+            {
+                "backend": VectorStoreBackend.MEMORY.value,
+                "embedding_dimension": 16,
+                "vector_quantization": "int8",
+                "quantization_rerank_k": 5,
+            }
+        )
+        store.embedding_model = _FakeEncoder()
+
+        entities = [
+            MemoryEntity(
+                id=f"quantized_{i}",
+                session_id="test_session",
+                type=MemoryEntityType.FACT,
+                content={"text": f"量化实体 {i}"},
+                created_at=datetime.now(),
+                updated_at=datetime.now(),
+            )
+            for i in range(8)
+        ]
+        await store.store_entities_batch(entities)
+        assert set(store.memory_store[entities[0].id]) == {"metadata", "text"}
+
+        # 重排从嵌入缓存取回float32嵌入，只为查询文本调用模型
+        query_text = store._entity_to_text(entities[4])
+        calls = len(store.embedding_model.calls)
+        hits = await store.semantic_search(query_text, limit=3)
+        assert all(call == [query_text] for call in store.embedding_model.calls[calls:])
+        assert hits[0][0] == entities[4].id
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+        await store.delete_entity(entities[4].id)
+        hits = await store.semantic_search(query_text, limit=10)
+        assert entities[4].id not in [entity_id for entity_id, _ in hits]
+
+
+class TestRelationGraph:
+    """测试RelationGraph"""
+
+    @pytest.fixture
+    def graph(self):
+        """a-b-c-d 链 + a-e 分支"""
+        graph = RelationGraph()
+        graph.load(
+            [
+                MemoryRelation("a", "b", MemoryRelationType.KNOWS),
+                MemoryRelation("b", "c", MemoryRelationType.KNOWS),
+                MemoryRelation("c", "d", MemoryRelationType.LOCATED_AT),
+                MemoryRelation("e", "a", MemoryRelationType.OWNS),
+            ]
+        )
+        return graph
+
+    def test_neighbors_follow_both_directions(self, graph):
+        assert graph.loaded
+        assert graph.edge_count == 4
+        assert set(graph.neighbors("a")) == {"b", "e"}
+        assert graph.neighbors("a", MemoryRelationType.OWNS) == ["e"]
+        assert graph.neighbors("a", direction="out") == ["b"]
+
+    def test_bfs_levels_and_k_hop(self, graph):
+        levels = list(graph.bfs_levels("a", 2))
+        assert levels[0] == ["a"]
+        assert set(levels[1]) == {"b", "e"}
+        assert levels[2] == ["c"]
+
+        assert graph.k_hop("a", 2) == {"b": 1, "e": 1, "c": 2}
+        assert graph.k_hop("a", 3, MemoryRelationType.KNOWS) == {"b": 1, "c": 2}
+
+    def test_shortest_path(self, graph):
+        assert graph.shortest_path("e", "d") == ["e", "a", "b", "c", "d"]
+        assert graph.shortest_path("e", "d", max_depth=3) is None
+        assert graph.shortest_path("a", "a") == ["a"]
+        assert graph.shortest_path("a", "missing") is None
+
+    def test_remove_edges_and_entities(self, graph):
+        assert graph.remove("a", "b", MemoryRelationType.KNOWS)
+        assert not graph.remove("a", "b", MemoryRelationType.KNOWS)
+        assert graph.shortest_path("a", "d") is None
+
+        assert graph.remove_entity("c") == 2
+        assert graph.neighbors("d") == []
+        assert graph.edge_count == 1
+
+
+class TestTTLCache:
+    """测试TTLCache"""
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        cache = TTLCache(max_entries=2, default_ttl=None)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert "b" not in cache
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+        sized = TTLCache(max_entries=10, max_bytes=100, size_fn=len)
+        sized.set("x", "x" * 60)
+        sized.set("y", "y" * 60)
+        assert "x" not in sized
+        assert sized.nbytes == 60
+        assert sized.get_stats()["evictions"] == 1
+
+    def test_expired_entries_purged_on_write(self):
+        cache = TTLCache(max_entries=10, default_ttl=60)
+        cache.set("short", 1, ttl=0.001)
+        cache.set("forever", 2, ttl=None)
+        time.sleep(0.01)
+
+        cache.set("other", 3)
+        assert len(cache) == 2
+        assert cache.get("short") is None
+        assert cache.get("forever") == 2
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_query_cache_tag_index_follows_evictions(self):
+        """测试QueryCache的标签索引随TTLCache淘汰和过期同步清理"""
+        cache = QueryCache(max_entries=2, ttl_seconds=60)
+        cache.set(("a",), 1, tags=["s1", ("entity", "a")])
+        cache.set(("b",), 2, tags=["s1"])
+        cache.set(("c",), 3, tags=["s2"])
+        assert ("a",) not in cache
+        assert cache.get_stats()["tags"] == 2  # ("entity", "a") 已随条目移除
+
+        assert cache.invalidate("s1") == 1
+        assert cache.get(("b",)) is None and cache.get(("c",)) == 3
+
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1 and stats["invalidations"] == 1
+
+        short = QueryCache(max_entries=2, ttl_seconds=0.001)
+        short.set(("d",), 4, tags=["s3"])
+        time.sleep(0.01)
+        assert short.get(("d",)) is None
+        assert short.get_stats()["tags"] == 0
+        assert short.get_stats()["expirations"] == 1
+
+
+class TestTimelineIndex:
+    """测试TimelineIndex"""
+
+    def _entity(self, entity_id, hours):
+        return MemoryEntity(
+            id=entity_id,
+            session_id="test_session",
+            type=MemoryEntityType.EVENT,
+            content={},
+            created_at=datetime(2024, 1, 1) + timedelta(hours=hours),
+            updated_at=datetime(2024, 1, 1),
+        )
+
+    def test_range_is_inclusive_and_ordered(self):
+        index = TimelineIndex()
+        index.load([self._entity(f"e{h}", h) for h in (5, 1, 3, 3)])
+        index.add(self._entity("e2", 2))
+
+        start = datetime(2024, 1, 1, 2)
+        end = datetime(2024, 1, 1, 3)
+        assert [e.id for e in index.range(start, end)] == ["e2", "e3"]
+        assert [e.id for e in index.range(limit=2)] == ["e1", "e2"]
+        assert [e.id for e in index.range(start_time=end)] == ["e3", "e5"]
+
+    def test_move_and_remove(self):
+        index = TimelineIndex()
+        index.load([self._entity("a", 1), self._entity("b", 2)])
+
+        index.add(self._entity("a", 3))
+        assert [e.id for e in index.range()] == ["b", "a"]
+
+        assert index.remove("b")
+        assert not index.remove("b")
+        assert len(index) == 1
+
+
+class TestTemporalIntervals:
+    """测试时间区间扫描和区间索引"""
+
+    def test_sweep_and_index_match_brute_force(self):
+        import random
+
+        rng = random.Random(7)
+        base = datetime(2024, 1, 1)
+        intervals = []
+        for i in range(200):
+            start = base + timedelta(minutes=rng.randrange(0, 5000))
+            intervals.append(
+                TemporalInterval(
+                    entity_id=f"e{i:03d}",
+                    start=start,
+                    end=start + timedelta(minutes=rng.randrange(1, 300)),
+                    subjects=frozenset(rng.sample("abcdef", rng.randint(1, 2))),
+                )
+            )
+
+        expected = {
+            (a.entity_id, b.entity_id)
+            for i, a in enumerate(intervals)
+            for b in intervals[i + 1 :]
+            if a.subjects & b.subjects and a.overlaps(b)
+        }
+        swept = {
+            tuple(sorted((a.entity_id, b.entity_id)))
+            for a, b, _ in find_overlapping_pairs(intervals)
+        }
+        assert swept == expected
+
+        index = TemporalIntervalIndex()
+        incremental = set()
+        for interval in intervals:
+            for other, _ in index.overlapping(interval):
+                incremental.add(tuple(sorted((other.entity_id, interval.entity_id))))
+            index.add(interval)
+        assert incremental == expected
+
+    @pytest.mark.asyncio
+    async def test_only_events_or_timed_entities_have_intervals(self):
+        now = datetime(2024, 1, 1, 12)
+
+        def make(entity_id, entity_type, content, minutes):
+            return MemoryEntity(
+                id=entity_id,
+                session_id="test_session",
+                type=entity_type,
+                content={"participants": ["alice"], **content},
+                created_at=now + timedelta(minutes=minutes),
+                updated_at=now,
+            )
+
+        entities = [
+            make("f1", MemoryEntityType.FACT, {"text": "alice is brave"}, 0),
+            make("o1", MemoryEntityType.OBJECT, {"name": "alice's sword"}, 10),
+            make("c1", MemoryEntityType.CHARACTER, {"name": "alice"}, 20),
+        ]
+        assert [interval_from_entity(e) for e in entities] == [None, None, None]
+        issues = await MemoryConsistencyChecker()._check_temporal_conflicts(entities)
+        assert not [i for i in issues if i.issue_id.startswith("overlap_")]
+
+        # 事件和带显式时间的实体仍然参与冲突检测
+        event = make("ev1", MemoryEntityType.EVENT, {}, 0)
+        timed = make("f2", MemoryEntityType.FACT, {"start_time": (now).isoformat()}, 30)
+        pairs = find_overlapping_pairs(
+            [interval_from_entity(event), interval_from_entity(timed)]
+        )
+        assert [(a.entity_id, b.entity_id) for a, b, _ in pairs] == [("ev1", "f2")]
+
+
+class TestImportanceScorer:
+    """测试ImportanceScorer"""
+
+    NOW = datetime(2024, 2, 1)
+
+    def _entities(self):
+        return [
+            MemoryEntity(
+                id=f"e{i}",
+                session_id="test_session",
+                type=entity_type,
+                content=content,
+                created_at=self.NOW - timedelta(days=days),
+                updated_at=self.NOW,
+                version=version,
+                metadata=metadata,
+            )
+            for i, (entity_type, content, days, version, metadata) in enumerate(
+                [
+                    (MemoryEntityType.PLOTLINE, {"a": 1, "b": 2}, 0, 1, {}),
+                    (MemoryEntityType.STYLE, "短 文本 文本", 45, 1, {}),
+                    (MemoryEntityType.FACT, [1, 2], 15, 3, {"importance": "x"}),
+                    (MemoryEntityType.CHARACTER, {}, 3, 1, {"access_count": 5}),
+                ]
+            )
+        ]
+
+    def test_batch_matches_scalar_definition(self):
+        scorer = ImportanceScorer()
+        entities = self._entities()
+        batch = scorer.score_batch(entities, relation_degrees={"e0": 5}, now=self.NOW)
+
+        assert batch.factors_of(0) == pytest.approx(
+            {
+                "type": 0.9,
+                "content_complexity": 0.2,
+                "recency": 1.0,
+                "activity": 1 / 3,
+            }
+        )
+        # 无活跃信号时不计入活跃度，超过30天的新鲜度为0
+        assert set(batch.factors_of(1)) == {"type", "content_complexity", "recency"}
+        assert batch.factors_of(1)["recency"] == 0.0
+        # 元数据重要性无法解析时记为0.5，修订次数计入活跃度
+        assert batch.factors_of(2)["metadata"] == 0.5
+        assert batch.factors_of(2)["activity"] == pytest.approx(0.5 / 3)
+        assert batch.factors_of(3)["activity"] == pytest.approx(0.5 / 3)
+
+        for i in range(len(entities)):
+            factors = batch.factors_of(i)
+            assert batch.score_of(i) == pytest.approx(
+                sum(factors.values()) / len(factors)
+            )
+
+        assert batch.ranked(limit=2) == [0, 3]
+        assert batch.ranked(threshold=0.45) == [0, 3]
+
+    def test_features_cached_per_version(self):
+        scorer = ImportanceScorer()
+        entities = self._entities()
+        scorer.score_batch(entities, now=self.NOW)
+        scorer.score_batch(entities, now=self.NOW)
+        assert scorer.stats["feature_builds"] == 4
+        assert scorer.stats["feature_hits"] == 4
+
+        entities[0].content = {}
+        entities[0].version += 1
+        batch = scorer.score_batch(entities[:1], now=self.NOW)
+        assert scorer.stats["feature_builds"] == 5
+        assert batch.factors_of(0)["content_complexity"] == 0.0
+
+
 class TestMemorySummarizer:
     """测试MemorySummarizer"""
 
@@ -184,6 +886,111 @@ class TestMemorySummarizer:
         importance_based = summarizer._select_entities_for_summary(test_entities)
         assert len(importance_based) <= summarizer.config.max_entities_per_summary
 
+        # 混合策略只对整批实体评分一次
+        summarizer.config.summary_strategy = SummaryStrategy.HYBRID
+        batches = summarizer.importance_scorer.stats["batches"]
+        summarizer._select_entities_for_summary(test_entities)
+        assert summarizer.importance_scorer.stats["batches"] == batches + 1
+
+    @pytest.mark.asyncio
+    async def test_hierarchical_summary_recomputes_dirty_path(
+        self, test_entities, tmp_path
+    ):
+        """测试分层摘要只重算脏叶子及其祖先，并能从存储恢复"""
+        store = StructuredStore(db_path=str(tmp_path / "summary.db"))
+        await asyncio.sleep(0.1)
+
+        mock_llm = Mock()
+        mock_llm.generate = AsyncMock(return_value=Mock(content="阶段摘要"))
+        config = {
+            "enable_hierarchical": True,
+            "leaf_window_size": 2,
+            "hierarchy_fanout": 2,
+            "hierarchy_levels": 3,
+        }
+        summarizer = MemorySummarizer(mock_llm, config)
+        summarizer.summary_store = store
+
+        summary = await summarizer.update_hierarchical_summary(test_entities[:8])
+        assert summary.summary_text == "阶段摘要"
+        assert summary.metadata["total_nodes"] == 4 + 2 + 1
+        assert mock_llm.generate.await_count == 7
+
+        # 新实体只落入新叶子：叶子 + 章节 + 篇章
+        mock_llm.generate.reset_mock()
+        summary = await summarizer.generate_incremental_summary(
+            test_entities[8:9], summary
+        )
+        assert summary.metadata["refreshed_nodes"] == 3
+        assert mock_llm.generate.await_count == 3
+        assert summary.summary_text == "阶段摘要\n\n阶段摘要"
+
+        # 新的摘要器从存储恢复摘要树，不重算已有节点
+        restored = MemorySummarizer(mock_llm, config)
+        restored.summary_store = store
+        hierarchy = await restored.get_summary_hierarchy("test_session")
+        assert len(hierarchy) == len(summarizer.hierarchies["test_session"])
+        assert not hierarchy.dirty_nodes()
+        assert hierarchy.render() == summary.summary_text
+
+    @pytest.mark.asyncio
+    async def test_hierarchical_incremental_keeps_history(self):
+        """测试分层增量摘要保留之前摘要覆盖的实体，并支持删除"""
+
+        def make(i):
+            return MemoryEntity(
+                id=f"e{i}",
+                session_id="test_session",
+                type=MemoryEntityType.FACT,
+                content={"text": f"fact number {i}"},
+                created_at=datetime.now() + timedelta(seconds=i),
+                updated_at=datetime.now(),
+            )
+
+        entities = {f"e{i}": make(i) for i in list(range(5)) + [99]}
+        source = Mock()
+        source.retrieve_entity = AsyncMock(side_effect=lambda eid: entities.get(eid))
+        config = {
+            "enable_hierarchical": True,
+            "min_entities_to_summarize": 1,
+            "leaf_window_size": 2,
+            "hierarchy_fanout": 2,
+            "hierarchy_levels": 2,
+        }
+
+        # 无法加载历史实体时退回普通增量路径，不丢失之前的摘要
+        flat = MemorySummarizer(None, config)
+        previous = await flat.generate_summary([entities[f"e{i}"] for i in range(5)])
+        summary = await flat.generate_incremental_summary([entities["e99"]], previous)
+        assert previous.summary_text in summary.summary_text
+        assert len(summary.original_entities) == 6
+
+        summarizer = MemorySummarizer(None, config)
+        summarizer.entity_source = source
+        summary = await summarizer.generate_incremental_summary(
+            [entities["e99"]], previous
+        )
+        assert summary.metadata["hierarchical"] is True
+        assert sorted(summary.original_entities) == sorted(entities)
+        assert "fact number 0" in summary.summary_text
+        assert "fact number 99" in summary.summary_text
+        # 模板摘要只在叶子层加列表符号
+        assert "- - " not in summary.summary_text
+
+        # 已删除的实体从叶子中移除
+        await summarizer.remove_entity("e0", "test_session")
+        summary = await summarizer.update_hierarchical_summary([], "test_session")
+        assert "fact number 0" not in summary.summary_text
+        assert "e0" not in summary.original_entities
+
+        # 输出只拼接最近的fanout个最上层节点
+        hierarchy = summarizer.hierarchies["test_session"]
+        for i in range(100, 120):
+            hierarchy.add_entity(f"e{i}", f"fact number {i}")
+        await hierarchy.refresh(summarizer._summarize_hierarchy_level)
+        assert len(hierarchy.top_nodes()) > hierarchy.fanout
+        assert hierarchy.render().count("\n\n") == hierarchy.fanout - 1
+
 
 class TestEnhancedWorldMemory:
     """测试EnhancedWorldMemory"""
@@ -309,6 +1116,165 @@ class TestEnhancedWorldMemory:
         # 由于禁用了结构化存储，这里可能返回False
         # 在实际测试中，应该启用结构化存储
 
+    @pytest.mark.asyncio
+    async def test_relationship_graph_queries(self, tmp_path):
+        """测试关系图索引上的网络、k跳和路径查询"""
+        config = {
+            "db_path": str(tmp_path / "graph.db"),
+            "vector_store_enabled": False,
+            "summarizer_enabled": False,
+        }
+        memory = EnhancedWorldMemory("graph_session", config)
+        await asyncio.sleep(0.1)  # 等待建表完成
+
+        for name in ("a", "b", "c", "d"):
+            await memory.store_entity(
+                MemoryEntity(
+                    id=f"node_{name}",
+                    session_id="graph_session",
+                    type=MemoryEntityType.CHARACTER,
+                    content={"name": name},
+                    created_at=datetime.now(),
+                    updated_at=datetime.now(),
+                )
+            )
+        for source, target in (("a", "b"), ("b", "c"), ("c", "d")):
+            assert await memory.add_relation(
+                MemoryRelation(
+                    f"node_{source}", f"node_{target}", MemoryRelationType.KNOWS
+                )
+            )
+
+        network = await memory.get_relationship_network("node_a", depth=2)
+        assert set(network.nodes) == {"node_a", "node_b", "node_c"}
+        assert len(network.edges) == 2
+        assert network.edges[0]["metadata"]["relation_type"] == "knows"
+
+        k_hop = await memory.get_k_hop_entities("node_a", k=3)
+        assert {entity_id: hops for entity_id, (_, hops) in k_hop.items()} == {
+            "node_b": 1,
+            "node_c": 2,
+            "node_d": 3,
+        }
+
+        path = await memory.find_relationship_path("node_a", "node_d")
+        assert [entity.id for entity in path] == [
+            "node_a",
+            "node_b",
+            "node_c",
+            "node_d",
+        ]
+
+        # 新实例从结构化存储一次性加载关系图
+        reloaded = EnhancedWorldMemory("graph_session", config)
+        related = await reloaded.get_related_entities("node_b")
+        assert {entity.id for entity in related} == {"node_a", "node_c"}
+
+        assert await reloaded.remove_relation(
+            "node_b", "node_c", MemoryRelationType.KNOWS
+        )
+        assert await reloaded.find_relationship_path("node_a", "node_d") is None
+
+    @pytest.mark.asyncio
+    async def test_timeline_range_queries(self, tmp_path):
+        """测试时间线按时间索引查询并按版本缓存事件"""
+        config = {
+            "db_path": str(tmp_path / "timeline.db"),
+            "vector_store_enabled": False,
+            "summarizer_enabled": False,
+        }
+        memory = EnhancedWorldMemory("timeline_session", config)
+        await asyncio.sleep(0.1)  # 等待建表完成
+
+        base = datetime(2024, 1, 1)
+        for day in (3, 1, 2):
+            await memory.store_entity(
+                MemoryEntity(
+                    id=f"event_{day}",
+                    session_id="timeline_session",
+                    type=MemoryEntityType.EVENT,
+                    content={"day": day},
+                    created_at=base + timedelta(days=day),
+                    updated_at=datetime.now(),
+                )
+            )
+
+        timeline = await memory.get_timeline()
+        assert [event.entity_id for event in timeline] == [
+            "event_1",
+            "event_2",
+            "event_3",
+        ]
+
+        window = await memory.get_timeline(
+            base + timedelta(days=2), base + timedelta(days=3)
+        )
+        assert [event.entity_id for event in window] == ["event_2", "event_3"]
+        assert memory.timeline_index.stats["event_hits"] == 2
+
+        # 更新后只重建该实体的事件，新增实体直接进入索引
+        await memory.update_entity("event_2", {"content": {"note": "updated"}})
+        await memory.store_entity(
+            MemoryEntity(
+                id="event_0",
+                session_id="timeline_session",
+                type=MemoryEntityType.EVENT,
+                content={"day": 0},
+                created_at=base,
+                updated_at=datetime.now(),
+            )
+        )
+        await memory.delete_entity("event_3")
+
+        timeline = await memory.get_timeline()
+        assert [event.entity_id for event in timeline] == [
+            "event_0",
+            "event_1",
+            "event_2",
+        ]
+        assert timeline[2].metadata["version"] == 2
+
+    @pytest.mark.asyncio
+    async def test_consistency_index_loads_from_store(self, tmp_path):
+        """测试近似重复索引从结构化存储加载，且只保存ID和签名"""
+        config = {
+            "db_path": str(tmp_path / "consistency.db"),
+            "vector_store_enabled": False,
+            "summarizer_enabled": False,
+        }
+        memory = EnhancedWorldMemory("consistency_session", config)
+        await asyncio.sleep(0.1)  # 等待建表完成
+
+        character = {"name": "艾琳", "status": "alive", "location": "银月城堡"}
+        await memory.store_entity(
+            MemoryEntity(
+                id="alive",
+                session_id="consistency_session",
+                type=MemoryEntityType.CHARACTER,
+                content=character,
+                created_at=datetime(2024, 1, 1),
+                updated_at=datetime(2024, 1, 1),
+            )
+        )
+
+        # 新实例（如进程重启）首次检查时从存储加载已有实体
+        reloaded = EnhancedWorldMemory("consistency_session", config)
+        dead = MemoryEntity(
+            id="dead",
+            session_id="consistency_session",
+            type=MemoryEntityType.CHARACTER,
+            content={**character, "status": "dead"},
+            created_at=datetime(2024, 1, 2),
+            updated_at=datetime(2024, 1, 2),
+        )
+        issues = await reloaded.check_entity_consistency(dead)
+        assert [issue.issue_id for issue in issues] == ["contradiction_alive_dead"]
+
+        checker = reloaded.consistency_checker
+        assert checker.loaded
+        assert "alive" in checker.lsh_index
+        assert checker._indexed_entities == {}
+
 
 class TestMemoryConsistencyChecker:
     """测试MemoryConsistencyChecker"""
@@ -420,6 +1386,132 @@ class TestMemoryConsistencyChecker:
         assert ConsistencyIssueType.ENTITY_DUPLICATE in issue_types
         assert ConsistencyIssueType.TEMPORAL_CONFLICT in issue_types
 
+    @pytest.mark.asyncio
+    async def test_near_duplicates_and_contradictions(self, consistency_checker):
+        """测试基于LSH的近似重复和矛盾候选检测"""
+
+        def make(entity_id, entity_type, content):
+            return MemoryEntity(
+                id=entity_id,
+                session_id="test_session",
+                type=entity_type,
+                content=content,
+                created_at=datetime(2024, 1, 1),
+                updated_at=datetime(2024, 1, 1),
+            )
+
+        character = {"name": "艾琳", "status": "alive", "location": "银月城堡"}
+        text = "艾琳在银月城堡的图书馆里发现了一本古老的魔法书"
+        entities = [
+            make("alive", MemoryEntityType.CHARACTER, character),
+            make("dead", MemoryEntityType.CHARACTER, {**character, "status": "dead"}),
+            make("fact_a", MemoryEntityType.FACT, {"text": text}),
+            make("fact_b", MemoryEntityType.FACT, {"text": text + "。"}),
+            make("other", MemoryEntityType.CHARACTER, {"name": "高文"}),
+        ]
+
+        issues = await consistency_checker._check_near_duplicates(entities)
+        by_id = {issue.issue_id: issue for issue in issues}
+        assert set(by_id) == {
+            "contradiction_alive_dead",
+            "near_duplicate_fact_a_fact_b",
+        }
+        contradiction = by_id["contradiction_alive_dead"]
+        assert contradiction.issue_type == ConsistencyIssueType.FACT_CONTRADICTION
+        assert contradiction.conflicting_data["conflicting_fields"] == {
+            "status": ["alive", "dead"]
+        }
+
+        # 批量检查使用临时索引，不保留实体
+        assert len(consistency_checker.lsh_index) == 0
+        assert consistency_checker._indexed_entities == {}
+
+        # 单实体检查只比较同桶候选；删除后不再匹配
+        for entity in entities:
+            consistency_checker.index_entity(entity)
+        revived = make("revived", MemoryEntityType.CHARACTER, character)
+        consistency_checker.remove_entity("alive")
+        issues = await consistency_checker.check_entity(revived)
+        assert [issue.affected_entities for issue in issues] == [["dead", "revived"]]
+
+        consistency_checker.remove_entity("dead")
+        assert await consistency_checker.check_entity(revived) == []
+
+    @pytest.mark.asyncio
+    async def test_contradiction_requires_identity_field(self, consistency_checker):
+        """测试仅地点等非标识字段相同的实体不视为矛盾"""
+        description = "王国骑士团在银月城堡的大厅里举行了盛大的授勋仪式"
+        entities = [
+            MemoryEntity(
+                id=f"event_{time_of_day}",
+                session_id="test_session",
+                type=MemoryEntityType.EVENT,
+                content={
+                    "description": description,
+                    "location": "银月城堡",
+                    "time_of_day": time_of_day,
+                },
+                created_at=datetime(2024, 1, 1),
+                updated_at=datetime(2024, 1, 1),
+            )
+            for time_of_day in ("morning", "evening")
+        ]
+
+        issues = await consistency_checker._check_near_duplicates(entities)
+        assert all(
+            issue.issue_type != ConsistencyIssueType.FACT_CONTRADICTION
+            for issue in issues
+        )
+
+    @pytest.mark.asyncio
+    async def test_participant_overlap_detection(self, consistency_checker):
+        """测试同一参与者的事件时间重叠（批量扫描与增量索引）"""
+
+        def event(entity_id, hour, hours, participants, location):
+            start = datetime(2024, 1, 1, hour)
+            return MemoryEntity(
+                id=entity_id,
+                session_id="test_session",
+                type=MemoryEntityType.EVENT,
+                content={
+                    "participants": participants,
+                    "start_time": start.isoformat(),
+                    "duration_hours": hours,
+                    "location": location,
+                },
+                created_at=start,
+                updated_at=start,
+            )
+
+        events = [
+            event("feast", 8, 4, ["艾琳", "高文"], "城堡"),
+            event("duel", 10, 1, ["高文"], "北境"),
+            event("council", 12, 2, ["艾琳"], "城堡"),  # 紧接feast结束，不重叠
+            event("hunt", 9, 1, ["莫德"], "森林"),
+        ]
+
+        issues = await consistency_checker._check_temporal_conflicts(events)
+        overlaps = [i for i in issues if i.issue_id.startswith("overlap_")]
+        assert [i.issue_id for i in overlaps] == ["overlap_duel_feast"]
+        assert overlaps[0].severity == ConsistencySeverity.HIGH
+        assert overlaps[0].conflicting_data["subject"] == "高文"
+
+        # 增量：索引已有事件后，只检查新事件
+        for entity in events:
+            consistency_checker.index_entity(entity)
+        ambush = event("ambush", 13, 1, ["艾琳", "莫德"], "城堡")
+        issues = [
+            issue
+            for issue in await consistency_checker.check_entity(ambush)
+            if issue.issue_type == ConsistencyIssueType.TEMPORAL_CONFLICT
+        ]
+        assert [i.issue_id for i in issues] == ["overlap_ambush_council"]
+        assert issues[0].severity == ConsistencySeverity.MEDIUM
+
+        consistency_checker.remove_entity("council")
+        issues = await consistency_checker.check_entity(ambush)
+        assert not any(i.issue_id.startswith("overlap_") for i in issues)
+
     @pytest.mark.asyncio
     async def test_issue_resolution(
         self, consistency_checker, test_entities_with_issues
@@ -12,6 +12,11 @@ from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
+from src.loom.memory.hybrid_retrieval import (
+    HybridRetriever,
+    HybridSearchConfig,
+    reciprocal_rank_fusion,
+)
 from src.loom.memory.structured_store import StructuredStore
 from src.loom.memory.summarizer import MemorySummarizer, SummaryConfig
 from src.loom.memory.vector_store import VectorStore
@@ -333,6 +338,94 @@ class TestStructuredStore:
         assert len(characters) == 1
         assert characters[0].type == MemoryEntityType.CHARACTER
 
+    @pytest.mark.asyncio
+    async def test_query_cache_invalidated_by_writes(self, temp_db_path):
+        """测试写入按标签失效查询缓存，且缓存有界"""
+        store = StructuredStore(db_path=temp_db_path, cache_max_entries=3)
+        await asyncio.sleep(0.1)
+
+        def character(entity_id):
+            return MemoryEntity(
+                id=entity_id,
+                session_id="test-session",
+                type=MemoryEntityType.CHARACTER,
+                content={"name": entity_id},
+                created_at=datetime.now(),
+                updated_at=datetime.now(),
+            )
+
+        await store.store_entity(character("char-1"))
+        for limit in (10, 50):
+            characters = await store.retrieve_entities_by_type(
+                "test-session", MemoryEntityType.CHARACTER, limit=limit
+            )
+            assert len(characters) == 1
+
+        # 新实体写入后，所有limit的按类型结果都失效
+        await store.store_entity(character("char-2"))
+        for limit in (10, 50):
+            characters = await store.retrieve_entities_by_type(
+                "test-session", MemoryEntityType.CHARACTER, limit=limit
+            )
+            assert len(characters) == 2
+
+        assert (await store.retrieve_entity("char-1")) is not None
+        assert (await store.retrieve_entity("char-1")) is not None
+        assert (await store.retrieve_entity("char-2")) is not None
+        await store.delete_entity("char-1")
+        assert await store.retrieve_entity("char-1") is None
+
+        stats = store.get_cache_stats()
+        assert stats["entries"] <= 3
+        assert stats["evictions"] >= 1
+        assert stats["invalidations"] >= 2
+        assert 0 < stats["hit_ratio"] < 1
+        assert stats["memory_bytes"] > 0
+
+    @pytest.mark.asyncio
+    async def test_cleanup_old_sessions_invalidates_session_cache(self, temp_db_path):
+        """测试清理旧会话时使该会话标签下的缓存结果失效"""
+        store = StructuredStore(db_path=temp_db_path)
+        await asyncio.sleep(0.1)
+
+        old_time = datetime.now() - timedelta(days=40)
+        for entity_id, session_id, created_at in (
+            ("old-1", "old-session", old_time),
+            ("new-1", "new-session", datetime.now()),
+        ):
+            await store.store_entity(
+                MemoryEntity(
+                    id=entity_id,
+                    session_id=session_id,
+                    type=MemoryEntityType.CHARACTER,
+                    content={"name": entity_id},
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+            )
+            await store.retrieve_entity(entity_id)
+            await store.retrieve_entities_by_type(
+                session_id, MemoryEntityType.CHARACTER
+            )
+
+        assert await store.cleanup_old_sessions(days_old=30)
+
+        # 旧会话的缓存结果全部失效，其他会话不受影响
+        assert store._get_cached_result(("retrieve_entity", "old-1")) is None
+        assert (
+            store._get_cached_result(
+                ("retrieve_entities_by_type", "old-session", "character", 100)
+            )
+            is None
+        )
+        assert store._get_cached_result(("retrieve_entity", "new-1")) is not None
+        assert (
+            store._get_cached_result(
+                ("retrieve_entities_by_type", "new-session", "character", 100)
+            )
+            is not None
+        )
+
     @pytest.mark.asyncio
     async def test_store_and_retrieve_facts(self, temp_db_path):
         """测试存储和检索事实"""
@@ -405,6 +498,181 @@ class TestStructuredStore:
         assert "character" in stats["entity_stats"]
         assert stats["entity_stats"]["character"] == 1
 
+    @pytest.mark.asyncio
+    async def test_search_entities_ranked(self, temp_db_path):
+        """测试全文索引关键词检索"""
+        store = StructuredStore(db_path=temp_db_path)
+        await asyncio.sleep(0.1)
+
+        for entity_id, text in [
+            ("fact-1", "王国的古老城堡矗立在山顶"),
+            ("fact-2", "古老城堡的城门被攻破，古老城堡陷落"),
+            ("fact-3", "港口的商船正在卸货"),
+        ]:
+            await store.store_entity(
+                MemoryEntity(
+                    id=entity_id,
+                    session_id="test-session",
+                    type=MemoryEntityType.FACT,
+                    content={"text": text},
+                    created_at=datetime.now(),
+                    updated_at=datetime.now(),
+                )
+            )
+
+        hits = await store.search_entities_ranked("古老城堡", "test-session")
+        assert [entity.id for entity, _ in hits] == ["fact-2", "fact-1"]
+        assert hits[0][1] >= hits[1][1]
+
+        # 覆盖写入后旧内容不再命中
+        await store.store_entity(
+            MemoryEntity(
+                id="fact-1",
+                session_id="test-session",
+                type=MemoryEntityType.FACT,
+                content={"text": "山顶只剩废墟"},
+                created_at=datetime.now(),
+                updated_at=datetime.now(),
+            )
+        )
+        hits = await store.search_entities_ranked("古老城堡", "test-session")
+        assert [entity.id for entity, _ in hits] == ["fact-2"]
+        assert await store.search_entities_ranked("古老城堡", "other-session") == []
+
+    @pytest.mark.asyncio
+    async def test_retrieve_entities_multi_get(self, temp_db_path):
+        """测试批量检索实体"""
+        store = StructuredStore(db_path=temp_db_path)
+        await asyncio.sleep(0.1)
+
+        for i in range(3):
+            await store.store_entity(
+                MemoryEntity(
+                    id=f"entity-{i}",
+                    session_id="test-session",
+                    type=MemoryEntityType.FACT,
+                    content={"text": f"实体{i}"},
+                    created_at=datetime.now(),
+                    updated_at=datetime.now(),
+                )
+            )
+
+        found = await store.retrieve_entities(["entity-2", "entity-0", "missing"])
+        assert set(found) == {"entity-0", "entity-2"}
+        assert found["entity-2"].content == {"text": "实体2"}
+
+        # 第二次命中查询缓存
+        cached = await store.retrieve_entities(["entity-0"])
+        assert cached["entity-0"] is found["entity-0"]
+
+    @pytest.mark.asyncio
+    async def test_world_memory_hydrates_search_results_in_batch(self):
+        """测试检索结果通过一次批量查询还原"""
+        entities = {
+            f"entity-{i}": MemoryEntity(
+                id=f"entity-{i}",
+                session_id="test-session",
+                type=MemoryEntityType.FACT,
+                content={"text": f"实体{i}"},
+                created_at=datetime.now(),
+                updated_at=datetime.now(),
+            )
+            for i in range(4)
+        }
+        structured_store = MagicMock()
+        structured_store.retrieve_entities = AsyncMock(
+            side_effect=lambda ids: {i: entities[i] for i in ids if i in entities}
+        )
+        vector_store = MagicMock()
+        vector_store.search = AsyncMock(
+            return_value=[("entity-3", 0.9), ("missing", 0.8), ("entity-1", 0.7)]
+        )
+
+        memory = WorldMemory(
+            session_id="test-session",
+            structured_store=structured_store,
+            vector_store=vector_store,
+        )
+        memory.entities["entity-1"] = entities["entity-1"]
+
+        results = await memory.search_entities("实体")
+        assert [entity.id for entity in results] == ["entity-3", "entity-1"]
+        structured_store.retrieve_entities.assert_awaited_once_with(
+            ["entity-3", "missing"]
+        )
+
+
+class TestHybridRetrieval:
+    """混合检索单元测试"""
+
+    def _entity(self, entity_id: str, hours_old: float = 0.0) -> MemoryEntity:
+        timestamp = datetime.now() - timedelta(hours=hours_old)
+        return MemoryEntity(
+            id=entity_id,
+            session_id="test-session",
+            type=MemoryEntityType.FACT,
+            content={"text": entity_id},
+            created_at=timestamp,
+            updated_at=timestamp,
+        )
+
+    def test_reciprocal_rank_fusion(self):
+        """测试倒数排名融合偏向两路都靠前的结果"""
+        fused = reciprocal_rank_fusion(
+            {"semantic": ["a", "b", "c"], "keyword": ["b", "d"]}, k=60
+        )
+        assert max(fused, key=fused.get) == "b"
+        assert fused["a"] == pytest.approx(1 / 61)
+
+    @pytest.mark.asyncio
+    async def test_slow_source_dropped_within_budget(self):
+        """测试超出延迟预算的检索路径被丢弃"""
+        a, b = self._entity("a"), self._entity("b")
+
+        async def fast(query, limit):
+            return [(a, 0.9), (b, 0.5)]
+
+        async def slow(query, limit):
+            await asyncio.sleep(1)
+            return [(b, 1.0)]
+
+        retriever = HybridRetriever(HybridSearchConfig(timeout_ms=50))
+        results = await retriever.search(
+            "查询", {"semantic": fast, "keyword": slow}, limit=5
+        )
+        assert [entity.id for entity, _ in results] == ["a", "b"]
+        assert retriever.get_stats()["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_contextual_memories_fuse_sources(self):
+        """测试上下文记忆融合语义和关键词结果"""
+        memory = WorldMemory(session_id="test-session")
+        old, fresh = self._entity("old", hours_old=72), self._entity("fresh")
+        for entity in (old, fresh):
+            memory.entities[entity.id] = entity
+
+        memory.vector_store = MagicMock()
+        memory.vector_store.search = AsyncMock(
+            return_value=[("old", 0.9), ("fresh", 0.8)]
+        )
+        memory.structured_store = MagicMock()
+        memory.structured_store.search_entities_ranked = AsyncMock(
+            return_value=[(fresh, 3.0)]
+        )
+
+        results = await memory.get_contextual_memories("查询", limit=2)
+        assert [entity.id for entity in results] == ["fresh", "old"]
+
+        # 仅有语义结果时，较新的实体凭新近度排在前面，上下文实体被提升
+        memory.structured_store.search_entities_ranked.return_value = []
+        results = await memory.get_contextual_memories("查询", limit=2)
+        assert results[0].id == "fresh"
+
+        results = await memory.get_contextual_memories(
+            "查询", context_entities=["old"], limit=2
+        )
+        assert results[0].id == "old"
+
 
 class TestVectorStore:
     """VectorStore单元测试"""